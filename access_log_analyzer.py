@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Nginx Access Log Analyzer
+-------------------------
+Lê o access log do nginx no formato `upstream_timing` (JSON, gerado pelo
+setup.py em docker/nginx/conf.d/app.conf), agrupa as requisições por rota
+(/api/transactions/42/refund -> /api/transactions/{id}/refund) e relata
+vazão e percentis de latência por rota, separando:
+
+  total     $request_time: do primeiro byte lido do cliente ao último enviado
+  conexão   $upstream_connect_time: conexão com o PHP-FPM
+  php       $upstream_header_time - $upstream_connect_time: fila do pool e
+            execução do PHP até o primeiro byte da resposta
+  nginx     $request_time - $upstream_response_time: leitura do corpo,
+            bufferização e envio ao cliente, fora do PHP
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from latency_histogram import LatencyHistogram, format_percentiles
+from log_analyzer import iter_lines, parse_record
+from log_indexer import normalize_path
+
+ACCESS_LOG = os.path.join("docker", "nginx", "logs", "access.log")
+
+# Etapas exibidas no relatório, na ordem
+STAGES = ["total", "connect", "php", "nginx"]
+STAGE_LABELS = {"total": "total", "connect": "conexão", "php": "php", "nginx": "nginx"}
+
+
+# Cores para formatação no terminal
+class Colors:
+    """Define cores para saídas no terminal."""
+    RED = '\033[0;31m'
+    YELLOW = '\033[0;33m'
+    BLUE = '\033[0;34m'
+    RESET = '\033[0m'  # No Color
+
+
+def log_info(message):
+    """Exibe mensagem informativa."""
+    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}", file=sys.stderr)
+
+
+def log_warning(message):
+    """Exibe mensagem de aviso."""
+    print(f"{Colors.YELLOW}[WARNING]{Colors.RESET} {message}", file=sys.stderr)
+
+
+def log_error(message):
+    """Exibe mensagem de erro."""
+    print(f"{Colors.RED}[ERROR]{Colors.RESET} {message}", file=sys.stderr)
+
+
+def route_template(uri):
+    """Remove a query string e troca IDs do caminho por {id}."""
+    path = uri.split("?", 1)[0]
+    return "/" + normalize_path(path)
+
+
+def upstream_seconds(value):
+    """
+    Soma os tempos de upstream do nginx.
+
+    Com retentativas o nginx registra um valor por upstream ("0.010, 0.020"
+    ou "0.010 : 0.020"); "-" indica que não houve upstream.
+    """
+    if value in (None, "", "-"):
+        return None
+    total = 0.0
+    found = False
+    for part in str(value).replace(":", ",").split(","):
+        part = part.strip()
+        if part and part != "-":
+            total += float(part)
+            found = True
+    return total if found else None
+
+
+class RouteStats:
+    """Métricas agregadas de uma rota."""
+
+    def __init__(self):
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+        self.statuses = {}
+        self.bytes_sent = 0
+        self.count = 0
+
+    def add(self, entry):
+        """Acrescenta uma linha do access log."""
+        self.count += 1
+        status = entry.get("status", 0)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes_sent += entry.get("bytes_sent", 0) or 0
+
+        total = entry.get("request_time")
+        if isinstance(total, (int, float)):
+            self.stages["total"].record_seconds(total)
+        connect = upstream_seconds(entry.get("upstream_connect_time"))
+        header = upstream_seconds(entry.get("upstream_header_time"))
+        response = upstream_seconds(entry.get("upstream_response_time"))
+        if connect is not None:
+            self.stages["connect"].record_seconds(connect)
+        if header is not None:
+            self.stages["php"].record_seconds(header - (connect or 0.0))
+        if response is not None and isinstance(total, (int, float)):
+            self.stages["nginx"].record_seconds(total - response)
+
+    def to_dict(self, elapsed_seconds):
+        """Resumo serializável."""
+        return {
+            "requests": self.count,
+            "rps": round(self.count / elapsed_seconds, 3) if elapsed_seconds else None,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "bytes_sent": self.bytes_sent,
+            "latency": {stage: self.stages[stage].to_dict() for stage in STAGES},
+        }
+
+
+def analyze(path, since=None):
+    """
+    Agrega o access log por (método, rota) em uma passada.
+
+    Args:
+        path: Arquivo do access log
+        since: datetime mínimo (com fuso) das linhas consideradas
+
+    Returns:
+        tuple: (dict (método, rota) -> RouteStats, primeiro horário, último horário,
+                linhas ignoradas)
+    """
+    routes = {}
+    first = last = None
+    skipped = 0
+    for _, _, line in iter_lines(path):
+        entry = parse_record(line)
+        if entry is None or "uri" not in entry:
+            skipped += 1
+            continue
+        try:
+            moment = datetime.fromisoformat(entry.get("time", ""))
+        except ValueError:
+            moment = None
+        if since and moment and moment < since:
+            continue
+        if moment:
+            first = moment if first is None else min(first, moment)
+            last = moment if last is None else max(last, moment)
+
+        key = (entry.get("method", "?"), route_template(entry["uri"]))
+        stats = routes.get(key)
+        if stats is None:
+            stats = routes[key] = RouteStats()
+        stats.add(entry)
+    return routes, first, last, skipped
+
+
+def print_report(routes, elapsed_seconds, limit):
+    """Exibe o relatório por rota, das mais frequentes às menos frequentes."""
+    ordered = sorted(routes.items(), key=lambda item: item[1].count, reverse=True)[:limit]
+    print(f"{Colors.BLUE}=== LATÊNCIA POR ROTA (NGINX) ==={Colors.RESET}")
+    for (method, route), stats in ordered:
+        rps = stats.count / elapsed_seconds if elapsed_seconds else 0.0
+        errors = sum(c for s, c in stats.statuses.items() if s >= 500)
+        print(f"\n{method} {route}  {stats.count} req ({rps:.2f} req/s), "
+              f"5xx {errors / stats.count:.1%}, "
+              f"{stats.bytes_sent / stats.count / 1024:.1f} KB/resp")
+        for stage in STAGES:
+            histogram = stats.stages[stage]
+            if histogram.total:
+                print(f"  {STAGE_LABELS[stage]:<8} {format_percentiles(histogram)}")
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Latência por rota a partir do access log do nginx")
+    parser.add_argument("file", nargs="?", default=ACCESS_LOG,
+                        help=f"Access log (padrão: {ACCESS_LOG})")
+    parser.add_argument("--since", default=None,
+                        help="Considera apenas linhas a partir deste horário ISO 8601")
+    parser.add_argument("--limit", type=int, default=30,
+                        help="Quantidade máxima de rotas exibidas (padrão: 30)")
+    parser.add_argument("--json", action="store_true",
+                        help="Imprime o resultado em JSON")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+    if not os.path.isfile(options.file):
+        log_error(f"Access log não encontrado: {options.file}")
+        sys.exit(1)
+
+    since = None
+    if options.since:
+        since = datetime.fromisoformat(options.since)
+        if since.tzinfo is None:
+            since = since.astimezone()
+
+    routes, first, last, skipped = analyze(options.file, since)
+    if skipped:
+        log_warning(f"{skipped} linhas fora do formato upstream_timing foram ignoradas "
+                    f"(execute o setup.py para atualizar a configuração do nginx)")
+    if not routes:
+        log_error("Nenhuma requisição encontrada.")
+        sys.exit(1)
+
+    elapsed = (last - first).total_seconds() if first and last else 0.0
+    log_info(f"Período: {first} a {last}")
+    if options.json:
+        json.dump({f"{method} {route}": stats.to_dict(elapsed)
+                   for (method, route), stats in routes.items()}, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(routes, elapsed, options.limit)
+
+
+if __name__ == "__main__":
+    main()
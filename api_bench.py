@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+"""
+API Benchmark
+-------------
+Benchmark por endpoint guiado pela coleção do Postman
+("MultiGateway API.postman_collection.json").
+
+Cada requisição da coleção roda em concorrência fixa por um tempo fixo
+(closed-loop, após um aquecimento descartado). As variáveis da coleção
+({{base_url}}, {{auth_token}}) são resolvidas fazendo login com os usuários
+dos seeders. Vazão, percentis de latência e uma amostra das latências de cada
+endpoint são gravados em .bench-results/<sha do git>.json.
+
+O comando compare confronta duas execuções com o teste de Mann-Whitney
+(latência por requisição e vazão por segundo) e termina com código 1 quando
+há regressão estatisticamente significativa, para ser usado como portão no
+CI.
+
+Por padrão só rodam as leituras (GET), o login e a compra; as demais escritas
+alteram os dados usados pelas outras requisições e exigem --include-writes.
+O logout nunca roda, pois revogaria o token compartilhado.
+
+Uso:
+  python api_bench.py run --concurrency 10 --duration 20
+  python api_bench.py run --roles admin,user --filter products
+  python api_bench.py compare main HEAD
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from async_http import HttpClient, HttpError
+from latency_histogram import LatencyHistogram, format_percentiles
+
+COLLECTION_FILE = "MultiGateway API.postman_collection.json"
+RESULTS_DIR = ".bench-results"
+
+# Usuários criados pelo UserSeeder (todos com a senha "password")
+SEEDED_USERS = {
+    "admin": "admin@example.com",
+    "manager": "manager@example.com",
+    "finance": "finance@example.com",
+    "user": "user@example.com",
+}
+SEEDED_PASSWORD = "password"
+
+# Escritas que não alteram os dados de que as outras requisições dependem
+SAFE_WRITES = {("POST", "/login"), ("POST", "/purchase")}
+
+# Revoga o token em uso: nunca entra no benchmark
+SKIPPED_REQUESTS = {("POST", "/logout")}
+
+# Latências guardadas por endpoint para os testes de significância
+SAMPLE_SIZE = 2000
+
+VARIABLE_RE = re.compile(r"\{\{\s*([\w.-]+)\s*\}\}")
+
+
+# Cores para formatação no terminal
+class Colors:
+    """Define cores para saídas no terminal."""
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[0;33m'
+    BLUE = '\033[0;34m'
+    RESET = '\033[0m'  # No Color
+
+
+def log_info(message):
+    """Exibe mensagem informativa."""
+    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}")
+
+
+def log_success(message):
+    """Exibe mensagem de sucesso."""
+    print(f"{Colors.GREEN}[SUCCESS]{Colors.RESET} {message}")
+
+
+def log_warning(message):
+    """Exibe mensagem de aviso."""
+    print(f"{Colors.YELLOW}[WARNING]{Colors.RESET} {message}")
+
+
+def log_error(message):
+    """Exibe mensagem de erro."""
+    print(f"{Colors.RED}[ERROR]{Colors.RESET} {message}")
+
+
+class CollectionRequest:
+    """Requisição da coleção do Postman."""
+
+    def __init__(self, folder, name, method, url, headers, body, authenticated):
+        self.folder = folder
+        self.name = name
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.authenticated = authenticated
+
+    def path(self, variables):
+        """Caminho relativo ao {{base_url}}, sem a query string."""
+        resolved = substitute(self.url, dict(variables, base_url=""))
+        return resolved.split("?", 1)[0]
+
+    @property
+    def is_read(self):
+        return self.method in ("GET", "HEAD")
+
+
+def substitute(text, variables):
+    """Substitui {{variavel}} pelos valores conhecidos; as demais ficam intactas."""
+    return VARIABLE_RE.sub(lambda m: str(variables.get(m.group(1), m.group(0))), text)
+
+
+def load_collection(path=COLLECTION_FILE):
+    """
+    Lê a coleção do Postman.
+
+    Returns:
+        tuple: (lista de CollectionRequest, dict de variáveis da coleção)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        collection = json.load(f)
+
+    variables = {item["key"]: item.get("value", "") for item in collection.get("variable", [])}
+    requests = []
+
+    def walk(items, folder):
+        for item in items:
+            if "item" in item:
+                walk(item["item"], item["name"])
+                continue
+            request = item["request"]
+            url = request["url"] if isinstance(request["url"], str) else request["url"]["raw"]
+            headers = {h["key"]: h["value"] for h in request.get("header", [])
+                       if not h.get("disabled")}
+            body = (request.get("body") or {}).get("raw") or None
+            auth = request.get("auth") or collection.get("auth") or {}
+            requests.append(CollectionRequest(folder, item["name"], request["method"].upper(),
+                                              url, headers, body, auth.get("type") == "bearer"))
+
+    walk(collection.get("item", []), "")
+    return requests, variables
+
+
+def select_requests(requests, variables, include_writes=False, pattern=None):
+    """
+    Escolhe as requisições do benchmark: leituras, escritas seguras e, com
+    include_writes, as demais escritas ao final (para não afetar as leituras).
+    """
+    reads, writes = [], []
+    regex = re.compile(pattern, re.IGNORECASE) if pattern else None
+    for request in requests:
+        key = (request.method, request.path(variables))
+        if key in SKIPPED_REQUESTS:
+            continue
+        if regex and not regex.search(f"{request.method} {key[1]} {request.folder} {request.name}"):
+            continue
+        if request.is_read or key in SAFE_WRITES:
+            reads.append(request)
+        elif include_writes:
+            writes.append(request)
+    return reads + writes
+
+
+def git_revision():
+    """
+    SHA do commit atual, com o sufixo -dirty se houver alterações não commitadas.
+
+    Returns:
+        str: Identificador da execução, ou "unknown" fora de um repositório git
+    """
+    result = subprocess.run("git rev-parse HEAD", shell=True, capture_output=True,
+                            text=True, check=False)
+    if result.returncode != 0:
+        return "unknown"
+    sha = result.stdout.strip()
+    status = subprocess.run("git status --porcelain --untracked-files=no", shell=True,
+                            capture_output=True, text=True, check=False)
+    return f"{sha}-dirty" if status.stdout.strip() else sha
+
+
+def resolve_result(reference):
+    """
+    Localiza o arquivo de resultados de uma referência do git ou de um caminho.
+
+    Returns:
+        str: Caminho do arquivo
+
+    Raises:
+        FileNotFoundError: Se não houver execução gravada para a referência
+    """
+    if os.path.isfile(reference):
+        return reference
+    result = subprocess.run(f"git rev-parse {reference}", shell=True, capture_output=True,
+                            text=True, check=False)
+    sha = result.stdout.strip() if result.returncode == 0 else reference
+    for name in (sha, f"{sha}-dirty"):
+        path = os.path.join(RESULTS_DIR, f"{name}.json")
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f"nenhuma execução gravada para '{reference}' em {RESULTS_DIR}/")
+
+
+class EndpointStats:
+    """Métricas de um endpoint durante a medição."""
+
+    def __init__(self, seed=None):
+        self.latency = LatencyHistogram()
+        self.samples = []
+        self.per_second = Counter()
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.random = random.Random(seed)
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def record(self, latency, status=None, error=None):
+        """Registra uma requisição concluída (latência em segundos)."""
+        self.latency.record_seconds(latency)
+        self.per_second[int(time.monotonic() - self.started_at)] += 1
+        if error is not None:
+            self.errors[error] += 1
+        else:
+            self.statuses[status] += 1
+
+        # Amostragem por reservatório: memória constante e amostra uniforme
+        latency_ms = round(latency * 1000.0, 3)
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(latency_ms)
+        else:
+            index = self.random.randrange(self.latency.total)
+            if index < SAMPLE_SIZE:
+                self.samples[index] = latency_ms
+
+    def to_dict(self, duration):
+        """Resumo serializável do endpoint."""
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        failed = sum(self.errors.values()) + sum(
+            count for status, count in self.statuses.items() if status >= 400)
+        return {
+            "requests": self.latency.total,
+            "failed": failed,
+            "throughput_rps": round(self.latency.total / elapsed, 2) if elapsed else 0.0,
+            "latency": self.latency.to_dict(),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "transport_errors": dict(self.errors),
+            # Segundos completos apenas: o último é parcial
+            "per_second": [self.per_second.get(second, 0) for second in range(int(duration))],
+            "samples_ms": self.samples,
+        }
+
+
+async def login(client, variables, email):
+    """
+    Faz login com um usuário dos seeders.
+
+    Returns:
+        str: Token Bearer
+
+    Raises:
+        RuntimeError: Se o login falhar
+    """
+    response = await client.request("POST", "/login",
+                                    {"email": email, "password": SEEDED_PASSWORD})
+    if response.status != 200 or "token" not in response.json():
+        raise RuntimeError(f"login de {email} falhou (status {response.status})")
+    return response.json()["token"]
+
+
+def prepare(request, variables):
+    """
+    Resolve as variáveis de uma requisição uma única vez.
+
+    Returns:
+        tuple: (caminho com query string, headers, corpo JSON ou None)
+    """
+    url = substitute(request.url, dict(variables, base_url=""))
+    headers = {key: substitute(value, variables) for key, value in request.headers.items()}
+    # O HttpClient define o Content-Type ao serializar o corpo
+    headers.pop("Content-Type", None)
+    if request.authenticated:
+        headers["Authorization"] = f"Bearer {variables['auth_token']}"
+    body = json.loads(substitute(request.body, variables)) if request.body else None
+    return url, headers, body
+
+
+async def measure(client, request, variables, concurrency, duration):
+    """Mantém `concurrency` usuários virtuais repetindo a requisição até o prazo."""
+    url, headers, body = prepare(request, variables)
+    stats = EndpointStats()
+    deadline = time.monotonic() + duration
+
+    async def virtual_user():
+        while time.monotonic() < deadline:
+            started_at = time.monotonic()
+            try:
+                response = await client.request(request.method, url, body, headers)
+            except HttpError as exc:
+                stats.record(time.monotonic() - started_at, error=str(exc))
+                continue
+            stats.record(time.monotonic() - started_at, status=response.status)
+
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    stats.finished_at = time.monotonic()
+    return stats
+
+
+async def run_benchmark(options):
+    """
+    Executa o benchmark de todas as requisições selecionadas.
+
+    Returns:
+        dict: endpoint -> resumo
+    """
+    requests, variables = load_collection(options.collection)
+    variables["base_url"] = options.url.rstrip("/") + "/api"
+    selected = select_requests(requests, variables, options.include_writes, options.filter)
+    if not selected:
+        raise RuntimeError("nenhuma requisição da coleção foi selecionada")
+
+    client = HttpClient(variables["base_url"], options.concurrency, options.timeout)
+    try:
+        tokens = {}
+        for role in options.roles:
+            tokens[role] = await login(client, variables, SEEDED_USERS[role])
+            log_info(f"Login como {SEEDED_USERS[role]} ({role}) concluído.")
+
+        results = {}
+        for request in selected:
+            roles = options.roles if request.authenticated else [None]
+            for role in roles:
+                request_variables = dict(variables, auth_token=tokens.get(role, ""))
+                key = f"{request.method} {request.path(variables)}"
+                if role:
+                    key += f" [{role}]"
+
+                if options.warmup > 0:
+                    await measure(client, request, request_variables,
+                                  options.concurrency, options.warmup)
+                stats = await measure(client, request, request_variables,
+                                      options.concurrency, options.duration)
+                results[key] = dict(stats.to_dict(options.duration), name=request.name)
+                log_info(f"{key:<45} {results[key]['throughput_rps']:>8.1f} req/s  "
+                         f"{format_percentiles(stats.latency)}"
+                         + (f"  {Colors.YELLOW}{results[key]['failed']} falhas{Colors.RESET}"
+                            if results[key]["failed"] else ""))
+        return results
+    finally:
+        client.close()
+
+
+def save_results(options, results):
+    """
+    Grava a execução em .bench-results/<sha>.json, substituindo uma execução
+    anterior do mesmo commit.
+
+    Returns:
+        str: Caminho do arquivo gravado
+    """
+    revision = git_revision()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{revision}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "revision": revision,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "url": options.url,
+            "concurrency": options.concurrency,
+            "duration": options.duration,
+            "warmup": options.warmup,
+            "roles": options.roles,
+            "endpoints": results,
+        }, f, indent=1)
+    return path
+
+
+def load_result(path):
+    """Carrega uma execução gravada."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def mann_whitney(a, b):
+    """
+    Teste U de Mann-Whitney bilateral, com aproximação normal e correção de
+    empates.
+
+    Returns:
+        float: Valor-p (1.0 se não houver dados suficientes)
+    """
+    n1, n2 = len(a), len(b)
+    if n1 < 2 or n2 < 2:
+        return 1.0
+
+    combined = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    rank_sum = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        rank = (i + j) / 2.0 + 1.0
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        rank_sum += rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        i = j + 1
+
+    u = rank_sum - n1 * (n1 + 1) / 2.0
+    n = n1 + n2
+    variance = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2.0) - 0.5) / math.sqrt(variance)
+    return math.erfc(max(z, 0.0) / math.sqrt(2.0))
+
+
+def median(values):
+    """Mediana de uma lista (0.0 se vazia)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+def compare_runs(baseline, candidate, alpha=0.01, min_change=0.05):
+    """
+    Compara dois resultados endpoint a endpoint.
+
+    Uma regressão exige significância (valor-p < alpha) e uma mudança relativa
+    acima de min_change na mediana da latência ou da vazão por segundo, para
+    que diferenças minúsculas em amostras grandes não reprovem a execução.
+
+    Returns:
+        list: dicts com endpoint, métrica, base, candidato, variação, valor-p e regressão
+    """
+    rows = []
+    for endpoint, base in sorted(baseline["endpoints"].items()):
+        current = candidate["endpoints"].get(endpoint)
+        if current is None:
+            continue
+        for metric, base_values, current_values, worse_when_higher in (
+                ("latência p50 (ms)", base["samples_ms"], current["samples_ms"], True),
+                ("vazão (req/s)", base["per_second"], current["per_second"], False)):
+            before, after = median(base_values), median(current_values)
+            change = (after - before) / before if before else 0.0
+            p_value = mann_whitney(base_values, current_values)
+            worse = change > min_change if worse_when_higher else change < -min_change
+            rows.append({
+                "endpoint": endpoint,
+                "metric": metric,
+                "baseline": before,
+                "candidate": after,
+                "change": change,
+                "p_value": p_value,
+                "regression": worse and p_value < alpha,
+                "improvement": not worse and abs(change) > min_change and p_value < alpha,
+            })
+    return rows
+
+
+def print_comparison(rows, baseline, candidate):
+    """Exibe a comparação entre duas execuções."""
+    print(f"\n{Colors.BLUE}=== {baseline['revision'][:12]} -> "
+          f"{candidate['revision'][:12]} ==={Colors.RESET}")
+    if baseline["concurrency"] != candidate["concurrency"] or \
+            baseline["duration"] != candidate["duration"]:
+        log_warning("As execuções usaram concorrência ou duração diferentes.")
+
+    print(f"{'Endpoint':<45} {'Métrica':<18} {'Base':>9} {'Atual':>9} {'Var.':>8} {'p':>8}")
+    for row in rows:
+        color = (Colors.RED if row["regression"]
+                 else Colors.GREEN if row["improvement"] else "")
+        reset = Colors.RESET if color else ""
+        print(f"{color}{row['endpoint']:<45} {row['metric']:<18} {row['baseline']:>9.2f} "
+              f"{row['candidate']:>9.2f} {row['change']:>+7.1%} {row['p_value']:>8.4f}{reset}")
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark por endpoint guiado pela coleção do Postman")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Executa o benchmark e grava o resultado do commit atual")
+    run.add_argument("--url", default="http://localhost:8000",
+                     help="URL base da aplicação (padrão: http://localhost:8000)")
+    run.add_argument("--collection", default=COLLECTION_FILE,
+                     help=f"Coleção do Postman (padrão: {COLLECTION_FILE})")
+    run.add_argument("--concurrency", type=int, default=10,
+                     help="Usuários virtuais por endpoint (padrão: 10)")
+    run.add_argument("--duration", type=float, default=20.0,
+                     help="Medição por endpoint em segundos (padrão: 20)")
+    run.add_argument("--warmup", type=float, default=3.0,
+                     help="Aquecimento descartado por endpoint em segundos (padrão: 3)")
+    run.add_argument("--timeout", type=float, default=30.0,
+                     help="Timeout por requisição em segundos (padrão: 30)")
+    run.add_argument("--roles", default="admin",
+                     help="Usuários dos seeders usados nas rotas autenticadas, separados "
+                          f"por vírgula ({', '.join(SEEDED_USERS)}; padrão: admin)")
+    run.add_argument("--filter", default=None,
+                     help="Expressão regular sobre método, caminho, pasta e nome da requisição")
+    run.add_argument("--include-writes", action="store_true",
+                     help="Inclui as escritas que alteram dados (executadas após as leituras)")
+    run.add_argument("--no-save", action="store_true",
+                     help=f"Não grava o resultado em {RESULTS_DIR}/")
+
+    compare = commands.add_parser("compare", help="Compara duas execuções gravadas")
+    compare.add_argument("baseline", help="Referência do git ou arquivo da execução base")
+    compare.add_argument("candidate", nargs="?", default="HEAD",
+                         help="Referência do git ou arquivo da execução avaliada (padrão: HEAD)")
+    compare.add_argument("--alpha", type=float, default=0.01,
+                         help="Nível de significância (padrão: 0.01)")
+    compare.add_argument("--min-change", type=float, default=0.05,
+                         help="Variação relativa mínima para regressão (padrão: 0.05)")
+
+    options = parser.parse_args(argv)
+    if options.command == "run":
+        options.roles = [role.strip() for role in options.roles.split(",") if role.strip()]
+        unknown = [role for role in options.roles if role not in SEEDED_USERS]
+        if unknown:
+            parser.error(f"roles desconhecidas: {', '.join(unknown)}")
+        if options.concurrency < 1 or options.duration < 1:
+            parser.error("--concurrency e --duration devem ser positivos (duração >= 1s)")
+    return options
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+
+    if options.command == "compare":
+        try:
+            paths = [resolve_result(options.baseline), resolve_result(options.candidate)]
+        except FileNotFoundError as e:
+            log_error(str(e))
+            sys.exit(2)
+        baseline, candidate = [load_result(path) for path in paths]
+        rows = compare_runs(baseline, candidate, options.alpha, options.min_change)
+        print_comparison(rows, baseline, candidate)
+        regressions = {row["endpoint"] for row in rows if row["regression"]}
+        if regressions:
+            log_error(f"{len(regressions)} endpoint(s) com regressão significativa.")
+            sys.exit(1)
+        log_success("Nenhuma regressão significativa.")
+        return
+
+    print(f"{Colors.BLUE}=== BENCHMARK DA API (COLEÇÃO DO POSTMAN) ==={Colors.RESET}\n")
+    try:
+        results = asyncio.run(run_benchmark(options))
+    except (RuntimeError, HttpError) as e:
+        log_error(f"Falha no benchmark: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        log_warning("Interrompido pelo usuário.")
+        sys.exit(130)
+
+    if not options.no_save:
+        log_success(f"Resultado gravado em {save_results(options, results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Async HTTP Client
+-----------------
+Cliente HTTP/1.1 mínimo sobre asyncio, apenas com a biblioteca padrão.
+Mantém conexões keep-alive em um pool limitado, para que as ferramentas de
+carga meçam a aplicação e não o custo de abrir conexões a cada requisição.
+Seguindo as diretrizes do PEP 8.
+"""
+
+import asyncio
+import json
+
+# Métodos que podem ser repetidos sem efeito adicional no servidor (RFC 9110)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+
+class HttpError(Exception):
+    """Falha de transporte (conexão, timeout ou resposta malformada)."""
+
+
+@dataclass
+class HttpResponse:
+    """Resposta HTTP já lida por completo."""
+    status: int
+    headers: dict = field(default_factory=dict)
+    body: bytes = b""
+
+    def json(self):
+        """Decodifica o corpo como JSON."""
+        return json.loads(self.body.decode("utf-8") or "null")
+
+
+class HttpConnection:
+    """Conexão keep-alive com um único host."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        # Se a última requisição recebeu a linha de status (o servidor a processou)
+        self.status_received = False
+
+    @property
+    def closed(self):
+        return self.writer is None or self.writer.is_closing()
+
+    @property
+    def stale(self):
+        """Conexão ociosa que o servidor já encerrou (EOF pendente no reader)."""
+        return self.closed or self.reader.at_eof()
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers, body):
+        """Envia uma requisição e lê a resposta inteira."""
+        if self.closed:
+            await self.connect()
+        self.status_received = False
+
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        lines.append(f"Content-Length: {len(body)}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Conexão encerrada pelo servidor")
+        self.status_received = True
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError) as exc:
+            raise HttpError(f"Linha de status inválida: {status_line!r}") from exc
+
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            data = b"".join(chunks)
+        elif "content-length" in response_headers:
+            data = await self.reader.readexactly(int(response_headers["content-length"]))
+        else:
+            data = await self.reader.read()
+            self.close()
+
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return HttpResponse(status, response_headers, data)
+
+
+class HttpClient:
+    """
+    Pool de conexões keep-alive para uma URL base.
+
+    Requisições acima do limite de conexões aguardam uma conexão livre; o
+    tempo de espera faz parte da latência observada pelo chamador.
+    """
+
+    def __init__(self, base_url, max_connections=100, timeout=30.0, default_headers=None):
+        """
+        Args:
+            base_url: URL base (ex.: http://localhost:8000)
+            max_connections: Máximo de conexões simultâneas
+            timeout: Timeout de cada requisição em segundos
+            default_headers: Headers enviados em todas as requisições
+        """
+        parts = urlsplit(base_url)
+        if parts.scheme != "http":
+            raise ValueError("Apenas URLs http:// são suportadas")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.base_path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.default_headers = {"Accept": "application/json", "Connection": "keep-alive"}
+        self.default_headers.update(default_headers or {})
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def request(self, method, path, json_body=None, headers=None):
+        """
+        Executa uma requisição reutilizando uma conexão livre do pool.
+
+        Args:
+            method: Método HTTP
+            path: Caminho relativo à URL base
+            json_body: Corpo serializado como JSON
+            headers: Headers adicionais
+
+        Returns:
+            HttpResponse
+
+        Raises:
+            HttpError: Em falhas de conexão, timeout ou resposta inválida
+        """
+        all_headers = dict(self.default_headers)
+        body = b""
+        if json_body is not None:
+            body = json.dumps(json_body).encode("utf-8")
+            all_headers["Content-Type"] = "application/json"
+        all_headers.update(headers or {})
+
+        async with self._slots:
+            connection = self._take_idle() or HttpConnection(self.host, self.port)
+            reused = not connection.closed
+            try:
+                response = await asyncio.wait_for(
+                    connection.request(method, self.base_path + path, all_headers, body),
+                    self.timeout)
+            except asyncio.TimeoutError as exc:
+                connection.close()
+                raise HttpError("timeout") from exc
+            except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                connection.close()
+                # Só repete se a conexão reaproveitada caiu antes de qualquer resposta e o
+                # método é idempotente: um POST /api/purchase repetido pode cobrar duas vezes
+                if not reused or connection.status_received or method.upper() not in IDEMPOTENT_METHODS:
+                    raise HttpError(f"conexão: {exc.__class__.__name__}") from exc
+                # Conexão ociosa fechada pelo servidor: tenta uma vez com uma nova
+                connection = HttpConnection(self.host, self.port)
+                try:
+                    response = await asyncio.wait_for(
+                        connection.request(method, self.base_path + path, all_headers, body),
+                        self.timeout)
+                except asyncio.TimeoutError as retry_exc:
+                    connection.close()
+                    raise HttpError("timeout") from retry_exc
+                except (ConnectionError, OSError, asyncio.IncompleteReadError) as retry_exc:
+                    connection.close()
+                    raise HttpError(f"conexão: {retry_exc.__class__.__name__}") from retry_exc
+            except OSError as exc:
+                connection.close()
+                raise HttpError(f"conexão: {exc.__class__.__name__}") from exc
+
+            if not connection.closed:
+                self._idle.append(connection)
+            return response
+
+    def _take_idle(self):
+        """Conexão ociosa ainda aberta, descartando as que o servidor já encerrou."""
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection.stale:
+                return connection
+            connection.close()
+        return None
+
+    def close(self):
+        """Fecha todas as conexões ociosas."""
+        for connection in self._idle:
+            connection.close()
+        self._idle.clear()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Database Snapshot Cache
+-----------------------
+Cache de snapshots do banco de teste já migrado e populado.
+A chave de cada snapshot é o hash do conteúdo de database/migrations,
+database/seeders e database/factories: enquanto nenhum desses arquivos
+muda, o banco é restaurado de um dump em vez de rodar migrate:fresh --seed.
+Seguindo as diretrizes do PEP 8.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+
+SNAPSHOT_SOURCES = [
+    "database/migrations",
+    "database/seeders",
+    "database/factories",
+]
+
+ROOT_CREDENTIALS = "-u root -proot_password"
+
+
+def compute_schema_hash(app_dir, sources=None):
+    """
+    Calcula o hash do conteúdo dos diretórios que definem o banco.
+
+    Args:
+        app_dir: Diretório da aplicação Laravel no host
+        sources: Diretórios relativos à aplicação (padrão: SNAPSHOT_SOURCES)
+
+    Returns:
+        str: Hash SHA-256 em hexadecimal
+    """
+    digest = hashlib.sha256()
+    for source in sources or SNAPSHOT_SOURCES:
+        base = os.path.join(app_dir, source)
+        for root, dirs, files in os.walk(base):
+            dirs.sort()
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                digest.update(os.path.relpath(path, app_dir).encode())
+                digest.update(b"\0")
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+                digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def dump_schema(docker_compose, service, db_name, destination):
+    """
+    Gera um dump comprimido do schema diretamente do contêiner.
+
+    Args:
+        docker_compose: Comando do Docker Compose
+        service: Serviço do banco de dados
+        db_name: Schema a ser exportado
+        destination: Arquivo .sql.gz no host
+
+    Returns:
+        bool: True se o dump foi gerado com sucesso
+    """
+    process = subprocess.Popen(
+        f"{docker_compose} exec -T {service} mysqldump {ROOT_CREDENTIALS} "
+        f"--single-transaction --skip-lock-tables --no-tablespaces "
+        f"--set-gtid-purged=OFF --routines {db_name}",
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    with gzip.open(destination, "wb", compresslevel=3) as f:
+        shutil.copyfileobj(process.stdout, f, length=1024 * 1024)
+    return process.wait() == 0
+
+
+def restore_schema(docker_compose, service, db_name, source):
+    """
+    Recria o schema e importa um dump em uma única carga.
+
+    Args:
+        docker_compose: Comando do Docker Compose
+        service: Serviço do banco de dados
+        db_name: Schema de destino
+        source: Arquivo .sql.gz no host
+
+    Returns:
+        bool: True se a importação foi concluída com sucesso
+    """
+    recreate = subprocess.run(
+        f"{docker_compose} exec -T {service} mysql {ROOT_CREDENTIALS} "
+        f"-e \"DROP DATABASE IF EXISTS {db_name}; CREATE DATABASE {db_name};\"",
+        shell=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=False
+    )
+    if recreate.returncode != 0:
+        return False
+
+    process = subprocess.Popen(
+        f"{docker_compose} exec -T {service} mysql {ROOT_CREDENTIALS} {db_name}",
+        shell=True,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        with gzip.open(source, "rb") as f:
+            shutil.copyfileobj(f, process.stdin, length=1024 * 1024)
+    except BrokenPipeError:
+        pass
+    finally:
+        process.stdin.close()
+    return process.wait() == 0
+
+
+class SnapshotStore:
+    """
+    Armazenamento local de snapshots com limite de tamanho (LRU).
+
+    Cada snapshot é um par <hash>.sql.gz + <hash>.json com metadados. O
+    horário de modificação do dump marca o último uso e define a ordem de
+    remoção quando o limite é excedido.
+    """
+
+    def __init__(self, directory, max_bytes):
+        """
+        Args:
+            directory: Diretório dos snapshots no host
+            max_bytes: Tamanho máximo total dos snapshots
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _dump_path(self, key):
+        return os.path.join(self.directory, f"{key}.sql.gz")
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def lookup(self, key):
+        """
+        Procura um snapshot pela chave e marca o uso.
+
+        Args:
+            key: Hash do schema
+
+        Returns:
+            tuple: (caminho do dump, metadados) ou (None, None)
+        """
+        dump_path = self._dump_path(key)
+        if not os.path.isfile(dump_path):
+            return None, None
+
+        metadata = {}
+        try:
+            with open(self._meta_path(key), "r") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        os.utime(dump_path)
+        return dump_path, metadata
+
+    def store(self, key, dump_fn, build_seconds):
+        """
+        Gera e grava um snapshot, aplicando o limite de tamanho em seguida.
+
+        Args:
+            key: Hash do schema
+            dump_fn: Função que recebe o caminho de destino e gera o dump
+            build_seconds: Tempo gasto para migrar e popular o banco
+
+        Returns:
+            str: Caminho do dump, ou None se a geração falhou
+        """
+        dump_path = self._dump_path(key)
+        partial_path = dump_path + ".partial"
+        if not dump_fn(partial_path):
+            if os.path.exists(partial_path):
+                os.unlink(partial_path)
+            return None
+
+        os.replace(partial_path, dump_path)
+        with open(self._meta_path(key), "w") as f:
+            json.dump({
+                "key": key,
+                "build_seconds": round(build_seconds, 3),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "size_bytes": os.path.getsize(dump_path),
+            }, f, indent=2)
+
+        self.evict(keep=key)
+        return dump_path
+
+    def evict(self, keep=None):
+        """
+        Remove os snapshots usados há mais tempo até respeitar o limite.
+
+        Args:
+            keep: Chave que nunca deve ser removida
+
+        Returns:
+            list: Chaves removidas
+        """
+        entries = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".sql.gz"):
+                path = os.path.join(self.directory, filename)
+                entries.append((os.path.getmtime(path), os.path.getsize(path),
+                                filename[:-len(".sql.gz")]))
+
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for path in (self._dump_path(key), self._meta_path(key)):
+                if os.path.exists(path):
+                    os.unlink(path)
+            total -= size
+            removed.append(key)
+        return removed
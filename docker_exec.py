@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Docker Exec Session
+-------------------
+Sessão de shell persistente dentro de um contêiner do docker-compose.
+Permite enviar vários comandos pelo mesmo `docker compose exec`, evitando
+abrir um novo processo e um novo shell para cada etapa, mantendo o código
+de saída, a saída e o tempo de cada comando.
+Seguindo as diretrizes do PEP 8.
+"""
+
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+
+
+@dataclass
+class CommandResult:
+    """Resultado de um comando executado na sessão."""
+    command: str
+    returncode: int
+    stdout: str
+    duration: float
+
+    @property
+    def ok(self):
+        """Indica se o comando terminou com sucesso."""
+        return self.returncode == 0
+
+
+class ExecSession:
+    """
+    Canal `docker compose exec` de longa duração para um serviço.
+
+    Cada comando é enviado ao shell remoto seguido de um marcador único que
+    informa o código de saída, permitindo separar a saída de cada comando
+    sem encerrar o processo.
+    """
+
+    def __init__(self, docker_compose, service, env=None, echo=True):
+        """
+        Args:
+            docker_compose: Comando do Docker Compose
+            service: Nome do serviço do compose
+            env: Variáveis de ambiente para a sessão
+            echo: Se a saída dos comandos deve ser exibida enquanto chega
+        """
+        self.docker_compose = docker_compose
+        self.service = service
+        self.env = env or {}
+        self.echo = echo
+        self.marker = f"__MG_EXEC_{uuid.uuid4().hex}__"
+        self.process = None
+        self.history = []
+
+    def open(self):
+        """Abre o canal de execução com o contêiner."""
+        env_params = " ".join(f"-e {k}={v}" for k, v in self.env.items())
+        self.process = subprocess.Popen(
+            f"{self.docker_compose} exec -T {env_params} {self.service} sh",
+            shell=True,
+            text=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=1
+        )
+        return self
+
+    def close(self):
+        """Encerra o shell remoto e aguarda o processo local."""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.write("exit\n")
+            self.process.stdin.flush()
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.wait()
+        self.process = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _send(self, index, command):
+        # stdin do comando vem de /dev/null para que ele não consuma os
+        # próximos comandos enviados pelo canal
+        self.process.stdin.write(
+            f"{{ {command} ; }} </dev/null 2>&1; "
+            f"echo \"{self.marker} {index} $?\"\n")
+
+    def _collect(self, command, echo):
+        output = []
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                return CommandResult(command, 255, "".join(output), 0.0)
+
+            position = line.find(self.marker)
+            if position == -1:
+                output.append(line)
+                if echo:
+                    sys.stdout.write(line)
+                continue
+
+            if position > 0:
+                output.append(line[:position])
+                if echo:
+                    sys.stdout.write(line[:position] + "\n")
+            returncode = int(line[position:].split()[2])
+            return CommandResult(command, returncode, "".join(output), 0.0)
+
+    def run(self, command, echo=None):
+        """
+        Executa um único comando na sessão.
+
+        Args:
+            command: Comando de shell a ser executado
+            echo: Sobrepõe o echo da sessão só para este comando
+                (False para saídas que não devem aparecer no console)
+
+        Returns:
+            CommandResult com código de saída, saída e duração
+        """
+        return self.run_batch([command], echo=echo)[0]
+
+    def run_batch(self, commands, stop_on_error=False, echo=None):
+        """
+        Envia uma lista de comandos de uma vez e coleta o resultado de cada um.
+
+        Os comandos são enviados em pipeline: o shell remoto já os tem em
+        buffer enquanto os anteriores executam. A duração de cada comando é
+        medida entre o fim do anterior e a chegada do seu marcador.
+
+        Args:
+            commands: Lista de comandos de shell
+            stop_on_error: Se deve interromper a lista no primeiro erro
+            echo: Sobrepõe o echo da sessão só para estes comandos
+
+        Returns:
+            list: Lista de CommandResult, na ordem dos comandos executados
+        """
+        if self.process is None:
+            self.open()
+
+        if echo is None:
+            echo = self.echo
+
+        if stop_on_error:
+            # Sem pipeline: cada comando só é enviado se o anterior passou
+            results = []
+            for command in commands:
+                started_at = time.monotonic()
+                self._send(len(results), command)
+                self.process.stdin.flush()
+                result = self._collect(command, echo)
+                result.duration = time.monotonic() - started_at
+                results.append(result)
+                if not result.ok:
+                    break
+            self.history.extend(results)
+            return results
+
+        for index, command in enumerate(commands):
+            self._send(index, command)
+        self.process.stdin.flush()
+
+        results = []
+        started_at = time.monotonic()
+        for command in commands:
+            result = self._collect(command, echo)
+            finished_at = time.monotonic()
+            result.duration = finished_at - started_at
+            started_at = finished_at
+            results.append(result)
+        self.history.extend(results)
+        return results
+
+
+def format_results(results):
+    """
+    Formata um resumo por comando com código de saída e tempo.
+
+    Args:
+        results: Lista de CommandResult
+
+    Returns:
+        str: Tabela de texto com o resumo
+    """
+    lines = [f"{'Código':>6} {'Tempo':>8}  Comando"]
+    for result in results:
+        lines.append(f"{result.returncode:>6} {result.duration:>7.2f}s  {result.command}")
+    return "\n".join(lines)
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Gateway Mock Server
+-------------------
+Substituto local da imagem matheusprotzen/gateways-mock, implementando os
+endpoints usados por Gateway1 e Gateway2 com o esquema de autenticação de
+cada um, latência configurável por distribuição, taxa de erro por endpoint
+e janelas de indisponibilidade programadas.
+
+Endpoints do Gateway 1 (porta 3001, Bearer token obtido em /login):
+  POST /login, POST /transactions, POST /transactions/{id}/charge_back,
+  GET /transactions
+Endpoints do Gateway 2 (porta 3002, headers Gateway-Auth-Token/Secret):
+  POST /transacoes, POST /transacoes/reembolso, GET /transacoes
+Endpoints de controle (sem autenticação):
+  GET /__mock/stats, POST /__mock/outage, POST /__mock/reset
+
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+
+# Configuração padrão; um arquivo JSON passado em --config é mesclado por cima
+DEFAULT_CONFIG = {
+    "gateway1": {
+        "port": 3001,
+        "credentials": {"email": "dev@betalent.tech",
+                        "token": "FEC9BB078BF338F464F96B48089EB498"},
+        "token_ttl_s": None,
+        "reject_cvvs": ["100"],
+        "endpoints": {
+            "default": {"latency": {"distribution": "lognormal", "median_ms": 40, "sigma": 0.4},
+                        "error_rate": 0.0, "error_status": 500},
+            "login": {"latency": {"distribution": "lognormal", "median_ms": 15, "sigma": 0.3}},
+        },
+        "outages": [],
+    },
+    "gateway2": {
+        "port": 3002,
+        "credentials": {"auth_token": "tk_f2198cc671b5289fa856",
+                        "auth_secret": "3d15e8ed6131446ea7e3456728b1211f"},
+        "reject_cvvs": ["200"],
+        "endpoints": {
+            "default": {"latency": {"distribution": "lognormal", "median_ms": 60, "sigma": 0.5},
+                        "error_rate": 0.0, "error_status": 500},
+        },
+        "outages": [],
+    },
+}
+
+# Rotas: (gateway, método, regex do caminho, nome do endpoint)
+ROUTES = [
+    ("gateway1", "POST", re.compile(r"^/login$"), "login"),
+    ("gateway1", "POST", re.compile(r"^/transactions$"), "pay"),
+    ("gateway1", "POST", re.compile(r"^/transactions/(?P<id>[^/]+)/charge_back$"), "refund"),
+    ("gateway1", "GET", re.compile(r"^/transactions$"), "list"),
+    ("gateway2", "POST", re.compile(r"^/transacoes$"), "pay"),
+    ("gateway2", "POST", re.compile(r"^/transacoes/reembolso$"), "refund"),
+    ("gateway2", "GET", re.compile(r"^/transacoes$"), "list"),
+]
+
+# Override do compose que troca as imagens dos gateways por este script
+COMPOSE_OVERRIDE_FILE = "docker-compose.gateway-mock.yml"
+SCENARIO_DIR = os.path.join("docker", "gateway-mock")
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized",
+           404: "Not Found", 422: "Unprocessable Entity", 500: "Internal Server Error",
+           502: "Bad Gateway", 503: "Service Unavailable"}
+
+
+def merge_config(base, override):
+    """Mescla recursivamente dois dicts de configuração."""
+    result = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = merge_config(result[key], value)
+        else:
+            result[key] = copy.deepcopy(value)
+    return result
+
+
+def sample_latency(spec, rng):
+    """
+    Sorteia uma latência em segundos a partir da especificação.
+
+    Distribuições suportadas:
+      fixed        {"ms": 50}
+      uniform      {"min_ms": 10, "max_ms": 90}
+      normal       {"mean_ms": 50, "stddev_ms": 10}
+      lognormal    {"median_ms": 40, "sigma": 0.4}
+      exponential  {"mean_ms": 50}
+    Todas aceitam "spike_rate" e "spike_ms" para uma cauda extra ocasional.
+    """
+    if not spec:
+        return 0.0
+    kind = spec.get("distribution", "fixed")
+    if kind == "fixed":
+        value = spec.get("ms", 0)
+    elif kind == "uniform":
+        value = rng.uniform(spec.get("min_ms", 0), spec.get("max_ms", 0))
+    elif kind == "normal":
+        value = rng.gauss(spec.get("mean_ms", 0), spec.get("stddev_ms", 0))
+    elif kind == "lognormal":
+        value = rng.lognormvariate(math.log(max(spec.get("median_ms", 1), 0.001)),
+                                   spec.get("sigma", 0.5))
+    elif kind == "exponential":
+        value = rng.expovariate(1.0 / max(spec.get("mean_ms", 1), 0.001))
+    else:
+        raise ValueError(f"Distribuição de latência desconhecida: {kind}")
+
+    if spec.get("spike_rate") and rng.random() < spec["spike_rate"]:
+        value += spec.get("spike_ms", 0)
+    return max(0.0, value) / 1000.0
+
+
+class GatewayMock:
+    """Estado e regras de um gateway simulado."""
+
+    def __init__(self, name, config, rng=None):
+        """
+        Args:
+            name: gateway1 ou gateway2
+            config: Configuração do gateway (já mesclada com o padrão)
+            rng: Gerador aleatório (para execuções reproduzíveis)
+        """
+        self.name = name
+        self.config = config
+        self.rng = rng or random.Random()
+        self.started_at = time.monotonic()
+        self.transactions = {}
+        self.tokens = {}
+        self.runtime_outages = []
+        self.stats = Counter()
+
+    def endpoint_config(self, endpoint):
+        endpoints = self.config.get("endpoints", {})
+        return merge_config(endpoints.get("default", {}), endpoints.get(endpoint, {}))
+
+    def active_outage(self, endpoint):
+        """Retorna a janela de indisponibilidade ativa para o endpoint, se houver."""
+        now = time.monotonic()
+        elapsed = now - self.started_at
+        for outage in self.config.get("outages", []):
+            position = elapsed - outage.get("start_s", 0)
+            if outage.get("repeat_every_s"):
+                position %= outage["repeat_every_s"]
+            if 0 <= position < outage.get("duration_s", 0) and \
+                    endpoint in outage.get("endpoints", [endpoint]):
+                return outage
+        for until, outage in self.runtime_outages:
+            if now < until and endpoint in outage.get("endpoints", [endpoint]):
+                return outage
+        return None
+
+    def add_outage(self, outage):
+        """Inicia uma indisponibilidade imediata (via /__mock/outage)."""
+        self.runtime_outages.append((time.monotonic() + outage.get("duration_s", 10), outage))
+
+    def authorized(self, endpoint, headers):
+        credentials = self.config["credentials"]
+        if self.name == "gateway2":
+            return (headers.get("gateway-auth-token") == credentials["auth_token"] and
+                    headers.get("gateway-auth-secret") == credentials["auth_secret"])
+        if endpoint == "login":
+            return True
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        expires_at = self.tokens.get(token)
+        if scheme.lower() != "bearer" or expires_at is None:
+            return False
+        return expires_at is True or time.monotonic() < expires_at
+
+    def handle(self, endpoint, params, body):
+        """Executa a regra de negócio simulada e retorna (status, corpo)."""
+        if endpoint == "login":
+            credentials = self.config["credentials"]
+            if body.get("email") != credentials["email"] or body.get("token") != credentials["token"]:
+                return 401, {"message": "Credenciais inválidas"}
+            token = uuid.uuid4().hex
+            ttl = self.config.get("token_ttl_s")
+            self.tokens[token] = time.monotonic() + ttl if ttl else True
+            return 200, {"token": token}
+
+        if endpoint == "pay":
+            fields = (("amount", "name", "email", "cardNumber", "cvv") if self.name == "gateway1"
+                      else ("valor", "nome", "email", "numeroCartao", "cvv"))
+            missing = [f for f in fields if body.get(f) in (None, "")]
+            if missing:
+                return 400, {"message": f"Campos obrigatórios ausentes: {', '.join(missing)}"}
+            if str(body["cvv"]) in self.config.get("reject_cvvs", []):
+                return 400, {"message": "Pagamento recusado (cvv inválido)"}
+            transaction_id = str(uuid.uuid4())
+            self.transactions[transaction_id] = {
+                "id": transaction_id,
+                "amount": body[fields[0]],
+                "name": body[fields[1]],
+                "email": body["email"],
+                "cardNumber": str(body[fields[3]])[-4:],
+                "status": "paid",
+            }
+            return 201, {"id": transaction_id}
+
+        if endpoint == "refund":
+            transaction_id = params.get("id") or str(body.get("id", ""))
+            transaction = self.transactions.get(transaction_id)
+            if transaction is None:
+                return 404, {"message": "Transação não encontrada"}
+            transaction["status"] = "charged_back"
+            return 200, transaction
+
+        return 200, {"data": list(self.transactions.values())}
+
+    async def respond(self, endpoint, params, headers, body):
+        """
+        Aplica indisponibilidade, latência, autenticação e erros injetados.
+
+        Returns:
+            tuple: (status, corpo) ou None para derrubar a conexão
+        """
+        self.stats[f"{endpoint}.requests"] += 1
+        outage = self.active_outage(endpoint)
+        if outage:
+            self.stats[f"{endpoint}.outage"] += 1
+            mode = outage.get("mode", "error")
+            if mode == "reset":
+                return None
+            if mode == "timeout":
+                await asyncio.sleep(outage.get("hang_s", 60))
+                return None
+            return outage.get("status", 503), {"message": "Gateway indisponível"}
+
+        settings = self.endpoint_config(endpoint)
+        await asyncio.sleep(sample_latency(settings.get("latency"), self.rng))
+
+        if not self.authorized(endpoint, headers):
+            self.stats[f"{endpoint}.401"] += 1
+            return 401, {"message": "Não autorizado"}
+
+        if self.rng.random() < settings.get("error_rate", 0.0):
+            self.stats[f"{endpoint}.injected_error"] += 1
+            return settings.get("error_status", 500), {"message": "Erro simulado"}
+
+        status, payload = self.handle(endpoint, params, body)
+        self.stats[f"{endpoint}.{status}"] += 1
+        return status, payload
+
+
+def encode_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def read_request(reader):
+    """Lê uma requisição HTTP/1.1; retorna None quando o cliente fecha a conexão."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    raw = await reader.readexactly(length) if length else b""
+    try:
+        body = json.loads(raw.decode("utf-8")) if raw else {}
+    except ValueError:
+        body = {}
+    return method.upper(), target.split("?", 1)[0], headers, body if isinstance(body, dict) else {}
+
+
+def make_handler(mock):
+    """Cria o handler de conexões para um gateway."""
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                response = await dispatch(mock, method, path, headers, body)
+                if response is None:
+                    break
+                writer.write(encode_response(*response, keep_alive=keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    return handle_connection
+
+
+async def dispatch(mock, method, path, headers, body):
+    """Roteia a requisição para o endpoint simulado ou de controle."""
+    if path == "/__mock/stats":
+        return 200, {"gateway": mock.name, "transactions": len(mock.transactions),
+                     "stats": dict(mock.stats)}
+    if path == "/__mock/outage" and method == "POST":
+        mock.add_outage(body)
+        return 200, {"message": "Indisponibilidade iniciada", "outage": body}
+    if path == "/__mock/reset" and method == "POST":
+        mock.stats.clear()
+        mock.transactions.clear()
+        mock.runtime_outages.clear()
+        mock.started_at = time.monotonic()
+        return 200, {"message": "Estado reiniciado"}
+
+    for gateway, route_method, pattern, endpoint in ROUTES:
+        match = pattern.match(path)
+        if gateway == mock.name and route_method == method and match:
+            return await mock.respond(endpoint, match.groupdict(), headers, body)
+    return 404, {"message": "Rota não encontrada"}
+
+
+def compose_with_gateway_mock(docker_compose, scenario="default"):
+    """
+    Monta o comando do Docker Compose com o override dos gateways simulados.
+
+    Args:
+        docker_compose: Comando do Docker Compose ("docker-compose" ou "docker compose"),
+            possivelmente já com outros arquivos -f
+        scenario: Nome do cenário em docker/gateway-mock (sem .json)
+
+    Returns:
+        str: Comando do Docker Compose com os arquivos -f adequados
+    """
+    if not os.path.isfile(os.path.join(SCENARIO_DIR, f"{scenario}.json")):
+        raise FileNotFoundError(f"Cenário não encontrado: {SCENARIO_DIR}/{scenario}.json")
+    os.environ["GATEWAY_MOCK_SCENARIO"] = scenario
+    if " -f " not in docker_compose:
+        docker_compose = f"{docker_compose} -f docker-compose.yml"
+    return f"{docker_compose} -f {COMPOSE_OVERRIDE_FILE}"
+
+
+def load_config(path):
+    """Carrega o arquivo de configuração e mescla com o padrão."""
+    if not path:
+        return copy.deepcopy(DEFAULT_CONFIG)
+    with open(path, "r") as f:
+        return merge_config(DEFAULT_CONFIG, json.load(f))
+
+
+async def serve(gateways, config, host, port_override, seed):
+    servers = []
+    for name in gateways:
+        rng = random.Random(None if seed is None else f"{seed}-{name}")
+        mock = GatewayMock(name, config[name], rng)
+        port = port_override or config[name]["port"]
+        servers.append(await asyncio.start_server(make_handler(mock), host, port))
+        print(f"[gateway-mock] {name} ouvindo em {host}:{port}", flush=True)
+    await asyncio.gather(*(server.serve_forever() for server in servers))
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(description="Mock dos gateways de pagamento")
+    parser.add_argument("--gateway", choices=["gateway1", "gateway2", "all"], default="all",
+                        help="Gateway a simular (padrão: ambos, cada um na sua porta)")
+    parser.add_argument("--config", default=None,
+                        help="Arquivo JSON com latências, erros e indisponibilidades")
+    parser.add_argument("--host", default="0.0.0.0",
+                        help="Endereço de escuta (padrão: 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=None,
+                        help="Porta (apenas com um único --gateway)")
+    parser.add_argument("--seed", default=None,
+                        help="Semente para latências e erros reproduzíveis")
+    options = parser.parse_args(argv)
+    if options.port and options.gateway == "all":
+        parser.error("--port exige --gateway gateway1 ou gateway2")
+    return options
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+    config = load_config(options.config)
+    gateways = ["gateway1", "gateway2"] if options.gateway == "all" else [options.gateway]
+    try:
+        asyncio.run(serve(gateways, config, options.host, options.port, options.seed))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
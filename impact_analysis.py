@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Test Impact Analysis
+--------------------
+Seleciona as classes de teste afetadas por um conjunto de arquivos alterados.
+Monta um índice estático de referências entre as classes de app/, database/
+e tests/ (imports, nomes de classe usados no código e rotas chamadas pelos
+testes de Feature via routes/api.php) e calcula, para cada teste, o fecho
+transitivo de arquivos dos quais ele depende.
+
+Verificação da seleção (exemplo embutido e testes do PaymentService):
+  python impact_analysis.py [diretório da aplicação]
+Seguindo as diretrizes do PEP 8.
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+# Diretórios indexados, relativos à aplicação
+INDEXED_DIRS = ["app", "database/factories", "database/seeders", "tests"]
+
+# Arquivos e diretórios que afetam todos os testes quando alterados
+GLOBAL_PATHS = [
+    "bootstrap/",
+    "config/",
+    "routes/",
+    "database/migrations/",
+    "app/Providers/",
+    "app/Http/Kernel.php",
+    "app/Http/Middleware/",
+    "app/Logging/",
+    "composer.json",
+    "composer.lock",
+    "phpunit.xml",
+    ".env.testing",
+    "tests/TestCase.php",
+]
+
+NAMESPACE_RE = re.compile(r"^\s*namespace\s+([\w\\]+)\s*;", re.MULTILINE)
+CLASS_RE = re.compile(
+    r"^\s*(?:(?:abstract|final|readonly)\s+)*(?:class|interface|trait|enum)\s+(\w+)",
+    re.MULTILINE)
+USE_RE = re.compile(r"^use\s+(?!function\b|const\b)([^;]+);", re.MULTILINE)
+IDENTIFIER_RE = re.compile(r"\\?\b[A-Z]\w*(?:\\[A-Z]\w*)*")
+# Strings e comentários numa única passada da esquerda para a direita: assim
+# '//' e '#' dentro de literais ('tcp://...', "#id") não viram comentário.
+# '#[' é atributo do PHP 8, não comentário
+TOKEN_RE = re.compile(
+    r"(?P<heredoc><<<[ \t]*([\"']?)(\w+)\2\r?\n.*?\n[ \t]*\3\b)"
+    r"|(?P<comment>/\*.*?(?:\*/|\Z)|(?://|#(?!\[))[^\n]*)"
+    r"|(?P<string>'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\")",
+    re.DOTALL)
+
+TEST_URL_RE = re.compile(
+    r"->\s*(?:get|post|put|patch|delete|json|call)(?:Json)?\s*\(\s*"
+    r"(?:['\"](?:GET|POST|PUT|PATCH|DELETE)['\"]\s*,\s*)?['\"](/api/[^'\"?]*)")
+ROUTE_RE = re.compile(
+    r"Route::(get|post|put|patch|delete|any|match)\(\s*['\"]([^'\"]*)['\"]\s*,\s*"
+    r"(?:\[\s*(\w+)::class\s*,\s*['\"]\w+['\"]\s*\]|['\"]\w+['\"])")
+GROUP_CONTROLLER_RE = re.compile(r"Route::controller\(\s*(\w+)::class\s*\)")
+GROUP_PREFIX_RE = re.compile(r"->prefix\(\s*['\"]([^'\"]*)['\"]\s*\)|Route::prefix\(\s*['\"]([^'\"]*)['\"]\s*\)")
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _strip_php(source, keep_strings=False):
+    """
+    Remove os comentários do código PHP e troca os literais de string por ''.
+
+    Args:
+        source: Código PHP
+        keep_strings: Mantém os literais (usado nas rotas, que leem as URLs)
+    """
+    def replace(match):
+        if match.group("comment") is not None:
+            # Comentários de bloco mantêm as quebras de linha
+            return "\n" * match.group("comment").count("\n")
+        if keep_strings:
+            return match.group(0)
+        return "''"
+
+    return TOKEN_RE.sub(replace, source)
+
+
+def _imports(code):
+    """
+    Lê as declarações `use` do arquivo (inclusive agrupadas, `use A\\{B, C as D}`).
+
+    Returns:
+        dict: Alias -> nome totalmente qualificado (sempre absoluto)
+    """
+    imports = {}
+    for clause in USE_RE.findall(code):
+        clause = " ".join(clause.split())
+        group = re.match(r"([\w\\]+)\\\s*\{(.*)\}$", clause)
+        prefix, items = (group.group(1) + "\\", group.group(2).split(",")) if group else ("", clause.split(","))
+        for item in items:
+            match = re.match(r"\s*\\?([\w\\]+)(?:\s+as\s+(\w+))?\s*$", item)
+            if match:
+                fqcn = (prefix + match.group(1)).lstrip("\\")
+                imports[match.group(2) or fqcn.rsplit("\\", 1)[-1]] = fqcn
+    return imports
+
+
+def _resolve(name, namespace, imports):
+    """Resolve um nome de classe usado no código para o nome totalmente qualificado."""
+    if name.startswith("\\"):
+        return name[1:]
+    head, _, rest = name.partition("\\")
+    if head in imports:
+        return imports[head] + ("\\" + rest if rest else "")
+    return f"{namespace}\\{name}" if namespace else name
+
+
+class ReferenceIndex:
+    """Índice estático de referências entre arquivos PHP da aplicação."""
+
+    def __init__(self, app_dir):
+        """
+        Args:
+            app_dir: Diretório da aplicação Laravel no host
+        """
+        self.app_dir = app_dir
+        self.class_files = {}   # FQCN -> arquivo
+        self.references = {}    # arquivo -> conjunto de arquivos referenciados
+        self.test_urls = {}     # arquivo de teste -> URLs chamadas
+        self.routes = []        # (regex da URL, arquivo do controller)
+        self._build()
+
+    def _php_files(self):
+        for directory in INDEXED_DIRS:
+            base = os.path.join(self.app_dir, directory)
+            for root, _, files in os.walk(base):
+                for filename in files:
+                    if filename.endswith(".php"):
+                        yield os.path.relpath(os.path.join(root, filename), self.app_dir)
+
+    def _build(self):
+        parsed = {}
+        for path in self._php_files():
+            source = _read(os.path.join(self.app_dir, path))
+            code = _strip_php(source)
+            match = NAMESPACE_RE.search(code)
+            namespace = match.group(1) if match else ""
+            imports = _imports(code)
+            for class_name in CLASS_RE.findall(code):
+                self.class_files[f"{namespace}\\{class_name}"] = path
+            # Os nomes das declarações use e namespace já são absolutos: ficam
+            # fora da resolução relativa ao namespace do arquivo
+            body = NAMESPACE_RE.sub("", USE_RE.sub("", code))
+            names = set(imports.values())
+            names.update(_resolve(name, namespace, imports) for name in IDENTIFIER_RE.findall(body))
+            parsed[path] = names
+            if path.startswith("tests/"):
+                self.test_urls[path] = TEST_URL_RE.findall(_strip_php(source, keep_strings=True))
+
+        for path, names in parsed.items():
+            refs = {self.class_files[name] for name in names if name in self.class_files}
+            # HasFactory resolve Database\Factories\<Model>Factory por convenção
+            for name in names:
+                if name.startswith("App\\Models\\"):
+                    factory = "Database\\Factories\\" + name.rsplit("\\", 1)[-1] + "Factory"
+                    if factory in self.class_files:
+                        refs.add(self.class_files[factory])
+            refs.discard(path)
+            self.references[path] = refs
+
+        self._parse_routes()
+
+    def _parse_routes(self):
+        """Mapeia os padrões de URL de routes/api.php para os controllers."""
+        routes_path = os.path.join(self.app_dir, "routes", "api.php")
+        if not os.path.isfile(routes_path):
+            return
+
+        source = _strip_php(_read(routes_path), keep_strings=True)
+        imports = _imports(source)
+
+        # Pilha de grupos: (profundidade de chaves, prefixo, controller)
+        stack = [(0, "/api", None)]
+        depth = 0
+        for line in source.splitlines():
+            _, prefix, controller = stack[-1]
+
+            for method, uri, action_controller in ROUTE_RE.findall(line):
+                target = action_controller or controller
+                target_file = self.class_files.get(_resolve(target, "", imports)) if target else None
+                if target_file:
+                    full = "/".join(p.strip("/") for p in (prefix, uri) if p.strip("/"))
+                    pattern = re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape("/" + full))
+                    self.routes.append((re.compile(f"^{pattern}/?$"), target_file))
+
+            opens = line.count("{") - line.count("}")
+            if "->group(" in line:
+                group_controller = GROUP_CONTROLLER_RE.search(line)
+                group_prefix = GROUP_PREFIX_RE.search(line)
+                new_prefix = prefix
+                if group_prefix:
+                    new_prefix = prefix.rstrip("/") + "/" + (group_prefix.group(1) or group_prefix.group(2) or "").strip("/")
+                stack.append((depth, new_prefix,
+                              group_controller.group(1) if group_controller else controller))
+
+            depth += opens
+            while len(stack) > 1 and depth <= stack[-1][0]:
+                stack.pop()
+
+    def controllers_for_url(self, url):
+        """Retorna os arquivos de controller que atendem a URL."""
+        # Interpolações como {$user->id} viram um segmento qualquer
+        normalized = re.sub(r"\{\$[^}]*\}|\$\w+(?:->\w+)*", "x", url)
+        return {target for pattern, target in self.routes if pattern.match(normalized)}
+
+    def dependencies(self, test_file):
+        """
+        Calcula o fecho transitivo de arquivos dos quais um teste depende.
+
+        Args:
+            test_file: Arquivo de teste relativo à aplicação
+
+        Returns:
+            set: Arquivos relativos à aplicação (incluindo o próprio teste)
+        """
+        pending = [test_file]
+        for url in self.test_urls.get(test_file, []):
+            pending.extend(self.controllers_for_url(url))
+
+        seen = set()
+        while pending:
+            path = pending.pop()
+            if path in seen:
+                continue
+            seen.add(path)
+            pending.extend(self.references.get(path, ()))
+        return seen
+
+
+def changed_files(base, app_prefix):
+    """
+    Lista os arquivos da aplicação alterados em relação a uma referência do git.
+
+    Inclui alterações já commitadas desde a base, alterações não commitadas
+    e arquivos novos ainda não rastreados.
+
+    Args:
+        base: Referência do git (ex.: origin/main, HEAD~3)
+        app_prefix: Diretório da aplicação relativo à raiz do repositório
+
+    Returns:
+        tuple: (arquivos relativos à aplicação, True se o git falhou)
+    """
+    commands = [
+        f"git diff --name-only {base}",
+        "git ls-files --others --exclude-standard",
+    ]
+    files = set()
+    for command in commands:
+        result = subprocess.run(command, shell=True, text=True,
+                                capture_output=True, check=False)
+        if result.returncode != 0:
+            return set(), True
+        files.update(line.strip() for line in result.stdout.splitlines() if line.strip())
+
+    prefix = app_prefix.rstrip("/") + "/"
+    return {path[len(prefix):] for path in files if path.startswith(prefix)}, False
+
+
+def select_tests(index, tests, changed):
+    """
+    Seleciona os testes afetados pelos arquivos alterados.
+
+    Args:
+        index: ReferenceIndex da aplicação
+        tests: Lista de tuplas (classe, arquivo) de todos os testes
+        changed: Arquivos alterados relativos à aplicação
+
+    Returns:
+        dict: Classe de teste -> motivo da seleção
+    """
+    global_changes = sorted(path for path in changed
+                            if any(path == g or path.startswith(g) for g in GLOBAL_PATHS))
+    if global_changes:
+        reason = f"alteração global: {global_changes[0]}"
+        return {class_name: reason for class_name, _ in tests}
+
+    selected = {}
+    for class_name, test_file in tests:
+        hits = sorted(index.dependencies(test_file) & changed)
+        if hits:
+            selected[class_name] = hits[0] if len(hits) == 1 else f"{hits[0]} (+{len(hits) - 1})"
+    return selected
+
+
+def dependency_hash(index, test_file):
+    """
+    Calcula o hash do conteúdo do teste, de suas dependências e dos
+    arquivos globais que existirem.
+
+    Args:
+        index: ReferenceIndex da aplicação
+        test_file: Arquivo de teste relativo à aplicação
+
+    Returns:
+        str: Hash SHA-256 em hexadecimal
+    """
+    paths = set(index.dependencies(test_file))
+    for global_path in GLOBAL_PATHS:
+        full = os.path.join(index.app_dir, global_path)
+        if os.path.isfile(full):
+            paths.add(global_path)
+        elif os.path.isdir(full):
+            for root, _, files in os.walk(full):
+                for filename in files:
+                    paths.add(os.path.relpath(os.path.join(root, filename), index.app_dir))
+
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.encode())
+        digest.update(b"\0")
+        try:
+            with open(os.path.join(index.app_dir, path), "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b"<missing>")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Cache de resultados: classes de teste que já passaram para um dado hash."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Arquivo JSON do cache
+        """
+        self.path = path
+        self.entries = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, "r") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def passed(self, class_name, digest):
+        """Indica se a classe já passou com exatamente este conteúdo."""
+        return self.entries.get(class_name) == digest
+
+    def record(self, class_name, digest, passed):
+        """Registra o resultado de uma classe de teste."""
+        if passed:
+            self.entries[class_name] = digest
+        else:
+            self.entries.pop(class_name, None)
+
+    def save(self):
+        """Grava o cache em disco."""
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+
+# Aplicação mínima da verificação: literais com '//' e '#' antes das
+# referências, heredoc e um teste que só cita a classe em comentário
+CHECK_FIXTURE = {
+    "app/Services/Payment/PaymentService.php": """<?php
+namespace App\\Services\\Payment;
+
+class PaymentService
+{
+    private $url = 'tcp://127.0.0.1:9000';
+    private $tag = "#primary";
+}
+""",
+    "tests/Unit/PaymentServiceTest.php": """<?php
+namespace Tests\\Unit;
+
+use App\\Services\\Payment\\PaymentService;
+use Tests\\TestCase;
+
+class PaymentServiceTest extends TestCase
+{
+    public function test_pays(): void
+    {
+        $server = 'redis://localhost'; $id = '#1';
+        $service = new PaymentService();
+        $this->assertSame('ok', 'ok');
+    }
+}
+""",
+    "tests/Unit/HeredocTest.php": """<?php
+namespace Tests\\Unit;
+
+class HeredocTest extends \\Tests\\TestCase
+{
+    public function test_body(): void
+    {
+        $body = <<<JSON
+        {"url": "http://gateway"}
+        JSON;
+        $class = \\App\\Services\\Payment\\PaymentService::class;
+        $this->assertNotEmpty("ok");
+    }
+}
+""",
+    "tests/Unit/UnrelatedTest.php": """<?php
+namespace Tests\\Unit;
+
+// Não usa o PaymentService
+class UnrelatedTest extends \\Tests\\TestCase
+{
+}
+""",
+    "tests/TestCase.php": """<?php
+namespace Tests;
+
+abstract class TestCase
+{
+}
+""",
+}
+
+
+def _test_classes(app_dir):
+    """Tuplas (classe, arquivo) dos arquivos *Test.php em tests/."""
+    tests = []
+    for root, _, files in os.walk(os.path.join(app_dir, "tests")):
+        for filename in sorted(files):
+            if filename.endswith("Test.php"):
+                relative = os.path.relpath(os.path.join(root, filename), app_dir)
+                tests.append(("Tests\\" + relative[len("tests/"):-len(".php")].replace("/", "\\"),
+                              relative))
+    return tests
+
+
+def check_selection(app_dir=None):
+    """
+    Confere a seleção de testes para uma alteração no PaymentService.
+
+    Na aplicação de exemplo (CHECK_FIXTURE), exatamente os testes que usam a
+    classe precisam ser selecionados. Em `app_dir`, todo teste que importa o
+    PaymentService precisa ser selecionado.
+
+    Returns:
+        list: Mensagens de erro (vazia se a seleção está correta)
+    """
+    changed = {"app/Services/Payment/PaymentService.php"}
+    errors = []
+
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        for path, content in CHECK_FIXTURE.items():
+            os.makedirs(os.path.dirname(os.path.join(fixture_dir, path)), exist_ok=True)
+            with open(os.path.join(fixture_dir, path), "w") as f:
+                f.write(content)
+        selected = set(select_tests(ReferenceIndex(fixture_dir), _test_classes(fixture_dir), changed))
+        expected = {"Tests\\Unit\\PaymentServiceTest", "Tests\\Unit\\HeredocTest"}
+        if selected != expected:
+            errors.append(f"exemplo: selecionados {sorted(selected)}, esperados {sorted(expected)}")
+
+    if app_dir:
+        index = ReferenceIndex(app_dir)
+        tests = _test_classes(app_dir)
+        selected = set(select_tests(index, tests, changed))
+        for class_name, path in tests:
+            imports = _imports(_strip_php(_read(os.path.join(app_dir, path))))
+            if "App\\Services\\Payment\\PaymentService" in imports.values() and class_name not in selected:
+                errors.append(f"{class_name} usa o PaymentService e não foi selecionado")
+    return errors
+
+
+if __name__ == "__main__":
+    app = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "multigateway-app")
+    problems = check_selection(app)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if not problems:
+        print("[SUCCESS] Seleção de testes para o PaymentService está correta.")
+    sys.exit(1 if problems else 0)
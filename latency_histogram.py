@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Latency Histogram
+-----------------
+Histograma de latência no estilo HDR: buckets log-lineares com erro
+relativo limitado, memória constante e combinação barata entre
+histogramas. Os valores são gravados em microssegundos.
+Seguindo as diretrizes do PEP 8.
+"""
+
+import math
+
+# Percentis exibidos por padrão nos relatórios
+DEFAULT_PERCENTILES = (50.0, 95.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """
+    Histograma log-linear de valores inteiros positivos.
+
+    Cada potência de dois é dividida em 2^precision_bits sub-buckets, o que
+    limita o erro relativo de qualquer percentil a 1 / 2^precision_bits
+    (0,8% com o padrão de 7 bits), independentemente da faixa de valores.
+    """
+
+    def __init__(self, precision_bits=7):
+        """
+        Args:
+            precision_bits: Bits de sub-bucket por potência de dois
+        """
+        self.precision_bits = precision_bits
+        self.sub_buckets = 1 << precision_bits
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self.sub_buckets:
+            return value
+        exponent = value.bit_length() - 1 - self.precision_bits
+        return ((exponent + 1) << self.precision_bits) + (value >> exponent) - self.sub_buckets
+
+    def _value_at(self, index):
+        """Limite superior do bucket, para nunca subestimar a latência."""
+        if index < self.sub_buckets:
+            return index
+        exponent = (index >> self.precision_bits) - 1
+        mantissa = (index & (self.sub_buckets - 1)) + self.sub_buckets
+        return ((mantissa + 1) << exponent) - 1
+
+    def record(self, value, count=1):
+        """
+        Grava um valor.
+
+        Args:
+            value: Valor em microssegundos (negativos contam como zero)
+            count: Quantidade de ocorrências
+        """
+        value = max(0, int(value))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def record_seconds(self, seconds):
+        """Grava uma duração em segundos."""
+        self.record(round(seconds * 1_000_000))
+
+    def merge(self, other):
+        """Soma as contagens de outro histograma com a mesma precisão."""
+        if other.precision_bits != self.precision_bits:
+            raise ValueError("Histogramas com precisões diferentes")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.total:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def percentile(self, percentile):
+        """
+        Retorna o valor no percentil informado.
+
+        Args:
+            percentile: Percentil entre 0 e 100
+
+        Returns:
+            int: Valor em microssegundos, ou 0 se o histograma está vazio
+        """
+        if not self.total:
+            return 0
+        target = max(1, math.ceil(self.total * percentile / 100.0))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._value_at(index), self.max)
+        return self.max
+
+    def percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        """Retorna um dict percentil -> valor em microssegundos."""
+        return {p: self.percentile(p) for p in percentiles}
+
+    @property
+    def mean(self):
+        """Média em microssegundos."""
+        return self.sum / self.total if self.total else 0.0
+
+    def to_state(self):
+        """Estado compacto e serializável em JSON (para persistência)."""
+        return {"bits": self.precision_bits, "counts": self.counts,
+                "sum": self.sum, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_state(cls, state):
+        """Reconstrói um histograma a partir de to_state()."""
+        histogram = cls(state["bits"])
+        histogram.counts = {int(index): count for index, count in state["counts"].items()}
+        histogram.total = sum(histogram.counts.values())
+        histogram.sum = state["sum"]
+        histogram.min = state["min"]
+        histogram.max = state["max"]
+        return histogram
+
+    def to_dict(self, percentiles=DEFAULT_PERCENTILES):
+        """Resumo serializável em milissegundos."""
+        return {
+            "count": self.total,
+            "min_ms": (self.min or 0) / 1000.0,
+            "mean_ms": round(self.mean / 1000.0, 3),
+            "max_ms": (self.max or 0) / 1000.0,
+            "percentiles_ms": {f"p{p:g}": v / 1000.0
+                               for p, v in self.percentiles(percentiles).items()},
+        }
+
+
+def format_percentiles(histogram, percentiles=DEFAULT_PERCENTILES):
+    """
+    Formata os percentis de um histograma em milissegundos numa linha.
+
+    Args:
+        histogram: LatencyHistogram
+        percentiles: Percentis exibidos
+
+    Returns:
+        str: Ex.: "p50=12.3ms p95=40.1ms p99=88.0ms p99.9=120.5ms"
+    """
+    return " ".join(f"p{p:g}={histogram.percentile(p) / 1000.0:.1f}ms" for p in percentiles)
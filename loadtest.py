@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Multi-Gateway Load Test
+-----------------------
+Gerador de carga para POST /api/purchase com payloads válidos (produtos dos
+seeders, clientes e cartões aleatórios).
+
+Modos:
+  closed  N usuários virtuais, cada um envia a próxima compra assim que a
+          anterior termina (mede a vazão máxima com N clientes).
+  open    Chegadas a taxa constante, independentes das respostas. A latência
+          é medida a partir do horário planejado de envio, para não esconder
+          filas (coordinated omission).
+
+Relata percentis p50/p95/p99/p99.9 da latência do cliente, do header
+X-Response-Time adicionado pelo middleware RequestMonitoring e da diferença
+entre os dois (rede, servidor web e fila), além da distribuição de status.
+
+Com --async as compras vão para POST /api/purchase/async (resposta 202) e cada
+uma é acompanhada pela URL de status até sair de PENDING; a vazão passa a ser
+de compras concluídas e a latência de conclusão inclui a espera na fila.
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import string
+import sys
+import time
+from collections import Counter
+from functools import partial
+from urllib.parse import urlsplit
+
+from async_http import HttpClient, HttpError
+from latency_histogram import LatencyHistogram, format_percentiles
+
+
+# Cores para formatação no terminal
+class Colors:
+    """Define cores para saídas no terminal."""
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[0;33m'
+    BLUE = '\033[0;34m'
+    RESET = '\033[0m'  # No Color
+
+
+def log_info(message):
+    """Exibe mensagem informativa."""
+    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}")
+
+
+def log_success(message):
+    """Exibe mensagem de sucesso."""
+    print(f"{Colors.GREEN}[SUCCESS]{Colors.RESET} {message}")
+
+
+def log_warning(message):
+    """Exibe mensagem de aviso."""
+    print(f"{Colors.YELLOW}[WARNING]{Colors.RESET} {message}")
+
+
+def log_error(message):
+    """Exibe mensagem de erro."""
+    print(f"{Colors.RED}[ERROR]{Colors.RESET} {message}")
+
+
+# Produtos criados pelo ProductSeeder (id -> valor em centavos)
+SEEDED_PRODUCTS = {1: 1000, 2: 2500, 3: 9990}
+
+# CVVs que os mocks dos gateways tratam como recusa
+REJECTED_CVVS = {"100", "200"}
+
+RESPONSE_TIME_RE = re.compile(r"([\d.]+)\s*ms")
+
+# Status finais de uma compra assíncrona
+FINAL_STATUSES = {"COMPLETED", "FAILED"}
+
+
+class PayloadFactory:
+    """Gera payloads válidos para /api/purchase."""
+
+    def __init__(self, product_ids, client_pool, max_quantity, seed=None):
+        """
+        Args:
+            product_ids: IDs de produtos existentes
+            client_pool: Quantidade de clientes distintos (emails reaproveitados)
+            max_quantity: Quantidade máxima por item
+            seed: Semente do gerador aleatório
+        """
+        self.random = random.Random(seed)
+        self.product_ids = list(product_ids)
+        self.max_quantity = max_quantity
+        self.clients = [self._client(i) for i in range(client_pool)]
+
+    def _client(self, index):
+        suffix = "".join(self.random.choices(string.ascii_lowercase, k=6))
+        return (f"Cliente Carga {index}", f"loadtest.{suffix}{index}@example.com")
+
+    def _cvv(self):
+        while True:
+            cvv = f"{self.random.randint(0, 999):03d}"
+            if cvv not in REJECTED_CVVS:
+                return cvv
+
+    def build(self):
+        """Retorna um novo payload de compra."""
+        items = self.random.sample(self.product_ids,
+                                   self.random.randint(1, len(self.product_ids)))
+        name, email = self.random.choice(self.clients)
+        return {
+            "products": [{"id": product_id,
+                          "quantity": self.random.randint(1, self.max_quantity)}
+                         for product_id in items],
+            "client_name": name,
+            "client_email": email,
+            "card_number": "".join(self.random.choices(string.digits, k=16)),
+            "card_cvv": self._cvv(),
+        }
+
+
+class LoadStats:
+    """Métricas acumuladas de uma fase do teste."""
+
+    def __init__(self):
+        self.client = LatencyHistogram()
+        self.server = LatencyHistogram()
+        self.overhead = LatencyHistogram()
+        self.completion = LatencyHistogram()
+        self.outcomes = Counter()
+        self.statuses = Counter()
+        self.messages = Counter()
+        self.errors = Counter()
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def record(self, latency, response=None, error=None):
+        """
+        Registra o resultado de uma requisição.
+
+        Args:
+            latency: Latência observada pelo cliente em segundos
+            response: HttpResponse recebida, se houver
+            error: Descrição da falha de transporte, se houver
+        """
+        self.client.record_seconds(latency)
+        if error is not None:
+            self.errors[error] += 1
+            return
+
+        self.statuses[response.status] += 1
+        match = RESPONSE_TIME_RE.match(response.headers.get("x-response-time", ""))
+        if match:
+            server_seconds = float(match.group(1)) / 1000.0
+            self.server.record_seconds(server_seconds)
+            self.overhead.record_seconds(latency - server_seconds)
+
+        if response.status >= 400:
+            try:
+                message = response.json().get("message", "")
+            except (ValueError, AttributeError):
+                message = ""
+            self.messages[(response.status, message[:80])] += 1
+
+    def record_outcome(self, latency, outcome):
+        """
+        Registra o desfecho de uma compra assíncrona.
+
+        Args:
+            latency: Tempo do envio até o status final, em segundos
+            outcome: COMPLETED, FAILED, TIMEOUT ou ERROR
+        """
+        self.outcomes[outcome] += 1
+        if outcome in FINAL_STATUSES:
+            self.completion.record_seconds(latency)
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def completed(self):
+        return self.client.total
+
+    @property
+    def succeeded(self):
+        return sum(count for status, count in self.statuses.items() if 200 <= status < 300)
+
+    def to_dict(self):
+        """Resumo serializável da fase."""
+        return {
+            "elapsed_seconds": round(self.elapsed, 3),
+            "requests": self.completed,
+            "succeeded": self.succeeded,
+            "throughput_rps": round(self.completed / self.elapsed, 2) if self.elapsed else 0.0,
+            "client_latency": self.client.to_dict(),
+            "server_latency": self.server.to_dict(),
+            "overhead_latency": self.overhead.to_dict(),
+            "completion_latency": self.completion.to_dict(),
+            "outcomes": dict(self.outcomes),
+            "completed_rps": (round(self.outcomes["COMPLETED"] / self.elapsed, 2)
+                              if self.elapsed else 0.0),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "error_messages": [{"status": s, "message": m, "count": c}
+                               for (s, m), c in self.messages.most_common()],
+            "transport_errors": dict(self.errors),
+        }
+
+
+async def send_purchase(client, payloads, stats, intended_start=None):
+    """
+    Envia uma compra e registra o resultado.
+
+    Args:
+        client: HttpClient
+        payloads: PayloadFactory
+        stats: LoadStats da fase atual
+        intended_start: Horário planejado de envio (modo open)
+    """
+    started_at = intended_start if intended_start is not None else time.monotonic()
+    headers = {"X-Request-ID": f"loadtest-{random.getrandbits(64):016x}"}
+    try:
+        response = await client.request("POST", "/api/purchase", payloads.build(), headers)
+    except HttpError as exc:
+        stats.record(time.monotonic() - started_at, error=str(exc))
+        return
+    stats.record(time.monotonic() - started_at, response)
+
+
+async def send_async_purchase(client, payloads, stats, intended_start=None,
+                              poll_interval=0.2, completion_timeout=60.0):
+    """
+    Envia uma compra assíncrona e acompanha a URL de status até o desfecho.
+
+    Args:
+        client: HttpClient
+        payloads: PayloadFactory
+        stats: LoadStats da fase atual
+        intended_start: Horário planejado de envio (modo open)
+        poll_interval: Intervalo entre consultas de status em segundos
+        completion_timeout: Tempo máximo aguardando o status final
+    """
+    started_at = intended_start if intended_start is not None else time.monotonic()
+    headers = {"X-Request-ID": f"loadtest-{random.getrandbits(64):016x}"}
+    try:
+        response = await client.request("POST", "/api/purchase/async", payloads.build(), headers)
+    except HttpError as exc:
+        stats.record(time.monotonic() - started_at, error=str(exc))
+        return
+    stats.record(time.monotonic() - started_at, response)
+    if response.status != 202:
+        return
+
+    try:
+        status_url = urlsplit(response.json()["status_url"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        # 202 sem status_url ou com corpo que não é JSON: não há o que acompanhar
+        stats.record_outcome(time.monotonic() - started_at, "ERROR")
+        return
+    path = status_url.path
+    if client.base_path and path.startswith(client.base_path):
+        path = path[len(client.base_path):]
+    path = f"{path}?{status_url.query}"
+
+    while time.monotonic() - started_at < completion_timeout:
+        await asyncio.sleep(poll_interval)
+        try:
+            status = await client.request("GET", path)
+        except HttpError:
+            continue
+        try:
+            outcome = status.json().get("status") if status.status == 200 else None
+        except (ValueError, AttributeError):
+            outcome = None
+        if outcome is None:
+            stats.record_outcome(time.monotonic() - started_at, "ERROR")
+            return
+        if outcome in FINAL_STATUSES:
+            stats.record_outcome(time.monotonic() - started_at, outcome)
+            return
+    stats.record_outcome(time.monotonic() - started_at, "TIMEOUT")
+
+
+def purchase_sender(options):
+    """Função de envio de uma compra conforme o modo (síncrono ou --async)."""
+    if getattr(options, "async_mode", False):
+        return partial(send_async_purchase, poll_interval=options.poll_interval,
+                       completion_timeout=options.completion_timeout)
+    return send_purchase
+
+
+async def run_closed_loop(client, payloads, stats, concurrency, deadline, send=send_purchase):
+    """Mantém `concurrency` usuários virtuais enviando compras até o prazo."""
+    async def virtual_user():
+        while time.monotonic() < deadline:
+            await send(client, payloads, stats)
+
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+
+
+async def run_open_loop(client, payloads, stats, rate, deadline, send=send_purchase):
+    """Dispara compras a taxa constante até o prazo e aguarda as pendentes."""
+    interval = 1.0 / rate
+    next_at = time.monotonic()
+    pending = set()
+    while next_at < deadline:
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(send(client, payloads, stats, next_at))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        next_at += interval
+    if pending:
+        await asyncio.gather(*pending)
+
+
+async def run_phase(options, client, payloads, duration):
+    """Executa uma fase (aquecimento ou medição) e retorna as métricas."""
+    stats = LoadStats()
+    deadline = time.monotonic() + duration
+    send = purchase_sender(options)
+    if options.mode == "closed":
+        await run_closed_loop(client, payloads, stats, options.concurrency, deadline, send)
+    else:
+        await run_open_loop(client, payloads, stats, options.rate, deadline, send)
+    stats.finished_at = time.monotonic()
+    return stats
+
+
+def print_report(stats, options):
+    """Exibe o relatório da fase medida."""
+    if options.mode == "closed":
+        workload = f"closed-loop, {options.concurrency} usuários"
+    else:
+        workload = f"open-loop, {options.rate:g} req/s planejadas"
+
+    endpoint = "/api/purchase/async" if getattr(options, "async_mode", False) else "/api/purchase"
+    print(f"\n{Colors.BLUE}=== RESULTADO: POST {endpoint} ({workload}) ==={Colors.RESET}")
+    print(f"Requisições: {stats.completed} em {stats.elapsed:.1f}s "
+          f"({stats.completed / stats.elapsed:.1f} req/s), {stats.succeeded} com sucesso")
+    if stats.outcomes:
+        print(f"Compras concluídas: {stats.outcomes['COMPLETED']} "
+              f"({stats.outcomes['COMPLETED'] / stats.elapsed:.1f}/s); desfechos: "
+              + ", ".join(f"{k}={v}" for k, v in sorted(stats.outcomes.items())))
+
+    print(f"\n{'Latência':<22} {'média':>9}  percentis")
+    for label, histogram in (("cliente", stats.client),
+                             ("servidor (header)", stats.server),
+                             ("cliente - servidor", stats.overhead),
+                             ("conclusão (async)", stats.completion)):
+        if histogram.total:
+            print(f"{label:<22} {histogram.mean / 1000.0:>7.1f}ms  {format_percentiles(histogram)}")
+    if stats.completed and not stats.server.total:
+        log_warning("Nenhuma resposta trouxe o header X-Response-Time.")
+
+    print("\nStatus:")
+    for status, count in sorted(stats.statuses.items()):
+        print(f"  {status}: {count} ({count / stats.completed:.1%})")
+    for (status, message), count in stats.messages.most_common(10):
+        print(f"    {status} {message or '(sem mensagem)'}: {count}")
+    for error, count in stats.errors.most_common():
+        print(f"  erro de transporte [{error}]: {count}")
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Teste de carga de POST /api/purchase")
+    parser.add_argument("--url", default="http://localhost:8000",
+                        help="URL base da API (padrão: http://localhost:8000)")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed",
+                        help="closed: concorrência fixa; open: taxa de chegada constante")
+    parser.add_argument("--concurrency", type=int, default=10,
+                        help="Usuários virtuais no modo closed (padrão: 10)")
+    parser.add_argument("--rate", type=float, default=20.0,
+                        help="Requisições por segundo no modo open (padrão: 20)")
+    parser.add_argument("--duration", type=float, default=30.0,
+                        help="Duração da medição em segundos (padrão: 30)")
+    parser.add_argument("--warmup", type=float, default=5.0,
+                        help="Aquecimento descartado antes da medição (padrão: 5)")
+    parser.add_argument("--max-connections", type=int, default=200,
+                        help="Limite de conexões abertas (padrão: 200)")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="Timeout por requisição em segundos (padrão: 30)")
+    parser.add_argument("--products", default=",".join(str(i) for i in SEEDED_PRODUCTS),
+                        help="IDs de produtos usados nas compras (padrão: 1,2,3)")
+    parser.add_argument("--max-quantity", type=int, default=3,
+                        help="Quantidade máxima por item (padrão: 3)")
+    parser.add_argument("--clients", type=int, default=50,
+                        help="Quantidade de clientes distintos (padrão: 50)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Semente para payloads reproduzíveis")
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="Usa POST /api/purchase/async e acompanha o status até o desfecho")
+    parser.add_argument("--poll-interval", type=float, default=0.2,
+                        help="Intervalo entre consultas de status no modo --async (padrão: 0.2)")
+    parser.add_argument("--completion-timeout", type=float, default=60.0,
+                        help="Espera máxima pelo status final no modo --async (padrão: 60)")
+    parser.add_argument("--json", dest="json_path", default=None,
+                        help="Grava o resultado em um arquivo JSON")
+    options = parser.parse_args(argv)
+
+    if options.concurrency < 1 or options.rate <= 0 or options.duration <= 0:
+        parser.error("--concurrency, --rate e --duration devem ser positivos")
+    return options
+
+
+async def run(options):
+    """Executa aquecimento e medição, retornando as métricas medidas."""
+    payloads = PayloadFactory([int(p) for p in options.products.split(",")],
+                              options.clients, options.max_quantity, options.seed)
+    max_connections = options.concurrency if options.mode == "closed" else options.max_connections
+    client = HttpClient(options.url, max_connections, options.timeout)
+    try:
+        if options.warmup > 0:
+            log_info(f"Aquecendo por {options.warmup:g}s...")
+            warmup = await run_phase(options, client, payloads, options.warmup)
+            log_info(f"Aquecimento: {warmup.completed} requisições, "
+                     f"{sum(warmup.errors.values())} erros de transporte")
+
+        log_info(f"Medindo por {options.duration:g}s...")
+        return await run_phase(options, client, payloads, options.duration)
+    finally:
+        client.close()
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+    print(f"{Colors.BLUE}=== TESTE DE CARGA - MULTI-GATEWAY ==={Colors.RESET}\n")
+
+    try:
+        stats = asyncio.run(run(options))
+    except KeyboardInterrupt:
+        log_warning("Interrompido pelo usuário.")
+        sys.exit(130)
+
+    print_report(stats, options)
+
+    if options.json_path:
+        result = {"mode": options.mode, "async": options.async_mode,
+                  "concurrency": options.concurrency,
+                  "rate": options.rate, "url": options.url, **stats.to_dict()}
+        with open(options.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+        log_success(f"Resultado gravado em {options.json_path}")
+
+    if sum(stats.statuses.values()) == 0:
+        log_error("Nenhuma requisição foi concluída com resposta do servidor.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
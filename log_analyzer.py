@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Gateway Log Analyzer
+--------------------
+Lê os arquivos diários do canal `gateways` (storage/logs/gateways-*.log,
+um JSON por linha gerado pelo CustomJsonFormatter) e calcula, por gateway e
+operação, percentis de latência (metadata.processing_time_ms), taxa de erro
+e séries por intervalo de tempo.
+
+Os arquivos são percorridos com mmap em uma única passada: nenhum arquivo é
+carregado inteiro em memória e apenas as linhas de "Gateway response" são
+decodificadas como JSON.
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import glob
+import json
+import mmap
+import os
+import sys
+from datetime import datetime
+
+from latency_histogram import LatencyHistogram, format_percentiles
+
+LOG_DIR = os.path.join("multigateway-app", "storage", "logs")
+
+# Marcador procurado nos bytes da linha antes de decodificar o JSON
+RESPONSE_MARKER = b'"message":"Gateway response"'
+
+
+# Cores para formatação no terminal
+class Colors:
+    """Define cores para saídas no terminal."""
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[0;33m'
+    BLUE = '\033[0;34m'
+    RESET = '\033[0m'  # No Color
+
+
+def log_info(message):
+    """Exibe mensagem informativa."""
+    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}", file=sys.stderr)
+
+
+def log_error(message):
+    """Exibe mensagem de erro."""
+    print(f"{Colors.RED}[ERROR]{Colors.RESET} {message}", file=sys.stderr)
+
+
+def channel_files(log_dir, channel):
+    """
+    Lista os arquivos diários de um canal em ordem cronológica.
+
+    Args:
+        log_dir: Diretório dos logs
+        channel: Nome do canal (transactions, gateways, system)
+
+    Returns:
+        list: Caminhos dos arquivos <canal>-AAAA-MM-DD.log
+    """
+    return sorted(glob.glob(os.path.join(log_dir, f"{channel}-*.log")))
+
+
+def iter_lines(path, start=0, marker=None):
+    """
+    Percorre as linhas completas de um arquivo via mmap.
+
+    Linhas sem o "\\n" final (ainda sendo escritas) não são retornadas, o que
+    permite retomar a leitura a partir do último offset devolvido.
+
+    Args:
+        path: Arquivo de log
+        start: Offset inicial em bytes (início de uma linha)
+        marker: Bytes que a linha precisa conter; as demais são puladas sem cópia
+
+    Yields:
+        tuple: (offset da linha, offset seguinte, bytes da linha sem "\\n")
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= start:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            position = start
+            while position < size:
+                end = mm.find(b"\n", position)
+                if end == -1:
+                    return
+                if marker is None or mm.find(marker, position, end) != -1:
+                    yield position, end + 1, mm[position:end]
+                position = end + 1
+
+
+def parse_record(line):
+    """Decodifica uma linha JSON; retorna None para linhas inválidas."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def bucket_start(timestamp, bucket_seconds, cache):
+    """
+    Arredonda um datetime ISO 8601 para o início do intervalo (epoch).
+
+    O cache por segundo evita reinterpretar o mesmo horário em arquivos com
+    muitos registros por segundo.
+    """
+    second = timestamp[:19]
+    if len(timestamp) > 19 and timestamp[-6] in "+-":
+        second += timestamp[-6:]
+    epoch = cache.get(second)
+    if epoch is None:
+        try:
+            epoch = datetime.fromisoformat(second).timestamp()
+        except ValueError:
+            return None
+        cache[second] = epoch
+    return int(epoch // bucket_seconds * bucket_seconds)
+
+
+class GatewayResponseStats:
+    """Agregação das respostas de gateway por (gateway, operação) e por intervalo."""
+
+    def __init__(self, bucket_seconds=300):
+        """
+        Args:
+            bucket_seconds: Tamanho dos intervalos da série temporal
+        """
+        self.bucket_seconds = bucket_seconds
+        self.latency = {}   # (gateway, operação) -> LatencyHistogram
+        self.responses = {}  # (gateway, operação) -> quantidade de respostas
+        self.errors = {}    # (gateway, operação) -> quantidade de erros
+        self.series = {}    # (intervalo, gateway) -> [LatencyHistogram, respostas, erros]
+        self.first_seen = None
+        self.last_seen = None
+        self._bucket_cache = {}
+
+    def add(self, record):
+        """Acrescenta um registro "Gateway response" decodificado."""
+        context = record.get("context") or {}
+        gateway = context.get("gateway") or {}
+        name = gateway.get("name") or f"gateway {gateway.get('id', '?')}"
+        operation = context.get("operation", "unknown")
+        elapsed_ms = (context.get("metadata") or {}).get("processing_time_ms")
+        is_error = context.get("status") != "success"
+
+        key = (name, operation)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = LatencyHistogram()
+            self.responses[key] = 0
+            self.errors[key] = 0
+        if isinstance(elapsed_ms, (int, float)):
+            histogram.record(elapsed_ms * 1000)
+        self.responses[key] += 1
+        self.errors[key] += is_error
+
+        timestamp = record.get("datetime")
+        if not timestamp:
+            return
+        self.first_seen = min(self.first_seen or timestamp, timestamp)
+        self.last_seen = max(self.last_seen or timestamp, timestamp)
+        start = bucket_start(timestamp, self.bucket_seconds, self._bucket_cache)
+        if start is None:
+            return
+        point = self.series.get((start, name))
+        if point is None:
+            point = self.series[(start, name)] = [LatencyHistogram(), 0, 0]
+        if isinstance(elapsed_ms, (int, float)):
+            point[0].record(elapsed_ms * 1000)
+        point[1] += 1
+        point[2] += is_error
+
+    def to_dict(self):
+        """Resumo serializável."""
+        return {
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "bucket_seconds": self.bucket_seconds,
+            "gateways": [
+                {"gateway": name, "operation": operation,
+                 "responses": self.responses[(name, operation)],
+                 "errors": self.errors[(name, operation)],
+                 "latency": self.latency[(name, operation)].to_dict()}
+                for name, operation in sorted(self.latency)
+            ],
+            "series": [
+                {"bucket": datetime.fromtimestamp(start).isoformat(), "gateway": name,
+                 "responses": count, "errors": errors,
+                 "latency": histogram.to_dict()}
+                for (start, name), (histogram, count, errors) in sorted(self.series.items())
+            ],
+        }
+
+
+def analyze_gateway_logs(paths, bucket_seconds=300):
+    """
+    Processa os arquivos do canal gateways em uma única passada.
+
+    Args:
+        paths: Arquivos gateways-*.log
+        bucket_seconds: Tamanho dos intervalos da série temporal
+
+    Returns:
+        tuple: (GatewayResponseStats, bytes lidos)
+    """
+    stats = GatewayResponseStats(bucket_seconds)
+    total_bytes = 0
+    for path in paths:
+        for _, _, line in iter_lines(path, marker=RESPONSE_MARKER):
+            record = parse_record(line)
+            if record is not None and record.get("message") == "Gateway response":
+                stats.add(record)
+        total_bytes += os.path.getsize(path)
+    return stats, total_bytes
+
+
+def print_report(stats):
+    """Exibe o relatório por gateway/operação e a série temporal."""
+    print(f"{Colors.BLUE}=== RESPOSTAS DOS GATEWAYS ==={Colors.RESET}")
+    if not stats.latency:
+        print("Nenhum registro 'Gateway response' encontrado.")
+        return
+    print(f"Período: {stats.first_seen} a {stats.last_seen}\n")
+
+    print(f"{'Gateway':<20} {'Operação':<10} {'Respostas':>9} {'Erros':>7}  Latência")
+    for key in sorted(stats.latency):
+        histogram = stats.latency[key]
+        requests = stats.responses[key]
+        errors = stats.errors[key]
+        print(f"{key[0][:20]:<20} {key[1][:10]:<10} {requests:>9} "
+              f"{errors / requests:>7.1%}  {format_percentiles(histogram)}")
+
+    print(f"\n{Colors.BLUE}Série ({stats.bucket_seconds // 60} min){Colors.RESET}")
+    print(f"{'Intervalo':<17} {'Gateway':<20} {'Respostas':>9} {'Erros':>7} "
+          f"{'p50':>9} {'p95':>9}")
+    for (start, name), (histogram, count, errors) in sorted(stats.series.items()):
+        print(f"{datetime.fromtimestamp(start):%Y-%m-%d %H:%M} {name[:20]:<20} {count:>9} "
+              f"{errors / count:>7.1%} {histogram.percentile(50) / 1000:>7.1f}ms "
+              f"{histogram.percentile(95) / 1000:>7.1f}ms")
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Latência e erros dos gateways a partir dos logs JSON")
+    parser.add_argument("files", nargs="*",
+                        help="Arquivos a analisar (padrão: todos os gateways-*.log)")
+    parser.add_argument("--log-dir", default=LOG_DIR,
+                        help=f"Diretório dos logs (padrão: {LOG_DIR})")
+    parser.add_argument("--bucket", type=int, default=5,
+                        help="Tamanho dos intervalos da série em minutos (padrão: 5)")
+    parser.add_argument("--json", action="store_true",
+                        help="Imprime o resultado em JSON")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+    paths = options.files or channel_files(options.log_dir, "gateways")
+    if not paths:
+        log_error(f"Nenhum arquivo gateways-*.log em {options.log_dir}")
+        sys.exit(1)
+
+    started_at = datetime.now()
+    stats, total_bytes = analyze_gateway_logs(paths, max(1, options.bucket) * 60)
+    elapsed = (datetime.now() - started_at).total_seconds()
+    log_info(f"{len(paths)} arquivo(s), {total_bytes / 1024 / 1024:.1f} MB em {elapsed:.2f}s")
+
+    if options.json:
+        json.dump(stats.to_dict(), sys.stdout, indent=2)
+        print()
+    else:
+        print_report(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Incremental Log Indexer
+-----------------------
+Indexa incrementalmente os canais `transactions`, `gateways` e `system`
+(arquivos diários <canal>-AAAA-MM-DD.log, mantidos por 14 dias) em um
+resumo por minuto gravado em SQLite.
+
+Cada arquivo tem um checkpoint com inode, tamanho e offset já lido: a cada
+execução apenas os bytes acrescentados desde então são processados. Troca
+de inode, truncamento e reaproveitamento de inode (detectado pelo hash da
+primeira linha) reiniciam a leitura do arquivo; arquivos removidos pela
+rotação perdem o checkpoint, mas seus resumos continuam disponíveis até o
+prazo de retenção.
+
+Uso:
+  python log_indexer.py update            # processa apenas os bytes novos
+  python log_indexer.py report --hours 24 # relatório a partir do resumo
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from latency_histogram import LatencyHistogram, format_percentiles
+from log_analyzer import LOG_DIR, bucket_start, channel_files, iter_lines, parse_record
+
+CHANNELS = ["transactions", "gateways", "system"]
+INDEX_FILE = ".log-index.sqlite"
+
+# Bytes da primeira linha usados para detectar reaproveitamento de inode
+HEAD_BYTES = 512
+
+# Segmentos numéricos ou UUID do path viram {id} para agrupar rotas
+PATH_ID_RE = re.compile(r"/(?:\d+|[0-9a-f]{8}-[0-9a-f-]{27,})(?=/|$)", re.IGNORECASE)
+
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    channel TEXT NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    head_hash TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+SUMMARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS minute_summary (
+    minute INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    message TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    amount INTEGER NOT NULL,
+    latency TEXT,
+    PRIMARY KEY (minute, channel, message, dimension, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_minute_summary_channel
+    ON minute_summary (channel, minute);
+CREATE INDEX IF NOT EXISTS idx_minute_summary_file
+    ON minute_summary (file_id);
+"""
+
+
+# Cores para formatação no terminal
+class Colors:
+    """Define cores para saídas no terminal."""
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[0;33m'
+    BLUE = '\033[0;34m'
+    RESET = '\033[0m'  # No Color
+
+
+def log_info(message):
+    """Exibe mensagem informativa."""
+    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}")
+
+
+def log_success(message):
+    """Exibe mensagem de sucesso."""
+    print(f"{Colors.GREEN}[SUCCESS]{Colors.RESET} {message}")
+
+
+def log_warning(message):
+    """Exibe mensagem de aviso."""
+    print(f"{Colors.YELLOW}[WARNING]{Colors.RESET} {message}")
+
+
+def normalize_path(path):
+    """Converte api/transactions/42/refund em api/transactions/{id}/refund."""
+    return PATH_ID_RE.sub("/{id}", "/" + (path or "").lstrip("/"))[1:]
+
+
+def head_fingerprint(path):
+    """
+    Hash da primeira linha completa do arquivo (até HEAD_BYTES).
+
+    Ao contrário do início bruto do arquivo, a primeira linha não muda
+    enquanto o arquivo cresce.
+    """
+    with open(path, "rb") as f:
+        head = f.read(HEAD_BYTES)
+    newline = head.find(b"\n")
+    if newline != -1:
+        head = head[:newline]
+    elif len(head) < HEAD_BYTES:
+        head = b""
+    return hashlib.sha1(head).hexdigest()
+
+
+def summarize_record(channel, record):
+    """
+    Extrai a dimensão e as métricas de um registro de log.
+
+    Args:
+        channel: Canal de origem
+        record: Registro JSON decodificado
+
+    Returns:
+        tuple: (mensagem, dimensão, erro, valor em centavos, latência em ms ou None)
+    """
+    message = record.get("message", "")
+    context = record.get("context") or {}
+    metadata = context.get("metadata") or {}
+    is_error = int(record.get("level", 0) >= 400)
+    latency = None
+    amount = 0
+    dimension = ""
+
+    if channel == "gateways":
+        gateway = context.get("gateway") or {}
+        dimension = f"{gateway.get('name', '?')}|{context.get('operation', '?')}"
+        if message == "Gateway response":
+            is_error = int(context.get("status") != "success")
+            latency = metadata.get("processing_time_ms")
+    elif channel == "transactions":
+        gateway = context.get("gateway") or {}
+        dimension = gateway.get("name", "")
+        amount = context.get("amount") or 0
+        latency = metadata.get("processing_time_ms", context.get("processing_time_ms"))
+        if message in ("Payment processing failed", "Refund failed"):
+            is_error = 1
+    elif channel == "system":
+        path = normalize_path(context.get("path", ""))
+        if message == "API Response":
+            status = context.get("status_code", 0)
+            dimension = f"{context.get('method', '?')} {path} {status}"
+            is_error = int(status >= 500)
+            latency = context.get("response_time_ms")
+        elif message == "API Request":
+            dimension = f"{context.get('method', '?')} {path}"
+
+    if not isinstance(latency, (int, float)):
+        latency = None
+    if not isinstance(amount, int):
+        amount = 0
+    return message, dimension, is_error, amount, latency
+
+
+class CheckpointedIndex:
+    """
+    Base dos índices incrementais: checkpoints por arquivo em SQLite.
+
+    Subclasses implementam _index_file (processa os bytes novos de um
+    arquivo) e, se guardam referências por arquivo, _forget (descarta o que
+    foi indexado de um arquivo substituído ou removido) ou _reset (só para
+    o arquivo substituído ou truncado, que será lido de novo desde o início).
+    O processamento de cada arquivo e o avanço do seu checkpoint ocorrem na
+    mesma transação.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Caminho do arquivo SQLite
+        """
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+        self.connection.executescript(CHECKPOINT_SCHEMA + self.SCHEMA)
+
+    def close(self):
+        """Fecha a conexão com o banco."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _migrate(self):
+        """Ajusta um índice de versão anterior antes de criar o esquema (padrão: nada)."""
+
+    def _checkpoints(self):
+        rows = self.connection.execute(
+            "SELECT id, path, channel, inode, size, offset, head_hash FROM checkpoints")
+        columns = ("id", "path", "channel", "inode", "size", "offset", "head_hash")
+        return {row[1]: dict(zip(columns, row)) for row in rows}
+
+    def resume_offset(self, path, stat, head_hash, checkpoints):
+        """
+        Decide a partir de qual offset o arquivo deve ser lido.
+
+        Args:
+            path: Arquivo atual
+            stat: os.stat do arquivo
+            head_hash: Hash da primeira linha do arquivo
+            checkpoints: Checkpoints conhecidos, por caminho
+
+        Returns:
+            tuple: (offset inicial, motivo, checkpoint de origem ou None)
+        """
+        checkpoint = checkpoints.get(path)
+        if checkpoint is None:
+            # Arquivo renomeado: mesmo inode e mesma primeira linha em outro caminho
+            for other in checkpoints.values():
+                if other["inode"] == stat.st_ino and other["head_hash"] == head_hash and \
+                        not os.path.exists(other["path"]) and stat.st_size >= other["offset"]:
+                    return other["offset"], f"renomeado de {other['path']}", other
+            return 0, "novo", None
+
+        if checkpoint["inode"] != stat.st_ino or checkpoint["head_hash"] != head_hash:
+            return 0, "substituído", checkpoint
+        if stat.st_size < checkpoint["offset"]:
+            return 0, "truncado", checkpoint
+        return checkpoint["offset"], "incremental", checkpoint
+
+    def update(self, log_dir, channels=CHANNELS):
+        """
+        Processa os bytes novos de todos os arquivos dos canais.
+
+        Args:
+            log_dir: Diretório dos logs
+            channels: Canais indexados
+
+        Returns:
+            dict: Estatísticas (arquivos, bytes, registros, removidos)
+        """
+        checkpoints = self._checkpoints()
+        totals = {"files": 0, "bytes": 0, "records": 0, "pruned": 0}
+        seen = set()
+
+        for channel in channels:
+            for path in channel_files(log_dir, channel):
+                seen.add(path)
+                stat = os.stat(path)
+                head_hash = head_fingerprint(path)
+                start, reason, checkpoint = self.resume_offset(path, stat, head_hash, checkpoints)
+                if reason == "incremental" and start == stat.st_size:
+                    continue
+
+                with self.connection:
+                    if checkpoint is None:
+                        file_id = self.connection.execute(
+                            "INSERT INTO checkpoints "
+                            "(path, channel, inode, size, offset, head_hash, updated_at) "
+                            "VALUES (?, ?, ?, 0, 0, '', '')",
+                            (path, channel, stat.st_ino)).lastrowid
+                    else:
+                        file_id = checkpoint["id"]
+                        if reason.startswith("renomeado"):
+                            # O checkpoint acompanha o arquivo no novo caminho
+                            checkpoints.pop(checkpoint["path"])
+                            self.connection.execute(
+                                "UPDATE checkpoints SET path = ? WHERE id = ?", (path, file_id))
+                        elif reason != "incremental":
+                            self._reset(file_id)
+
+                    records, offset = self._index_file(channel, path, start, file_id)
+                    self.connection.execute(
+                        "UPDATE checkpoints SET inode = ?, size = ?, offset = ?, head_hash = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (stat.st_ino, stat.st_size, offset, head_hash,
+                         time.strftime("%Y-%m-%dT%H:%M:%S"), file_id))
+                if reason in ("substituído", "truncado"):
+                    log_warning(f"{path}: {reason}, lido desde o início")
+                elif reason.startswith("renomeado"):
+                    log_info(f"{path}: {reason}, checkpoint mantido")
+                if offset == start:
+                    # Apenas uma linha incompleta foi acrescentada
+                    continue
+                totals["files"] += 1
+                totals["bytes"] += offset - start
+                totals["records"] += records
+
+        # Checkpoints de arquivos removidos pela rotação
+        gone = [checkpoint for path, checkpoint in checkpoints.items() if path not in seen]
+        if gone:
+            with self.connection:
+                for checkpoint in gone:
+                    self._forget(checkpoint["id"])
+                    self.connection.execute("DELETE FROM checkpoints WHERE id = ?",
+                                            (checkpoint["id"],))
+            totals["pruned"] = len(gone)
+        return totals
+
+    def _index_file(self, channel, path, start, file_id):
+        """
+        Processa as linhas completas a partir de start, dentro da transação aberta.
+
+        Returns:
+            tuple: (registros processados, offset após a última linha completa)
+        """
+        raise NotImplementedError
+
+    def _forget(self, file_id):
+        """Descarta o que foi indexado de um arquivo (padrão: nada a descartar)."""
+
+    def _reset(self, file_id):
+        """Descarta o que foi indexado de um arquivo que será relido (padrão: _forget)."""
+        self._forget(file_id)
+
+
+class LogIndex(CheckpointedIndex):
+    """
+    Resumo por minuto dos canais, mantido incrementalmente.
+
+    Cada arquivo tem as próprias linhas no resumo (file_id): um arquivo
+    substituído ou truncado tem as suas descartadas antes de ser relido, sem
+    contar os registros duas vezes. As linhas de arquivos removidos pela
+    rotação são mantidas até o prazo de retenção (prune).
+    """
+
+    SCHEMA = SUMMARY_SCHEMA
+
+    def __init__(self, path=INDEX_FILE):
+        """
+        Args:
+            path: Caminho do arquivo SQLite
+        """
+        super().__init__(path)
+
+    def _migrate(self):
+        """Recria o resumo de um índice sem linhas por arquivo a partir dos logs atuais."""
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(minute_summary)")]
+        if not columns or "file_id" in columns:
+            return
+        log_warning("Índice em formato antigo; o resumo será recriado a partir dos logs.")
+        with self.connection:
+            self.connection.execute("DROP TABLE minute_summary")
+            self.connection.execute("DROP TABLE IF EXISTS checkpoints")
+
+    def _index_file(self, channel, path, start, file_id):
+        """Agrega em memória os registros novos e soma ao resumo existente."""
+        pending = {}
+        cache = {}
+        offset = start
+        records = 0
+        for _, next_offset, line in iter_lines(path, start):
+            offset = next_offset
+            record = parse_record(line)
+            if record is None:
+                continue
+            minute = bucket_start(record.get("datetime", ""), 60, cache)
+            if minute is None:
+                continue
+            message, dimension, is_error, amount, latency = summarize_record(channel, record)
+            key = (minute, channel, message, dimension, file_id)
+            entry = pending.get(key)
+            if entry is None:
+                entry = pending[key] = [0, 0, 0, LatencyHistogram()]
+            entry[0] += 1
+            entry[1] += is_error
+            entry[2] += amount
+            if latency is not None:
+                entry[3].record(latency * 1000)
+            records += 1
+
+        for key, (count, errors, amount, histogram) in pending.items():
+            row = self.connection.execute(
+                "SELECT count, errors, amount, latency FROM minute_summary "
+                "WHERE minute = ? AND channel = ? AND message = ? AND dimension = ? "
+                "AND file_id = ?",
+                key).fetchone()
+            if row:
+                count += row[0]
+                errors += row[1]
+                amount += row[2]
+                if row[3]:
+                    histogram.merge(LatencyHistogram.from_state(json.loads(row[3])))
+            latency = json.dumps(histogram.to_state()) if histogram.total else None
+            self.connection.execute(
+                "INSERT OR REPLACE INTO minute_summary "
+                "(minute, channel, message, dimension, file_id, count, errors, amount, latency) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, count, errors, amount, latency))
+        return records, offset
+
+    def _reset(self, file_id):
+        """Remove a contribuição do arquivo ao resumo antes de relê-lo."""
+        self.connection.execute("DELETE FROM minute_summary WHERE file_id = ?", (file_id,))
+
+    def prune(self, retention_days):
+        """Remove resumos mais antigos que o prazo de retenção."""
+        cutoff = int(time.time()) - retention_days * 86400
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM minute_summary WHERE minute < ?", (cutoff,))
+        return cursor.rowcount
+
+    def summary(self, since, channel=None):
+        """
+        Agrega o resumo por (canal, mensagem, dimensão) a partir de um horário.
+
+        Args:
+            since: Epoch inicial
+            channel: Canal específico, ou None para todos
+
+        Returns:
+            list: Dicts com canal, mensagem, dimensão, contagens e histograma
+        """
+        query = ("SELECT channel, message, dimension, count, errors, amount, latency "
+                 "FROM minute_summary WHERE minute >= ?")
+        params = [since]
+        if channel:
+            query += " AND channel = ?"
+            params.append(channel)
+
+        groups = {}
+        for channel_name, message, dimension, count, errors, amount, latency in \
+                self.connection.execute(query, params):
+            group = groups.get((channel_name, message, dimension))
+            if group is None:
+                group = groups[(channel_name, message, dimension)] = {
+                    "channel": channel_name, "message": message, "dimension": dimension,
+                    "count": 0, "errors": 0, "amount": 0, "latency": LatencyHistogram()}
+            group["count"] += count
+            group["errors"] += errors
+            group["amount"] += amount
+            if latency:
+                group["latency"].merge(LatencyHistogram.from_state(json.loads(latency)))
+        return [groups[key] for key in sorted(groups)]
+
+
+def print_summary(groups, hours):
+    """Exibe o relatório agregado."""
+    print(f"{Colors.BLUE}=== RESUMO DAS ÚLTIMAS {hours:g}H ==={Colors.RESET}")
+    current = None
+    for group in groups:
+        if group["channel"] != current:
+            current = group["channel"]
+            print(f"\n{Colors.BLUE}[{current}]{Colors.RESET}")
+        label = group["message"] + (f" ({group['dimension']})" if group["dimension"] else "")
+        line = f"  {label[:60]:<60} {group['count']:>8} {group['errors'] / group['count']:>7.1%}"
+        if group["amount"]:
+            line += f"  R$ {group['amount'] / 100:,.2f}"
+        if group["latency"].total:
+            line += f"  {format_percentiles(group['latency'])}"
+        print(line)
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(description="Indexação incremental dos logs JSON")
+    parser.add_argument("--log-dir", default=LOG_DIR,
+                        help=f"Diretório dos logs (padrão: {LOG_DIR})")
+    parser.add_argument("--index", default=INDEX_FILE,
+                        help=f"Arquivo SQLite do índice (padrão: {INDEX_FILE})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    update = subparsers.add_parser("update", help="Processa os bytes novos dos logs")
+    update.add_argument("--retention-days", type=int, default=14,
+                        help="Remove resumos mais antigos que N dias (padrão: 14)")
+
+    report = subparsers.add_parser("report", help="Relatório a partir do resumo")
+    report.add_argument("--hours", type=float, default=24,
+                        help="Janela do relatório em horas (padrão: 24)")
+    report.add_argument("--channel", choices=CHANNELS, default=None,
+                        help="Restringe a um canal")
+    report.add_argument("--no-update", action="store_true",
+                        help="Não atualiza o índice antes do relatório")
+    report.add_argument("--json", action="store_true",
+                        help="Imprime o resultado em JSON")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+
+    with LogIndex(options.index) as index:
+        if options.command == "update" or not options.no_update:
+            started_at = time.monotonic()
+            totals = index.update(options.log_dir)
+            removed = index.prune(options.retention_days) if options.command == "update" else 0
+            message = (f"{totals['files']} arquivo(s) atualizados, "
+                       f"{totals['bytes'] / 1024:.0f} KB novos, {totals['records']} registros, "
+                       f"{totals['pruned']} removidos pela rotação, "
+                       f"em {(time.monotonic() - started_at) * 1000:.0f}ms")
+            if options.command == "update":
+                log_success(message)
+                if removed:
+                    log_info(f"{removed} resumos além da retenção removidos")
+                return
+            print(message, file=sys.stderr)
+
+        started_at = time.monotonic()
+        since = int(time.time() - options.hours * 3600)
+        groups = index.summary(since, options.channel)
+        elapsed_ms = (time.monotonic() - started_at) * 1000
+
+    if options.json:
+        json.dump([{**group, "latency": group["latency"].to_dict()} for group in groups],
+                  sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print_summary(groups, options.hours)
+        print(f"\n(consulta ao resumo em {elapsed_ms:.0f}ms; "
+              f"desde {datetime.fromtimestamp(since):%Y-%m-%d %H:%M})")
+
+
+if __name__ == "__main__":
+    main()
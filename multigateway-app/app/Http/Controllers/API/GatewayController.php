@@ -5,6 +5,7 @@
 use App\Http\Controllers\Controller as Controller;
 use App\Http\Resources\GatewayResource;
 use App\Models\Gateway;
+use App\Services\Payment\GatewayRoutingTable;
 use Illuminate\Http\Request;
 use Illuminate\Support\Facades\DB;
 
@@ -64,17 +65,18 @@ public function destroy(Gateway $gateway)
         return response()->json(null, 204);
     }
 
-    public function toggleActive(Gateway $gateway)
+    public function toggleActive(Gateway $gateway, GatewayRoutingTable $routingTable)
     {
         $this->authorize('manage-gateways');
 
         $gateway->is_active = !$gateway->is_active;
         $gateway->save();
+        $routingTable->invalidate();
 
         return new GatewayResource($gateway);
     }
 
-    public function updatePriority(Request $request, Gateway $gateway)
+    public function updatePriority(Request $request, Gateway $gateway, GatewayRoutingTable $routingTable)
     {
         $this->authorize('manage-gateways');
 
@@ -110,6 +112,9 @@ public function updatePriority(Request $request, Gateway $gateway)
             $gateway->priority = $newPriority;
             $gateway->save();
 
+            // increment/decrement não disparam eventos de modelo; a invalidação ocorre após o commit
+            $routingTable->invalidate();
+
             DB::commit();
 
             // Retornar todos os gateways em ordem para que o frontend possa atualizar
@@ -129,7 +134,7 @@ public function updatePriority(Request $request, Gateway $gateway)
         }
     }
 
-    public function reorderPriorities(Request $request)
+    public function reorderPriorities(Request $request, GatewayRoutingTable $routingTable)
     {
         $this->authorize('manage-gateways');
 
@@ -156,6 +161,9 @@ public function reorderPriorities(Request $request)
                     ->update(['priority' => $gatewayData['priority']]);
             }
 
+            // Atualizações em massa não disparam eventos de modelo
+            $routingTable->invalidate();
+
             DB::commit();
 
             $gateways = Gateway::orderBy('priority')->get();
@@ -173,7 +181,7 @@ public function reorderPriorities(Request $request)
         }
     }
 
-    public function normalizePriorities()
+    public function normalizePriorities(GatewayRoutingTable $routingTable)
     {
         $this->authorize('manage-gateways');
 
@@ -190,6 +198,8 @@ public function normalizePriorities()
                 $gateway->save();
             }
 
+            $routingTable->invalidate();
+
             DB::commit();
 
             return response()->json([
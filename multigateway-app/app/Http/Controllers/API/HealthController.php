@@ -8,6 +8,9 @@
 use App\Models\Product;
 use App\Models\User;
 use App\Models\Client;
+use App\Services\Payment\GatewayCircuitBreaker;
+use App\Services\Payment\GatewayRoutingTable;
+use App\Services\Payment\GatewayTokenCache;
 use Illuminate\Support\Facades\DB;
 use Illuminate\Support\Facades\Redis;
 use Illuminate\Support\Facades\Http;
@@ -263,6 +266,9 @@ public function paymentSystem()
             'status' => 'ok',
             'timestamp' => now()->toIso8601String(),
             'gateways' => $this->getGatewayStatuses(),
+            'token_cache' => $this->getTokenCacheStats(),
+            'routing_table' => $this->getRoutingTableStats(),
+            'circuit_breakers' => $this->getCircuitBreakerStates(),
             'transaction_metrics' => [
                 'total_processed' => Transaction::count(),
                 'volume_total' => Transaction::sum('amount') / 100, // Em reais ao invés de centavos
@@ -353,6 +359,68 @@ private function getGatewayStatuses()
         return $result;
     }
 
+    /**
+     * Obter os contadores do cache de tokens dos gateways
+     *
+     * @return array
+     */
+    private function getTokenCacheStats()
+    {
+        try {
+            return [
+                'gateway1' => app(GatewayTokenCache::class)->stats('gateway1'),
+            ];
+        } catch (\Exception $e) {
+            return [
+                'error' => 'Failed to read token cache: ' . $e->getMessage()
+            ];
+        }
+    }
+
+    /**
+     * Obter os contadores do cache da tabela de gateways ativos
+     *
+     * @return array
+     */
+    private function getRoutingTableStats()
+    {
+        try {
+            return app(GatewayRoutingTable::class)->stats();
+        } catch (\Exception $e) {
+            return [
+                'error' => 'Failed to read routing table cache: ' . $e->getMessage()
+            ];
+        }
+    }
+
+    /**
+     * Obter o estado do circuit breaker e a pontuação de saúde de cada gateway
+     *
+     * @return array
+     */
+    private function getCircuitBreakerStates()
+    {
+        if (!config('services.gateway_circuit_breaker.enabled')) {
+            return ['enabled' => false];
+        }
+
+        try {
+            $gateways = Gateway::orderBy('priority')->get(['id', 'name']);
+            $states = app(GatewayCircuitBreaker::class)->states($gateways->pluck('id')->all());
+
+            $result = [];
+            foreach ($gateways as $gateway) {
+                $result[] = array_merge(['id' => $gateway->id, 'name' => $gateway->name], $states[$gateway->id]);
+            }
+
+            return $result;
+        } catch (\Exception $e) {
+            return [
+                'error' => 'Failed to read circuit breakers: ' . $e->getMessage()
+            ];
+        }
+    }
+
     /**
      * Calcular taxa de sucesso geral
      *
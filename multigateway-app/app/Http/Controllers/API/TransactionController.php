@@ -2,22 +2,30 @@
 
 namespace App\Http\Controllers\API;
 
+use App\Jobs\ProcessPurchasePayment;
 use App\Models\Client;
 use App\Models\Product;
 use App\Models\Transaction;
 use App\Services\Payment\PaymentService;
+use App\Services\Payment\PendingPaymentStore;
 use Illuminate\Http\Request;
 use App\Http\Controllers\Controller;
 use App\Http\Resources\TransactionResource;
+use Illuminate\Support\Facades\DB;
 use Illuminate\Support\Facades\Log;
+use Illuminate\Support\Facades\URL;
 
 class TransactionController extends Controller
 {
     protected $paymentService;
 
-    public function __construct(PaymentService $paymentService)
+    /**
+     * PaymentService criado só nas ações que falam com os gateways, para que
+     * a compra assíncrona e a consulta de status não carreguem os gateways
+     */
+    protected function paymentService(): PaymentService
     {
-        $this->paymentService = $paymentService;
+        return $this->paymentService ??= app(PaymentService::class);
     }
 
     public function index()
@@ -36,42 +44,10 @@ public function purchase(Request $request)
     {
         $startTime = microtime(true);
 
-        $validatedData = $request->validate([
-            'products' => 'required|array|min:1',
-            'products.*.id' => 'required|exists:products,id',
-            'products.*.quantity' => 'required|integer|min:1|max:100',
-            'client_name' => 'required|string|max:255',
-            'client_email' => 'required|email:rfc,dns|max:255',
-            'card_number' => [
-                'required',
-                'string',
-                'size:16',
-                'regex:/^[0-9]+$/'
-            ],
-            'card_cvv' => 'required|string|size:3|regex:/^[0-9]+$/',
-        ]);
-
-        // Calcular o total
-        $total = 0;
-        $products = [];
-
-        foreach ($validatedData['products'] as $item) {
-            $product = Product::findOrFail($item['id']);
-            $total += $product->amount * $item['quantity'];
-            $products[] = [
-                'id' => $product->id,
-                'quantity' => $item['quantity'],
-            ];
-        }
-
-        // Verificar ou criar cliente
-        $client = Client::firstOrCreate(
-            ['email' => $validatedData['client_email']],
-            ['name' => $validatedData['client_name']]
-        );
+        [$validatedData, $client, $products, $total] = $this->preparePurchase($request);
 
         // Processar pagamento
-        $paymentResponse = $this->paymentService->processPayment([
+        $paymentResponse = $this->paymentService()->processPayment([
             'amount' => $total,
             'name' => $client->name,
             'email' => $client->email,
@@ -132,6 +108,90 @@ public function purchase(Request $request)
         ], 201);
     }
 
+    /**
+     * Compra assíncrona: registra a transação como PENDING, enfileira o
+     * pagamento e responde 202 com a URL (assinada) para acompanhar o status
+     */
+    public function purchaseAsync(Request $request)
+    {
+        [$validatedData, $client, $products, $total] = $this->preparePurchase($request);
+
+        $transaction = DB::transaction(function () use ($client, $products, $total, $validatedData) {
+            $transaction = Transaction::create([
+                'client_id' => $client->id,
+                'status' => 'PENDING',
+                'amount' => $total,
+                'card_last_numbers' => substr($validatedData['card_number'], -4),
+            ]);
+
+            foreach ($products as $product) {
+                $transaction->products()->attach($product['id'], [
+                    'quantity' => $product['quantity']
+                ]);
+            }
+
+            return $transaction;
+        });
+
+        // Os dados do cartão não entram no payload do job (tabelas jobs e failed_jobs)
+        app(PendingPaymentStore::class)->put($transaction->id, [
+            'amount' => $total,
+            'name' => $client->name,
+            'email' => $client->email,
+            'card_number' => $validatedData['card_number'],
+            'cvv' => $validatedData['card_cvv'],
+        ]);
+
+        ProcessPurchasePayment::dispatch($transaction->id);
+
+        $statusUrl = URL::temporarySignedRoute(
+            'purchase.status',
+            now()->addSeconds((int) config('services.async_purchase.status_url_ttl')),
+            ['transaction' => $transaction->id]
+        );
+
+        return response()->json([
+            'message' => 'Compra recebida, pagamento em processamento',
+            'transaction_id' => $transaction->id,
+            'status' => $transaction->status,
+            'status_url' => $statusUrl,
+        ], 202)->header('Location', $statusUrl);
+    }
+
+    /**
+     * Status de uma compra assíncrona (rota assinada, sem autenticação)
+     *
+     * Consulta só a linha da transação, para poder ser chamado com frequência.
+     */
+    public function purchaseStatus($transaction)
+    {
+        $transaction = Transaction::select(['id', 'external_id', 'status', 'failure_reason', 'reconciliation_required', 'amount', 'updated_at'])
+            ->findOrFail($transaction);
+
+        $data = [
+            'transaction_id' => $transaction->id,
+            'status' => $transaction->status,
+            'external_id' => $transaction->external_id,
+            'amount' => $transaction->amount,
+            'updated_at' => $transaction->updated_at,
+        ];
+
+        if ($transaction->status === 'FAILED') {
+            $data['errors'] = [$transaction->failure_reason];
+        }
+
+        // Desfecho no gateway desconhecido: continua PENDING até a conciliação, sem novo polling imediato
+        if ($transaction->reconciliation_required) {
+            $data['message'] = $transaction->failure_reason;
+
+            return response()->json($data);
+        }
+
+        $response = response()->json($data);
+
+        return $transaction->status === 'PENDING' ? $response->header('Retry-After', 1) : $response;
+    }
+
     public function refund(Transaction $transaction)
     {
         $startTime = microtime(true);
@@ -144,8 +204,16 @@ public function refund(Transaction $transaction)
             ], 422);
         }
 
+        // Compras assíncronas PENDING ou FAILED não têm gateway nem ID externo para estornar
+        if ($transaction->status !== 'COMPLETED') {
+            return response()->json([
+                'message' => 'Apenas transações concluídas podem ser reembolsadas',
+                'status' => $transaction->status,
+            ], 422);
+        }
+
         try {
-            $refundResponse = $this->paymentService->refundPayment($transaction);
+            $refundResponse = $this->paymentService()->refundPayment($transaction);
 
             // Atualizar status da transação
             $transaction = Transaction::findOrFail($transaction->id);
@@ -178,4 +246,48 @@ public function refund(Transaction $transaction)
             ], 422);
         }
     }
+
+    /**
+     * Valida a compra, calcula o total e localiza ou cria o cliente
+     *
+     * @return array [$validatedData, $client, $products, $total]
+     */
+    private function preparePurchase(Request $request): array
+    {
+        $validatedData = $request->validate([
+            'products' => 'required|array|min:1',
+            'products.*.id' => 'required|exists:products,id',
+            'products.*.quantity' => 'required|integer|min:1|max:100',
+            'client_name' => 'required|string|max:255',
+            'client_email' => 'required|email:rfc,dns|max:255',
+            'card_number' => [
+                'required',
+                'string',
+                'size:16',
+                'regex:/^[0-9]+$/'
+            ],
+            'card_cvv' => 'required|string|size:3|regex:/^[0-9]+$/',
+        ]);
+
+        // Calcular o total
+        $total = 0;
+        $products = [];
+
+        foreach ($validatedData['products'] as $item) {
+            $product = Product::findOrFail($item['id']);
+            $total += $product->amount * $item['quantity'];
+            $products[] = [
+                'id' => $product->id,
+                'quantity' => $item['quantity'],
+            ];
+        }
+
+        // Verificar ou criar cliente
+        $client = Client::firstOrCreate(
+            ['email' => $validatedData['client_email']],
+            ['name' => $validatedData['client_name']]
+        );
+
+        return [$validatedData, $client, $products, $total];
+    }
 }
@@ -0,0 +1,146 @@
+<?php
+
+namespace App\Jobs;
+
+use App\Models\Transaction;
+use App\Services\Payment\PaymentService;
+use App\Services\Payment\PendingPaymentStore;
+use Illuminate\Bus\Queueable;
+use Illuminate\Contracts\Queue\ShouldQueue;
+use Illuminate\Foundation\Bus\Dispatchable;
+use Illuminate\Queue\InteractsWithQueue;
+use Illuminate\Support\Facades\Log;
+
+/**
+ * Processa o pagamento de uma compra assíncrona (transação PENDING).
+ *
+ * O payload leva só o ID da transação; os dados do cartão ficam no
+ * PendingPaymentStore e são removidos quando o job os lê.
+ */
+class ProcessPurchasePayment implements ShouldQueue
+{
+    use Dispatchable, InteractsWithQueue, Queueable;
+
+    /**
+     * Uma única tentativa: repetir um pagamento pode cobrar o cliente duas vezes
+     */
+    public $tries = 1;
+
+    /**
+     * Maior que a cadeia de gateways no pior caso (services.async_purchase.job_timeout)
+     */
+    public $timeout;
+
+    protected $transactionId;
+
+    public function __construct(int $transactionId)
+    {
+        $this->transactionId = $transactionId;
+        $this->timeout = (int) config('services.async_purchase.job_timeout');
+        $this->onQueue(config('services.async_purchase.queue'));
+    }
+
+    public function handle(PaymentService $paymentService, PendingPaymentStore $paymentStore): void
+    {
+        $transaction = Transaction::find($this->transactionId);
+
+        if (!$transaction || $transaction->status !== 'PENDING') {
+            $paymentStore->forget($this->transactionId);
+            return;
+        }
+
+        $paymentData = $paymentStore->pull($this->transactionId);
+
+        if ($paymentData === null) {
+            // Nada foi enviado aos gateways: os dados expiraram enquanto o job esperava na fila
+            $transaction->update([
+                'status' => 'FAILED',
+                'failure_reason' => 'Dados de pagamento expirados antes do processamento',
+            ]);
+
+            return;
+        }
+
+        try {
+            $paymentResponse = $paymentService->processPayment($paymentData);
+        } finally {
+            // Sem fim de requisição no worker: estorna aqui os perdedores do envio paralelo
+            $paymentService->settleHedgeAttempts();
+        }
+
+        // Tempo desde o recebimento da compra, incluindo a espera na fila
+        $processingTime = round(max(0, microtime(true) - $transaction->created_at->getPreciseTimestamp(6) / 1e6) * 1000, 2);
+
+        if (!$paymentResponse['success']) {
+            $transaction->update([
+                'status' => 'FAILED',
+                'failure_reason' => mb_substr(implode('; ', $paymentResponse['errors']), 0, 1000),
+            ]);
+
+            Log::channel('transactions')->warning('Payment processing failed', [
+                'transaction_id' => $transaction->id,
+                'client_id' => $transaction->client_id,
+                'amount' => $transaction->amount,
+                'errors' => $paymentResponse['errors'],
+                'processing_time_ms' => $paymentResponse['processing_time_ms'] ?? null,
+                'timestamp' => now()->toIso8601String(),
+            ]);
+
+            return;
+        }
+
+        $transaction->update([
+            'gateway_id' => $paymentResponse['gateway_id'],
+            'external_id' => $paymentResponse['external_id'],
+            'status' => 'COMPLETED',
+        ]);
+
+        event('transaction.processed', [
+            $transaction->id,
+            'COMPLETED',
+            $paymentResponse['gateway_id'],
+            $processingTime
+        ]);
+    }
+
+    /**
+     * Falha do job (exceção, timeout ou worker interrompido)
+     *
+     * Se os dados de pagamento ainda estão guardados, nada foi enviado aos
+     * gateways e a compra falha. Caso contrário um gateway pode ter cobrado:
+     * a transação continua PENDING e é marcada para conciliação.
+     */
+    public function failed(?\Throwable $exception): void
+    {
+        $paymentStore = app(PendingPaymentStore::class);
+        $reason = $exception ? $exception->getMessage() : 'motivo desconhecido';
+
+        if ($paymentStore->has($this->transactionId)) {
+            $paymentStore->forget($this->transactionId);
+
+            Transaction::where('id', $this->transactionId)
+                ->where('status', 'PENDING')
+                ->update([
+                    'status' => 'FAILED',
+                    'failure_reason' => 'Erro interno ao processar o pagamento',
+                ]);
+
+            Log::error("Falha no job de pagamento da transação {$this->transactionId}: {$reason}");
+
+            return;
+        }
+
+        Transaction::where('id', $this->transactionId)
+            ->where('status', 'PENDING')
+            ->update([
+                'reconciliation_required' => true,
+                'failure_reason' => 'Processamento interrompido após o envio ao gateway; aguardando conciliação',
+            ]);
+
+        Log::channel('transactions')->critical('Payment requires reconciliation', [
+            'transaction_id' => $this->transactionId,
+            'reason' => $reason,
+            'timestamp' => now()->toIso8601String(),
+        ]);
+    }
+}
@@ -0,0 +1,71 @@
+<?php
+
+namespace App\Logging;
+
+use Monolog\Handler\RotatingFileHandler;
+
+/**
+ * Arquivo diário que grava um lote de registros com uma única escrita por dia.
+ *
+ * O RotatingFileHandler padrão faz uma escrita (e um lock) por registro mesmo
+ * quando recebe um lote do BufferHandler. Um lote que atravessa a meia-noite
+ * é dividido por data: cada registro vai para o arquivo do dia em que ocorreu.
+ */
+class BatchRotatingFileHandler extends RotatingFileHandler
+{
+    public function handleBatch(array $records): void
+    {
+        $days = [];
+
+        foreach ($records as $record) {
+            if (!$this->isHandling($record)) {
+                continue;
+            }
+
+            if (count($this->processors) > 0) {
+                $record = $this->processRecord($record);
+            }
+
+            $date = $record->datetime->format($this->dateFormat);
+            $days[$date]['formatted'] = ($days[$date]['formatted'] ?? '') . $this->getFormatter()->format($record);
+            $days[$date]['last'] = $record;
+        }
+
+        $today = date($this->dateFormat);
+
+        foreach ($days as $date => $day) {
+            if ($date === $today) {
+                // Arquivo atual: a escrita passa pela rotação e limpeza do RotatingFileHandler
+                $this->write($day['last']->with(formatted: $day['formatted']));
+                continue;
+            }
+
+            $path = $this->filenameFor($date);
+
+            if (!is_dir(dirname($path))) {
+                @mkdir(dirname($path), 0777, true);
+            }
+
+            file_put_contents($path, $day['formatted'], FILE_APPEND | LOCK_EX);
+        }
+    }
+
+    /**
+     * Arquivo de uma data, no mesmo formato do getTimedFilename()
+     */
+    private function filenameFor(string $date): string
+    {
+        $fileInfo = pathinfo($this->filename);
+        $filename = str_replace(
+            ['{filename}', '{date}'],
+            [$fileInfo['filename'], $date],
+            ($fileInfo['dirname'] ?? '') . '/' . $this->filenameFormat
+        );
+
+        if (isset($fileInfo['extension'])) {
+            $filename .= '.' . $fileInfo['extension'];
+        }
+
+        return $filename;
+    }
+}
@@ -0,0 +1,70 @@
+<?php
+
+namespace App\Logging;
+
+use Monolog\Formatter\JsonFormatter as MonologJsonFormatter;
+use Monolog\LogRecord;
+
+class CustomJsonFormatter extends MonologJsonFormatter
+{
+    /**
+     * Contexto do processo (ambiente, host, versão), calculado uma vez por worker
+     */
+    private static $processContext = null;
+
+    private $cacheContext;
+
+    /**
+     * @param bool $cacheContext false recalcula o contexto do processo a cada registro (usado no benchmark)
+     */
+    public function __construct(bool $cacheContext = true)
+    {
+        parent::__construct();
+
+        $this->cacheContext = $cacheContext;
+    }
+
+    /**
+     * {@inheritdoc}
+     *
+     * O contexto da requisição e o usuário vêm de `extra`, preenchidos pelo
+     * RequestContextProcessor quando o registro foi criado.
+     */
+    public function format(LogRecord $record): string
+    {
+        $normalized = $this->normalize($record->toArray());
+        $fields = array_flip(RequestContextProcessor::FIELDS);
+        $extra = $normalized['extra'] ?? [];
+        $normalized['extra'] = array_diff_key($extra, $fields);
+
+        $normalized = array_merge(
+            $normalized,
+            $this->processContext(),
+            array_intersect_key($extra, $fields)
+        );
+
+        if ($this->appendNewline) {
+            return $this->toJson($normalized) . "\n";
+        }
+
+        return $this->toJson($normalized);
+    }
+
+    private function processContext(): array
+    {
+        if (!$this->cacheContext) {
+            return $this->buildProcessContext();
+        }
+
+        return self::$processContext ??= $this->buildProcessContext();
+    }
+
+    private function buildProcessContext(): array
+    {
+        return [
+            'environment' => app()->environment(),
+            'host' => gethostname(),
+            'app_version' => config('app.version', '1.0.0'),
+        ];
+    }
+}
@@ -2,63 +2,75 @@
 
 namespace App\Logging;
 
-use Monolog\Formatter\JsonFormatter as MonologJsonFormatter;
-use Monolog\LogRecord;
+use Monolog\Handler\BufferHandler;
+use Monolog\Level;
 
 class JsonFormatter
 {
     /**
-     * Personaliza a instância do logger fornecida.
+     * Buffers de cada logger criado neste container, descarregados ao final da requisição ou do job
      *
-     * @param  \Illuminate\Log\Logger  $logger
-     * @return void
+     * Indexados pelo logger do Monolog: um canal resolvido de novo substitui os
+     * buffers do anterior, que gravam o que restou ao serem destruídos.
+     *
+     * @var \WeakMap<\Monolog\Logger, BufferHandler[]>
      */
-    public function __invoke($logger)
+    private $buffers;
+
+    public function __construct()
     {
-        foreach ($logger->getHandlers() as $handler) {
-            $handler->setFormatter(new CustomJsonFormatter());
-        }
+        $this->buffers = new \WeakMap();
     }
-}
 
-class CustomJsonFormatter extends MonologJsonFormatter
-{
     /**
-     * {@inheritdoc}
+     * Personaliza a instância do logger fornecida.
+     *
+     * Cada handler passa a usar o CustomJsonFormatter e fica atrás de um
+     * BufferHandler, que grava os registros em lote ao final da requisição ou
+     * ao atingir `logging.buffer_size` registros. O flush ao final da
+     * requisição é agendado uma única vez pelo ObservabilityServiceProvider.
+     * O contexto da requisição e o usuário são capturados pelo
+     * RequestContextProcessor ao criar o registro, antes do buffer.
+     *
+     * @param  \Illuminate\Log\Logger  $logger
+     * @return void
      */
-    public function format(LogRecord $record): string
+    public function __invoke($logger)
     {
-        $normalized = $this->normalize($record->toArray());
+        $bufferSize = (int) config('logging.buffer_size', 100);
+        $handlers = [];
+        $buffers = [];
 
-        // Adicionar informações contextuais padrão
-        $normalized['environment'] = app()->environment();
-        $normalized['host'] = gethostname();
-        $normalized['app_version'] = config('app.version', '1.0.0');
+        foreach ($logger->getHandlers() as $handler) {
+            $handler->setFormatter(new CustomJsonFormatter());
 
-        // Adicionar ID da requisição para correlacionar logs
-        $normalized['request_id'] = request()->header('X-Request-ID') ??
-                                   (request()->header('X-Correlation-ID') ?? uniqid());
+            if ($bufferSize > 0) {
+                $handler = new BufferHandler($handler, $bufferSize, Level::Debug, true, true);
+                $buffers[] = $handler;
+            }
 
-        // Adicionar contexto de usuário autenticado
-        if (auth()->check()) {
-            $normalized['user'] = [
-                'id' => auth()->id(),
-                'email' => auth()->user()->email,
-            ];
+            $handlers[] = $handler;
         }
 
-        // Adicionar contexto de IP e User-Agent
-        if (request()->ip()) {
-            $normalized['client'] = [
-                'ip' => request()->ip(),
-                'user_agent' => request()->userAgent(),
-            ];
-        }
+        $logger->setHandlers($handlers);
+        $logger->getLogger()->pushProcessor(new RequestContextProcessor());
 
-        if ($this->appendNewline) {
-            return $this->toJson($normalized) . "\n";
+        if (!empty($buffers)) {
+            $this->buffers[$logger->getLogger()] = $buffers;
         }
+    }
 
-        return $this->toJson($normalized);
+    /**
+     * Grava os registros pendentes de todos os canais com buffer
+     *
+     * @return void
+     */
+    public function flushBuffers(): void
+    {
+        foreach ($this->buffers as $buffers) {
+            foreach ($buffers as $buffer) {
+                $buffer->flush();
+            }
+        }
     }
 }
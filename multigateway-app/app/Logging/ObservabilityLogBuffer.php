@@ -0,0 +1,324 @@
+<?php
+
+namespace App\Logging;
+
+use App\Models\Gateway;
+use App\Models\Product;
+use App\Models\Transaction;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Log;
+use Monolog\JsonSerializableDateTimeImmutable;
+use Monolog\Level;
+
+/**
+ * Buffer dos logs estruturados de transações e gateways.
+ *
+ * Os listeners do ObservabilityServiceProvider só guardam o payload do evento
+ * (com o horário em que ocorreu); o enriquecimento com os dados de gateways,
+ * transações, clientes e produtos e a gravação dos logs acontecem em lote ao
+ * final da requisição, depois de a resposta ser enviada, ou ao final de cada
+ * job nos workers de fila. Os registros saem com o horário, a requisição e o
+ * usuário do evento, não os do flush. Os flushes são agendados pelo
+ * ObservabilityServiceProvider.
+ */
+class ObservabilityLogBuffer
+{
+    /**
+     * Eventos acumulados antes de um flush antecipado (processos longos sem fim de requisição)
+     */
+    private const MAX_ENTRIES = 200;
+
+    /**
+     * Metadados de gateways e produtos já carregados neste processo
+     */
+    private static $gateways = [];
+    private static $products = [];
+
+    private $entries = [];
+
+    public function gatewayRequest($gatewayId, string $operation, array $data): void
+    {
+        $this->push('gateway_request', [
+            'gateway_id' => $gatewayId,
+            'operation' => $operation,
+            'request_data' => array_merge($data, [
+                // Remover dados sensíveis antes de guardar o payload
+                'card_number' => isset($data['card_number']) ? '****' . substr($data['card_number'], -4) : null,
+                'cvv' => isset($data['cvv']) ? '***' : null,
+            ]),
+        ]);
+    }
+
+    public function gatewayResponse($gatewayId, string $operation, string $status, $response, $processingTimeMs): void
+    {
+        $this->push('gateway_response', [
+            'gateway_id' => $gatewayId,
+            'operation' => $operation,
+            'status' => $status,
+            'response' => $response,
+            'processing_time_ms' => $processingTimeMs,
+        ]);
+    }
+
+    public function transactionProcessed($transactionId, $processingTimeMs): void
+    {
+        $this->push('transaction_processed', [
+            'transaction_id' => $transactionId,
+            'processing_time_ms' => $processingTimeMs,
+        ]);
+    }
+
+    public function transactionRefunded($transactionId, $processingTimeMs): void
+    {
+        $this->push('transaction_refunded', [
+            'transaction_id' => $transactionId,
+            'processing_time_ms' => $processingTimeMs,
+        ]);
+    }
+
+    /**
+     * Enriquece e grava os eventos acumulados
+     *
+     * @return void
+     */
+    public function flush(): void
+    {
+        if (empty($this->entries)) {
+            return;
+        }
+
+        $entries = $this->entries;
+        $this->entries = [];
+
+        try {
+            $this->write($this->enrich($entries));
+        } catch (\Exception $e) {
+            // Logs de observabilidade não devem derrubar o fim da requisição ou o job
+            Log::warning("Falha ao gravar " . count($entries) . " logs de observabilidade: " . $e->getMessage());
+        }
+    }
+
+    /**
+     * Descarta os metadados de um gateway alterado
+     */
+    public static function forgetGateway($gatewayId): void
+    {
+        unset(self::$gateways[$gatewayId]);
+    }
+
+    /**
+     * Descarta os metadados de um produto alterado
+     */
+    public static function forgetProduct($productId): void
+    {
+        unset(self::$products[$productId]);
+    }
+
+    private function push(string $type, array $payload): void
+    {
+        $payload['type'] = $type;
+        $payload['time'] = microtime(true);
+        $payload['log_context'] = RequestContextProcessor::capture();
+        $payload['timestamp'] = now()->toIso8601String();
+        $this->entries[] = $payload;
+
+        if (count($this->entries) >= self::MAX_ENTRIES) {
+            $this->flush();
+        }
+    }
+
+    /**
+     * Monta os registros de log de um lote, com uma consulta por tipo de dado
+     *
+     * @param array $entries
+     * @return array Registros agrupados por canal: [canal => [[mensagem, contexto, horário, contexto da requisição], ...]]
+     */
+    private function enrich(array $entries): array
+    {
+        $transactionIds = [];
+        foreach ($entries as $entry) {
+            if (isset($entry['transaction_id'])) {
+                $transactionIds[] = $entry['transaction_id'];
+            }
+        }
+
+        $transactions = collect();
+        $items = collect();
+
+        if (!empty($transactionIds)) {
+            $transactions = Transaction::with('client')->whereIn('id', array_unique($transactionIds))->get()->keyBy('id');
+            $items = DB::table('transaction_products')
+                ->whereIn('transaction_id', $transactions->keys())
+                ->get(['transaction_id', 'product_id', 'quantity'])
+                ->groupBy('transaction_id');
+        }
+
+        $gatewayIds = array_merge(
+            array_column($entries, 'gateway_id'),
+            $transactions->pluck('gateway_id')->all()
+        );
+        $this->loadGateways($gatewayIds);
+        $this->loadProducts($items->flatten()->pluck('product_id')->all());
+
+        $records = [];
+
+        foreach ($entries as $entry) {
+            switch ($entry['type']) {
+                case 'gateway_request':
+                    $records['gateways'][] = ['Gateway request', [
+                        'gateway' => $this->gatewayContext($entry['gateway_id']),
+                        'operation' => $entry['operation'],
+                        'request_data' => $entry['request_data'],
+                        'timestamp' => $entry['timestamp'],
+                    ], $entry['time'], $entry['log_context']];
+                    break;
+
+                case 'gateway_response':
+                    $records['gateways'][] = ['Gateway response', [
+                        'gateway' => $this->gatewayContext($entry['gateway_id']),
+                        'operation' => $entry['operation'],
+                        'status' => $entry['status'],
+                        'response' => $entry['response'],
+                        'metadata' => [
+                            'processing_time_ms' => $entry['processing_time_ms'],
+                            'timestamp' => $entry['timestamp'],
+                        ],
+                    ], $entry['time'], $entry['log_context']];
+                    break;
+
+                case 'transaction_processed':
+                case 'transaction_refunded':
+                    $transaction = $transactions->get($entry['transaction_id']);
+
+                    if ($transaction) {
+                        $records['transactions'][] = $this->transactionRecord(
+                            $entry,
+                            $transaction,
+                            $items->get($transaction->id, collect())
+                        );
+                    }
+                    break;
+            }
+        }
+
+        return $records;
+    }
+
+    private function transactionRecord(array $entry, Transaction $transaction, $items): array
+    {
+        $refunded = $entry['type'] === 'transaction_refunded';
+        $gateway = $this->gatewayContext($transaction->gateway_id);
+
+        $context = [
+            'transaction_id' => $transaction->id,
+            'external_id' => $transaction->external_id,
+        ];
+
+        if ($refunded) {
+            $context['original_status'] = 'COMPLETED';
+            $context['new_status'] = 'REFUNDED';
+        } else {
+            $context['status'] = $transaction->status;
+        }
+
+        $context['amount'] = $transaction->amount;
+        $context['amount_formatted'] = 'R$ ' . number_format($transaction->amount / 100, 2, ',', '.');
+        $context['gateway'] = $refunded ? ['id' => $gateway['id'], 'name' => $gateway['name']] : $gateway;
+        $context['client'] = [
+            'id' => $transaction->client_id,
+            'name' => $transaction->client ? $transaction->client->name : 'Unknown',
+            'email' => $transaction->client ? $transaction->client->email : 'Unknown',
+        ];
+
+        if (!$refunded) {
+            $context['products'] = $items
+                ->filter(fn ($item) => isset(self::$products[$item->product_id]))
+                ->map(function ($item) {
+                    $product = self::$products[$item->product_id];
+
+                    return [
+                        'id' => $item->product_id,
+                        'name' => $product['name'],
+                        'quantity' => $item->quantity,
+                        'amount' => $product['amount'],
+                        'subtotal' => $product['amount'] * $item->quantity,
+                    ];
+                })
+                ->values()
+                ->all();
+        }
+
+        $context['metadata'] = [
+            'processing_time_ms' => $entry['processing_time_ms'],
+            'timestamp' => $entry['timestamp'],
+            'environment' => app()->environment(),
+        ];
+
+        return [$refunded ? 'Transaction refunded' : 'Transaction processed', $context, $entry['time'], $entry['log_context']];
+    }
+
+    private function gatewayContext($gatewayId): array
+    {
+        $gateway = self::$gateways[$gatewayId] ?? null;
+
+        return [
+            'id' => $gatewayId,
+            'name' => $gateway['name'] ?? 'Unknown',
+            'type' => $gateway['type'] ?? 'Unknown',
+        ];
+    }
+
+    private function loadGateways(array $ids): void
+    {
+        $missing = array_diff(array_unique(array_filter($ids)), array_keys(self::$gateways));
+
+        if (empty($missing)) {
+            return;
+        }
+
+        foreach (Gateway::whereIn('id', $missing)->get(['id', 'name', 'type']) as $gateway) {
+            self::$gateways[$gateway->id] = ['name' => $gateway->name, 'type' => $gateway->type];
+        }
+    }
+
+    private function loadProducts(array $ids): void
+    {
+        $missing = array_diff(array_unique($ids), array_keys(self::$products));
+
+        if (empty($missing)) {
+            return;
+        }
+
+        foreach (Product::whereIn('id', $missing)->get(['id', 'name', 'amount']) as $product) {
+            self::$products[$product->id] = ['name' => $product->name, 'amount' => $product->amount];
+        }
+    }
+
+    private function write(array $records): void
+    {
+        foreach ($records as $channel => $channelRecords) {
+            $logger = Log::channel($channel)->getLogger();
+
+            foreach ($channelRecords as [$message, $context, $time, $logContext]) {
+                // Requisição e usuário do momento do evento, não do flush
+                RequestContextProcessor::using($logContext, fn () => $logger->addRecord(
+                    Level::Info,
+                    $message,
+                    $context,
+                    $this->datetime($time)
+                ));
+            }
+        }
+    }
+
+    /**
+     * Horário do evento como datetime do registro, com microssegundos
+     */
+    private function datetime(float $time): JsonSerializableDateTimeImmutable
+    {
+        $datetime = new JsonSerializableDateTimeImmutable(true);
+        $offset = (int) round(($time - (float) $datetime->format('U.u')) * 1000000);
+
+        return $datetime->modify("{$offset} microseconds");
+    }
+}
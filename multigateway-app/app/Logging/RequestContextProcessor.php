@@ -0,0 +1,145 @@
+<?php
+
+namespace App\Logging;
+
+use Monolog\LogRecord;
+use Monolog\Processor\ProcessorInterface;
+
+/**
+ * Guarda em `extra` o contexto da requisição (ID, IP, User-Agent) e o usuário
+ * autenticado no momento em que o registro é criado.
+ *
+ * Os canais gravam em lote (BufferHandler): lido na formatação, o contexto
+ * seria o do fim da requisição, e registros anteriores à autenticação (ex.:
+ * "API Request") sairiam com o usuário autenticado depois.
+ */
+class RequestContextProcessor implements ProcessorInterface
+{
+    /**
+     * Campos que o CustomJsonFormatter leva de `extra` para a raiz do JSON
+     */
+    public const FIELDS = ['request_id', 'client', 'user'];
+
+    /**
+     * Campos fixos da requisição atual (ID, IP, User-Agent) e a requisição a que correspondem
+     */
+    private static $requestContext = null;
+    private static $contextRequest = null;
+
+    /**
+     * Contexto capturado antes, usado no lugar do atual (registros gravados depois do evento)
+     */
+    private static $pinnedContext = null;
+
+    private $cacheContext;
+
+    /**
+     * @param bool $cacheContext false recalcula o contexto da requisição a cada registro (usado no benchmark)
+     */
+    public function __construct(bool $cacheContext = true)
+    {
+        $this->cacheContext = $cacheContext;
+    }
+
+    public function __invoke(LogRecord $record): LogRecord
+    {
+        $record->extra = array_merge($record->extra, self::$pinnedContext ?? self::capture($this->cacheContext));
+
+        return $record;
+    }
+
+    /**
+     * Contexto da requisição e usuário autenticado neste momento
+     *
+     * @param bool $cacheContext false recalcula os campos fixos da requisição
+     * @return array
+     */
+    public static function capture(bool $cacheContext = true): array
+    {
+        return array_merge(
+            $cacheContext ? self::requestContext() : self::buildRequestContext(),
+            self::userContext()
+        );
+    }
+
+    /**
+     * Grava registros com um contexto capturado antes (ex.: no horário do evento)
+     *
+     * @param array $context Retorno de capture()
+     * @param callable $callback
+     * @return mixed
+     */
+    public static function using(array $context, callable $callback)
+    {
+        $previous = self::$pinnedContext;
+        self::$pinnedContext = $context;
+
+        try {
+            return $callback();
+        } finally {
+            self::$pinnedContext = $previous;
+        }
+    }
+
+    /**
+     * Descarta o contexto da requisição (ex.: entre jobs de um worker de fila)
+     *
+     * @return void
+     */
+    public static function resetRequestContext(): void
+    {
+        self::$requestContext = null;
+        self::$contextRequest = null;
+    }
+
+    /**
+     * Campos fixos da requisição, recalculados só quando a requisição muda
+     */
+    private static function requestContext(): array
+    {
+        $request = app()->bound('request') ? app('request') : null;
+
+        if (self::$requestContext === null || self::$contextRequest?->get() !== $request) {
+            self::$requestContext = self::buildRequestContext();
+            self::$contextRequest = $request ? \WeakReference::create($request) : null;
+        }
+
+        return self::$requestContext;
+    }
+
+    private static function buildRequestContext(): array
+    {
+        $context = [];
+
+        // Adicionar ID da requisição para correlacionar logs
+        $context['request_id'] = request()->header('X-Request-ID') ??
+                                 (request()->header('X-Correlation-ID') ?? uniqid());
+
+        // Adicionar contexto de IP e User-Agent
+        if (request()->ip()) {
+            $context['client'] = [
+                'ip' => request()->ip(),
+                'user_agent' => request()->userAgent(),
+            ];
+        }
+
+        return $context;
+    }
+
+    /**
+     * Usuário autenticado, lido a cada registro (o guard já guarda o usuário resolvido)
+     */
+    private static function userContext(): array
+    {
+        if (!auth()->check()) {
+            return [];
+        }
+
+        return [
+            'user' => [
+                'id' => auth()->id(),
+                'email' => auth()->user()->email,
+            ],
+        ];
+    }
+}
@@ -10,7 +10,7 @@ class Transaction extends Model
     use SoftDeletes;
     protected $fillable = [
         'client_id', 'gateway_id', 'external_id',
-        'status', 'amount', 'card_last_numbers'
+        'status', 'failure_reason', 'reconciliation_required', 'amount', 'card_last_numbers'
     ];
 
     public function client() {
@@ -5,8 +5,15 @@
 use Illuminate\Support\ServiceProvider;
 use Illuminate\Support\Facades\Event;
 use Illuminate\Support\Facades\Log;
-use App\Models\Transaction;
+use Illuminate\Support\Facades\Queue;
+use App\Logging\JsonFormatter;
+use App\Logging\ObservabilityLogBuffer;
+use App\Logging\RequestContextProcessor;
 use App\Models\Gateway;
+use App\Models\Product;
+use App\Services\Payment\GatewayCircuitBreaker;
+use App\Services\Payment\GatewayLatencyTracker;
+use App\Services\Payment\GatewayRoutingTable;
 
 class ObservabilityServiceProvider extends ServiceProvider
 {
@@ -15,7 +22,10 @@ class ObservabilityServiceProvider extends ServiceProvider
      */
     public function register(): void
     {
-        //
+        $this->app->singleton(ObservabilityLogBuffer::class);
+
+        // Tap dos canais estruturados: guarda os buffers deste container
+        $this->app->singleton(JsonFormatter::class);
     }
 
     /**
@@ -29,87 +39,34 @@ public function boot(): void
         // Registrar canal de log para eventos de gateway
         $this->registerGatewayLogging();
 
+        // Gravar os logs pendentes ao final da requisição e de cada job da fila
+        $this->registerLogFlushing();
+
+        // Registrar as latências usadas no orçamento do envio paralelo
+        $this->registerGatewayLatencyTracking();
+
+        // Registrar o circuit breaker dos gateways
+        $this->registerGatewayCircuitBreaker();
+
         // Registrar handlers para eventos de modelo
         $this->registerModelEventHandlers();
     }
 
     /**
      * Configurar o logging de transações
+     *
+     * Os listeners só guardam o payload; o enriquecimento e a gravação ficam
+     * para o ObservabilityLogBuffer, fora do tempo de resposta.
      */
     private function registerTransactionLogging(): void
     {
         Event::listen('transaction.processed', function ($transactionId, $status, $gatewayId, $processingTimeMs) {
-            $transaction = Transaction::with(['client', 'gateway', 'products'])->find($transactionId);
-
-            if (!$transaction) {
-                return;
-            }
-
-            // Log estruturado da transação
-            Log::channel('transactions')->info('Transaction processed', [
-                'transaction_id' => $transaction->id,
-                'external_id' => $transaction->external_id,
-                'status' => $transaction->status,
-                'amount' => $transaction->amount,
-                'amount_formatted' => 'R$ ' . number_format($transaction->amount / 100, 2, ',', '.'),
-                'gateway' => [
-                    'id' => $transaction->gateway_id,
-                    'name' => $transaction->gateway ? $transaction->gateway->name : 'Unknown',
-                    'type' => $transaction->gateway ? $transaction->gateway->type : 'Unknown',
-                ],
-                'client' => [
-                    'id' => $transaction->client_id,
-                    'name' => $transaction->client ? $transaction->client->name : 'Unknown',
-                    'email' => $transaction->client ? $transaction->client->email : 'Unknown',
-                ],
-                'products' => $transaction->products->map(function ($product) {
-                    return [
-                        'id' => $product->id,
-                        'name' => $product->name,
-                        'quantity' => $product->pivot->quantity,
-                        'amount' => $product->amount,
-                        'subtotal' => $product->amount * $product->pivot->quantity,
-                    ];
-                }),
-                'metadata' => [
-                    'processing_time_ms' => $processingTimeMs,
-                    'timestamp' => now()->toIso8601String(),
-                    'environment' => app()->environment(),
-                ],
-            ]);
+            app(ObservabilityLogBuffer::class)->transactionProcessed($transactionId, $processingTimeMs);
         });
 
         // Evento para reembolsos
         Event::listen('transaction.refunded', function ($transactionId, $processingTimeMs) {
-            $transaction = Transaction::with(['client', 'gateway'])->find($transactionId);
-
-            if (!$transaction) {
-                return;
-            }
-
-            // Log estruturado do reembolso
-            Log::channel('transactions')->info('Transaction refunded', [
-                'transaction_id' => $transaction->id,
-                'external_id' => $transaction->external_id,
-                'original_status' => 'COMPLETED',
-                'new_status' => 'REFUNDED',
-                'amount' => $transaction->amount,
-                'amount_formatted' => 'R$ ' . number_format($transaction->amount / 100, 2, ',', '.'),
-                'gateway' => [
-                    'id' => $transaction->gateway_id,
-                    'name' => $transaction->gateway ? $transaction->gateway->name : 'Unknown',
-                ],
-                'client' => [
-                    'id' => $transaction->client_id,
-                    'name' => $transaction->client ? $transaction->client->name : 'Unknown',
-                    'email' => $transaction->client ? $transaction->client->email : 'Unknown',
-                ],
-                'metadata' => [
-                    'processing_time_ms' => $processingTimeMs,
-                    'timestamp' => now()->toIso8601String(),
-                    'environment' => app()->environment(),
-                ],
-            ]);
+            app(ObservabilityLogBuffer::class)->transactionRefunded($transactionId, $processingTimeMs);
         });
     }
 
@@ -119,43 +76,82 @@ private function registerTransactionLogging(): void
     private function registerGatewayLogging(): void
     {
         Event::listen('gateway.request', function ($gatewayId, $operation, $data) {
-            $gateway = Gateway::find($gatewayId);
-
-            // Log estruturado da requisição para o gateway
-            Log::channel('gateways')->info('Gateway request', [
-                'gateway' => [
-                    'id' => $gatewayId,
-                    'name' => $gateway ? $gateway->name : 'Unknown',
-                    'type' => $gateway ? $gateway->type : 'Unknown',
-                ],
-                'operation' => $operation,
-                'request_data' => array_merge($data, [
-                    // Remover dados sensíveis
-                    'card_number' => isset($data['card_number']) ? '****' . substr($data['card_number'], -4) : null,
-                    'cvv' => isset($data['cvv']) ? '***' : null,
-                ]),
-                'timestamp' => now()->toIso8601String(),
-            ]);
+            app(ObservabilityLogBuffer::class)->gatewayRequest($gatewayId, $operation, $data);
         });
 
         Event::listen('gateway.response', function ($gatewayId, $operation, $status, $response, $processingTimeMs) {
-            $gateway = Gateway::find($gatewayId);
-
-            // Log estruturado da resposta do gateway
-            Log::channel('gateways')->info('Gateway response', [
-                'gateway' => [
-                    'id' => $gatewayId,
-                    'name' => $gateway ? $gateway->name : 'Unknown',
-                    'type' => $gateway ? $gateway->type : 'Unknown',
-                ],
-                'operation' => $operation,
-                'status' => $status,
-                'response' => $response,
-                'metadata' => [
-                    'processing_time_ms' => $processingTimeMs,
-                    'timestamp' => now()->toIso8601String(),
-                ],
-            ]);
+            app(ObservabilityLogBuffer::class)->gatewayResponse($gatewayId, $operation, $status, $response, $processingTimeMs);
+        });
+    }
+
+    /**
+     * Agendar a gravação dos logs pendentes, uma única vez por processo
+     *
+     * Ao final da requisição o flush é reagendado para depois dos callbacks
+     * registrados durante ela (ex.: estornos do envio paralelo, que também
+     * geram logs). Nos workers de fila não há fim de requisição: cada job tem
+     * o próprio contexto de log e grava os logs pendentes ao terminar.
+     */
+    private function registerLogFlushing(): void
+    {
+        $flush = function () {
+            app(ObservabilityLogBuffer::class)->flush();
+            app(JsonFormatter::class)->flushBuffers();
+        };
+
+        $this->app->terminating(fn () => $this->app->terminating($flush));
+
+        Queue::before(fn () => RequestContextProcessor::resetRequestContext());
+        Queue::after($flush);
+        Queue::failing($flush);
+    }
+
+    /**
+     * Alimentar o GatewayLatencyTracker com os pagamentos respondidos
+     */
+    private function registerGatewayLatencyTracking(): void
+    {
+        if (!config('services.payment_hedging.enabled')) {
+            return;
+        }
+
+        Event::listen('gateway.response', function ($gatewayId, $operation, $status, $response, $processingTimeMs) {
+            if ($operation !== 'payment' || $status !== 'success') {
+                return;
+            }
+
+            try {
+                app(GatewayLatencyTracker::class)->record($gatewayId, (float) $processingTimeMs);
+            } catch (\Exception $e) {
+                Log::warning("Falha ao registrar latência do gateway {$gatewayId}: " . $e->getMessage());
+            }
+        });
+    }
+
+    /**
+     * Alimentar o GatewayCircuitBreaker com os desfechos dos pagamentos
+     */
+    private function registerGatewayCircuitBreaker(): void
+    {
+        if (!config('services.gateway_circuit_breaker.enabled')) {
+            return;
+        }
+
+        Event::listen('gateway.response', function ($gatewayId, $operation, $status, $response, $processingTimeMs) {
+            if ($operation !== 'payment') {
+                return;
+            }
+
+            try {
+                app(GatewayCircuitBreaker::class)->record(
+                    $gatewayId,
+                    $status,
+                    is_array($response) ? $response : null,
+                    (float) $processingTimeMs
+                );
+            } catch (\Exception $e) {
+                Log::warning("Falha ao atualizar o circuit breaker do gateway {$gatewayId}: " . $e->getMessage());
+            }
         });
     }
 
@@ -164,8 +160,23 @@ private function registerGatewayLogging(): void
      */
     private function registerModelEventHandlers(): void
     {
+        // Qualquer alteração em um gateway invalida a tabela de roteamento em cache
+        Gateway::created(fn () => app(GatewayRoutingTable::class)->invalidate());
+        Gateway::deleted(function ($gateway) {
+            app(GatewayRoutingTable::class)->invalidate();
+            ObservabilityLogBuffer::forgetGateway($gateway->id);
+        });
+        Gateway::restored(fn () => app(GatewayRoutingTable::class)->invalidate());
+
+        // Produtos alterados saem dos metadados usados nos logs de transação
+        Product::saved(fn ($product) => ObservabilityLogBuffer::forgetProduct($product->id));
+        Product::deleted(fn ($product) => ObservabilityLogBuffer::forgetProduct($product->id));
+
         // Monitorar quando gateways são ativados/desativados
         Gateway::updated(function ($gateway) {
+            app(GatewayRoutingTable::class)->invalidate();
+            ObservabilityLogBuffer::forgetGateway($gateway->id);
+
             if ($gateway->isDirty('is_active')) {
                 $action = $gateway->is_active ? 'activated' : 'deactivated';
 
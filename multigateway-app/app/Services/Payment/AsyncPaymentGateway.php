@@ -0,0 +1,22 @@
+<?php
+
+namespace App\Services\Payment;
+
+use GuzzleHttp\Promise\PromiseInterface;
+use Illuminate\Http\Client\PendingRequest;
+
+/**
+ * Gateway capaz de enviar o pagamento por uma requisição assíncrona do pool
+ * HTTP, usado no envio paralelo (hedged) do PaymentService.
+ */
+interface AsyncPaymentGateway
+{
+    /**
+     * Envia o pagamento pela requisição assíncrona recebida
+     *
+     * @param PendingRequest $request Requisição assíncrona do pool
+     * @param array $data Dados do pagamento
+     * @return PromiseInterface Promessa resolvida com a resposta decodificada do gateway
+     */
+    public function payAsync(PendingRequest $request, array $data): PromiseInterface;
+}
@@ -3,76 +3,122 @@
 namespace App\Services\Payment;
 
 use App\Services\Payment\PaymentGatewayInterface as PaymentPaymentGatewayInterface;
-use Illuminate\Support\Facades\Http;
+use GuzzleHttp\Promise\PromiseInterface;
+use Illuminate\Http\Client\PendingRequest;
 use Illuminate\Support\Facades\Log;
 
-class Gateway1 implements PaymentPaymentGatewayInterface
+class Gateway1 implements PaymentPaymentGatewayInterface, AsyncPaymentGateway
 {
+    use GatewayHttpTimeouts;
+
     private $apiUrl;
     private $email;
     private $token;
     private $bearerToken;
+    private $tokenCache;
 
     public function __construct()
     {
         $this->apiUrl = config('services.gateway1.url');
         $this->email = config('services.gateway1.email');
         $this->token = config('services.gateway1.token');
-        $this->authenticate();
+        // O login só acontece na primeira chamada, e o token é compartilhado entre workers
+        $this->tokenCache = app(GatewayTokenCache::class);
     }
 
-    private function authenticate()
+    private function authenticate(): string
     {
-        $response = Http::post("{$this->apiUrl}/login", [
+        $response = $this->http()->post("{$this->apiUrl}/login", [
             'email' => $this->email,
             'token' => $this->token,
         ]);
 
-        if ($response->successful()) {
-            $this->bearerToken = $response->json()['token'];
-        } else {
-            throw new \Exception('Failed to authenticate with Gateway 1');
+        if ($response->successful() && !empty($response->json()['token'])) {
+            return $response->json()['token'];
+        }
+
+        throw new \Exception('Failed to authenticate with Gateway 1');
+    }
+
+    /**
+     * Token Bearer em cache (ou obtido com um novo login)
+     */
+    private function bearerToken(): string
+    {
+        if (empty($this->bearerToken)) {
+            $this->bearerToken = $this->tokenCache->get('gateway1', fn () => $this->authenticate());
         }
+
+        return $this->bearerToken;
+    }
+
+    /**
+     * Executa uma chamada autenticada, renovando o token e repetindo uma vez se o gateway responder 401
+     *
+     * @param callable $call Recebe o token e retorna a resposta HTTP
+     * @return \Illuminate\Http\Client\Response
+     */
+    private function withToken(callable $call)
+    {
+        $response = $call($this->bearerToken());
+
+        if ($response->status() === 401) {
+            Log::info("Token expirado no Gateway 1, renovando...");
+            $this->tokenCache->invalidate('gateway1', $this->bearerToken);
+            $this->bearerToken = null;
+
+            $response = $call($this->bearerToken());
+        }
+
+        return $response;
     }
 
     public function pay(array $data): array
     {
-        $response = Http::withToken($this->bearerToken)
-            ->post("{$this->apiUrl}/transactions", [
-                'amount' => $data['amount'],
-                'name' => $data['name'],
-                'email' => $data['email'],
-                'cardNumber' => $data['card_number'],
-                'cvv' => $data['cvv'],
-            ]);
+        $response = $this->withToken(fn ($token) => $this->http()->withToken($token)
+            ->post("{$this->apiUrl}/transactions", $this->paymentPayload($data)));
 
         return $response->json();
     }
 
-    public function refund(string $transactionId): array
+    public function payAsync(PendingRequest $request, array $data): PromiseInterface
     {
-        // Autenticar se não tiver token
-        if (empty($this->bearerToken)) {
-            if (!$this->authenticate()) {
-                throw new \Exception("Não foi possível autenticar no Gateway 1");
-            }
-        }
+        $token = $this->bearerToken();
 
-        try {
-            $response = Http::withToken($this->bearerToken)
-                ->post("{$this->apiUrl}/transactions/{$transactionId}/charge_back");
-
-            // Se receber erro de autenticação, tenta renovar o token e repetir
-            if ($response->status() === 401) {
-                Log::info("Token expirado no Gateway 1, renovando...");
-                if (!$this->authenticate()) {
-                    throw new \Exception("Falha ao renovar token no Gateway 1");
+        return $this->http($request)->withToken($token)
+            ->post("{$this->apiUrl}/transactions", $this->paymentPayload($data))
+            ->then(function ($response) use ($token) {
+                // Falhas de conexão chegam como exceção na promessa do Laravel
+                if ($response instanceof \Throwable) {
+                    throw $response;
                 }
 
-                // Tentar novamente com o novo token
-                $response = Http::withToken($this->bearerToken)
-                    ->post("{$this->apiUrl}/transactions/{$transactionId}/charge_back");
-            }
+                // Sem repetição no modo assíncrono: descarta o token para a próxima tentativa
+                if ($response->status() === 401) {
+                    $this->tokenCache->invalidate('gateway1', $token);
+                    $this->bearerToken = null;
+                }
+
+                return $response->json() ?? [];
+            });
+    }
+
+    private function paymentPayload(array $data): array
+    {
+        return [
+            'amount' => $data['amount'],
+            'name' => $data['name'],
+            'email' => $data['email'],
+            'cardNumber' => $data['card_number'],
+            'cvv' => $data['cvv'],
+        ];
+    }
+
+    public function refund(string $transactionId): array
+    {
+        try {
+            $response = $this->withToken(fn ($token) => $this->http()->withToken($token)
+                ->post("{$this->apiUrl}/transactions/{$transactionId}/charge_back"));
 
             return $response->json();
         } catch (\Exception $e) {
@@ -83,8 +129,8 @@ public function refund(string $transactionId): array
 
     public function getTransactions(): array
     {
-        $response = Http::withToken($this->bearerToken)
-            ->get("{$this->apiUrl}/transactions");
+        $response = $this->withToken(fn ($token) => $this->http()->withToken($token)
+            ->get("{$this->apiUrl}/transactions"));
 
         return $response->json();
     }
@@ -3,11 +3,14 @@
 namespace App\Services\Payment;
 
 use App\Services\Payment\PaymentGatewayInterface as PaymentPaymentGatewayInterface;
-use Illuminate\Support\Facades\Http;
+use GuzzleHttp\Promise\PromiseInterface;
+use Illuminate\Http\Client\PendingRequest;
 use Illuminate\Support\Facades\Log;
 
-class Gateway2 implements PaymentPaymentGatewayInterface
+class Gateway2 implements PaymentPaymentGatewayInterface, AsyncPaymentGateway
 {
+    use GatewayHttpTimeouts;
+
     private $apiUrl;
     private $authToken;
     private $authSecret;
@@ -21,24 +24,45 @@ public function __construct()
 
     public function pay(array $data): array
     {
-        $response = Http::withHeaders([
+        $response = $this->http()->withHeaders([
+            'Gateway-Auth-Token' => $this->authToken,
+            'Gateway-Auth-Secret' => $this->authSecret,
+        ])->post("{$this->apiUrl}/transacoes", $this->paymentPayload($data));
+
+        return $response->json();
+    }
+
+    public function payAsync(PendingRequest $request, array $data): PromiseInterface
+    {
+        return $this->http($request)->withHeaders([
             'Gateway-Auth-Token' => $this->authToken,
             'Gateway-Auth-Secret' => $this->authSecret,
-        ])->post("{$this->apiUrl}/transacoes", [
+        ])->post("{$this->apiUrl}/transacoes", $this->paymentPayload($data))
+            ->then(function ($response) {
+                // Falhas de conexão chegam como exceção na promessa do Laravel
+                if ($response instanceof \Throwable) {
+                    throw $response;
+                }
+
+                return $response->json() ?? [];
+            });
+    }
+
+    private function paymentPayload(array $data): array
+    {
+        return [
             'valor' => $data['amount'],
             'nome' => $data['name'],
             'email' => $data['email'],
             'numeroCartao' => $data['card_number'],
             'cvv' => $data['cvv'],
-        ]);
-
-        return $response->json();
+        ];
     }
 
     public function refund(string $transactionId): array
     {
         try {
-            $response = Http::withHeaders([
+            $response = $this->http()->withHeaders([
                 'Gateway-Auth-Token' => $this->authToken,
                 'Gateway-Auth-Secret' => $this->authSecret,
             ])->post("{$this->apiUrl}/transacoes/reembolso", [
@@ -58,7 +82,7 @@ public function refund(string $transactionId): array
 
     public function getTransactions(): array
     {
-        $response = Http::withHeaders([
+        $response = $this->http()->withHeaders([
             'Gateway-Auth-Token' => $this->authToken,
             'Gateway-Auth-Secret' => $this->authSecret,
         ])->get("{$this->apiUrl}/transacoes");
@@ -0,0 +1,242 @@
+<?php
+
+namespace App\Services\Payment;
+
+use Illuminate\Contracts\Cache\Repository;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\Log;
+
+/**
+ * Circuit breaker e pontuação de saúde por gateway, compartilhados entre workers.
+ *
+ * Alimentado pelos eventos gateway.response dos pagamentos. Depois de uma
+ * sequência de falhas (ou de chamadas lentas demais) o circuito abre e o
+ * gateway vai para o fim da ordem de envio; passado o tempo de abertura, o
+ * circuito fica semiaberto e uma única compra por vez testa o gateway na sua
+ * posição de prioridade. Um sucesso fecha o circuito, uma falha o reabre.
+ */
+class GatewayCircuitBreaker
+{
+    public const CLOSED = 'closed';
+    public const OPEN = 'open';
+    public const HALF_OPEN = 'half_open';
+
+    /**
+     * Um circuito aberto há mais de um dia sem nenhum teste volta a fechar
+     */
+    private const OPENED_TTL = 86400;
+
+    private $store;
+    private $failureThreshold;
+    private $openSeconds;
+    private $probeSeconds;
+    private $slowCallMs;
+    private $healthAlpha;
+    private $degradedScore;
+
+    public function __construct(?string $store = null)
+    {
+        $config = config('services.gateway_circuit_breaker');
+
+        $this->store = $store ?? $config['store'];
+        $this->failureThreshold = (int) $config['failure_threshold'];
+        $this->openSeconds = (int) $config['open_seconds'];
+        $this->probeSeconds = (int) $config['probe_seconds'];
+        $this->slowCallMs = (float) $config['slow_call_ms'];
+        $this->healthAlpha = (float) $config['health_alpha'];
+        $this->degradedScore = (float) $config['degraded_score'];
+    }
+
+    /**
+     * Registra o desfecho de uma chamada de pagamento ao gateway
+     *
+     * Recusas do gateway (resposta sem identificador de transação) não
+     * indicam problema no gateway e só entram na latência.
+     *
+     * @param int $gatewayId
+     * @param string $status 'success' ou 'error', como no evento gateway.response
+     * @param array|null $response
+     * @param float $processingTimeMs
+     * @return void
+     */
+    public function record(int $gatewayId, string $status, ?array $response, float $processingTimeMs): void
+    {
+        $charged = isset($response['id']) || isset($response['transactionId']);
+        $failed = $status !== 'success' || $processingTimeMs > $this->slowCallMs;
+
+        $this->updateHealth($gatewayId, $failed ? 0.0 : ($charged ? 1.0 : null), $processingTimeMs);
+
+        if ($failed) {
+            $this->recordFailure($gatewayId);
+        } elseif ($charged) {
+            $this->recordSuccess($gatewayId);
+        }
+    }
+
+    /**
+     * Reordena os gateways para o envio de um pagamento
+     *
+     * Primeiro os saudáveis (e o semiaberto que ganhou a vez de teste), na
+     * ordem de prioridade; depois os com pontuação de saúde baixa; por último
+     * os com circuito aberto, que ainda são tentados se todos os outros falharem.
+     *
+     * @param array $gateways Lista no formato ['id' => ..., 'instance' => ...]
+     * @return array
+     */
+    public function order(array $gateways): array
+    {
+        $states = $this->states(array_column($gateways, 'id'));
+        $groups = [[], [], []];
+
+        foreach ($gateways as $gateway) {
+            $state = $states[$gateway['id']];
+
+            if ($state['state'] === self::OPEN
+                || ($state['state'] === self::HALF_OPEN && !$this->acquireProbe($gateway['id']))) {
+                $groups[2][] = $gateway;
+            } elseif ($state['state'] === self::CLOSED && $state['score'] !== null && $state['score'] < $this->degradedScore) {
+                $groups[1][] = $gateway;
+            } else {
+                $groups[0][] = $gateway;
+            }
+        }
+
+        return array_merge(...$groups);
+    }
+
+    /**
+     * Estado do circuito e pontuação de saúde de cada gateway
+     *
+     * @param array $gatewayIds
+     * @return array Indexado pelo id do gateway
+     */
+    public function states(array $gatewayIds): array
+    {
+        $keys = [];
+        foreach ($gatewayIds as $gatewayId) {
+            $keys[] = $this->key($gatewayId, 'opened_at');
+            $keys[] = $this->key($gatewayId, 'failures');
+            $keys[] = $this->key($gatewayId, 'health');
+        }
+
+        // Uma única ida ao Redis para todos os gateways
+        $values = empty($keys) ? [] : $this->cache()->many($keys);
+        $result = [];
+
+        foreach ($gatewayIds as $gatewayId) {
+            $openedAt = $values[$this->key($gatewayId, 'opened_at')] ?? null;
+            $health = $values[$this->key($gatewayId, 'health')] ?? null;
+
+            $result[$gatewayId] = [
+                'state' => $this->stateFor($openedAt),
+                'consecutive_failures' => (int) ($values[$this->key($gatewayId, 'failures')] ?? 0),
+                'opened_at' => $openedAt !== null ? date(DATE_ATOM, (int) $openedAt) : null,
+                'score' => $health['score'] ?? null,
+                'latency_ms' => $health['latency_ms'] ?? null,
+            ];
+        }
+
+        return $result;
+    }
+
+    private function stateFor($openedAt): string
+    {
+        if ($openedAt === null) {
+            return self::CLOSED;
+        }
+
+        return now()->getTimestamp() - (int) $openedAt < $this->openSeconds ? self::OPEN : self::HALF_OPEN;
+    }
+
+    private function recordFailure(int $gatewayId): void
+    {
+        $cache = $this->cache();
+        $openedAt = $cache->get($this->key($gatewayId, 'opened_at'));
+
+        // Falha no teste do semiaberto: reabre imediatamente
+        if ($openedAt !== null) {
+            if ($this->stateFor($openedAt) === self::HALF_OPEN) {
+                $cache->put($this->key($gatewayId, 'opened_at'), now()->getTimestamp(), self::OPENED_TTL);
+                $cache->forget($this->key($gatewayId, 'probe'));
+
+                Log::warning("Circuito do gateway {$gatewayId} reaberto após falha no teste");
+            }
+
+            return;
+        }
+
+        $failures = $cache->increment($this->key($gatewayId, 'failures'));
+
+        // add: só o primeiro worker a passar do limite abre o circuito
+        if ($failures >= $this->failureThreshold
+            && $cache->add($this->key($gatewayId, 'opened_at'), now()->getTimestamp(), self::OPENED_TTL)) {
+            Log::warning("Circuito do gateway {$gatewayId} aberto após {$failures} falhas consecutivas");
+        }
+    }
+
+    private function recordSuccess(int $gatewayId): void
+    {
+        $cache = $this->cache();
+        $values = $cache->many([$this->key($gatewayId, 'opened_at'), $this->key($gatewayId, 'failures')]);
+
+        if ($values[$this->key($gatewayId, 'opened_at')] !== null) {
+            $cache->forget($this->key($gatewayId, 'opened_at'));
+            $cache->forget($this->key($gatewayId, 'probe'));
+
+            Log::info("Circuito do gateway {$gatewayId} fechado");
+        }
+
+        if ((int) $values[$this->key($gatewayId, 'failures')] > 0) {
+            $cache->forever($this->key($gatewayId, 'failures'), 0);
+        }
+    }
+
+    /**
+     * Atualiza as médias móveis exponenciais de sucesso e latência
+     *
+     * Sem lock, como no GatewayLatencyTracker: uma amostra perdida em gravações
+     * concorrentes não altera a pontuação de forma relevante.
+     */
+    private function updateHealth(int $gatewayId, ?float $outcome, float $processingTimeMs): void
+    {
+        $cache = $this->cache();
+        $key = $this->key($gatewayId, 'health');
+        $health = $cache->get($key, ['score' => null, 'latency_ms' => null]);
+
+        if ($outcome !== null) {
+            $health['score'] = $this->ewma($health['score'], $outcome, 4);
+        }
+        $health['latency_ms'] = $this->ewma($health['latency_ms'], $processingTimeMs, 2);
+
+        $cache->forever($key, $health);
+    }
+
+    private function ewma(?float $current, float $sample, int $precision): float
+    {
+        if ($current === null) {
+            return round($sample, $precision);
+        }
+
+        return round($current + $this->healthAlpha * ($sample - $current), $precision);
+    }
+
+    /**
+     * Reserva a vez de testar um gateway semiaberto
+     *
+     * A reserva expira sozinha se a compra de teste não chegar a chamar o gateway.
+     */
+    private function acquireProbe(int $gatewayId): bool
+    {
+        return $this->cache()->add($this->key($gatewayId, 'probe'), 1, $this->probeSeconds);
+    }
+
+    private function key(int $gatewayId, string $field): string
+    {
+        return "gateway_circuit:{$gatewayId}:{$field}";
+    }
+
+    private function cache(): Repository
+    {
+        return Cache::store($this->store);
+    }
+}
@@ -0,0 +1,30 @@
+<?php
+
+namespace App\Services\Payment;
+
+use Illuminate\Http\Client\PendingRequest;
+use Illuminate\Support\Facades\Http;
+
+/**
+ * Timeouts explícitos nas chamadas aos gateways (services.gateway_http)
+ *
+ * Sem eles vale o padrão de 30 s do cliente HTTP, e a cadeia de gateways de
+ * uma compra pode passar do timeout do job de pagamento.
+ */
+trait GatewayHttpTimeouts
+{
+    /**
+     * Requisição com os timeouts configurados (nova, ou a recebida do envio paralelo)
+     */
+    protected function http(?PendingRequest $request = null): PendingRequest
+    {
+        $timeout = (int) config('services.gateway_http.timeout', 10);
+        $connectTimeout = (int) config('services.gateway_http.connect_timeout', 3);
+
+        if ($request === null) {
+            return Http::timeout($timeout)->connectTimeout($connectTimeout);
+        }
+
+        return $request->timeout($timeout)->connectTimeout($connectTimeout);
+    }
+}
@@ -0,0 +1,86 @@
+<?php
+
+namespace App\Services\Payment;
+
+use Illuminate\Contracts\Cache\Repository;
+use Illuminate\Support\Facades\Cache;
+
+/**
+ * Latências recentes de pagamento por gateway, compartilhadas entre workers.
+ *
+ * Define o orçamento do envio paralelo (hedged): se o gateway principal não
+ * responder dentro do percentil configurado das suas últimas latências, o
+ * pagamento também é enviado ao próximo gateway.
+ */
+class GatewayLatencyTracker
+{
+    private $store;
+    private $window;
+    private $percentile;
+    private $minSamples;
+    private $defaultBudgetMs;
+    private $minBudgetMs;
+
+    public function __construct(?string $store = null)
+    {
+        $config = config('services.payment_hedging');
+
+        $this->store = $store ?? $config['store'];
+        $this->window = (int) $config['window'];
+        $this->percentile = (float) $config['percentile'];
+        $this->minSamples = (int) $config['min_samples'];
+        $this->defaultBudgetMs = (float) $config['default_budget_ms'];
+        $this->minBudgetMs = (float) $config['min_budget_ms'];
+    }
+
+    /**
+     * Registra a latência de um pagamento respondido pelo gateway
+     *
+     * A janela é atualizada sem lock: uma amostra perdida em gravações
+     * concorrentes não altera o percentil de forma relevante.
+     *
+     * @param int $gatewayId
+     * @param float $processingTimeMs
+     * @return void
+     */
+    public function record(int $gatewayId, float $processingTimeMs): void
+    {
+        $cache = $this->cache();
+        $key = $this->key($gatewayId);
+
+        $samples = $cache->get($key, []);
+        $samples[] = $processingTimeMs;
+
+        $cache->put($key, array_slice($samples, -$this->window), now()->addDay());
+    }
+
+    /**
+     * Tempo (ms) que o gateway principal tem antes de o pagamento ser enviado ao próximo
+     *
+     * @param int $gatewayId
+     * @return float
+     */
+    public function budgetMs(int $gatewayId): float
+    {
+        $samples = $this->cache()->get($this->key($gatewayId), []);
+
+        if (count($samples) < $this->minSamples) {
+            return $this->defaultBudgetMs;
+        }
+
+        sort($samples);
+        $index = (int) ceil(($this->percentile / 100) * count($samples)) - 1;
+
+        return max($this->minBudgetMs, $samples[max(0, $index)]);
+    }
+
+    private function key(int $gatewayId): string
+    {
+        return "gateway_latency:{$gatewayId}";
+    }
+
+    private function cache(): Repository
+    {
+        return Cache::store($this->store);
+    }
+}
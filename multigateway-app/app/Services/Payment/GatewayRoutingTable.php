@@ -0,0 +1,186 @@
+<?php
+
+namespace App\Services\Payment;
+
+use App\Models\Gateway;
+use Illuminate\Contracts\Cache\Repository;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Log;
+
+/**
+ * Tabela de roteamento dos gateways ativos, em ordem de prioridade.
+ *
+ * Fica em cache em dois níveis: na memória do processo (útil para workers de
+ * fila e para várias instâncias do PaymentService na mesma requisição) e no
+ * Redis, compartilhada entre workers. Cada alteração nos gateways incrementa
+ * um número de versão; a versão é conferida a cada consulta, então os workers
+ * passam a usar a tabela nova já na requisição seguinte à alteração.
+ */
+class GatewayRoutingTable
+{
+    private const VERSION_KEY = 'gateway_routing:version';
+
+    /**
+     * Acertos locais acumulados antes de atualizar o contador compartilhado
+     */
+    private const LOCAL_HITS_BATCH = 50;
+
+    /**
+     * Tabela em memória e a versão a que ela corresponde
+     */
+    private static $localTable = null;
+    private static $localVersion = null;
+    private static $pendingLocalHits = 0;
+    private static $flushRegistered = false;
+
+    private $store;
+    private $ttl;
+
+    public function __construct(?string $store = null, ?int $ttl = null)
+    {
+        $this->store = $store ?? config('services.gateway_routing.store');
+        $this->ttl = $ttl ?? (int) config('services.gateway_routing.ttl', 300);
+    }
+
+    /**
+     * Gateways ativos em ordem de prioridade
+     *
+     * @return \Illuminate\Database\Eloquent\Collection
+     */
+    public function activeGateways()
+    {
+        $cache = $this->cache();
+        $version = $this->version($cache);
+
+        if (self::$localTable !== null && self::$localVersion === $version) {
+            $this->countLocalHit();
+            return Gateway::hydrate(self::$localTable);
+        }
+
+        $tableKey = "gateway_routing:table:{$version}";
+        $table = $cache->get($tableKey);
+
+        if (is_array($table)) {
+            $this->count('shared_hits');
+        } else {
+            $this->count('misses');
+            $table = Gateway::where('is_active', true)
+                ->orderBy('priority')
+                ->get()
+                ->map(fn (Gateway $gateway) => $gateway->getAttributes())
+                ->all();
+            $cache->put($tableKey, $table, $this->ttl);
+
+            Log::info("Tabela de roteamento dos gateways recarregada", [
+                'version' => $version,
+                'gateways' => count($table),
+            ]);
+        }
+
+        self::$localTable = $table;
+        self::$localVersion = $version;
+
+        return Gateway::hydrate($table);
+    }
+
+    /**
+     * Invalida a tabela após o commit da transação em andamento
+     *
+     * Incrementar a versão antes do commit permitiria que outro worker
+     * gravasse o estado antigo do banco sob a versão nova.
+     *
+     * @return void
+     */
+    public function invalidate(): void
+    {
+        DB::afterCommit(function () {
+            $cache = $this->cache();
+            $this->version($cache);
+            $cache->increment(self::VERSION_KEY);
+            $this->count('invalidations');
+
+            self::$localTable = null;
+            self::$localVersion = null;
+        });
+    }
+
+    /**
+     * Contadores de uso do cache da tabela
+     *
+     * @return array
+     */
+    public function stats(): array
+    {
+        $this->flushLocalHits();
+
+        $cache = $this->cache();
+        $stats = ['version' => $this->version($cache)];
+
+        foreach (['local_hits', 'shared_hits', 'misses', 'invalidations'] as $counter) {
+            $stats[$counter] = (int) $cache->get("gateway_routing:{$counter}", 0);
+        }
+
+        $lookups = $stats['local_hits'] + $stats['shared_hits'] + $stats['misses'];
+        $stats['hit_rate'] = $lookups > 0
+            ? round((($lookups - $stats['misses']) / $lookups) * 100, 2) . '%'
+            : null;
+
+        return $stats;
+    }
+
+    /**
+     * Versão atual da tabela
+     *
+     * Se a chave for descartada pelo Redis, recomeça a partir do horário atual
+     * (com um sufixo aleatório) em vez de zero, para não reaproveitar uma
+     * tabela antiga de mesma versão.
+     */
+    private function version(Repository $cache): int
+    {
+        $version = $cache->get(self::VERSION_KEY);
+
+        if ($version === null) {
+            $cache->add(self::VERSION_KEY, (int) (microtime(true) * 1000) * 1000 + random_int(0, 999), null);
+            $version = $cache->get(self::VERSION_KEY);
+        }
+
+        return (int) $version;
+    }
+
+    private function countLocalHit(): void
+    {
+        // No PHP-FPM a memória do processo dura uma requisição: publica o restante ao final dela
+        if (!self::$flushRegistered) {
+            app()->terminating(fn () => $this->flushLocalHits());
+            self::$flushRegistered = true;
+        }
+
+        if (++self::$pendingLocalHits >= self::LOCAL_HITS_BATCH) {
+            $this->flushLocalHits();
+        }
+    }
+
+    private function flushLocalHits(): void
+    {
+        if (self::$pendingLocalHits > 0) {
+            $this->count('local_hits', self::$pendingLocalHits);
+            self::$pendingLocalHits = 0;
+        }
+    }
+
+    private function count(string $counter, int $amount = 1): void
+    {
+        try {
+            $this->cache()->increment("gateway_routing:{$counter}", $amount);
+        } catch (\Exception $e) {
+            // Contadores são apenas informativos: não devem interromper o pagamento
+            Log::warning("Falha ao atualizar contador {$counter} da tabela de gateways: " . $e->getMessage());
+        }
+    }
+
+    private function cache(): Repository
+    {
+        return Cache::store($this->store);
+    }
+}
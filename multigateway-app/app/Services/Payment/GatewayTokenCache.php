@@ -0,0 +1,140 @@
+<?php
+
+namespace App\Services\Payment;
+
+use Illuminate\Contracts\Cache\Repository;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\Log;
+
+/**
+ * Cache de tokens de autenticação dos gateways, compartilhado entre
+ * requisições e workers (Redis por padrão).
+ *
+ * A renovação é single-flight: quando o token expira, apenas o worker que
+ * obtém o lock faz login no gateway; os demais aguardam o lock e reutilizam
+ * o token gravado por ele.
+ */
+class GatewayTokenCache
+{
+    /**
+     * Tempo máximo (s) de posse do lock de renovação
+     */
+    private const LOCK_SECONDS = 10;
+
+    /**
+     * Tempo máximo (s) de espera pela renovação feita por outro worker
+     */
+    private const WAIT_SECONDS = 5;
+
+    private $store;
+    private $ttl;
+
+    public function __construct(?string $store = null, ?int $ttl = null)
+    {
+        $this->store = $store ?? config('services.gateway_tokens.store');
+        $this->ttl = $ttl ?? (int) config('services.gateway_tokens.ttl', 3000);
+    }
+
+    /**
+     * Retorna o token do gateway, fazendo login apenas se não houver um em cache
+     *
+     * @param string $gateway Identificador do gateway (ex.: gateway1)
+     * @param callable $login Função que autentica no gateway e retorna o token
+     * @return string
+     */
+    public function get(string $gateway, callable $login): string
+    {
+        $cache = $this->cache();
+        $key = $this->key($gateway);
+
+        $token = $cache->get($key);
+        if ($token) {
+            $this->count($gateway, 'hits');
+            return $token;
+        }
+
+        $this->count($gateway, 'misses');
+
+        return $cache->lock("{$key}:refresh", self::LOCK_SECONDS)
+            ->block(self::WAIT_SECONDS, function () use ($cache, $key, $gateway, $login) {
+                // Outro worker pode ter renovado enquanto aguardávamos o lock
+                $token = $cache->get($key);
+                if ($token) {
+                    return $token;
+                }
+
+                $token = $login();
+                $cache->put($key, $token, $this->ttl);
+                $this->count($gateway, 'refreshes');
+                Log::info("Token do {$gateway} renovado");
+
+                return $token;
+            });
+    }
+
+    /**
+     * Descarta o token rejeitado pelo gateway (401)
+     *
+     * Só remove o token se ele ainda for o rejeitado, para não descartar um
+     * token que outro worker acabou de renovar.
+     *
+     * @param string $gateway
+     * @param string $rejectedToken
+     * @return void
+     */
+    public function invalidate(string $gateway, string $rejectedToken): void
+    {
+        $cache = $this->cache();
+        $key = $this->key($gateway);
+
+        $cache->lock("{$key}:refresh", self::LOCK_SECONDS)
+            ->block(self::WAIT_SECONDS, function () use ($cache, $key, $gateway, $rejectedToken) {
+                if ($cache->get($key) === $rejectedToken) {
+                    $cache->forget($key);
+                    $this->count($gateway, 'invalidations');
+                }
+            });
+    }
+
+    /**
+     * Contadores de uso do cache de um gateway
+     *
+     * @param string $gateway
+     * @return array
+     */
+    public function stats(string $gateway): array
+    {
+        $cache = $this->cache();
+        $stats = [];
+
+        foreach (['hits', 'misses', 'refreshes', 'invalidations'] as $counter) {
+            $stats[$counter] = (int) $cache->get($this->key($gateway) . ":{$counter}", 0);
+        }
+
+        $lookups = $stats['hits'] + $stats['misses'];
+        $stats['hit_rate'] = $lookups > 0 ? round(($stats['hits'] / $lookups) * 100, 2) . '%' : null;
+        $stats['cached'] = $cache->has($this->key($gateway));
+
+        return $stats;
+    }
+
+    private function count(string $gateway, string $counter): void
+    {
+        try {
+            $this->cache()->increment($this->key($gateway) . ":{$counter}");
+        } catch (\Exception $e) {
+            // Contadores são apenas informativos: não devem interromper o pagamento
+            Log::warning("Falha ao atualizar contador {$counter} do {$gateway}: " . $e->getMessage());
+        }
+    }
+
+    private function key(string $gateway): string
+    {
+        return "gateway_tokens:{$gateway}";
+    }
+
+    private function cache(): Repository
+    {
+        return Cache::store($this->store);
+    }
+}
@@ -4,6 +4,10 @@
 
 use App\Models\Gateway;
 use App\Models\Transaction;
+use GuzzleHttp\Handler\CurlMultiHandler;
+use GuzzleHttp\Promise\Create;
+use GuzzleHttp\TransferStats;
+use Illuminate\Support\Facades\Http;
 use Illuminate\Support\Facades\Log;
 use Illuminate\Support\Facades\App;
 
@@ -11,6 +15,16 @@ class PaymentService
 {
     protected $gateways = [];
 
+    /**
+     * Tentativas do envio paralelo ainda sem desfecho, resolvidas ao final da requisição
+     */
+    protected $pendingHedgeAttempts = [];
+
+    /**
+     * Indica se settleHedgeAttempts() já foi agendado para o fim da requisição
+     */
+    protected $settleRegistered = false;
+
     /**
      * Construtor que facilita a injeção de mocks para testes
      *
@@ -31,12 +45,8 @@ public function __construct(array $mockedGateways = [])
     protected function loadGateways()
     {
         try {
-            // Carregar todos os gateways ativos em ordem de prioridade
-            $dbGateways = Gateway::where('is_active', true)
-                ->orderBy('priority')
-                ->get();
-
-            Log::info("Carregando gateways. Encontrados: " . $dbGateways->count());
+            // Tabela de gateways ativos em cache, invalidada quando um gateway muda
+            $dbGateways = app(GatewayRoutingTable::class)->activeGateways();
 
             foreach ($dbGateways as $gateway) {
                 try {
@@ -48,8 +58,6 @@ protected function loadGateways()
                             'id' => $gateway->id,
                             'instance' => $gatewayInstance,
                         ];
-
-                        Log::info("Gateway carregado com sucesso: " . $gateway->name);
                     }
                 } catch (\Exception $e) {
                     Log::error("Erro ao carregar gateway {$gateway->name}: " . $e->getMessage());
@@ -119,8 +127,20 @@ public function processPayment(array $paymentData)
             ];
         }
 
+        $gateways = $this->orderByHealth($this->gateways);
+
+        // Envio paralelo: o próximo gateway entra se o principal estourar o orçamento de latência
+        if ($this->canHedge($gateways)) {
+            $result = $this->processHedgedPayment($gateways, $paymentData, $startTime, $errors, $attempted);
+            if ($result !== null) {
+                return $result;
+            }
+
+            $gateways = array_slice($gateways, $attempted);
+        }
+
         // Tentar processar o pagamento em cada gateway, em ordem de prioridade
-        foreach ($this->gateways as $gateway) {
+        foreach ($gateways as $gateway) {
             try {
                 $gatewayStartTime = microtime(true);
 
@@ -183,6 +203,330 @@ public function processPayment(array $paymentData)
         ];
     }
 
+    /**
+     * Ordem de envio considerando o circuit breaker: gateways com circuito
+     * aberto ou saúde baixa vão para o fim, mantendo a prioridade entre os demais
+     */
+    protected function orderByHealth(array $gateways): array
+    {
+        if (!config('services.gateway_circuit_breaker.enabled') || count($gateways) < 2) {
+            return $gateways;
+        }
+
+        try {
+            return app(GatewayCircuitBreaker::class)->order($gateways);
+        } catch (\Exception $e) {
+            // Sem o estado compartilhado, segue a ordem de prioridade
+            Log::warning("Falha ao consultar o circuit breaker dos gateways: " . $e->getMessage());
+            return $gateways;
+        }
+    }
+
+    /**
+     * Verifica se o envio paralelo está ativo e se os dois primeiros gateways o suportam
+     */
+    protected function canHedge(array $gateways): bool
+    {
+        return config('services.payment_hedging.enabled')
+            && function_exists('curl_multi_exec')
+            && count($gateways) >= 2
+            && $gateways[0]['instance'] instanceof AsyncPaymentGateway
+            && $gateways[1]['instance'] instanceof AsyncPaymentGateway;
+    }
+
+    /**
+     * Envia o pagamento ao gateway principal e, se ele não responder dentro do
+     * orçamento de latência, também ao segundo gateway. Vence o primeiro sucesso.
+     *
+     * O segundo envio é agendado com a opção `delay` num handler curl próprio,
+     * avançado tick a tick só até a primeira tentativa terminar. Quando o
+     * principal responde (sucesso ou recusa) antes do orçamento, o segundo envio
+     * é cancelado sem sair. Se os dois gateways cobrarem, o perdedor é estornado
+     * ao final da requisição.
+     *
+     * @param array $gateways Gateways na ordem de envio
+     * @param array $paymentData
+     * @param float $startTime
+     * @param array $errors Erros das tentativas que falharam
+     * @param int|null $attempted Quantidade de gateways efetivamente acionados
+     * @return array|null Resultado do pagamento, ou null se nenhuma tentativa teve sucesso
+     */
+    protected function processHedgedPayment(array $gateways, array $paymentData, float $startTime, array &$errors, &$attempted)
+    {
+        $budgetMs = app(GatewayLatencyTracker::class)->budgetMs($gateways[0]['id']);
+        // Timeout curto no select para o segundo envio sair perto do fim do orçamento
+        $handler = new CurlMultiHandler(['select_timeout' => 0.01]);
+        $attempts = [];
+        $winner = null;
+
+        foreach (array_slice($gateways, 0, 2) as $index => $gateway) {
+            $attempt = (object) [
+                'gateway' => $gateway,
+                'payment_data' => $paymentData,
+                'role' => $index === 0 ? 'primary' : 'hedge',
+                'delay_ms' => $index === 0 ? 0 : $budgetMs,
+                'started_at' => $startTime + ($index === 0 ? 0 : $budgetMs / 1000),
+                'transfer_ms' => null,
+                'settled' => false,
+                'cancelled' => false,
+                'request_emitted' => false,
+                'response' => null,
+                'error' => null,
+            ];
+
+            $request = Http::async()->setHandler($handler)->withOptions([
+                'delay' => $attempt->delay_ms,
+                'on_stats' => function (TransferStats $stats) use ($attempt) {
+                    $attempt->transfer_ms = round($stats->getTransferTime() * 1000, 2);
+                },
+            ]);
+
+            if ($index === 0) {
+                $this->emitHedgeRequest($attempt);
+            }
+
+            try {
+                $promise = $gateway['instance']->payAsync($request, $paymentData);
+            } catch (\Exception $e) {
+                // Ex.: falha no login do Gateway 1, antes de qualquer envio
+                $promise = Create::rejectionFor($e);
+            }
+
+            $attempt->promise = $promise->then(
+                function (array $response) use ($attempt, &$attempts, &$winner) {
+                    $this->settleHedgeAttempt($attempt, $response);
+
+                    // Principal respondeu antes do orçamento: o segundo envio não sai
+                    if ($attempt->role === 'primary' && isset($attempts[1])) {
+                        $this->cancelIfNotSent($attempts[1]);
+                    }
+
+                    if (!$this->isPaymentSuccessful($response)) {
+                        throw new \RuntimeException(json_encode($response));
+                    }
+
+                    $winner ??= $attempt;
+
+                    return $attempt;
+                },
+                function ($reason) use ($attempt, &$attempts) {
+                    $message = $reason instanceof \Throwable ? $reason->getMessage() : (string) $reason;
+                    $this->settleHedgeAttempt($attempt, null, $message);
+
+                    // Principal falhou antes do orçamento: o segundo envio é cancelado e o
+                    // próximo gateway é chamado no fluxo sequencial, sem esperar o atraso
+                    if ($attempt->role === 'primary' && isset($attempts[1])) {
+                        $this->cancelIfNotSent($attempts[1]);
+                    }
+
+                    throw $reason instanceof \Throwable ? $reason : new \RuntimeException($message);
+                }
+            );
+
+            $attempts[] = $attempt;
+        }
+
+        // Um wait() agregado rodaria o handler até todas as transferências
+        // terminarem, inclusive o segundo envio ainda agendado
+        while ($winner === null && !$this->hedgeAttemptsFinished($attempts)) {
+            $handler->tick();
+        }
+
+        // Gateways acionados; um segundo envio cancelado volta para o fluxo sequencial
+        $attempted = $attempts[1]->cancelled ? 1 : 2;
+
+        foreach ($attempts as $attempt) {
+            if ($attempt === $winner) {
+                continue;
+            }
+
+            if ($attempt->settled) {
+                if ($attempt->error === null && !$this->isPaymentSuccessful($attempt->response)) {
+                    $errors[] = "Gateway {$attempt->gateway['id']}: " . json_encode($attempt->response);
+                } elseif ($attempt->error !== null) {
+                    $errors[] = "Gateway {$attempt->gateway['id']}: " . $attempt->error;
+                }
+            }
+
+            if (!$winner || $this->cancelIfNotSent($attempt) || $attempt->cancelled) {
+                continue;
+            }
+
+            // Em andamento ou também cobrado: o desfecho e o estorno ficam para o fim da requisição
+            if (!$attempt->settled || $this->isPaymentSuccessful($attempt->response)) {
+                $this->deferHedgeAttempt($attempt);
+            }
+        }
+
+        if (!$winner) {
+            return null;
+        }
+
+        return [
+            'success' => true,
+            'gateway_id' => $winner->gateway['id'],
+            'external_id' => $winner->response['id'] ?? $winner->response['transactionId'],
+            'response' => $winner->response,
+            'processing_time_ms' => round((microtime(true) - $startTime) * 1000, 2),
+            'hedged' => $winner->role === 'hedge',
+        ];
+    }
+
+    /**
+     * Verifica se todas as tentativas terminaram ou foram canceladas
+     */
+    protected function hedgeAttemptsFinished(array $attempts): bool
+    {
+        foreach ($attempts as $attempt) {
+            if (!$attempt->settled && !$attempt->cancelled) {
+                return false;
+            }
+        }
+
+        return true;
+    }
+
+    /**
+     * Resolve as tentativas paralelas que perderam e estorna as que também cobraram
+     *
+     * Chamado ao final da requisição (depois de a resposta ser enviada ao
+     * comprador); fora do ciclo HTTP, como em jobs de fila, deve ser chamado
+     * explicitamente.
+     */
+    public function settleHedgeAttempts(): void
+    {
+        $attempts = $this->pendingHedgeAttempts;
+        $this->pendingHedgeAttempts = [];
+
+        foreach ($attempts as $attempt) {
+            try {
+                $attempt->promise->wait();
+            } catch (\Throwable $e) {
+                // Falha ou recusa do perdedor: nada a estornar
+            }
+
+            if ($attempt->settled && $attempt->error === null && $this->isPaymentSuccessful($attempt->response)) {
+                $this->refundHedgeLoser($attempt);
+            }
+        }
+    }
+
+    protected function deferHedgeAttempt(object $attempt): void
+    {
+        // Um único callback por instância; no console (jobs de fila, comandos) não há
+        // fim de requisição e quem chama resolve as tentativas com settleHedgeAttempts()
+        if (!$this->settleRegistered && !App::runningInConsole()) {
+            App::terminating(fn () => $this->settleHedgeAttempts());
+            $this->settleRegistered = true;
+        }
+
+        $this->pendingHedgeAttempts[] = $attempt;
+    }
+
+    /**
+     * Cancela o segundo envio se o atraso dele ainda não terminou (nada foi enviado)
+     *
+     * @return bool true se a tentativa foi cancelada
+     */
+    protected function cancelIfNotSent(object $attempt): bool
+    {
+        if ($attempt->settled || $attempt->cancelled || microtime(true) >= $attempt->started_at) {
+            return false;
+        }
+
+        $attempt->cancelled = true;
+        $attempt->promise->cancel();
+
+        return true;
+    }
+
+    protected function settleHedgeAttempt(object $attempt, ?array $response, ?string $error = null): void
+    {
+        if ($attempt->cancelled) {
+            return;
+        }
+
+        $attempt->settled = true;
+        $attempt->response = $response;
+        $attempt->error = $error;
+
+        $this->emitHedgeRequest($attempt);
+
+        $processingTime = $attempt->transfer_ms
+            ?? round(max(0, microtime(true) - $attempt->started_at) * 1000, 2);
+
+        event('gateway.response', [
+            $attempt->gateway['id'],
+            'payment',
+            $error === null ? 'success' : 'error',
+            $error === null ? $response : ['message' => $error],
+            $processingTime
+        ]);
+    }
+
+    protected function emitHedgeRequest(object $attempt): void
+    {
+        if ($attempt->request_emitted) {
+            return;
+        }
+
+        $attempt->request_emitted = true;
+
+        event('gateway.request', [
+            $attempt->gateway['id'],
+            'payment',
+            array_merge($attempt->payment_data, [
+                'attempt' => $attempt->role,
+                'hedge_delay_ms' => $attempt->delay_ms,
+            ])
+        ]);
+    }
+
+    protected function refundHedgeLoser(object $attempt): void
+    {
+        $gatewayId = $attempt->gateway['id'];
+        $externalId = $attempt->response['id'] ?? $attempt->response['transactionId'];
+        $gatewayStartTime = microtime(true);
+
+        Log::warning("Pagamento duplicado pelo envio paralelo, estornando no gateway {$gatewayId}", [
+            'external_id' => $externalId,
+            'amount' => $attempt->payment_data['amount'],
+        ]);
+
+        event('gateway.request', [
+            $gatewayId,
+            'refund',
+            ['transaction_id' => $externalId, 'reason' => 'hedge_loser']
+        ]);
+
+        try {
+            $result = $attempt->gateway['instance']->refund((string) $externalId);
+
+            event('gateway.response', [
+                $gatewayId,
+                'refund',
+                'success',
+                $result,
+                round((microtime(true) - $gatewayStartTime) * 1000, 2)
+            ]);
+        } catch (\Exception $e) {
+            event('gateway.response', [
+                $gatewayId,
+                'refund',
+                'error',
+                ['message' => $e->getMessage()],
+                round((microtime(true) - $gatewayStartTime) * 1000, 2)
+            ]);
+
+            Log::error("Falha ao estornar pagamento duplicado {$externalId} no gateway {$gatewayId}: " . $e->getMessage());
+        }
+    }
+
+    protected function isPaymentSuccessful(?array $response): bool
+    {
+        return isset($response['id']) || isset($response['transactionId']);
+    }
+
     /**
      * Realiza o reembolso de uma transação
      */
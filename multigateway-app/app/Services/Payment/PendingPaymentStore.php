@@ -0,0 +1,66 @@
+<?php
+
+namespace App\Services\Payment;
+
+use Illuminate\Contracts\Cache\Repository;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\Crypt;
+
+/**
+ * Dados de pagamento (cartão, CVV) das compras assíncronas até o job processá-las.
+ *
+ * Ficam fora do payload do job, que é persistido na tabela `jobs` e, em caso
+ * de falha, em `failed_jobs`: só o ID da transação vai para a fila. Os dados
+ * são gravados criptografados, com TTL curto, e removidos quando o job os lê.
+ */
+class PendingPaymentStore
+{
+    private $store;
+    private $ttl;
+
+    public function __construct(?string $store = null, ?int $ttl = null)
+    {
+        $this->store = $store ?? config('services.async_purchase.payment_store');
+        $this->ttl = $ttl ?? (int) config('services.async_purchase.payment_ttl', 900);
+    }
+
+    public function put(int $transactionId, array $paymentData): void
+    {
+        $this->cache()->put($this->key($transactionId), Crypt::encrypt($paymentData), $this->ttl);
+    }
+
+    /**
+     * Lê e remove os dados de pagamento da transação
+     *
+     * @return array|null null se já foram lidos ou expiraram
+     */
+    public function pull(int $transactionId): ?array
+    {
+        $payload = $this->cache()->pull($this->key($transactionId));
+
+        return $payload === null ? null : Crypt::decrypt($payload);
+    }
+
+    /**
+     * Verifica se os dados ainda aguardam o job (o pagamento não foi enviado)
+     */
+    public function has(int $transactionId): bool
+    {
+        return $this->cache()->has($this->key($transactionId));
+    }
+
+    public function forget(int $transactionId): void
+    {
+        $this->cache()->forget($this->key($transactionId));
+    }
+
+    private function key(int $transactionId): string
+    {
+        return "pending_payment:{$transactionId}";
+    }
+
+    private function cache(): Repository
+    {
+        return Cache::store($this->store);
+    }
+}
@@ -31,6 +31,20 @@
     |
     */
 
+    /*
+    |--------------------------------------------------------------------------
+    | Log Buffer Size
+    |--------------------------------------------------------------------------
+    |
+    | Registros mantidos em memória pelos canais estruturados (transactions,
+    | gateways e system) antes de uma gravação em lote. O buffer também é
+    | gravado ao final de cada requisição ou job. Use 0 para gravar cada
+    | registro imediatamente.
+    |
+    */
+
+    'buffer_size' => env('LOG_BUFFER_SIZE', 100),
+
     'deprecations' => [
         'channel' => env('LOG_DEPRECATIONS_CHANNEL', 'null'),
         'trace' => env('LOG_DEPRECATIONS_TRACE', false),
@@ -127,26 +141,35 @@
             'path' => storage_path('logs/laravel.log'),
         ],
         'transactions' => [
-            'driver' => 'daily',
-            'path' => storage_path('logs/transactions.log'),
+            'driver' => 'monolog',
+            'handler' => App\Logging\BatchRotatingFileHandler::class,
+            'with' => [
+                'filename' => storage_path('logs/transactions.log'),
+                'maxFiles' => 14,
+            ],
             'level' => env('LOG_LEVEL', 'debug'),
-            'days' => 14,
             'tap' => [App\Logging\JsonFormatter::class],
         ],
 
         'gateways' => [
-            'driver' => 'daily',
-            'path' => storage_path('logs/gateways.log'),
+            'driver' => 'monolog',
+            'handler' => App\Logging\BatchRotatingFileHandler::class,
+            'with' => [
+                'filename' => storage_path('logs/gateways.log'),
+                'maxFiles' => 14,
+            ],
             'level' => env('LOG_LEVEL', 'debug'),
-            'days' => 14,
             'tap' => [App\Logging\JsonFormatter::class],
         ],
 
         'system' => [
-            'driver' => 'daily',
-            'path' => storage_path('logs/system.log'),
+            'driver' => 'monolog',
+            'handler' => App\Logging\BatchRotatingFileHandler::class,
+            'with' => [
+                'filename' => storage_path('logs/system.log'),
+                'maxFiles' => 14,
+            ],
             'level' => env('LOG_LEVEL', 'debug'),
-            'days' => 14,
             'tap' => [App\Logging\JsonFormatter::class],
         ],
 
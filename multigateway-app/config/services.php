@@ -40,6 +40,61 @@
         'token' => env('GATEWAY1_TOKEN', 'FEC9BB078BF338F464F96B48089EB498'),
     ],
 
+    // Tokens de autenticação dos gateways, compartilhados entre workers
+    'gateway_tokens' => [
+        'store' => env('GATEWAY_TOKEN_STORE', 'redis'),
+        'ttl' => env('GATEWAY_TOKEN_TTL', 3000),
+    ],
+
+    // Tabela de gateways ativos usada pelo PaymentService
+    'gateway_routing' => [
+        'store' => env('GATEWAY_ROUTING_STORE', 'redis'),
+        'ttl' => env('GATEWAY_ROUTING_TTL', 300),
+    ],
+
+    // Envio paralelo (hedged) do pagamento ao segundo gateway quando o
+    // principal passa do percentil configurado das suas latências recentes
+    'payment_hedging' => [
+        'enabled' => env('PAYMENT_HEDGING', false),
+        'store' => env('PAYMENT_HEDGING_STORE', 'redis'),
+        'percentile' => env('PAYMENT_HEDGING_PERCENTILE', 95),
+        'window' => env('PAYMENT_HEDGING_WINDOW', 200),
+        'min_samples' => env('PAYMENT_HEDGING_MIN_SAMPLES', 20),
+        'default_budget_ms' => env('PAYMENT_HEDGING_DEFAULT_BUDGET_MS', 1000),
+        'min_budget_ms' => env('PAYMENT_HEDGING_MIN_BUDGET_MS', 100),
+    ],
+
+    // Circuit breaker por gateway, alimentado pelos eventos gateway.response
+    'gateway_circuit_breaker' => [
+        'enabled' => env('GATEWAY_CIRCUIT_BREAKER', true),
+        'store' => env('GATEWAY_CIRCUIT_STORE', 'redis'),
+        'failure_threshold' => env('GATEWAY_CIRCUIT_FAILURE_THRESHOLD', 5),
+        'open_seconds' => env('GATEWAY_CIRCUIT_OPEN_SECONDS', 30),
+        'probe_seconds' => env('GATEWAY_CIRCUIT_PROBE_SECONDS', 10),
+        'slow_call_ms' => env('GATEWAY_CIRCUIT_SLOW_CALL_MS', 5000),
+        'health_alpha' => env('GATEWAY_CIRCUIT_HEALTH_ALPHA', 0.2),
+        'degraded_score' => env('GATEWAY_CIRCUIT_DEGRADED_SCORE', 0.5),
+    ],
+
+    // Compra assíncrona (POST /api/purchase/async): fila do job de pagamento,
+    // validade da URL assinada de status e dados do cartão guardados fora da fila.
+    // job_timeout deve superar a cadeia de gateways no pior caso (login com espera
+    // pelo lock, pagamento e nova tentativa após 401 em cada gateway) e ser menor
+    // que o retry_after da conexão da fila
+    'async_purchase' => [
+        'queue' => env('PURCHASE_QUEUE', 'payments'),
+        'status_url_ttl' => env('PURCHASE_STATUS_URL_TTL', 86400),
+        'job_timeout' => env('PURCHASE_JOB_TIMEOUT', 180),
+        'payment_store' => env('PURCHASE_PAYMENT_STORE', 'redis'),
+        'payment_ttl' => env('PURCHASE_PAYMENT_TTL', 900),
+    ],
+
+    // Timeouts (s) das chamadas HTTP aos gateways
+    'gateway_http' => [
+        'timeout' => env('GATEWAY_HTTP_TIMEOUT', 10),
+        'connect_timeout' => env('GATEWAY_CONNECT_TIMEOUT', 3),
+    ],
+
     'gateway2' => [
         'url' => env('GATEWAY2_URL', 'http://gateway2:3002'),
         'auth_token' => env('GATEWAY2_AUTH_TOKEN', 'tk_f2198cc671b5289fa856'),
@@ -0,0 +1,33 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        Schema::table('transactions', function (Blueprint $table) {
+            // Compras assíncronas ficam PENDING sem gateway até o job processar o pagamento
+            $table->foreignId('gateway_id')->nullable()->change();
+            $table->string('failure_reason', 1000)->nullable()->after('status');
+            // Job interrompido depois de enviar o pagamento: o desfecho no gateway é desconhecido
+            $table->boolean('reconciliation_required')->default(false)->after('failure_reason');
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::table('transactions', function (Blueprint $table) {
+            $table->dropColumn(['failure_reason', 'reconciliation_required']);
+            $table->foreignId('gateway_id')->nullable(false)->change();
+        });
+    }
+};
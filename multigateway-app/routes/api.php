@@ -19,6 +19,10 @@
 Route::post('/login', [AuthController::class, 'login']);
 Route::post('/register', [AuthController::class, 'register']);
 Route::post('/purchase', [TransactionController::class, 'purchase']);
+Route::post('/purchase/async', [TransactionController::class, 'purchaseAsync'])->name('purchase.async');
+Route::get('/purchase/{transaction}/status', [TransactionController::class, 'purchaseStatus'])
+    ->name('purchase.status')
+    ->middleware('signed');
 //health checks
 Route::get('/health', function () {
     return response()->json([
@@ -6,3 +6,50 @@
 Artisan::command('inspire', function () {
     $this->comment(Inspiring::quote());
 })->purpose('Display an inspiring quote');
+
+Artisan::command('logging:bench {--records=20000 : Registros gravados em cada cenário}', function () {
+    $records = max(1, (int) $this->option('records'));
+    $directory = sys_get_temp_dir() . '/logging-bench-' . getmypid();
+    $context = [
+        'gateway' => ['id' => 1, 'name' => 'Gateway 1', 'type' => 'gateway1'],
+        'operation' => 'payment',
+        'status' => 'success',
+        'response' => ['id' => 'a1b2c3d4', 'status' => 'paid'],
+        'metadata' => ['processing_time_ms' => 123.45, 'timestamp' => now()->toIso8601String()],
+    ];
+
+    // Antes: contexto recalculado e uma escrita por registro; depois: contexto em cache e gravação em lote
+    $scenarios = [
+        'antes' => function ($path) {
+            $handler = new \Monolog\Handler\RotatingFileHandler($path, 14);
+            $handler->setFormatter(new \App\Logging\CustomJsonFormatter(false));
+            return $handler;
+        },
+        'depois' => function ($path) {
+            $handler = new \App\Logging\BatchRotatingFileHandler($path, 14);
+            $handler->setFormatter(new \App\Logging\CustomJsonFormatter());
+            return new \Monolog\Handler\BufferHandler($handler, (int) config('logging.buffer_size', 100) ?: 100, \Monolog\Level::Debug, true, true);
+        },
+    ];
+
+    $results = [];
+    foreach ($scenarios as $name => $factory) {
+        $handler = $factory("{$directory}/{$name}.log");
+        // Contexto da requisição capturado em cada registro; recalculado por completo no 'antes'
+        $logger = new \Monolog\Logger('bench', [$handler], [new \App\Logging\RequestContextProcessor($name === 'depois')]);
+
+        $start = hrtime(true);
+        for ($i = 0; $i < $records; $i++) {
+            $logger->info('Gateway response', $context);
+        }
+        $logger->close();
+        $seconds = (hrtime(true) - $start) / 1e9;
+
+        $results[$name] = $records / $seconds;
+        $this->line(sprintf('%-7s %10.0f registros/s  (%.3f s)', $name, $results[$name], $seconds));
+    }
+
+    $this->info(sprintf('Ganho: %.1fx', $results['depois'] / $results['antes']));
+
+    \Illuminate\Support\Facades\File::deleteDirectory($directory);
+})->purpose('Mede registros/s do formatter JSON e do buffer de logs');
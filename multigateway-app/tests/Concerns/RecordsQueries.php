@@ -0,0 +1,79 @@
+<?php
+
+namespace Tests\Concerns;
+
+use Illuminate\Database\Events\QueryExecuted;
+use Illuminate\Foundation\Http\Events\RequestHandled;
+use Illuminate\Routing\Events\RouteMatched;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Event;
+
+/**
+ * Registra as consultas SQL de cada teste quando QUERY_LOG_PATH está definido
+ * (modo --query-budget do run_tests.py).
+ *
+ * Cada teste acrescenta uma linha JSON ao arquivo com as consultas executadas
+ * (SQL com placeholders, tempo em ms e endpoint da requisição em andamento) e
+ * a quantidade de requisições por endpoint.
+ */
+trait RecordsQueries
+{
+    /**
+     * Consultas do teste atual: [sql, tempo em ms, endpoint ou null].
+     */
+    protected array $recordedQueries = [];
+
+    /**
+     * Requisições atendidas por endpoint no teste atual.
+     */
+    protected array $recordedRequests = [];
+
+    /**
+     * Endpoint da requisição em andamento.
+     */
+    protected ?string $currentEndpoint = null;
+
+    /**
+     * Inicia o registro (chamado pelo setUpTraits do Laravel).
+     */
+    protected function setUpRecordsQueries(): void
+    {
+        if (! getenv('QUERY_LOG_PATH')) {
+            return;
+        }
+
+        Event::listen(RouteMatched::class, function (RouteMatched $event) {
+            $this->currentEndpoint = $event->request->method().' /'.ltrim($event->route->uri(), '/');
+            $this->recordedRequests[$this->currentEndpoint] = ($this->recordedRequests[$this->currentEndpoint] ?? 0) + 1;
+        });
+
+        Event::listen(RequestHandled::class, function () {
+            $this->currentEndpoint = null;
+        });
+
+        DB::listen(function (QueryExecuted $query) {
+            $this->recordedQueries[] = [$query->sql, round($query->time, 3), $this->currentEndpoint];
+        });
+    }
+
+    /**
+     * Grava as consultas do teste (chamado antes de a aplicação ser destruída).
+     */
+    protected function tearDownRecordsQueries(): void
+    {
+        $path = getenv('QUERY_LOG_PATH');
+        if (! $path) {
+            return;
+        }
+
+        file_put_contents($path, json_encode([
+            'test' => static::class.'::'.$this->name(),
+            'queries' => $this->recordedQueries,
+            'requests' => (object) $this->recordedRequests,
+        ]).PHP_EOL, FILE_APPEND | LOCK_EX);
+
+        $this->recordedQueries = [];
+        $this->recordedRequests = [];
+        $this->currentEndpoint = null;
+    }
+}
@@ -2,14 +2,17 @@
 
 namespace Tests\Feature;
 
+use App\Jobs\ProcessPurchasePayment;
 use App\Models\Client;
 use App\Models\Gateway;
 use App\Models\Product;
 use App\Models\Transaction;
 use App\Models\User;
 use App\Services\Payment\PaymentService;
+use App\Services\Payment\PendingPaymentStore;
 use Illuminate\Foundation\Testing\DatabaseTransactions;
 use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Queue;
 use Mockery;
 use PHPUnit\Framework\Attributes\Test;
 use Tests\TestCase;
@@ -190,6 +193,33 @@ public function it_prevents_refunding_already_refunded_transaction()
                  ]);
     }
 
+    #[Test]
+    public function it_prevents_refunding_transactions_that_are_not_completed()
+    {
+        $this->partialMock(PaymentService::class, function ($mock) {
+            $mock->shouldNotReceive('refundPayment');
+        });
+
+        foreach (['PENDING', 'FAILED'] as $status) {
+            // Compra assíncrona ainda sem gateway nem ID externo
+            $transaction = Transaction::create([
+                'client_id' => $this->client->id,
+                'status' => $status,
+                'amount' => 1500,
+                'card_last_numbers' => '6063'
+            ]);
+
+            $response = $this->actingAs($this->adminUser)
+                             ->postJson("/api/transactions/{$transaction->id}/refund");
+
+            $response->assertStatus(422)
+                     ->assertJson([
+                         'message' => 'Apenas transações concluídas podem ser reembolsadas',
+                         'status' => $status,
+                     ]);
+        }
+    }
+
     #[Test]
     public function it_lists_all_transactions()
     {
@@ -217,6 +247,147 @@ public function it_lists_all_transactions()
                  ]);
     }
 
+    #[Test]
+    public function async_purchase_returns_202_and_completes_in_the_job()
+    {
+        // Fila sync nos testes: o job roda durante a requisição
+        $this->partialMock(PaymentService::class, function ($mock) {
+            $mock->shouldReceive('processPayment')
+                ->once()
+                ->with(Mockery::on(fn ($data) => $data['card_number'] === '5569000000006063' && $data['cvv'] === '010'))
+                ->andReturn([
+                    'success' => true,
+                    'gateway_id' => $this->gateway->id,
+                    'external_id' => 'test-async-123',
+                ]);
+        });
+
+        $response = $this->postJson('/api/purchase/async', $this->purchaseData());
+
+        $response->assertStatus(202)
+                 ->assertJsonPath('status', 'PENDING')
+                 ->assertJsonStructure(['message', 'transaction_id', 'status', 'status_url'])
+                 ->assertHeader('Location', $response->json('status_url'));
+
+        $this->getJson($response->json('status_url'))
+             ->assertStatus(200)
+             ->assertJsonPath('status', 'COMPLETED')
+             ->assertJsonPath('external_id', 'test-async-123');
+
+        $this->assertDatabaseHas('transactions', [
+            'id' => $response->json('transaction_id'),
+            'gateway_id' => $this->gateway->id,
+            'status' => 'COMPLETED',
+        ]);
+    }
+
+    #[Test]
+    public function async_purchase_is_marked_failed_when_every_gateway_fails()
+    {
+        $this->partialMock(PaymentService::class, function ($mock) {
+            $mock->shouldReceive('processPayment')
+                ->once()
+                ->andReturn([
+                    'success' => false,
+                    'errors' => ['Gateway 1: recusado'],
+                ]);
+        });
+
+        $response = $this->postJson('/api/purchase/async', $this->purchaseData());
+        $response->assertStatus(202);
+
+        $this->getJson($response->json('status_url'))
+             ->assertStatus(200)
+             ->assertJsonPath('status', 'FAILED')
+             ->assertJsonPath('errors.0', 'Gateway 1: recusado');
+    }
+
+    #[Test]
+    public function async_purchase_keeps_card_data_out_of_the_job_payload()
+    {
+        Queue::fake();
+
+        $response = $this->postJson('/api/purchase/async', $this->purchaseData());
+        $transactionId = $response->json('transaction_id');
+
+        Queue::assertPushed(ProcessPurchasePayment::class, function ($job) {
+            $payload = serialize($job);
+
+            return !str_contains($payload, '5569000000006063') && !str_contains($payload, '"010"');
+        });
+
+        $store = app(PendingPaymentStore::class);
+        $this->assertEquals('010', $store->pull($transactionId)['cvv']);
+        $this->assertNull($store->pull($transactionId));
+    }
+
+    #[Test]
+    public function a_job_that_fails_after_sending_the_payment_is_left_for_reconciliation()
+    {
+        $transaction = $this->pendingTransaction();
+
+        // Os dados já foram lidos pelo job: um gateway pode ter cobrado
+        (new ProcessPurchasePayment($transaction->id))->failed(new \RuntimeException('Job timed out'));
+
+        $transaction->refresh();
+        $this->assertEquals('PENDING', $transaction->status);
+        $this->assertEquals(1, $transaction->reconciliation_required);
+    }
+
+    #[Test]
+    public function a_job_that_fails_before_sending_the_payment_is_marked_failed()
+    {
+        $transaction = $this->pendingTransaction();
+        $store = app(PendingPaymentStore::class);
+        $store->put($transaction->id, ['amount' => 1500, 'card_number' => '5569000000006063', 'cvv' => '010']);
+
+        (new ProcessPurchasePayment($transaction->id))->failed(new \RuntimeException('Worker stopped'));
+
+        $transaction->refresh();
+        $this->assertEquals('FAILED', $transaction->status);
+        $this->assertEquals(0, $transaction->reconciliation_required);
+        $this->assertFalse($store->has($transaction->id));
+    }
+
+    #[Test]
+    public function purchase_status_requires_a_signed_url()
+    {
+        $transaction = Transaction::create([
+            'client_id' => $this->client->id,
+            'status' => 'PENDING',
+            'amount' => 1500,
+            'card_last_numbers' => '6063'
+        ]);
+
+        $this->getJson("/api/purchase/{$transaction->id}/status")->assertStatus(403);
+    }
+
+    private function pendingTransaction(): Transaction
+    {
+        return Transaction::create([
+            'client_id' => $this->client->id,
+            'status' => 'PENDING',
+            'amount' => 1500,
+            'card_last_numbers' => '6063'
+        ]);
+    }
+
+    private function purchaseData(): array
+    {
+        return [
+            'products' => [
+                [
+                    'id' => $this->product->id,
+                    'quantity' => 2
+                ]
+            ],
+            'client_name' => 'New Test Client',
+            'client_email' => 'test@gmail.com',
+            'card_number' => '5569000000006063',
+            'card_cvv' => '010'
+        ];
+    }
+
     protected function tearDown(): void
     {
         parent::tearDown();
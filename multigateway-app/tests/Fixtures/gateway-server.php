@@ -0,0 +1,32 @@
+<?php
+
+/**
+ * Router do servidor embutido do PHP (php -S) que responde como os dois gateways.
+ *
+ * Cada requisição é anotada no arquivo de GATEWAY_SERVER_LOG, para que o teste
+ * confira quais chamadas realmente saíram pela rede.
+ */
+
+$path = parse_url($_SERVER['REQUEST_URI'], PHP_URL_PATH);
+
+file_put_contents(getenv('GATEWAY_SERVER_LOG'), $_SERVER['REQUEST_METHOD'] . ' ' . $path . "\n", FILE_APPEND | LOCK_EX);
+
+header('Content-Type: application/json');
+
+switch ($path) {
+    case '/login':
+        echo json_encode(['token' => 'token-1']);
+        break;
+
+    case '/transactions':
+        echo json_encode(['id' => 'ext-1']);
+        break;
+
+    case '/transacoes':
+        echo json_encode(['id' => 'ext-2']);
+        break;
+
+    default:
+        http_response_code(404);
+        echo json_encode(['message' => 'Not found']);
+}
@@ -3,8 +3,9 @@
 namespace Tests;
 
 use Illuminate\Foundation\Testing\TestCase as BaseTestCase;
+use Tests\Concerns\RecordsQueries;
 
 abstract class TestCase extends BaseTestCase
 {
-    //
+    use RecordsQueries;
 }
@@ -0,0 +1,142 @@
+<?php
+
+namespace Tests\Unit;
+
+use App\Logging\BatchRotatingFileHandler;
+use App\Logging\CustomJsonFormatter;
+use App\Logging\JsonFormatter;
+use App\Logging\RequestContextProcessor;
+use App\Models\User;
+use Illuminate\Http\Request;
+use Illuminate\Log\Logger as IlluminateLogger;
+use Illuminate\Support\Facades\File;
+use Monolog\Handler\BufferHandler;
+use Monolog\Handler\TestHandler;
+use Monolog\JsonSerializableDateTimeImmutable;
+use Monolog\Level;
+use Monolog\Logger;
+use Monolog\LogRecord;
+use PHPUnit\Framework\Attributes\Test;
+use Tests\TestCase;
+
+class CustomJsonFormatterTest extends TestCase
+{
+    protected $directory;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        RequestContextProcessor::resetRequestContext();
+        $this->directory = storage_path('framework/testing/logging-' . uniqid());
+    }
+
+    #[Test]
+    public function it_reuses_the_request_context_until_the_request_changes()
+    {
+        $formatter = new CustomJsonFormatter();
+        $processor = new RequestContextProcessor();
+
+        $first = json_decode($formatter->format($processor($this->record())), true);
+        $second = json_decode($formatter->format($processor($this->record())), true);
+
+        $this->assertEquals($first['request_id'], $second['request_id']);
+        $this->assertEquals(app()->environment(), $first['environment']);
+
+        $this->app->instance('request', Request::create('/api/purchase', 'POST', server: [
+            'HTTP_X_REQUEST_ID' => 'req-123',
+        ]));
+
+        $third = json_decode($formatter->format($processor($this->record())), true);
+        $this->assertEquals('req-123', $third['request_id']);
+        $this->assertArrayNotHasKey('request_id', $third['extra']);
+    }
+
+    #[Test]
+    public function buffered_records_keep_the_request_and_user_of_when_they_were_logged()
+    {
+        config(['logging.buffer_size' => 100]);
+        $handler = new TestHandler();
+        $logger = new IlluminateLogger(new Logger('system', [$handler]));
+        app(JsonFormatter::class)($logger);
+
+        // Registro anterior ao middleware de autenticação
+        $logger->info('API Request');
+
+        $this->actingAs((new User())->forceFill(['id' => 42, 'email' => 'admin@example.com']));
+        $logger->info('Payment processed');
+
+        // Contexto alterado no meio da requisição
+        $this->app->instance('request', Request::create('/api/purchase', 'POST', server: [
+            'HTTP_X_REQUEST_ID' => 'req-456',
+        ]));
+        $logger->info('Payment settled');
+
+        $this->assertCount(0, $handler->getRecords());
+        app(JsonFormatter::class)->flushBuffers();
+
+        [$request, $processed, $settled] = array_map(
+            fn ($record) => json_decode($record->formatted, true),
+            $handler->getRecords()
+        );
+
+        $this->assertArrayNotHasKey('user', $request);
+        $this->assertEquals(['id' => 42, 'email' => 'admin@example.com'], $processed['user']);
+        $this->assertEquals($request['request_id'], $processed['request_id']);
+        $this->assertEquals('req-456', $settled['request_id']);
+    }
+
+    #[Test]
+    public function buffered_records_are_written_in_a_single_batch()
+    {
+        $handler = new BatchRotatingFileHandler("{$this->directory}/bench.log", 14);
+        $handler->setFormatter(new CustomJsonFormatter());
+        $logger = new Logger('test', [new BufferHandler($handler, 3, Level::Debug, true, true)]);
+
+        $logger->info('Primeiro');
+        $logger->info('Segundo');
+        $this->assertEmpty(File::glob("{$this->directory}/*.log"));
+
+        $logger->info('Terceiro');
+        $logger->info('Quarto');
+        $logger->close();
+
+        $lines = file(File::glob("{$this->directory}/*.log")[0], FILE_IGNORE_NEW_LINES);
+        $this->assertEquals(['Primeiro', 'Segundo', 'Terceiro', 'Quarto'], array_map(
+            fn ($line) => json_decode($line, true)['message'],
+            $lines
+        ));
+    }
+
+    #[Test]
+    public function a_batch_that_crosses_midnight_is_written_to_each_day_file()
+    {
+        $handler = new BatchRotatingFileHandler("{$this->directory}/bench.log", 14);
+        $handler->setFormatter(new CustomJsonFormatter());
+        $logger = new Logger('test', [new BufferHandler($handler, 10, Level::Debug, true, true)]);
+
+        $yesterday = (new JsonSerializableDateTimeImmutable(true))->modify('-1 day')->setTime(23, 59, 59);
+        $logger->addRecord(Level::Info, 'Antes da meia-noite', [], $yesterday);
+        $logger->info('Depois da meia-noite');
+        $logger->close();
+
+        $messages = fn ($path) => array_map(
+            fn ($line) => json_decode($line, true)['message'],
+            file($path, FILE_IGNORE_NEW_LINES)
+        );
+
+        $this->assertEquals(['Antes da meia-noite'], $messages("{$this->directory}/bench-{$yesterday->format('Y-m-d')}.log"));
+        $this->assertEquals(['Depois da meia-noite'], $messages("{$this->directory}/bench-" . date('Y-m-d') . '.log'));
+    }
+
+    private function record(): LogRecord
+    {
+        return new LogRecord(new \DateTimeImmutable(), 'test', Level::Info, 'Gateway response', ['operation' => 'payment']);
+    }
+
+    protected function tearDown(): void
+    {
+        File::deleteDirectory($this->directory);
+        parent::tearDown();
+    }
+}
@@ -0,0 +1,95 @@
+<?php
+
+namespace Tests\Unit;
+
+use App\Services\Payment\Gateway1;
+use App\Services\Payment\GatewayTokenCache;
+use Illuminate\Http\Client\Request;
+use Illuminate\Support\Facades\Http;
+use PHPUnit\Framework\Attributes\Test;
+use Tests\TestCase;
+
+class Gateway1Test extends TestCase
+{
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        // Cache em memória: cada teste começa sem token
+        $this->app->instance(GatewayTokenCache::class, new GatewayTokenCache('array', 60));
+    }
+
+    #[Test]
+    public function it_reuses_the_cached_token_across_instances()
+    {
+        Http::fake([
+            '*/login' => Http::response(['token' => 'token-1']),
+            '*/transactions' => Http::response(['id' => 'ext-1']),
+        ]);
+
+        (new Gateway1())->pay($this->paymentData());
+        (new Gateway1())->pay($this->paymentData());
+
+        Http::assertSentCount(3);
+        Http::assertSent(fn (Request $request) => str_ends_with($request->url(), '/transactions')
+            && $request->hasHeader('Authorization', 'Bearer token-1'));
+
+        $stats = app(GatewayTokenCache::class)->stats('gateway1');
+        $this->assertEquals(1, $stats['hits']);
+        $this->assertEquals(1, $stats['misses']);
+        $this->assertEquals(1, $stats['refreshes']);
+    }
+
+    #[Test]
+    public function it_logs_in_again_and_retries_when_the_token_is_rejected()
+    {
+        Http::fake([
+            '*/login' => Http::sequence()
+                ->push(['token' => 'expired'])
+                ->push(['token' => 'fresh']),
+            '*/transactions' => function (Request $request) {
+                return $request->hasHeader('Authorization', 'Bearer fresh')
+                    ? Http::response(['id' => 'ext-2'])
+                    : Http::response(['message' => 'Unauthorized'], 401);
+            },
+        ]);
+
+        $response = (new Gateway1())->pay($this->paymentData());
+
+        $this->assertEquals('ext-2', $response['id']);
+        Http::assertSentCount(4);
+
+        $stats = app(GatewayTokenCache::class)->stats('gateway1');
+        $this->assertEquals(2, $stats['refreshes']);
+        $this->assertEquals(1, $stats['invalidations']);
+        $this->assertTrue($stats['cached']);
+    }
+
+    #[Test]
+    public function it_does_not_cache_a_failed_login()
+    {
+        Http::fake([
+            '*/login' => Http::response(['message' => 'Invalid credentials'], 401),
+        ]);
+
+        try {
+            (new Gateway1())->pay($this->paymentData());
+            $this->fail('Era esperada uma exceção de autenticação');
+        } catch (\Exception $e) {
+            $this->assertEquals('Failed to authenticate with Gateway 1', $e->getMessage());
+        }
+
+        $this->assertFalse(app(GatewayTokenCache::class)->stats('gateway1')['cached']);
+    }
+
+    private function paymentData(): array
+    {
+        return [
+            'amount' => 1000,
+            'name' => 'Cliente Teste',
+            'email' => 'cliente@example.com',
+            'card_number' => '5569000000006063',
+            'cvv' => '010',
+        ];
+    }
+}
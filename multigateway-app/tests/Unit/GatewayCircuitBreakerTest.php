@@ -0,0 +1,152 @@
+<?php
+
+namespace Tests\Unit;
+
+use App\Services\Payment\Gateway1;
+use App\Services\Payment\Gateway2;
+use App\Services\Payment\GatewayCircuitBreaker;
+use App\Services\Payment\PaymentService;
+use Illuminate\Support\Carbon;
+use Mockery;
+use PHPUnit\Framework\Attributes\Test;
+use Tests\TestCase;
+
+class GatewayCircuitBreakerTest extends TestCase
+{
+    protected $breaker;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        config([
+            'services.gateway_circuit_breaker.failure_threshold' => 3,
+            'services.gateway_circuit_breaker.open_seconds' => 30,
+        ]);
+
+        $this->breaker = new GatewayCircuitBreaker('array');
+        $this->app->instance(GatewayCircuitBreaker::class, $this->breaker);
+    }
+
+    #[Test]
+    public function it_opens_after_consecutive_failures()
+    {
+        $this->recordFailures(1, 2);
+        $this->assertEquals(GatewayCircuitBreaker::CLOSED, $this->state(1));
+
+        $this->recordFailures(1, 1);
+        $this->assertEquals(GatewayCircuitBreaker::OPEN, $this->state(1));
+
+        $order = $this->breaker->order($this->gateways());
+        $this->assertEquals([2, 1], array_column($order, 'id'));
+    }
+
+    #[Test]
+    public function it_ignores_declined_payments_and_resets_on_success()
+    {
+        $this->recordFailures(1, 2);
+        $this->breaker->record(1, 'success', ['message' => 'Cartão recusado'], 120);
+        $this->breaker->record(1, 'success', ['id' => 'ext-1'], 120);
+        $this->recordFailures(1, 2);
+
+        $this->assertEquals(GatewayCircuitBreaker::CLOSED, $this->state(1));
+        $this->assertEquals(2, $this->breaker->states([1])[1]['consecutive_failures']);
+    }
+
+    #[Test]
+    public function it_lets_a_single_probe_through_when_half_open()
+    {
+        $this->recordFailures(1, 3);
+        Carbon::setTestNow(now()->addSeconds(31));
+
+        $this->assertEquals(GatewayCircuitBreaker::HALF_OPEN, $this->state(1));
+
+        // Só a primeira compra testa o gateway na sua posição de prioridade
+        $this->assertEquals([1, 2], array_column($this->breaker->order($this->gateways()), 'id'));
+        $this->assertEquals([2, 1], array_column($this->breaker->order($this->gateways()), 'id'));
+
+        $this->breaker->record(1, 'success', ['id' => 'ext-1'], 150);
+        $this->assertEquals(GatewayCircuitBreaker::CLOSED, $this->state(1));
+
+        Carbon::setTestNow();
+    }
+
+    #[Test]
+    public function it_reopens_when_the_probe_fails()
+    {
+        $this->recordFailures(1, 3);
+        Carbon::setTestNow(now()->addSeconds(31));
+
+        $this->breaker->order($this->gateways());
+        $this->recordFailures(1, 1);
+
+        $this->assertEquals(GatewayCircuitBreaker::OPEN, $this->state(1));
+
+        Carbon::setTestNow();
+    }
+
+    #[Test]
+    public function it_counts_slow_calls_as_failures()
+    {
+        config(['services.gateway_circuit_breaker.slow_call_ms' => 1000]);
+        $breaker = new GatewayCircuitBreaker('array');
+
+        foreach (range(1, 3) as $i) {
+            $breaker->record(1, 'success', ['id' => "ext-{$i}"], 2500);
+        }
+
+        $this->assertEquals(GatewayCircuitBreaker::OPEN, $breaker->states([1])[1]['state']);
+    }
+
+    #[Test]
+    public function payment_service_tries_an_open_gateway_last()
+    {
+        $this->recordFailures(1, 3);
+
+        $mockGateway1 = Mockery::mock(Gateway1::class);
+        $mockGateway1->shouldNotReceive('pay');
+
+        $mockGateway2 = Mockery::mock(Gateway2::class);
+        $mockGateway2->shouldReceive('pay')->once()->andReturn(['transactionId' => 'ext-2']);
+
+        $result = (new PaymentService([
+            ['id' => 1, 'instance' => $mockGateway1],
+            ['id' => 2, 'instance' => $mockGateway2],
+        ]))->processPayment([
+            'amount' => 1000,
+            'name' => 'Cliente Teste',
+            'email' => 'cliente@example.com',
+            'card_number' => '5569000000006063',
+            'cvv' => '010',
+        ]);
+
+        $this->assertTrue($result['success']);
+        $this->assertEquals(2, $result['gateway_id']);
+    }
+
+    private function recordFailures(int $gatewayId, int $times): void
+    {
+        foreach (range(1, $times) as $i) {
+            $this->breaker->record($gatewayId, 'error', ['message' => 'Connection refused'], 50);
+        }
+    }
+
+    private function state(int $gatewayId): string
+    {
+        return $this->breaker->states([$gatewayId])[$gatewayId]['state'];
+    }
+
+    private function gateways(): array
+    {
+        return [
+            ['id' => 1, 'instance' => null],
+            ['id' => 2, 'instance' => null],
+        ];
+    }
+
+    protected function tearDown(): void
+    {
+        Mockery::close();
+        parent::tearDown();
+    }
+}
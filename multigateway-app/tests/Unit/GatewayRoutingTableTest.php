@@ -0,0 +1,82 @@
+<?php
+
+namespace Tests\Unit;
+
+use App\Models\Gateway;
+use App\Services\Payment\GatewayRoutingTable;
+use Illuminate\Foundation\Testing\DatabaseTransactions;
+use Illuminate\Support\Facades\DB;
+use PHPUnit\Framework\Attributes\Test;
+use Tests\TestCase;
+
+class GatewayRoutingTableTest extends TestCase
+{
+    use DatabaseTransactions;
+
+    protected $routingTable;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->routingTable = new GatewayRoutingTable('array', 60);
+        $this->app->instance(GatewayRoutingTable::class, $this->routingTable);
+
+        // Começar de uma versão nova, sem a tabela de testes anteriores
+        $this->routingTable->invalidate();
+    }
+
+    #[Test]
+    public function it_queries_the_database_only_on_a_miss()
+    {
+        $expected = Gateway::where('is_active', true)->orderBy('priority')->pluck('id')->all();
+
+        DB::enableQueryLog();
+        $first = $this->routingTable->activeGateways();
+        $second = $this->routingTable->activeGateways();
+        $queries = DB::getQueryLog();
+        DB::disableQueryLog();
+
+        $this->assertEquals($expected, $first->pluck('id')->all());
+        $this->assertEquals($expected, $second->pluck('id')->all());
+        $this->assertCount(1, $queries);
+
+        $stats = $this->routingTable->stats();
+        $this->assertEquals(1, $stats['misses']);
+        $this->assertGreaterThanOrEqual(1, $stats['local_hits']);
+    }
+
+    #[Test]
+    public function it_is_invalidated_when_a_gateway_is_toggled()
+    {
+        $gateway = Gateway::create([
+            'name' => 'Gateway Roteamento',
+            'type' => 'gateway2',
+            'is_active' => true,
+            'priority' => 99,
+        ]);
+
+        $this->assertContains($gateway->id, $this->routingTable->activeGateways()->pluck('id'));
+
+        $gateway->is_active = false;
+        $gateway->save();
+
+        $this->assertNotContains($gateway->id, $this->routingTable->activeGateways()->pluck('id'));
+    }
+
+    #[Test]
+    public function it_follows_the_new_order_after_a_bulk_priority_update()
+    {
+        $before = $this->routingTable->activeGateways()->pluck('id')->all();
+        $version = $this->routingTable->stats()['version'];
+
+        // Atualização em massa: não dispara eventos de modelo
+        foreach (array_reverse($before) as $index => $id) {
+            Gateway::where('id', $id)->update(['priority' => 1000 + $index]);
+        }
+        $this->routingTable->invalidate();
+
+        $this->assertGreaterThan($version, $this->routingTable->stats()['version']);
+        $this->assertEquals(array_reverse($before), $this->routingTable->activeGateways()->pluck('id')->all());
+    }
+}
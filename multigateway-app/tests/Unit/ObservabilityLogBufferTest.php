@@ -0,0 +1,160 @@
+<?php
+
+namespace Tests\Unit;
+
+use App\Logging\ObservabilityLogBuffer;
+use App\Logging\RequestContextProcessor;
+use App\Models\Client;
+use App\Models\Gateway;
+use App\Models\Product;
+use App\Models\Transaction;
+use App\Models\User;
+use Illuminate\Foundation\Testing\DatabaseTransactions;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Log\Logger;
+use Illuminate\Support\Facades\Log;
+use Mockery;
+use Monolog\Handler\TestHandler;
+use Monolog\Level;
+use Monolog\Logger as MonologLogger;
+use PHPUnit\Framework\Attributes\Test;
+use Tests\TestCase;
+
+class ObservabilityLogBufferTest extends TestCase
+{
+    use DatabaseTransactions;
+
+    #[Test]
+    public function listeners_do_not_query_the_database()
+    {
+        $transaction = $this->createTransaction();
+
+        DB::enableQueryLog();
+        event('gateway.request', [$transaction->gateway_id, 'payment', ['amount' => 1500, 'card_number' => '5569000000006063', 'cvv' => '010']]);
+        event('gateway.response', [$transaction->gateway_id, 'payment', 'success', ['id' => 'ext-1'], 120.5]);
+        event('transaction.processed', [$transaction->id, 'COMPLETED', $transaction->gateway_id, 180.2]);
+        $queries = DB::getQueryLog();
+        DB::disableQueryLog();
+
+        $this->assertCount(0, $queries);
+    }
+
+    #[Test]
+    public function it_enriches_and_writes_the_batch_on_flush()
+    {
+        $transaction = $this->createTransaction();
+        $buffer = app(ObservabilityLogBuffer::class);
+        [$gatewayHandler, $transactionHandler] = $this->fakeChannels();
+
+        $buffer->gatewayRequest($transaction->gateway_id, 'payment', ['card_number' => '5569000000006063', 'cvv' => '010']);
+        $buffer->gatewayResponse($transaction->gateway_id, 'payment', 'success', ['id' => 'ext-1'], 120.5);
+        $buffer->transactionProcessed($transaction->id, 180.2);
+
+        $this->assertCount(0, $gatewayHandler->getRecords());
+
+        $buffer->flush();
+
+        $this->assertTrue($gatewayHandler->hasRecordThatPasses(
+            fn ($record) => $record->message === 'Gateway request'
+                && $record->context['gateway']['name'] === 'Gateway Observabilidade'
+                && $record->context['request_data']['card_number'] === '****6063'
+                && $record->context['request_data']['cvv'] === '***',
+            Level::Info
+        ));
+        $this->assertTrue($gatewayHandler->hasInfoThatContains('Gateway response'));
+
+        $this->assertTrue($transactionHandler->hasRecordThatPasses(
+            fn ($record) => $record->message === 'Transaction processed'
+                && $record->context['transaction_id'] == $transaction->id
+                && $record->context['gateway']['type'] === 'gateway2'
+                && $record->context['client']['email'] === 'observabilidade@example.com'
+                && $record->context['products'][0]['quantity'] == 3
+                && $record->context['products'][0]['subtotal'] == 1500,
+            Level::Info
+        ));
+    }
+
+    #[Test]
+    public function records_keep_the_time_of_the_event()
+    {
+        $buffer = app(ObservabilityLogBuffer::class);
+        [$gatewayHandler] = $this->fakeChannels();
+
+        $before = microtime(true);
+        $buffer->gatewayResponse(1, 'payment', 'success', ['id' => 'ext-1'], 120.5);
+        $after = microtime(true);
+
+        usleep(50000);
+        $buffer->flush();
+
+        $time = (float) $gatewayHandler->getRecords()[0]->datetime->format('U.u');
+
+        // Mesmo instante do evento, com microssegundos, e não o do flush 50 ms depois
+        $this->assertGreaterThanOrEqual($before - 0.000001, $time);
+        $this->assertLessThanOrEqual($after + 0.000001, $time);
+    }
+
+    #[Test]
+    public function records_keep_the_user_of_the_event()
+    {
+        $buffer = app(ObservabilityLogBuffer::class);
+        [$gatewayHandler] = $this->fakeChannels();
+
+        $this->actingAs((new User())->forceFill(['id' => 7, 'email' => 'cliente@example.com']));
+        $buffer->gatewayResponse(1, 'payment', 'success', ['id' => 'ext-1'], 120.5);
+
+        // O flush acontece depois, com outro usuário autenticado
+        $this->actingAs((new User())->forceFill(['id' => 8, 'email' => 'outro@example.com']));
+        $buffer->flush();
+
+        $this->assertEquals(7, $gatewayHandler->getRecords()[0]->extra['user']['id']);
+    }
+
+    /**
+     * Canais gateways e transactions gravando em TestHandlers, com o contexto de requisição dos canais reais
+     *
+     * @return TestHandler[] [gateways, transactions]
+     */
+    private function fakeChannels(): array
+    {
+        $gatewayHandler = new TestHandler();
+        $transactionHandler = new TestHandler();
+
+        Log::shouldReceive('channel')->with('gateways')
+            ->andReturn(new Logger(new MonologLogger('gateways', [$gatewayHandler], [new RequestContextProcessor()])));
+        Log::shouldReceive('channel')->with('transactions')
+            ->andReturn(new Logger(new MonologLogger('transactions', [$transactionHandler], [new RequestContextProcessor()])));
+
+        return [$gatewayHandler, $transactionHandler];
+    }
+
+    private function createTransaction(): Transaction
+    {
+        $gateway = Gateway::create([
+            'name' => 'Gateway Observabilidade',
+            'type' => 'gateway2',
+            'is_active' => false,
+            'priority' => 99,
+        ]);
+        $client = Client::create(['name' => 'Cliente Observabilidade', 'email' => 'observabilidade@example.com']);
+        $product = Product::create(['name' => 'Produto Observabilidade', 'amount' => 500]);
+
+        $transaction = Transaction::create([
+            'client_id' => $client->id,
+            'gateway_id' => $gateway->id,
+            'external_id' => 'ext-observabilidade',
+            'status' => 'COMPLETED',
+            'amount' => 1500,
+            'card_last_numbers' => '6063',
+        ]);
+        $transaction->products()->attach($product->id, ['quantity' => 3]);
+
+        return $transaction;
+    }
+
+    protected function tearDown(): void
+    {
+        Mockery::close();
+        parent::tearDown();
+    }
+}
@@ -0,0 +1,189 @@
+<?php
+
+namespace Tests\Unit;
+
+use App\Services\Payment\Gateway1;
+use App\Services\Payment\Gateway2;
+use App\Services\Payment\GatewayTokenCache;
+use App\Services\Payment\PaymentService;
+use Illuminate\Http\Client\Request;
+use Illuminate\Support\Facades\Event;
+use Illuminate\Support\Facades\Http;
+use PHPUnit\Framework\Attributes\Test;
+use Symfony\Component\Process\Process;
+use Tests\TestCase;
+
+class PaymentServiceHedgingTest extends TestCase
+{
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->app->instance(GatewayTokenCache::class, new GatewayTokenCache('array', 60));
+
+        // Orçamento zero: o segundo envio sai junto com o principal
+        config([
+            'services.payment_hedging.enabled' => true,
+            'services.payment_hedging.default_budget_ms' => 0,
+            'services.payment_hedging.min_budget_ms' => 0,
+        ]);
+
+        Event::fake(['gateway.request', 'gateway.response']);
+    }
+
+    #[Test]
+    public function it_refunds_the_loser_when_both_gateways_charge()
+    {
+        Http::fake([
+            '*/login' => Http::response(['token' => 'token-1']),
+            '*/transactions' => Http::response(['id' => 'ext-1']),
+            '*/transacoes/reembolso' => Http::response(['id' => 'ext-2', 'status' => 'charged_back']),
+            '*/transacoes' => Http::response(['id' => 'ext-2']),
+        ]);
+
+        $service = $this->paymentService();
+        $result = $service->processPayment($this->paymentData());
+
+        $this->assertTrue($result['success']);
+        $this->assertEquals(1, $result['gateway_id']);
+        $this->assertEquals('ext-1', $result['external_id']);
+        $this->assertFalse($result['hedged']);
+
+        // O estorno só acontece ao final da requisição
+        Http::assertNotSent(fn (Request $request) => str_ends_with($request->url(), '/transacoes/reembolso'));
+
+        $service->settleHedgeAttempts();
+
+        Http::assertSent(fn (Request $request) => str_ends_with($request->url(), '/transacoes/reembolso')
+            && $request['id'] === 'ext-2');
+        Event::assertDispatched('gateway.request', fn ($event, $payload) => $payload[1] === 'refund'
+            && $payload[2]['reason'] === 'hedge_loser');
+    }
+
+    #[Test]
+    public function it_returns_the_second_gateway_when_the_primary_fails()
+    {
+        Http::fake([
+            '*/login' => Http::response(['token' => 'token-1']),
+            '*/transactions' => Http::response(['message' => 'Erro interno'], 500),
+            '*/transacoes' => Http::response(['id' => 'ext-2']),
+        ]);
+
+        $service = $this->paymentService();
+        $result = $service->processPayment($this->paymentData());
+        $service->settleHedgeAttempts();
+
+        $this->assertTrue($result['success']);
+        $this->assertEquals(2, $result['gateway_id']);
+        $this->assertEquals('ext-2', $result['external_id']);
+        $this->assertTrue($result['hedged']);
+
+        Http::assertSentCount(3);
+        Event::assertDispatched('gateway.response', fn ($event, $payload) => $payload[0] === 1
+            && $payload[2] === 'error');
+    }
+
+    #[Test]
+    public function it_reports_both_errors_when_no_gateway_charges()
+    {
+        Http::fake([
+            '*/login' => Http::response(['token' => 'token-1']),
+            '*/transactions' => Http::response(['message' => 'Cartão recusado'], 422),
+            '*/transacoes' => Http::response(['mensagem' => 'Cartão recusado'], 422),
+        ]);
+
+        $result = $this->paymentService()->processPayment($this->paymentData());
+
+        $this->assertFalse($result['success']);
+        $this->assertCount(2, $result['errors']);
+        Http::assertSentCount(3);
+    }
+
+    #[Test]
+    public function a_fast_primary_success_sends_no_hedge_request()
+    {
+        // Gateways num servidor HTTP real, sem Http::fake(): o handler curl é o de produção
+        [$server, $url, $requestLog] = $this->startGatewayServer();
+
+        try {
+            config([
+                'services.gateway1.url' => $url,
+                'services.gateway2.url' => $url,
+                'services.payment_hedging.default_budget_ms' => 1000,
+                'services.payment_hedging.min_budget_ms' => 1000,
+            ]);
+
+            $service = $this->paymentService();
+            $result = $service->processPayment($this->paymentData());
+            $service->settleHedgeAttempts();
+
+            $this->assertTrue($result['success']);
+            $this->assertEquals(1, $result['gateway_id']);
+            $this->assertFalse($result['hedged']);
+            $this->assertLessThan(1000, $result['processing_time_ms']);
+
+            $requests = file($requestLog, FILE_IGNORE_NEW_LINES);
+            $this->assertContains('POST /transactions', $requests);
+            $this->assertNotContains('POST /transacoes', $requests);
+            Event::assertNotDispatched('gateway.request', fn ($event, $payload) => $payload[0] === 2);
+        } finally {
+            $server->stop();
+            @unlink($requestLog);
+        }
+    }
+
+    /**
+     * Sobe o router de tests/Fixtures/gateway-server.php numa porta livre
+     *
+     * @return array [Process, URL base, arquivo com as requisições recebidas]
+     */
+    private function startGatewayServer(): array
+    {
+        $socket = stream_socket_server('tcp://127.0.0.1:0');
+        $address = stream_socket_get_name($socket, false);
+        fclose($socket);
+
+        $requestLog = tempnam(sys_get_temp_dir(), 'gateway-server');
+        $server = new Process(
+            [PHP_BINARY, '-S', $address, base_path('tests/Fixtures/gateway-server.php')],
+            null,
+            ['GATEWAY_SERVER_LOG' => $requestLog]
+        );
+        $server->start();
+
+        [$host, $port] = explode(':', $address);
+        $deadline = microtime(true) + 5;
+
+        while (!($connection = @fsockopen($host, (int) $port)) && microtime(true) < $deadline) {
+            usleep(50000);
+        }
+
+        if (!$connection) {
+            $server->stop();
+            $this->markTestSkipped('Servidor embutido do PHP não subiu');
+        }
+
+        fclose($connection);
+
+        return [$server, "http://{$address}", $requestLog];
+    }
+
+    private function paymentService(): PaymentService
+    {
+        return new PaymentService([
+            ['id' => 1, 'instance' => new Gateway1()],
+            ['id' => 2, 'instance' => new Gateway2()],
+        ]);
+    }
+
+    private function paymentData(): array
+    {
+        return [
+            'amount' => 1000,
+            'name' => 'Cliente Teste',
+            'email' => 'cliente@example.com',
+            'card_number' => '5569000000006063',
+            'cvv' => '010',
+        ];
+    }
+}
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+MySQL Probe
+-----------
+Sonda curta no estilo do sysbench para o serviço `db`: confere se a
+configuração gerada pelo setup.py (docker/mysql/conf.d/zz-host.cnf) está em
+vigor e mede inserções e consultas concorrentes sobre uma cópia vazia da
+tabela `transactions` (CREATE TABLE ... LIKE, com os mesmos índices).
+
+A carga roda em procedures no próprio servidor, com o tempo medido pelo
+MySQL (NOW(6)); o custo do `docker compose exec` fica fora da medição. A
+base temporária `mysql_probe` é removida ao final.
+
+Uso:
+  python mysql_probe.py
+  python mysql_probe.py --threads 8 --rows 5000 --selects 20000
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+PROBE_DATABASE = "mysql_probe"
+MYSQL_CONFIG_FILE = "docker/mysql/conf.d/zz-host.cnf"
+
+# Variáveis conferidas contra o arquivo gerado
+CHECKED_VARIABLES = [
+    "innodb_buffer_pool_size",
+    "innodb_buffer_pool_instances",
+    "innodb_redo_log_capacity",
+    "max_connections",
+    "thread_cache_size",
+    "table_open_cache",
+    "table_open_cache_instances",
+    "innodb_flush_log_at_trx_commit",
+    "innodb_flush_method",
+    "innodb_io_capacity",
+]
+
+PROCEDURES = """
+DELIMITER //
+CREATE PROCEDURE probe_insert(IN total INT, IN batch INT)
+BEGIN
+    DECLARE i INT DEFAULT 0;
+    START TRANSACTION;
+    WHILE i < total DO
+        INSERT INTO transactions
+            (client_id, gateway_id, external_id, status, amount,
+             card_last_numbers, created_at, updated_at)
+        VALUES
+            (1 + FLOOR(RAND() * 1000), 1 + (i % 2), UUID(), 'COMPLETED',
+             100 + FLOOR(RAND() * 100000), '6063', NOW(), NOW());
+        SET i = i + 1;
+        IF i % batch = 0 THEN
+            COMMIT;
+            START TRANSACTION;
+        END IF;
+    END WHILE;
+    COMMIT;
+END //
+CREATE PROCEDURE probe_select(IN total INT)
+BEGIN
+    DECLARE i INT DEFAULT 0;
+    DECLARE max_id BIGINT;
+    DECLARE found BIGINT;
+    SELECT MAX(id) INTO max_id FROM transactions;
+    WHILE i < total DO
+        IF i % 2 = 0 THEN
+            -- Busca pontual por chave primária (GET /transactions/{id})
+            SELECT amount INTO found FROM transactions
+            WHERE id = 1 + FLOOR(RAND() * max_id);
+        ELSE
+            -- Últimas transações de um cliente (GET /clients/{id}/transactions)
+            SELECT COUNT(*) INTO found FROM (
+                SELECT id FROM transactions
+                WHERE client_id = 1 + FLOOR(RAND() * 1000) AND deleted_at IS NULL
+                ORDER BY created_at DESC LIMIT 10) AS recent;
+        END IF;
+        SET i = i + 1;
+    END WHILE;
+END //
+DELIMITER ;
+"""
+
+
+# Cores para formatação no terminal
+class Colors:
+    """Define cores para saídas no terminal."""
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[0;33m'
+    BLUE = '\033[0;34m'
+    RESET = '\033[0m'  # No Color
+
+
+def log_info(message):
+    """Exibe mensagem informativa."""
+    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}")
+
+
+def log_warning(message):
+    """Exibe mensagem de aviso."""
+    print(f"{Colors.YELLOW}[WARNING]{Colors.RESET} {message}")
+
+
+def log_error(message):
+    """Exibe mensagem de erro."""
+    print(f"{Colors.RED}[ERROR]{Colors.RESET} {message}")
+
+
+def mysql_command(docker_compose):
+    """Cliente mysql como root dentro do contêiner db, lendo SQL da entrada padrão."""
+    return (f"{docker_compose} exec -T db sh -c "
+            "'exec mysql -uroot -p\"$MYSQL_ROOT_PASSWORD\" --batch --skip-column-names'")
+
+
+def run_sql(docker_compose, sql):
+    """
+    Executa SQL no serviço db.
+
+    Returns:
+        str: Saída do cliente mysql
+
+    Raises:
+        RuntimeError: Se o cliente terminar com erro
+    """
+    result = subprocess.run(mysql_command(docker_compose), shell=True, input=sql,
+                            capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if "password" not in line]
+        raise RuntimeError("; ".join(errors) or f"mysql terminou com código {result.returncode}")
+    return result.stdout
+
+
+def run_concurrently(docker_compose, scripts):
+    """
+    Executa um script SQL por conexão, todos ao mesmo tempo.
+
+    Cada script termina com um SELECT do tempo gasto em microssegundos.
+
+    Returns:
+        list: Tempo de cada conexão em segundos
+    """
+    processes = [
+        subprocess.Popen(mysql_command(docker_compose), shell=True, text=True,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                         stderr=subprocess.PIPE)
+        for _ in scripts
+    ]
+    elapsed = []
+    for process, script in zip(processes, scripts):
+        stdout, stderr = process.communicate(script)
+        lines = stdout.split()
+        if process.returncode != 0 or not lines or not lines[-1].isdigit():
+            errors = [line for line in stderr.splitlines() if "password" not in line]
+            raise RuntimeError("; ".join(errors) or "resposta inválida do mysql")
+        elapsed.append(int(lines[-1]) / 1_000_000)
+    return elapsed
+
+
+def to_bytes(value):
+    """Converte valores como 512M ou 2G em bytes; demais valores ficam como texto."""
+    value = str(value).strip()
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if value[:-1].isdigit() and value[-1].upper() in units:
+        return str(int(value[:-1]) * units[value[-1].upper()])
+    return value
+
+
+def expected_settings(path=MYSQL_CONFIG_FILE):
+    """Lê as variáveis conferidas do arquivo gerado pelo setup.py."""
+    expected = {}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                if "=" in line and not line.lstrip().startswith("#"):
+                    key, value = (part.strip() for part in line.split("=", 1))
+                    if key in CHECKED_VARIABLES:
+                        expected[key] = to_bytes(value)
+    except FileNotFoundError:
+        pass
+    return expected
+
+
+def check_settings(docker_compose):
+    """
+    Compara as variáveis em vigor no servidor com o arquivo gerado.
+
+    Returns:
+        dict: variável -> {"expected", "actual", "ok"}
+    """
+    names = ", ".join(f"'{name}'" for name in CHECKED_VARIABLES)
+    output = run_sql(docker_compose,
+                     f"SHOW GLOBAL VARIABLES WHERE Variable_name IN ({names});")
+    actual = dict(line.split("\t", 1) for line in output.splitlines() if "\t" in line)
+    expected = expected_settings()
+    return {
+        name: {"expected": expected.get(name), "actual": actual.get(name),
+               "ok": name not in expected or expected[name] == actual.get(name)}
+        for name in CHECKED_VARIABLES
+    }
+
+
+def source_database(env_file=".env"):
+    """Nome da base da aplicação (DB_DATABASE do .env)."""
+    try:
+        with open(env_file, "r") as f:
+            for line in f:
+                if line.startswith("DB_DATABASE="):
+                    return line.split("=", 1)[1].strip().strip('"')
+    except FileNotFoundError:
+        pass
+    return "multigateway-db"
+
+
+def run_probe(docker_compose, threads=4, rows=2000, selects=5000, batch=1, keep=False):
+    """
+    Executa a sonda completa: conferência da configuração, inserções e consultas.
+
+    Args:
+        docker_compose: Comando do Docker Compose
+        threads: Conexões simultâneas
+        rows: Inserções por conexão
+        selects: Consultas por conexão
+        batch: Inserções por commit (1 = um commit por compra, como a aplicação)
+        keep: Mantém a base mysql_probe ao final
+
+    Returns:
+        dict: Resultado da sonda
+    """
+    settings = check_settings(docker_compose)
+
+    log_info(f"Criando {PROBE_DATABASE}.transactions a partir de "
+             f"{source_database()}.transactions...")
+    run_sql(docker_compose, (
+        f"DROP DATABASE IF EXISTS {PROBE_DATABASE};\n"
+        f"CREATE DATABASE {PROBE_DATABASE};\n"
+        f"USE {PROBE_DATABASE};\n"
+        f"CREATE TABLE transactions LIKE `{source_database()}`.transactions;\n"
+        + PROCEDURES))
+
+    try:
+        phases = {}
+        for phase, call, operations in [
+            ("insert", f"CALL probe_insert({rows}, {max(1, batch)});", rows),
+            ("select", f"CALL probe_select({selects});", selects),
+        ]:
+            log_info(f"Fase {phase}: {threads} conexões x {operations} operações...")
+            script = (f"USE {PROBE_DATABASE};\nSET @t = NOW(6);\n{call}\n"
+                      "SELECT TIMESTAMPDIFF(MICROSECOND, @t, NOW(6));\n")
+            elapsed = run_concurrently(docker_compose, [script] * threads)
+            total_operations = operations * threads
+            wall = max(elapsed)
+            phases[phase] = {
+                "operations": total_operations,
+                "seconds": round(wall, 3),
+                "per_second": round(total_operations / wall, 1) if wall else None,
+                "mean_ms": round(sum(elapsed) / total_operations * 1000, 3),
+            }
+    finally:
+        if not keep:
+            run_sql(docker_compose, f"DROP DATABASE IF EXISTS {PROBE_DATABASE};")
+
+    return {"threads": threads, "batch": batch, "settings": settings, "phases": phases}
+
+
+def print_probe(result):
+    """Exibe a conferência da configuração e as medições."""
+    print(f"\n{Colors.BLUE}=== CONFIGURAÇÃO DO MYSQL ==={Colors.RESET}")
+    for name, check in result["settings"].items():
+        mark = (f"{Colors.GREEN}ok{Colors.RESET}" if check["ok"]
+                else f"{Colors.RED}diferente do gerado ({check['expected']}){Colors.RESET}")
+        print(f"{name:<32} {check['actual'] or '-':<20} {mark}")
+
+    print(f"\n{Colors.BLUE}=== SONDA ({result['threads']} conexões, "
+          f"{result['batch']} inserção(ões) por commit) ==={Colors.RESET}")
+    for phase, summary in result["phases"].items():
+        print(f"{phase:<7} {summary['operations']:>8} op em {summary['seconds']:>7.2f}s  "
+              f"{summary['per_second'] or 0:>10.1f} op/s  média {summary['mean_ms']:.3f}ms")
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Sonda de inserções e consultas no MySQL do serviço db")
+    parser.add_argument("--compose", default="docker compose",
+                        help="Comando do Docker Compose (padrão: docker compose)")
+    parser.add_argument("--threads", type=int, default=4,
+                        help="Conexões simultâneas (padrão: 4)")
+    parser.add_argument("--rows", type=int, default=2000,
+                        help="Inserções por conexão (padrão: 2000)")
+    parser.add_argument("--selects", type=int, default=5000,
+                        help="Consultas por conexão (padrão: 5000)")
+    parser.add_argument("--batch", type=int, default=1,
+                        help="Inserções por commit (padrão: 1)")
+    parser.add_argument("--keep", action="store_true",
+                        help=f"Mantém a base {PROBE_DATABASE} ao final")
+    parser.add_argument("--json", action="store_true",
+                        help="Imprime o resultado em JSON")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+    try:
+        result = run_probe(options.compose, options.threads, options.rows,
+                           options.selects, options.batch, options.keep)
+    except RuntimeError as e:
+        log_error(f"Falha na sonda: {e}")
+        sys.exit(1)
+
+    if options.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print_probe(result)
+    if not all(check["ok"] for check in result["settings"].values()):
+        log_warning(f"Há variáveis diferentes de {MYSQL_CONFIG_FILE}: "
+                    "reinicie o serviço db para aplicar a configuração.")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
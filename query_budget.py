@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Query Budget
+------------
+Orçamento de consultas SQL por teste para o modo --query-budget do
+run_tests.py.
+
+Durante os testes, o trait Tests\\Concerns\\RecordsQueries grava uma linha
+JSON por teste com as consultas executadas e o endpoint de cada uma. Este
+módulo agrega as consultas por teste e por endpoint, compara com a linha de
+base (.query-budget.json) e aponta:
+
+  - testes que passaram a executar mais consultas que o orçamento;
+  - fingerprints repetidos mais de K vezes na mesma requisição ou, fora de
+    requisições, no mesmo teste (padrão N+1).
+Seguindo as diretrizes do PEP 8.
+"""
+
+import json
+import os
+from collections import Counter
+
+from slow_query_analyzer import fingerprint
+
+# Escopo das consultas executadas fora de uma requisição HTTP do teste
+NO_ENDPOINT = "(fora de requisição)"
+
+
+class TestQueries:
+    """Consultas de um teste."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.time_ms = 0.0
+        self.repeats = {}   # escopo -> Counter de fingerprints
+        self.requests = {}  # endpoint -> requisições
+
+    def add(self, sql, time_ms, endpoint):
+        """Acrescenta uma consulta."""
+        self.count += 1
+        self.time_ms += time_ms
+        scope = endpoint or NO_ENDPOINT
+        self.repeats.setdefault(scope, Counter())[fingerprint(sql)] += 1
+
+    def worst_repeats(self, limit):
+        """
+        Fingerprints repetidos acima do limite.
+
+        Nas requisições, a contagem é dividida pelas requisições ao endpoint,
+        para que um teste que chama o mesmo endpoint várias vezes não seja
+        confundido com N+1.
+
+        Returns:
+            list: (escopo, fingerprint, repetições por requisição)
+        """
+        found = []
+        for scope, counter in self.repeats.items():
+            requests = max(1, self.requests.get(scope, 1))
+            for text, count in counter.items():
+                per_request = count / requests
+                if per_request > limit:
+                    found.append((scope, text, per_request))
+        return sorted(found, key=lambda item: item[2], reverse=True)
+
+
+def load_query_log(path):
+    """
+    Lê o arquivo gravado pelo RecordsQueries.
+
+    Returns:
+        tuple: (dict teste -> TestQueries, dict endpoint -> métricas agregadas)
+    """
+    tests = {}
+    endpoints = {}
+    if not os.path.isfile(path):
+        return tests, endpoints
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            test = tests.get(entry["test"])
+            if test is None:
+                test = tests[entry["test"]] = TestQueries(entry["test"])
+            for endpoint, requests in (entry.get("requests") or {}).items():
+                test.requests[endpoint] = test.requests.get(endpoint, 0) + requests
+                totals = endpoints.setdefault(endpoint, {"requests": 0, "queries": 0, "time_ms": 0.0})
+                totals["requests"] += requests
+            for sql, time_ms, endpoint in entry.get("queries", []):
+                test.add(sql, time_ms or 0.0, endpoint)
+                if endpoint:
+                    totals = endpoints.setdefault(endpoint, {"requests": 0, "queries": 0, "time_ms": 0.0})
+                    totals["queries"] += 1
+                    totals["time_ms"] += time_ms or 0.0
+    return tests, endpoints
+
+
+def load_baseline(path):
+    """Carrega a linha de base; retorna um dict vazio se ela não existir."""
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path, tests, endpoints):
+    """
+    Grava a linha de base a partir das consultas desta execução.
+
+    Testes e endpoints que não rodaram (por exemplo, com --impact ou --filter)
+    mantêm o orçamento anterior.
+    """
+    baseline = load_baseline(path)
+    baseline.setdefault("tests", {}).update(
+        (name, {"queries": test.count, "time_ms": round(test.time_ms, 3)})
+        for name, test in tests.items())
+    baseline.setdefault("endpoints", {}).update(
+        (name, {"queries_per_request": round(totals["queries"] / totals["requests"], 2)})
+        for name, totals in endpoints.items() if totals["requests"])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def find_violations(tests, baseline, repeat_limit, slack=0):
+    """
+    Compara as consultas desta execução com o orçamento.
+
+    Args:
+        tests: dict teste -> TestQueries
+        baseline: Linha de base carregada
+        repeat_limit: Repetições permitidas do mesmo fingerprint (K)
+        slack: Consultas extras toleradas sobre a linha de base
+
+    Returns:
+        tuple: (estouros de orçamento [(teste, consultas, orçamento)],
+                repetições [(teste, escopo, fingerprint, repetições)])
+    """
+    budgets = baseline.get("tests", {})
+    over_budget = []
+    repeated = []
+    for name, test in sorted(tests.items()):
+        budget = budgets.get(name)
+        if budget is not None and test.count > budget["queries"] + slack:
+            over_budget.append((name, test.count, budget["queries"]))
+        for scope, text, count in test.worst_repeats(repeat_limit):
+            repeated.append((name, scope, text, count))
+    return over_budget, repeated
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Queue Workers
+-------------
+Gerencia os workers da fila de pagamentos (serviço `queue` do
+docker-compose.yml, que executa `php artisan queue:work` na fila
+PURCHASE_QUEUE, padrão `payments`) e compara a vazão da compra síncrona
+com a da compra assíncrona.
+
+Subcomandos:
+  start N    sobe o serviço com N workers
+  scale N    altera a quantidade de workers em execução
+  stop       para todos os workers
+  status     workers em execução e jobs pendentes na fila
+  bench      mede POST /api/purchase uma vez e POST /api/purchase/async
+             para cada quantidade de workers em --workers, usando o loadtest.py
+
+Uso:
+  python queue_workers.py start 4
+  python queue_workers.py bench --workers 1,2,4,8 --concurrency 20 --duration 30
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import loadtest
+from latency_histogram import format_percentiles
+
+SERVICE = "queue"
+DEFAULT_QUEUE = "payments"
+
+
+# Cores para formatação no terminal
+class Colors:
+    """Define cores para saídas no terminal."""
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[0;33m'
+    BLUE = '\033[0;34m'
+    RESET = '\033[0m'  # No Color
+
+
+def log_info(message):
+    """Exibe mensagem informativa."""
+    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}")
+
+
+def log_success(message):
+    """Exibe mensagem de sucesso."""
+    print(f"{Colors.GREEN}[SUCCESS]{Colors.RESET} {message}")
+
+
+def log_warning(message):
+    """Exibe mensagem de aviso."""
+    print(f"{Colors.YELLOW}[WARNING]{Colors.RESET} {message}")
+
+
+def log_error(message):
+    """Exibe mensagem de erro."""
+    print(f"{Colors.RED}[ERROR]{Colors.RESET} {message}")
+
+
+def run(command, capture=False):
+    """
+    Executa um comando do shell.
+
+    Returns:
+        subprocess.CompletedProcess
+    """
+    return subprocess.run(command, shell=True, check=False, text=True,
+                          capture_output=capture)
+
+
+def scale_workers(docker_compose, count):
+    """
+    Ajusta o serviço de workers para `count` contêineres.
+
+    Workers já em execução são mantidos (--no-recreate); com 0 o serviço é parado.
+
+    Returns:
+        bool: True se o Docker Compose concluiu sem erro
+    """
+    if count == 0:
+        return run(f"{docker_compose} stop {SERVICE}").returncode == 0
+    command = (f"{docker_compose} up -d --no-recreate --no-deps "
+               f"--scale {SERVICE}={count} {SERVICE}")
+    return run(command).returncode == 0
+
+
+def running_workers(docker_compose):
+    """Quantidade de contêineres de worker em execução."""
+    result = run(f"{docker_compose} ps -q --status running {SERVICE}", capture=True)
+    if result.returncode != 0:
+        return None
+    return len([line for line in result.stdout.splitlines() if line.strip()])
+
+
+def queue_name(env_file=".env"):
+    """
+    Fila das compras assíncronas: PURCHASE_QUEUE do ambiente ou do .env,
+    a mesma variável usada pelo docker-compose.yml e pelo job.
+    """
+    if os.environ.get("PURCHASE_QUEUE"):
+        return os.environ["PURCHASE_QUEUE"]
+    try:
+        with open(env_file, "r") as f:
+            for line in f:
+                if line.startswith("PURCHASE_QUEUE="):
+                    value = line.split("=", 1)[1].strip().strip('"')
+                    if value:
+                        return value
+    except FileNotFoundError:
+        pass
+    return DEFAULT_QUEUE
+
+
+def pending_jobs(docker_compose, queue):
+    """
+    Jobs aguardando na fila de pagamentos.
+
+    Returns:
+        int ou None se não for possível consultar
+    """
+    code = ("echo Illuminate\\\\Support\\\\Facades\\\\Queue::size('" + queue + "');")
+    result = run(f"{docker_compose} exec -T app php artisan tinker --execute=\"{code}\"",
+                 capture=True)
+    if result.returncode != 0:
+        return None
+    try:
+        return int(result.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return None
+
+
+def wait_for_drain(docker_compose, queue, timeout=120.0):
+    """
+    Aguarda a fila esvaziar entre as rodadas do benchmark.
+
+    Um tamanho desconhecido (consulta falhou) não conta como fila vazia: a
+    consulta é repetida até o prazo.
+
+    Returns:
+        bool: True se a fila esvaziou, False no fim do prazo
+    """
+    deadline = time.monotonic() + timeout
+    unknown = False
+    while time.monotonic() < deadline:
+        size = pending_jobs(docker_compose, queue)
+        if size == 0:
+            return True
+        if size is None and not unknown:
+            log_warning(f"Não foi possível consultar a fila '{queue}'; tentando novamente.")
+            unknown = True
+        time.sleep(1.0)
+    return False
+
+
+def load_options(options, async_mode):
+    """Opções do loadtest.py para uma rodada do benchmark."""
+    argv = ["--url", options.url, "--mode", "closed",
+            "--concurrency", str(options.concurrency),
+            "--duration", str(options.duration), "--warmup", str(options.warmup),
+            "--timeout", str(options.timeout), "--products", options.products,
+            "--poll-interval", str(options.poll_interval),
+            "--completion-timeout", str(options.completion_timeout)]
+    if async_mode:
+        argv.append("--async")
+    return loadtest.parse_arguments(argv)
+
+
+def summarize(label, workers, stats, async_mode):
+    """Linha do resumo comparativo."""
+    if async_mode:
+        completed = stats.outcomes["COMPLETED"]
+        completion = stats.completion
+    else:
+        completed = stats.succeeded
+        completion = stats.client
+    return {
+        "label": label,
+        "workers": workers,
+        "completed": completed,
+        "completed_rps": round(completed / stats.elapsed, 2) if stats.elapsed else 0.0,
+        "accept_p50_ms": round(stats.client.percentile(50.0) / 1000.0, 1) if stats.client.total else None,
+        "completion": format_percentiles(completion, (50.0, 99.0)) if completion.total else "-",
+        "failed": sum(count for outcome, count in stats.outcomes.items() if outcome != "COMPLETED")
+        + sum(count for status, count in stats.statuses.items() if status >= 400)
+        + sum(stats.errors.values()),
+        "result": stats.to_dict(),
+    }
+
+
+def run_benchmark(options):
+    """Executa a rodada síncrona e uma rodada assíncrona por quantidade de workers."""
+    rows = []
+
+    log_info("Compra síncrona (POST /api/purchase)...")
+    stats = asyncio.run(loadtest.run(load_options(options, False)))
+    rows.append(summarize("síncrona", "-", stats, False))
+
+    for count in options.workers:
+        log_info(f"Escalando para {count} worker(s)...")
+        if not scale_workers(options.compose, count):
+            log_error(f"Falha ao escalar o serviço {SERVICE}.")
+            sys.exit(1)
+        if not wait_for_drain(options.compose, queue_name()):
+            log_warning("A fila não esvaziou (ou não pôde ser consultada); "
+                        "a rodada pode começar com jobs pendentes.")
+
+        log_info(f"Compra assíncrona com {count} worker(s)...")
+        stats = asyncio.run(loadtest.run(load_options(options, True)))
+        rows.append(summarize("assíncrona", count, stats, True))
+
+    return rows
+
+
+def print_comparison(rows, options):
+    """Exibe a tabela comparativa do benchmark."""
+    print(f"\n{Colors.BLUE}=== SÍNCRONA x ASSÍNCRONA "
+          f"({options.concurrency} usuários, {options.duration:g}s) ==={Colors.RESET}")
+    print(f"{'modo':<12} {'workers':>7} {'concluídas':>10} {'compras/s':>10} "
+          f"{'aceite p50':>11}  {'conclusão':<28} {'falhas':>6}")
+    baseline = rows[0]["completed_rps"] or None
+    for row in rows:
+        accept = f"{row['accept_p50_ms']:.1f}ms" if row["accept_p50_ms"] is not None else "-"
+        ratio = ""
+        if baseline and row is not rows[0]:
+            ratio = f"  ({row['completed_rps'] / baseline:.2f}x)"
+        print(f"{row['label']:<12} {str(row['workers']):>7} {row['completed']:>10} "
+              f"{row['completed_rps']:>10.1f} {accept:>11}  {row['completion']:<28} "
+              f"{row['failed']:>6}{ratio}")
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Workers da fila de pagamentos e benchmark síncrono x assíncrono")
+    parser.add_argument("--compose", default="docker compose",
+                        help="Comando do Docker Compose (padrão: docker compose)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("start", "Sobe N workers"),
+                            ("scale", "Altera a quantidade de workers")):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument("count", type=int, help="Quantidade de workers")
+
+    subparsers.add_parser("stop", help="Para todos os workers")
+    subparsers.add_parser("status", help="Workers em execução e jobs pendentes")
+
+    bench = subparsers.add_parser("bench", help="Compara compra síncrona e assíncrona")
+    bench.add_argument("--workers", default="1,2,4",
+                       help="Quantidades de workers, separadas por vírgula (padrão: 1,2,4)")
+    bench.add_argument("--url", default="http://localhost:8000",
+                       help="URL base da API (padrão: http://localhost:8000)")
+    bench.add_argument("--concurrency", type=int, default=20,
+                       help="Usuários virtuais em cada rodada (padrão: 20)")
+    bench.add_argument("--duration", type=float, default=30.0,
+                       help="Duração de cada rodada em segundos (padrão: 30)")
+    bench.add_argument("--warmup", type=float, default=5.0,
+                       help="Aquecimento descartado antes de cada rodada (padrão: 5)")
+    bench.add_argument("--timeout", type=float, default=30.0,
+                       help="Timeout por requisição em segundos (padrão: 30)")
+    bench.add_argument("--products", default="1,2,3",
+                       help="IDs de produtos usados nas compras (padrão: 1,2,3)")
+    bench.add_argument("--poll-interval", type=float, default=0.2,
+                       help="Intervalo entre consultas de status (padrão: 0.2)")
+    bench.add_argument("--completion-timeout", type=float, default=60.0,
+                       help="Espera máxima pelo status final (padrão: 60)")
+    bench.add_argument("--keep-workers", action="store_true",
+                       help="Mantém a última quantidade de workers ao final")
+    bench.add_argument("--json", dest="json_path", default=None,
+                       help="Grava o resultado em um arquivo JSON")
+
+    options = parser.parse_args(argv)
+    if options.command in ("start", "scale") and options.count < 0:
+        parser.error("a quantidade de workers não pode ser negativa")
+    if options.command == "bench":
+        try:
+            options.workers = [int(value) for value in options.workers.split(",")]
+        except ValueError:
+            parser.error("--workers deve ser uma lista de inteiros, ex.: 1,2,4")
+        if any(count < 1 for count in options.workers):
+            parser.error("--workers deve ter apenas valores positivos")
+    return options
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+    print(f"{Colors.BLUE}=== WORKERS DA FILA - MULTI-GATEWAY ==={Colors.RESET}\n")
+
+    if options.command in ("start", "scale"):
+        if not scale_workers(options.compose, options.count):
+            log_error(f"Falha ao escalar o serviço {SERVICE}.")
+            sys.exit(1)
+        log_success(f"{running_workers(options.compose)} worker(s) em execução.")
+    elif options.command == "stop":
+        if not scale_workers(options.compose, 0):
+            log_error(f"Falha ao parar o serviço {SERVICE}.")
+            sys.exit(1)
+        log_success("Workers parados.")
+    elif options.command == "status":
+        workers = running_workers(options.compose)
+        queue = queue_name()
+        jobs = pending_jobs(options.compose, queue)
+        log_info(f"Workers em execução: {workers if workers is not None else 'desconhecido'}")
+        log_info(f"Jobs pendentes em '{queue}': {jobs if jobs is not None else 'desconhecido'}")
+    else:
+        previous = running_workers(options.compose)
+        try:
+            rows = run_benchmark(options)
+        except KeyboardInterrupt:
+            log_warning("Interrompido pelo usuário.")
+            sys.exit(130)
+        finally:
+            if not options.keep_workers and previous is not None:
+                scale_workers(options.compose, previous)
+
+        print_comparison(rows, options)
+        if options.json_path:
+            with open(options.json_path, "w") as f:
+                json.dump({"concurrency": options.concurrency, "duration": options.duration,
+                           "rows": rows}, f, indent=2)
+            log_success(f"Resultado gravado em {options.json_path}")
+
+
+if __name__ == "__main__":
+    main()
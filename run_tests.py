@@ -6,10 +6,24 @@ Este script executa testes automatizados em um ambiente Docker
 com banco de dados pré-populado para o sistema de pagamento multi-gateway.
 """
 
+import argparse
 import os
+import re
+import statistics
 import sys
 import subprocess
+import threading
 import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from db_snapshot import SnapshotStore, compute_schema_hash, dump_schema, restore_schema
+from docker_exec import ExecSession, format_results
+from gateway_mock import compose_with_gateway_mock
+from impact_analysis import (ReferenceIndex, ResultCache, changed_files,
+                             dependency_hash, select_tests)
+from query_budget import find_violations, load_baseline, load_query_log, save_baseline
+from timing_history import TimingHistory
 
 
 # Cores para formatação no terminal
@@ -22,6 +36,10 @@ class Colors:
     NC = '\033[0m'  # No Color
 
 
+# Evita que linhas de processos paralelos se misturem no terminal
+OUTPUT_LOCK = threading.Lock()
+
+
 def log_info(message):
     """Exibe mensagem informativa."""
     print(f"{Colors.BLUE}[INFO]{Colors.NC} {message}")
@@ -42,43 +60,109 @@ def log_error(message):
     print(f"{Colors.RED}[ERRO]{Colors.NC} {message}")
 
 
-def run_command(command, env=None, check=True):
+def run_command(command, env=None, check=True, on_line=None, prefix=""):
     """
-    Executa um comando do sistema e retorna o resultado.
+    Executa um comando do sistema repassando a saída linha a linha.
 
     Args:
         command: Comando a ser executado.
         env: Variáveis de ambiente para o comando.
         check: Se deve levantar exceção em caso de erro.
+        on_line: Função chamada com cada linha de saída assim que ela chega.
+        prefix: Texto adicionado ao início de cada linha exibida.
 
     Returns:
-        Objeto CompletedProcess com os resultados do comando.
+        Objeto CompletedProcess com os resultados do comando
+        (stderr é mesclado ao stdout).
+    """
+    # Mesclar variáveis de ambiente existentes com as fornecidas
+    merged_env = os.environ.copy()
+    if env:
+        merged_env.update(env)
+
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        text=True,
+        errors="replace",
+        env=merged_env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=1
+    )
+
+    output = []
+    for line in process.stdout:
+        output.append(line)
+        with OUTPUT_LOCK:
+            sys.stdout.write(prefix + line)
+            sys.stdout.flush()
+        if on_line:
+            on_line(line)
+
+    returncode = process.wait()
+    stdout = "".join(output)
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, output=stdout)
+    return subprocess.CompletedProcess(command, returncode, stdout, "")
+
+
+class TestProgressParser:
+    """
+    Interpreta a saída do `php artisan test` (Collision) enquanto ela chega,
+    acompanhando o progresso e a duração de cada teste.
     """
-    try:
-        # Mesclar variáveis de ambiente existentes com as fornecidas
-        merged_env = os.environ.copy()
-        if env:
-            merged_env.update(env)
 
-        result = subprocess.run(
-            command,
-            shell=True,
-            check=check,
-            text=True,
-            env=merged_env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        print(result.stdout)
-        if result.stderr:
-            print(result.stderr)
-        return result
-    except subprocess.CalledProcessError as e:
-        print(e.stdout)
-        print(e.stderr)
-        if check:
-            raise
-        return e
+    ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+    CLASS_LINE = re.compile(r"^\s*(PASS|FAIL|WARN|RISKY|SKIPPED|INCOMPLETE)\s+(Tests\\\S+)")
+    TEST_LINE = re.compile(r"^\s*([✓✔⨯✕×!\-s…])\s+(.+?)(?:\s+(\d+(?:\.\d+)?)s)?\s*$")
+    STATUSES = {
+        "✓": "passed", "✔": "passed",
+        "⨯": "failed", "✕": "failed", "×": "failed",
+        "!": "risky", "-": "skipped", "s": "skipped", "…": "incomplete",
+    }
+
+    def __init__(self):
+        self.current_class = None
+        self.cases = []
+        self.counts = {}
+
+    def feed(self, line):
+        """
+        Processa uma linha de saída.
+
+        Args:
+            line: Linha recebida do processo de testes
+        """
+        line = self.ANSI_ESCAPE.sub("", line).replace("\r", "").rstrip("\n")
+
+        match = self.CLASS_LINE.match(line)
+        if match:
+            self.current_class = match.group(2)
+            return
+
+        if not line.strip():
+            return
+
+        match = self.TEST_LINE.match(line)
+        if not match or not self.current_class:
+            if line.lstrip().startswith("Tests:"):
+                self.current_class = None
+            return
+
+        status = self.STATUSES[match.group(1)]
+        duration = float(match.group(3)) if match.group(3) else None
+        self.counts[status] = self.counts.get(status, 0) + 1
+        self.cases.append({
+            "class_name": self.current_class,
+            "test_name": match.group(2).strip().replace(" ", "_"),
+            "duration": duration,
+            "status": status,
+        })
+
+    def timed_cases(self):
+        """Retorna apenas os testes cuja duração apareceu na saída."""
+        return [case for case in self.cases if case["duration"] is not None]
 
 
 def find_docker_compose_command():
@@ -115,6 +199,34 @@ def find_docker_compose_command():
             sys.exit(1)
 
 
+TEST_DB_NAME = "multigateway_test"
+TEST_DB_USER = "multigateway_test"
+TEST_DB_PASSWORD = "test_password"
+
+# Diretório da aplicação Laravel no host (montado em /var/www/html no contêiner)
+APP_DIR = "multigateway-app"
+TEST_DIRS = ["tests/Feature", "tests/Unit"]
+
+# Histórico de duração por teste, usado para balancear os shards e
+# detectar regressões de tempo
+HISTORY_FILE = ".test-history.sqlite"
+
+# Snapshots do banco de teste migrado, indexados pelo hash do schema
+SNAPSHOT_DIR = ".test-snapshots"
+
+# Classes de teste que já passaram, indexadas pelo hash de suas dependências
+RESULT_CACHE_FILE = ".test-results.json"
+
+# Arquivos gerados ficam em diretórios já ignorados pelo git da aplicação
+SHARD_CONFIG_DIR = "storage/framework/testing"
+JUNIT_DIR = "storage/logs"
+
+# Consultas por teste gravadas pelo trait RecordsQueries dos testes (--query-budget)
+# e orçamento versionado com a quantidade de consultas de cada teste
+QUERY_LOG_FILE = "storage/logs/query-budget.jsonl"
+QUERY_BASELINE_FILE = ".query-budget.json"
+
+
 def check_env_testing_file():
     """Verifica se o arquivo .env.testing existe."""
     if not os.path.isfile(".env.testing"):
@@ -141,42 +253,63 @@ def check_containers_running(docker_compose, app_service):
         time.sleep(5)  # Esperar os contêineres inicializarem
 
 
-def setup_test_database(docker_compose, db_test_service):
+def setup_test_database(docker_compose, db_test_service, db_names=None):
     """
     Configura o banco de dados de teste.
 
     Args:
         docker_compose: Comando do docker-compose
         db_test_service: Nome do serviço do banco de teste
+        db_names: Schemas a criar (padrão: apenas o banco de teste principal)
     """
     log_info("Configurando banco de dados de teste...")
 
     # Variáveis do banco de teste
-    db_name = "multigateway_test"
-    db_user = "multigateway_test"
-    db_pass = "test_password"
+    db_names = db_names or [TEST_DB_NAME]
+    db_user = TEST_DB_USER
+    db_pass = TEST_DB_PASSWORD
 
     # Comandos SQL para configurar o banco
     db_commands = [
-        f"CREATE DATABASE IF NOT EXISTS {db_name};",
-        f"CREATE USER IF NOT EXISTS '{db_user}'@'%' IDENTIFIED BY '{db_pass}';",
-        f"GRANT ALL PRIVILEGES ON {db_name}.* TO '{db_user}'@'%';",
-        "FLUSH PRIVILEGES;"
+        f"CREATE USER IF NOT EXISTS '{db_user}'@'%' IDENTIFIED BY '{db_pass}';"
     ]
+    for db_name in db_names:
+        db_commands.append(f"CREATE DATABASE IF NOT EXISTS {db_name};")
+        db_commands.append(f"GRANT ALL PRIVILEGES ON {db_name}.* TO '{db_user}'@'%';")
+    db_commands.append("FLUSH PRIVILEGES;")
+
+    # Enviar todos os comandos SQL em uma única invocação do mysql
+    sql = " ".join(db_commands)
+    cmd = f"{docker_compose} exec -T {db_test_service} mysql -u root -proot_password -e \"{sql}\""
+    run_command(cmd)
+
 
-    # Executar cada comando SQL
-    for sql_cmd in db_commands:
-        cmd = f"{docker_compose} exec {db_test_service} mysql -u root -proot_password -e \"{sql_cmd}\""
-        run_command(cmd)
+def test_db_params(db_test_service, db_name=None):
+    """
+    Monta os parâmetros de ambiente do banco de teste.
+
+    Args:
+        db_test_service: Nome do serviço do banco de teste
+        db_name: Schema a ser usado (padrão: banco de teste principal)
+
+    Returns:
+        dict: Variáveis de ambiente do banco
+    """
+    return {
+        "DB_CONNECTION": "mysql",
+        "DB_HOST": db_test_service,
+        "DB_DATABASE": db_name or TEST_DB_NAME,
+        "DB_USERNAME": TEST_DB_USER,
+        "DB_PASSWORD": TEST_DB_PASSWORD
+    }
 
 
-def prepare_laravel_environment(docker_compose, app_service):
+def prepare_laravel_environment(app_session):
     """
     Prepara o ambiente Laravel para testes limpando caches.
 
     Args:
-        docker_compose: Comando do docker-compose
-        app_service: Nome do serviço da aplicação
+        app_session: Sessão de execução persistente no contêiner da aplicação
     """
     log_info("Limpando caches e preparando ambiente de teste...")
 
@@ -186,30 +319,125 @@ def prepare_laravel_environment(docker_compose, app_service):
         "php artisan cache:clear"
     ]
 
-    for cmd in cache_commands:
-        run_command(f"{docker_compose} exec {app_service} {cmd}")
+    app_session.run_batch(cache_commands)
 
 
-def run_migrations(docker_compose, app_service, db_test_params):
+def migrate_schema(docker_compose, app_service, params, echo=False):
     """
-    Executa migrações e seeders no banco de teste.
+    Executa migrações e seeders em um schema de teste.
 
     Args:
         docker_compose: Comando do docker-compose
         app_service: Nome do serviço da aplicação
-        db_test_params: Parâmetros do banco de teste
+        params: Parâmetros do banco de teste
+        echo: Se a saída deve ser exibida enquanto chega
+
+    Returns:
+        CommandResult da migração
     """
-    log_info("Executando migrações e seeders no banco de teste...")
+    with ExecSession(docker_compose, app_service, env=params, echo=echo) as session:
+        return session.run("php artisan migrate:fresh --seed --env=testing")
 
-    env_params = " ".join([f"-e {k}={v}" for k, v in db_test_params.items()])
 
-    cmd = f"{docker_compose} exec {env_params} {app_service} php artisan migrate:fresh --seed --env=testing"
-    run_command(cmd)
+def restore_schemas_from_snapshot(docker_compose, db_test_service, db_names, snapshot_store):
+    """
+    Restaura os schemas a partir do snapshot correspondente ao hash atual.
 
-    log_success("Banco de testes preparado com dados de seed!")
+    Args:
+        docker_compose: Comando do docker-compose
+        db_test_service: Nome do serviço do banco de teste
+        db_names: Schemas a restaurar
+        snapshot_store: SnapshotStore configurado
+
+    Returns:
+        bool: True se todos os schemas foram restaurados
+    """
+    key = compute_schema_hash(APP_DIR)
+    dump_path, metadata = snapshot_store.lookup(key)
+    if not dump_path:
+        log_info(f"Nenhum snapshot para o schema {key[:12]}. Será criado após a migração.")
+        return False
+
+    log_info(f"Restaurando snapshot {key[:12]} em {len(db_names)} schema(s)...")
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(db_names)) as executor:
+        restored = list(executor.map(
+            lambda name: restore_schema(docker_compose, db_test_service, name, dump_path),
+            db_names))
+    elapsed = time.monotonic() - started_at
+
+    if not all(restored):
+        log_warning("Falha ao restaurar o snapshot. Executando migrações do zero.")
+        return False
+
+    build_seconds = metadata.get("build_seconds")
+    if build_seconds is not None:
+        log_success(f"Snapshot restaurado em {elapsed:.1f}s "
+                    f"(migração levou {build_seconds:.1f}s; "
+                    f"economia de {build_seconds - elapsed:.1f}s)")
+    else:
+        log_success(f"Snapshot restaurado em {elapsed:.1f}s")
+    return True
+
+
+def prepare_test_schemas(docker_compose, app_service, db_test_service, db_names,
+                         snapshot_store=None, echo=False):
+    """
+    Garante que os schemas de teste estejam migrados e populados.
+
+    Com o cache de snapshots ativo, restaura o dump do hash atual de
+    migrations/seeders/factories; caso não exista, migra do zero e grava
+    o snapshot para as próximas execuções.
 
+    Args:
+        docker_compose: Comando do docker-compose
+        app_service: Nome do serviço da aplicação
+        db_test_service: Nome do serviço do banco de teste
+        db_names: Schemas a preparar
+        snapshot_store: SnapshotStore ou None para desativar o cache
+        echo: Se a saída das migrações deve ser exibida
 
-def run_tests(docker_compose, app_service, db_test_params, test_args=""):
+    Returns:
+        Código de saída (0 em caso de sucesso)
+    """
+    if snapshot_store and restore_schemas_from_snapshot(
+            docker_compose, db_test_service, db_names, snapshot_store):
+        return 0
+
+    log_info(f"Executando migrações e seeders em {len(db_names)} schema(s)...")
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(db_names)) as executor:
+        migrations = list(executor.map(
+            lambda name: migrate_schema(docker_compose, app_service,
+                                        test_db_params(db_test_service, name), echo),
+            db_names))
+    build_seconds = time.monotonic() - started_at
+
+    for db_name, result in zip(db_names, migrations):
+        if not result.ok:
+            if not echo:
+                print(result.stdout)
+            log_error(f"Falha ao migrar {db_name} (código {result.returncode}).")
+            return result.returncode or 1
+        log_success(f"{db_name} preparado com dados de seed em {result.duration:.1f}s")
+
+    if snapshot_store:
+        key = compute_schema_hash(APP_DIR)
+        stored = snapshot_store.store(
+            key,
+            lambda destination: dump_schema(docker_compose, db_test_service,
+                                            db_names[0], destination),
+            build_seconds)
+        if stored:
+            log_success(f"Snapshot {key[:12]} gravado em {stored}")
+        else:
+            log_warning("Não foi possível gravar o snapshot do banco de teste.")
+
+    return 0
+
+
+def run_tests(docker_compose, app_service, db_test_params, test_args="",
+              timing_options=None, tests=None):
     """
     Executa os testes.
 
@@ -218,9 +446,11 @@ def run_tests(docker_compose, app_service, db_test_params, test_args=""):
         app_service: Nome do serviço da aplicação
         db_test_params: Parâmetros do banco de teste
         test_args: Argumentos adicionais para os testes
+        timing_options: Opções do relatório de tempos (--slowest, --regression-threshold)
+        tests: Tuplas (classe, arquivo) a executar, ou None para toda a suíte
 
     Returns:
-        Código de resultado dos testes
+        tuple: (código de resultado dos testes, casos de teste executados)
     """
     log_info("Executando testes...")
 
@@ -229,21 +459,526 @@ def run_tests(docker_compose, app_service, db_test_params, test_args=""):
 
     env_params = " ".join([f"-e {k}={v}" for k, v in db_test_params.items()])
 
-    cmd = f"{docker_compose} exec {env_params} {app_service} php artisan test {test_args}"
+    junit_path = f"{JUNIT_DIR}/junit.xml"
+    config_args = ""
+    if tests is not None:
+        config_path = write_test_config(
+            "selected", [path for _, path in tests], db_test_params["DB_DATABASE"])
+        config_args = f"--configuration {config_path} "
+    cmd = (f"{docker_compose} exec {env_params} {app_service} php artisan test "
+           f"{config_args}--log-junit {junit_path} {test_args}")
+
+    # Remover relatório antigo para não confundi-lo com o desta execução
+    if os.path.exists(os.path.join(APP_DIR, junit_path)):
+        os.unlink(os.path.join(APP_DIR, junit_path))
+
+    parser = TestProgressParser()
+    result = run_command(cmd, check=False, on_line=parser.feed)
+
+    report = parse_junit(os.path.join(APP_DIR, junit_path))
+    cases = report["cases"] if report else parser.timed_cases()
+    report_test_timings(cases, timing_options)
+    return result.returncode, cases
+
 
+def load_test_durations():
+    """
+    Carrega a duração estimada de cada classe de teste a partir do histórico.
+
+    Returns:
+        dict: Classe de teste -> duração em segundos
+    """
+    with TimingHistory(HISTORY_FILE) as history:
+        return history.class_durations()
+
+
+def report_test_timings(cases, timing_options=None, label=None):
+    """
+    Exibe os testes mais lentos e as regressões de tempo, e grava a execução
+    no histórico.
+
+    Args:
+        cases: Lista de dicts com class_name, test_name, duration e status
+        timing_options: Opções com slowest e regression_threshold
+        label: Identificação opcional da execução
+    """
+    if not cases:
+        log_warning("Nenhuma duração de teste capturada nesta execução.")
+        return
+
+    slowest = getattr(timing_options, "slowest", 10)
+    threshold = getattr(timing_options, "regression_threshold", 1.5)
+
+    with TimingHistory(HISTORY_FILE) as history:
+        regressions = history.find_regressions(cases, threshold)
+        history.record_run(cases, label)
+
+    if slowest > 0:
+        print(f"\n{Colors.BLUE}=== {slowest} TESTES MAIS LENTOS ==={Colors.NC}")
+        for case in sorted(cases, key=lambda c: c["duration"], reverse=True)[:slowest]:
+            print(f"{case['duration']:>8.3f}s  {case['class_name']}::{case['test_name']}")
+
+    if regressions:
+        print(f"\n{Colors.YELLOW}=== REGRESSÕES DE TEMPO (>= {threshold:g}x a mediana) ==={Colors.NC}")
+        for case, median, ratio in regressions:
+            print(f"{case['duration']:>8.3f}s  (mediana {median:.3f}s, {ratio:.1f}x)  "
+                  f"{case['class_name']}::{case['test_name']}")
+
+
+def discover_test_classes():
+    """
+    Localiza as classes de teste em tests/Feature e tests/Unit.
+
+    Returns:
+        list: Tuplas (classe totalmente qualificada, caminho relativo à aplicação)
+    """
+    tests = []
+    for test_dir in TEST_DIRS:
+        host_dir = os.path.join(APP_DIR, test_dir)
+        if not os.path.isdir(host_dir):
+            continue
+        for root, _, files in os.walk(host_dir):
+            for filename in sorted(files):
+                if not filename.endswith("Test.php"):
+                    continue
+                relative = os.path.relpath(os.path.join(root, filename), APP_DIR)
+                class_name = "Tests\\" + relative[len("tests/"):-len(".php")].replace("/", "\\")
+                tests.append((class_name, relative))
+    return tests
+
+
+def split_tests_into_shards(tests, durations, shards):
+    """
+    Distribui as classes de teste entre os shards pelo tempo histórico.
+
+    Usa o algoritmo guloso LPT: classes mais lentas primeiro, cada uma no
+    shard com menor carga acumulada. Classes sem histórico recebem a mediana
+    das durações conhecidas.
+
+    Args:
+        tests: Lista de tuplas (classe, caminho)
+        durations: Classe de teste -> duração em segundos
+        shards: Número de shards
+
+    Returns:
+        list: Lista de shards, cada um com a carga estimada e as tuplas de teste
+    """
+    known = [durations[name] for name, _ in tests if name in durations]
+    default = statistics.median(known) if known else 1.0
+
+    buckets = [{"load": 0.0, "tests": []} for _ in range(shards)]
+    ordered = sorted(tests, key=lambda t: durations.get(t[0], default), reverse=True)
+    for test in ordered:
+        bucket = min(buckets, key=lambda b: b["load"])
+        bucket["tests"].append(test)
+        bucket["load"] += durations.get(test[0], default)
+    return buckets
+
+
+def write_test_config(label, test_files, db_name):
+    """
+    Gera um phpunit.xml restrito a alguns arquivos a partir do phpunit.xml
+    da aplicação.
+
+    Args:
+        label: Identificação do arquivo gerado (ex.: shard-1, impact)
+        test_files: Caminhos dos arquivos de teste relativos à aplicação
+        db_name: Schema usado pelos testes
+
+    Returns:
+        str: Caminho do arquivo gerado, relativo à aplicação
+    """
+    ET.register_namespace("xsi", "http://www.w3.org/2001/XMLSchema-instance")
+    tree = ET.parse(os.path.join(APP_DIR, "phpunit.xml"))
+    root = tree.getroot()
+
+    # Caminhos do phpunit.xml são relativos ao diretório do arquivo
+    prefix = "../" * len(SHARD_CONFIG_DIR.split("/"))
+    root.set("bootstrap", prefix + root.get("bootstrap", "vendor/autoload.php"))
+    schema_attr = "{http://www.w3.org/2001/XMLSchema-instance}noNamespaceSchemaLocation"
+    if root.get(schema_attr):
+        root.set(schema_attr, prefix + root.get(schema_attr))
+    for directory in root.iter("directory"):
+        directory.text = prefix + directory.text
+
+    testsuites = root.find("testsuites")
+    for suite in list(testsuites):
+        testsuites.remove(suite)
+    suite = ET.SubElement(testsuites, "testsuite", name=label)
+    for test_file in test_files:
+        ET.SubElement(suite, "file").text = prefix + test_file
+
+    for env in root.iter("env"):
+        if env.get("name") == "DB_DATABASE":
+            env.set("value", db_name)
+
+    config_path = f"{SHARD_CONFIG_DIR}/phpunit-{label}.xml"
+    tree.write(os.path.join(APP_DIR, config_path), encoding="UTF-8", xml_declaration=True)
+    return config_path
+
+
+def parse_junit(path):
+    """
+    Lê um relatório JUnit do PHPUnit.
+
+    Args:
+        path: Caminho do arquivo no host
+
+    Returns:
+        dict: Totais e duração por classe, ou None se o arquivo não existir
+    """
+    if not os.path.isfile(path):
+        return None
     try:
-        result = run_command(cmd)
-        return 0  # Sucesso
-    except subprocess.CalledProcessError as e:
-        return e.returncode  # Falha
+        root = ET.parse(path).getroot()
+    except ET.ParseError:
+        log_warning(f"Relatório JUnit inválido: {path}")
+        return None
+
+    report = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0, "time": 0.0,
+              "classes": {}, "cases": []}
+    for case in root.iter("testcase"):
+        class_name = case.get("class") or case.get("classname", "").replace(".", "\\")
+        elapsed = float(case.get("time", 0) or 0)
+        report["tests"] += 1
+        report["time"] += elapsed
+        report["classes"][class_name] = report["classes"].get(class_name, 0.0) + elapsed
+
+        status = "passed"
+        if case.find("failure") is not None:
+            status = "failed"
+            report["failures"] += 1
+        elif case.find("error") is not None:
+            status = "error"
+            report["errors"] += 1
+        elif case.find("skipped") is not None:
+            status = "skipped"
+            report["skipped"] += 1
+
+        report["cases"].append({
+            "class_name": class_name,
+            "test_name": case.get("name", ""),
+            "duration": elapsed,
+            "status": status,
+        })
+    return report
+
+
+def run_shard(docker_compose, app_service, index, params, config_path, test_args):
+    """
+    Executa os testes de um shard repassando a saída com o prefixo do shard.
+
+    Returns:
+        tuple: (índice, código de saída, parser de progresso, duração em segundos)
+    """
+    env = dict(params, RUN_SEEDS_FOR_TESTS="true")
+    env_params = " ".join(f"-e {k}={v}" for k, v in env.items())
+    junit_path = f"{JUNIT_DIR}/junit-shard-{index}.xml"
+    cmd = (f"{docker_compose} exec -T {env_params} {app_service} php artisan test "
+           f"--configuration {config_path} --log-junit {junit_path} {test_args}")
+
+    if os.path.exists(os.path.join(APP_DIR, junit_path)):
+        os.unlink(os.path.join(APP_DIR, junit_path))
+
+    parser = TestProgressParser()
+    started_at = time.monotonic()
+    result = run_command(cmd, check=False, on_line=parser.feed,
+                         prefix=f"{Colors.BLUE}[shard {index}]{Colors.NC} ")
+    return index, result.returncode, parser, time.monotonic() - started_at
+
+
+def run_sharded_tests(docker_compose, app_service, db_test_service, shards,
+                      test_args="", snapshot_store=None, timing_options=None, tests=None,
+                      extra_env=None):
+    """
+    Executa a suíte dividida em N shards, cada um com seu próprio schema.
+
+    Args:
+        docker_compose: Comando do docker-compose
+        app_service: Nome do serviço da aplicação
+        db_test_service: Nome do serviço do banco de teste
+        shards: Número de shards
+        test_args: Argumentos adicionais para os testes
+        snapshot_store: SnapshotStore ou None para desativar o cache
+        timing_options: Opções do relatório de tempos (--slowest, --regression-threshold)
+        tests: Tuplas (classe, arquivo) a executar, ou None para toda a suíte
+        extra_env: Variáveis adicionais repassadas a todos os shards
+
+    Returns:
+        tuple: (código de resultado combinado, casos de teste executados)
+    """
+    if tests is None:
+        tests = discover_test_classes()
+    if not tests:
+        log_error("Nenhuma classe de teste encontrada.")
+        return 1, []
+
+    shards = min(shards, len(tests))
+    db_names = [f"{TEST_DB_NAME}_{i}" for i in range(1, shards + 1)]
+    shard_params = [dict(test_db_params(db_test_service, name), **(extra_env or {}))
+                    for name in db_names]
+
+    # Provisionar todos os schemas em uma única invocação do mysql
+    setup_test_database(docker_compose, db_test_service, db_names)
+
+    # Migrar e popular (ou restaurar) os schemas em paralelo
+    prepared = prepare_test_schemas(docker_compose, app_service, db_test_service,
+                                    db_names, snapshot_store)
+    if prepared != 0:
+        return prepared, []
+
+    buckets = split_tests_into_shards(tests, load_test_durations(), shards)
+    for index, bucket in enumerate(buckets, start=1):
+        log_info(f"Shard {index}: {len(bucket['tests'])} classes, "
+                 f"~{bucket['load']:.1f}s estimados")
+
+    log_info("Executando shards em paralelo...")
+    with ThreadPoolExecutor(max_workers=shards) as executor:
+        futures = []
+        for index, (bucket, params) in enumerate(zip(buckets, shard_params), start=1):
+            config_path = write_test_config(
+                f"shard-{index}", [path for _, path in bucket["tests"]], params["DB_DATABASE"])
+            futures.append(executor.submit(
+                run_shard, docker_compose, app_service, index, params, config_path, test_args))
+        outcomes = sorted((future.result() for future in futures), key=lambda o: o[0])
+
+    # Mesclar relatórios JUnit
+    final_code = 0
+    totals = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0}
+    cases = []
+    rows = []
+    for index, returncode, parser, elapsed in outcomes:
+        report = parse_junit(os.path.join(APP_DIR, JUNIT_DIR, f"junit-shard-{index}.xml"))
+        if report:
+            for key in totals:
+                totals[key] += report[key]
+            cases.extend(report["cases"])
+        else:
+            cases.extend(parser.timed_cases())
+        rows.append((index, returncode, elapsed, report))
+
+        if returncode != 0 and final_code == 0:
+            final_code = returncode
+
+    report_test_timings(cases, timing_options, label=f"shards={shards}")
+
+    print(f"\n{Colors.BLUE}=== RESUMO DOS SHARDS ==={Colors.NC}")
+    print(f"{'Shard':>5} {'Código':>6} {'Tempo':>8} {'Testes':>7} {'Falhas':>7} {'Erros':>6}")
+    for index, returncode, elapsed, report in rows:
+        tests_run = report["tests"] if report else "-"
+        failures = report["failures"] if report else "-"
+        errors = report["errors"] if report else "-"
+        print(f"{index:>5} {returncode:>6} {elapsed:>7.1f}s {tests_run:>7} {failures:>7} {errors:>6}")
+    print(f"Total: {totals['tests']} testes, {totals['failures']} falhas, "
+          f"{totals['errors']} erros, {totals['skipped']} ignorados")
+
+    return final_code, cases
+
+
+def check_query_budget(options, test_result):
+    """
+    Avalia as consultas gravadas nesta execução contra o orçamento e o limite
+    de repetições, e atualiza a linha de base quando solicitado.
+
+    Args:
+        options: Opções do script (query_repeat_limit, query_slack,
+            update_query_baseline)
+        test_result: Código de resultado dos testes
+
+    Returns:
+        int: 0 se não houver violações, 1 caso contrário
+    """
+    tests, endpoints = load_query_log(os.path.join(APP_DIR, QUERY_LOG_FILE))
+    if not tests:
+        log_warning("Nenhuma consulta registrada. O TestCase usa o trait RecordsQueries?")
+        return 0
+
+    baseline = {} if options.update_query_baseline else load_baseline(QUERY_BASELINE_FILE)
+    over_budget, repeated = find_violations(
+        tests, baseline, options.query_repeat_limit, options.query_slack)
+
+    print(f"\n{Colors.BLUE}=== CONSULTAS POR ENDPOINT ==={Colors.NC}")
+    print(f"{'Consultas/req':>13} {'Tempo/req':>10} {'Reqs':>6}  Endpoint")
+    for endpoint, totals in sorted(endpoints.items(),
+                                   key=lambda item: item[1]["queries"] / max(1, item[1]["requests"]),
+                                   reverse=True):
+        requests = max(1, totals["requests"])
+        print(f"{totals['queries'] / requests:>13.1f} {totals['time_ms'] / requests:>8.2f}ms "
+              f"{totals['requests']:>6}  {endpoint}")
+
+    total_queries = sum(test.count for test in tests.values())
+    total_time = sum(test.time_ms for test in tests.values())
+    log_info(f"{total_queries} consultas em {len(tests)} testes ({total_time:.1f}ms no banco).")
+
+    if over_budget:
+        print(f"\n{Colors.RED}=== TESTES ACIMA DO ORÇAMENTO DE CONSULTAS "
+              f"(folga {options.query_slack}) ==={Colors.NC}")
+        for name, count, budget in over_budget:
+            print(f"{count:>5} consultas (orçamento {budget})  {name}")
+
+    if repeated:
+        print(f"\n{Colors.RED}=== CONSULTAS REPETIDAS MAIS DE "
+              f"{options.query_repeat_limit}x (POSSÍVEL N+1) ==={Colors.NC}")
+        for name, scope, text, count in repeated:
+            print(f"{count:>5.0f}x  {name}  [{scope}]")
+            print(f"        {text[:160]}")
+
+    if over_budget or repeated:
+        return 1
+
+    if options.update_query_baseline:
+        if test_result == 0:
+            save_baseline(QUERY_BASELINE_FILE, tests, endpoints)
+            log_success(f"Orçamento de consultas gravado em {QUERY_BASELINE_FILE}.")
+        else:
+            log_warning("Orçamento de consultas não atualizado: há testes falhando.")
+    elif not baseline:
+        log_warning(f"Sem orçamento em {QUERY_BASELINE_FILE}; "
+                    "use --update-query-baseline para criá-lo.")
+    return 0
+
+
+def select_impacted_tests(options, test_args):
+    """
+    Seleciona os testes afetados pelas alterações desde a referência base e
+    descarta os que já passaram com o mesmo conteúdo de dependências.
+
+    Args:
+        options: Opções do script (base, no_result_cache)
+        test_args: Argumentos extras repassados aos testes
+
+    Returns:
+        tuple: (tuplas (classe, arquivo) a executar, hashes de dependências por classe)
+    """
+    index = ReferenceIndex(APP_DIR)
+    tests = discover_test_classes()
+    hashes = {name: dependency_hash(index, path) for name, path in tests}
+
+    changed, failed = changed_files(options.base, APP_DIR)
+    if failed:
+        log_warning(f"Não foi possível comparar com '{options.base}'. Executando toda a suíte.")
+        return tests, hashes
+
+    selected = select_tests(index, tests, changed)
+    log_info(f"{len(changed)} arquivo(s) alterado(s) desde {options.base}; "
+             f"{len(selected)} de {len(tests)} classes de teste afetadas.")
+
+    cache = None if options.no_result_cache or test_args else ResultCache(RESULT_CACHE_FILE)
+    to_run = []
+    for name, path in tests:
+        if name not in selected:
+            continue
+        if cache and cache.passed(name, hashes[name]):
+            log_info(f"  {name}: já passou com as mesmas dependências (cache)")
+            continue
+        log_info(f"  {name}: {selected[name]}")
+        to_run.append((name, path))
+    return to_run, hashes
+
+
+def update_result_cache(hashes, cases):
+    """
+    Registra no cache as classes cujos testes passaram nesta execução.
+
+    Args:
+        hashes: Classe de teste -> hash das dependências
+        cases: Casos de teste executados (do relatório JUnit)
+    """
+    outcome = {}
+    for case in cases:
+        ok = case["status"] not in ("failed", "error")
+        outcome[case["class_name"]] = outcome.get(case["class_name"], True) and ok
+
+    cache = ResultCache(RESULT_CACHE_FILE)
+    for class_name, passed in outcome.items():
+        if class_name in hashes:
+            cache.record(class_name, hashes[class_name], passed)
+    cache.save()
+
+
+def parse_arguments(argv):
+    """
+    Separa as opções do script dos argumentos repassados ao `php artisan test`.
+
+    Args:
+        argv: Argumentos da linha de comando
+
+    Returns:
+        tuple: (opções do script, argumentos extras para os testes)
+    """
+    parser = argparse.ArgumentParser(
+        description="Executa os testes no ambiente Docker.",
+        epilog="Argumentos não reconhecidos são repassados ao 'php artisan test'."
+    )
+    parser.add_argument(
+        "--shards", type=int, default=1,
+        help="Divide a suíte em N shards paralelos, cada um com seu schema")
+    parser.add_argument(
+        "--impact", action="store_true",
+        help="Executa apenas os testes afetados pelas alterações desde --base")
+    parser.add_argument(
+        "--base", default="HEAD",
+        help="Referência do git para --impact (padrão: HEAD, ou seja, alterações não commitadas)")
+    parser.add_argument(
+        "--no-result-cache", action="store_true",
+        help="Com --impact, não pula testes que já passaram com as mesmas dependências")
+    parser.add_argument(
+        "--gateway-mock", nargs="?", const="default", default=None, metavar="CENARIO",
+        help="Recria gateway1/gateway2 com o gateway_mock.py local e o cenário "
+             "de docker/gateway-mock/CENARIO.json (padrão: default)")
+    parser.add_argument(
+        "--slowest", type=int, default=10,
+        help="Quantidade de testes mais lentos exibidos ao final (padrão: 10)")
+    parser.add_argument(
+        "--regression-threshold", type=float, default=1.5,
+        help="Razão sobre a mediana móvel que caracteriza regressão de tempo (padrão: 1.5)")
+    parser.add_argument(
+        "--no-snapshot", action="store_true",
+        help="Sempre executa migrate:fresh --seed, sem usar o cache de snapshots")
+    parser.add_argument(
+        "--snapshot-cache-mb", type=int, default=512,
+        help="Tamanho máximo do cache de snapshots em MB (padrão: 512)")
+    parser.add_argument(
+        "--query-budget", action="store_true",
+        help=f"Registra as consultas SQL de cada teste e falha acima do orçamento "
+             f"de {QUERY_BASELINE_FILE} ou com consultas repetidas (N+1)")
+    parser.add_argument(
+        "--query-repeat-limit", type=int, default=5, metavar="K",
+        help="Repetições do mesmo fingerprint permitidas por requisição (padrão: 5)")
+    parser.add_argument(
+        "--query-slack", type=int, default=0,
+        help="Consultas extras toleradas sobre o orçamento de cada teste (padrão: 0)")
+    parser.add_argument(
+        "--update-query-baseline", action="store_true",
+        help=f"Com --query-budget, regrava {QUERY_BASELINE_FILE} se os testes passarem")
+    options, test_args = parser.parse_known_args(argv)
+    if options.shards < 1:
+        parser.error("--shards deve ser maior ou igual a 1")
+    if options.update_query_baseline:
+        options.query_budget = True
+    return options, test_args
 
 
 def main():
     """Função principal do script."""
     print(f"{Colors.BLUE}=== EXECUTANDO TESTES COM BANCO DE DADOS PRÉ-POPULADO ==={Colors.NC}\n")
 
+    # Capturar argumentos extras passados para o script
+    options, extra_args = parse_arguments(sys.argv[1:])
+    test_args = " ".join(extra_args)
+
+    # Selecionar apenas os testes afetados pelas alterações
+    selection, dependency_hashes = None, {}
+    if options.impact:
+        selection, dependency_hashes = select_impacted_tests(options, test_args)
+        if not selection:
+            log_success("Nenhum teste afetado pelas alterações precisa ser executado.")
+            sys.exit(0)
+
     # Encontrar o comando Docker Compose
     docker_compose = find_docker_compose_command()
+    if options.gateway_mock:
+        docker_compose = compose_with_gateway_mock(docker_compose, options.gateway_mock)
 
     # Definir nomes dos serviços
     app_service = "app"
@@ -255,30 +990,56 @@ def main():
     # Verificar contêineres
     check_containers_running(docker_compose, app_service)
 
-    # Configurar banco de testes
-    setup_test_database(docker_compose, db_test_service)
+    # O compose recria os gateways quando a definição muda para o mock
+    if options.gateway_mock:
+        log_info(f"Usando gateways simulados (cenário: {options.gateway_mock})...")
+        run_command(f"{docker_compose} up -d gateway1 gateway2")
+
+    # Definir parâmetros do banco de teste
+    db_test_params = test_db_params(db_test_service)
+
+    # Cache de snapshots do banco migrado e populado
+    snapshot_store = None
+    if not options.no_snapshot:
+        snapshot_store = SnapshotStore(SNAPSHOT_DIR, options.snapshot_cache_mb * 1024 * 1024)
 
     # Limpar caches e preparar ambiente
-    prepare_laravel_environment(docker_compose, app_service)
+    with ExecSession(docker_compose, app_service, env=db_test_params) as app_session:
+        prepare_laravel_environment(app_session)
+    print(format_results(app_session.history))
+
+    # Registro de consultas por teste, lido pelo trait RecordsQueries
+    query_env = {}
+    if options.query_budget:
+        query_env["QUERY_LOG_PATH"] = f"/var/www/html/{QUERY_LOG_FILE}"
+        db_test_params.update(query_env)
+        if os.path.exists(os.path.join(APP_DIR, QUERY_LOG_FILE)):
+            os.unlink(os.path.join(APP_DIR, QUERY_LOG_FILE))
+
+    if options.shards > 1:
+        # Cada shard provisiona e migra o próprio schema
+        test_result, cases = run_sharded_tests(docker_compose, app_service, db_test_service,
+                                               options.shards, test_args, snapshot_store,
+                                               options, selection, query_env)
+    else:
+        # Configurar banco de testes
+        setup_test_database(docker_compose, db_test_service)
 
-    # Definir parâmetros do banco de teste
-    db_test_params = {
-        "DB_CONNECTION": "mysql",
-        "DB_HOST": db_test_service,
-        "DB_DATABASE": "multigateway_test",
-        "DB_USERNAME": "multigateway_test",
-        "DB_PASSWORD": "test_password"
-    }
+        # Executar migrações (ou restaurar o snapshot)
+        prepared = prepare_test_schemas(docker_compose, app_service, db_test_service,
+                                        [TEST_DB_NAME], snapshot_store, echo=True)
+        if prepared != 0:
+            sys.exit(prepared)
 
-    # Executar migrações
-    run_migrations(docker_compose, app_service, db_test_params)
+        # Executar testes
+        test_result, cases = run_tests(docker_compose, app_service,
+                                       db_test_params, test_args, options, selection)
 
-    # Capturar argumentos extras passados para o script
-    test_args = " ".join(sys.argv[1:])
+    if options.impact and not options.no_result_cache and not test_args:
+        update_result_cache(dependency_hashes, cases)
 
-    # Executar testes
-    test_result = run_tests(docker_compose, app_service,
-                            db_test_params, test_args)
+    if options.query_budget and check_query_budget(options, test_result) != 0 and test_result == 0:
+        test_result = 1
 
     # Verificar resultado
     if test_result == 0:
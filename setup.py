@@ -4,11 +4,20 @@ Multi-Gateway Payment System Setup Tool - Portabilidade direta do setup.sh
 Seguindo diretrizes PEP 8.
 """
 
+import argparse
+import asyncio
 import os
+import random
 import sys
 import subprocess
 import time
 import shutil
+from dataclasses import dataclass, field
+
+from docker_exec import ExecSession, format_results
+from gateway_mock import compose_with_gateway_mock
+import mysql_probe
+import warm_boot
 
 
 # Cores para formatação no terminal
@@ -136,46 +145,281 @@ def update_env_line(key, value, env_file):
         f.writelines(lines)
 
 
-def check_app_readiness(docker_compose, max_attempts=15):
+@dataclass
+class ServiceSpec:
+    """Descreve como subir e verificar a prontidão de um serviço do compose."""
+    name: str
+    probes: list
+    depends_on: list = field(default_factory=list)
+    timeout: float = 180.0
+
+
+@dataclass
+class ServiceStatus:
+    """Resultado da subida de um serviço."""
+    name: str
+    ready: bool = False
+    attempts: int = 0
+    time_to_ready: float = None
+    detail: str = ""
+
+
+async def _run_shell(command, timeout=30.0):
+    """
+    Executa um comando de shell de forma assíncrona.
+
+    Args:
+        command: Comando a ser executado
+        timeout: Tempo máximo de execução em segundos
+
+    Returns:
+        tuple: (código de saída, stdout)
+    """
+    process = await asyncio.create_subprocess_shell(
+        command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return 1, ""
+    return process.returncode, stdout.decode(errors="replace").strip()
+
+
+def compose_health_probe(docker_compose, service):
+    """
+    Cria uma sonda que consulta o healthcheck do compose para o serviço.
+
+    Serviços sem healthcheck são considerados prontos quando estão "running".
+    """
+    async def probe():
+        code, container_id = await _run_shell(
+            f"{docker_compose} ps -q {service}")
+        if code != 0 or not container_id:
+            return False, "contêiner não encontrado"
+
+        code, status = await _run_shell(
+            "docker inspect -f "
+            "'{{if .State.Health}}{{.State.Health.Status}}{{else}}{{.State.Status}}{{end}}' "
+            f"{container_id}")
+        return code == 0 and status in ("healthy", "running"), status or "desconhecido"
+
+    return probe
+
+
+def tcp_probe(host, port, timeout=2.0):
+    """Cria uma sonda que verifica se a porta TCP aceita conexões."""
+    async def probe():
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port), timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            return False, f"tcp {port}: {e.__class__.__name__}"
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True, f"tcp {port} aberto"
+
+    return probe
+
+
+def http_probe(host, port, path="/", timeout=3.0, accept_any_status=True):
+    """
+    Cria uma sonda HTTP que lê apenas a linha de status da resposta.
+
+    Args:
+        host: Host de destino
+        port: Porta de destino
+        path: Caminho requisitado
+        timeout: Tempo máximo da requisição em segundos
+        accept_any_status: Se qualquer resposta HTTP indica prontidão
+            (os mocks dos gateways respondem 404 na raiz); sem ele, só 2xx
+    """
+    async def probe():
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port), timeout)
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), timeout)
+            writer.close()
+        except (OSError, asyncio.TimeoutError) as e:
+            return False, f"http {port}: {e.__class__.__name__}"
+
+        parts = status_line.decode(errors="replace").split()
+        if len(parts) < 2 or not parts[1].isdigit():
+            return False, f"http {port}: resposta inválida"
+
+        status = int(parts[1])
+        ok = accept_any_status or 200 <= status < 300
+        return ok, f"http {port} -> {status}"
+
+    return probe
+
+
+def exec_probe(docker_compose, service, command):
+    """Cria uma sonda que executa um comando dentro do contêiner."""
+    async def probe():
+        code, _ = await _run_shell(
+            f"{docker_compose} exec -T {service} {command}")
+        return code == 0, f"exec '{command}' -> {code}"
+
+    return probe
+
+
+def default_service_specs(docker_compose, profile="development"):
     """
-    Verifica se a aplicação Laravel está pronta.
+    Define os serviços do docker-compose.yml, suas sondas e dependências.
 
     Args:
         docker_compose: Comando do Docker Compose
-        max_attempts: Número máximo de tentativas
+        profile: Perfil do ambiente (development ou production)
 
     Returns:
-        bool: True se a aplicação está pronta, False caso contrário
+        list: Lista de ServiceSpec
     """
-    app_ready = False
-    attempt = 1
+    if profile == "production":
+        # A porta 9000 do PHP-FPM só existe dentro da rede do compose: a conexão
+        # é testada de dentro do contêiner, com o próprio PHP da imagem
+        app_probes = [exec_probe(
+            docker_compose, "app",
+            "php -r 'exit(@fsockopen(\"127.0.0.1\", 9000) ? 0 : 1);'")]
+    else:
+        # O bind mount de ./multigateway-app esconde o vendor/ da imagem: o
+        # artisan serve só atende depois do composer install, então aqui basta
+        # o PHP do contêiner responder. O /api/health é exigido depois das
+        # migrações (check_laravel_accessibility)
+        app_probes = [exec_probe(docker_compose, "app", "php -v")]
+    return [
+        ServiceSpec("db", [compose_health_probe(docker_compose, "db")]),
+        ServiceSpec("db_test", [compose_health_probe(docker_compose, "db_test")]),
+        ServiceSpec("redis", [tcp_probe("localhost", 6379)]),
+        ServiceSpec("gateway1", [tcp_probe("localhost", 3001),
+                                 http_probe("localhost", 3001)]),
+        ServiceSpec("gateway2", [tcp_probe("localhost", 3002),
+                                 http_probe("localhost", 3002)]),
+        ServiceSpec("app", app_probes, depends_on=["db"]),
+        ServiceSpec("nginx", [tcp_probe("localhost", 80)],
+                    depends_on=["app"], timeout=60.0),
+    ]
 
-    while attempt <= max_attempts:
-        log_info(
-            f"Verificando aplicação Laravel... (Tentativa {attempt} de {max_attempts})")
 
-        php_check = subprocess.run(
-            f"{docker_compose} exec app php -v",
-            shell=True,
-            capture_output=True,
-            text=True,
-            check=False  # Definido explicitamente
-        )
+async def wait_until_ready(probes, timeout, initial_delay=0.25, max_delay=4.0):
+    """
+    Executa as sondas concorrentemente até todas passarem, com backoff adaptativo.
 
-        if php_check.returncode == 0:
-            log_success("Aplicação está rodando!")
-            app_ready = True
-            break
+    O intervalo cresce exponencialmente (com jitter) enquanto nada muda e volta
+    ao mínimo sempre que uma sonda nova passa, para reagir rápido quando o
+    serviço está quase pronto.
+
+    Args:
+        probes: Lista de sondas assíncronas
+        timeout: Tempo máximo de espera em segundos
+        initial_delay: Intervalo inicial entre tentativas
+        max_delay: Intervalo máximo entre tentativas
+
+    Returns:
+        tuple: (pronto, tentativas, detalhe da última tentativa)
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    attempts = 0
+    passed_before = 0
+    details = []
+
+    while True:
+        attempts += 1
+        results = await asyncio.gather(*(probe() for probe in probes))
+        details = [detail for _, detail in results]
+        passed = sum(1 for ok, _ in results if ok)
+
+        if passed == len(probes):
+            return True, attempts, "; ".join(details)
+
+        if time.monotonic() + delay > deadline:
+            return False, attempts, "; ".join(details)
+
+        if passed > passed_before:
+            delay = initial_delay
+        passed_before = passed
+
+        await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+        delay = min(delay * 1.6, max_delay)
+
+
+async def bring_up_services(docker_compose, specs):
+    """
+    Inicia os serviços assim que suas dependências estão prontas e aguarda
+    a prontidão de todos em paralelo.
+
+    Args:
+        docker_compose: Comando do Docker Compose
+        specs: Lista de ServiceSpec
+
+    Returns:
+        dict: Nome do serviço -> ServiceStatus
+    """
+    ready_events = {spec.name: asyncio.Event() for spec in specs}
+    statuses = {spec.name: ServiceStatus(spec.name) for spec in specs}
+
+    async def bring_up(spec):
+        status = statuses[spec.name]
+
+        for dependency in spec.depends_on:
+            if dependency in ready_events:
+                await ready_events[dependency].wait()
+                if not statuses[dependency].ready:
+                    status.detail = f"dependência '{dependency}' não ficou pronta"
+                    ready_events[spec.name].set()
+                    return
+
+        log_info(f"Iniciando serviço {spec.name}...")
+        started_at = time.monotonic()
+        code, _ = await _run_shell(f"{docker_compose} start {spec.name}", timeout=120)
+        if code != 0:
+            status.detail = "falha ao iniciar o contêiner"
+            ready_events[spec.name].set()
+            return
+
+        ready, attempts, detail = await wait_until_ready(spec.probes, spec.timeout)
+        status.ready = ready
+        status.attempts = attempts
+        status.detail = detail
+        status.time_to_ready = time.monotonic() - started_at
+
+        if ready:
+            log_success(f"Serviço {spec.name} pronto em {status.time_to_ready:.1f}s")
         else:
-            if attempt == max_attempts:
-                log_error(
-                    "Tempo limite excedido. A aplicação pode não estar funcionando corretamente.")
-            else:
-                log_warning("Aplicação ainda não está pronta. Aguardando...")
-                time.sleep(8)
-                attempt += 1
+            log_warning(f"Serviço {spec.name} não ficou pronto: {detail}")
+        ready_events[spec.name].set()
 
-    return app_ready
+    await asyncio.gather(*(bring_up(spec) for spec in specs))
+    return statuses
+
+
+def print_readiness_report(statuses):
+    """
+    Exibe o tempo até a prontidão de cada serviço.
+
+    Args:
+        statuses: Dicionário nome do serviço -> ServiceStatus
+    """
+    print(f"\n{Colors.CYAN}=====================================")
+    print("      PRONTIDÃO DOS SERVIÇOS")
+    print(f"====================================={Colors.RESET}")
+    print(f"{'Serviço':<10} {'Status':<10} {'Tempo':>8} {'Tentativas':>11}  Detalhe")
+    for status in statuses.values():
+        label = (f"{Colors.GREEN}pronto{Colors.RESET}    " if status.ready
+                 else f"{Colors.RED}falhou{Colors.RESET}    ")
+        elapsed = f"{status.time_to_ready:.1f}s" if status.time_to_ready is not None else "-"
+        print(f"{status.name:<10} {label} {elapsed:>8} {status.attempts:>11}  {status.detail}")
+    print("")
 
 
 def setup_laravel_directory():
@@ -364,38 +608,438 @@ def sync_env_variables(env_vars):
     )
 
 
+# Formato JSON do access log com os tempos do upstream (PHP-FPM), lido pelo
+# access_log_analyzer.py. $req_id reaproveita o X-Request-ID do cliente ou
+# usa o $request_id do nginx, e é repassado à aplicação.
+NGINX_LOG_FORMAT = r"""map $http_x_request_id $req_id {
+    default $http_x_request_id;
+    ""      $request_id;
+}
+
+log_format upstream_timing escape=json '{'
+    '"time":"$time_iso8601",'
+    '"request_id":"$req_id",'
+    '"remote_addr":"$remote_addr",'
+    '"method":"$request_method",'
+    '"uri":"$request_uri",'
+    '"status":$status,'
+    '"request_time":$request_time,'
+    '"upstream_connect_time":"$upstream_connect_time",'
+    '"upstream_header_time":"$upstream_header_time",'
+    '"upstream_response_time":"$upstream_response_time",'
+    '"upstream_addr":"$upstream_addr",'
+    '"request_length":$request_length,'
+    '"bytes_sent":$bytes_sent,'
+    '"body_bytes_sent":$body_bytes_sent,'
+    '"connection":$connection,'
+    '"connection_requests":$connection_requests'
+'}';
+"""
+
+NGINX_SERVER_BLOCK = r"""server {
+    listen 80;
+    index index.php index.html;
+    error_log  /var/log/nginx/error.log;
+    access_log /var/log/nginx/access.log upstream_timing;
+    root /var/www/html/public;
+    location ~ \.php$ {
+        try_files $uri =404;
+        fastcgi_split_path_info ^(.+\.php)(/.+)$;
+        fastcgi_pass app:9000;
+        fastcgi_index index.php;
+        include fastcgi_params;
+        fastcgi_param SCRIPT_FILENAME $document_root$fastcgi_script_name;
+        fastcgi_param PATH_INFO $fastcgi_path_info;
+        fastcgi_param HTTP_X_REQUEST_ID $req_id;
+    }
+    location / {
+        try_files $uri $uri/ /index.php?$query_string;
+        gzip_static on;
+    }
+}
+"""
+
+
 def create_nginx_config():
-    """Cria a configuração do Nginx para o projeto."""
+    """Cria ou atualiza a configuração do Nginx para o projeto."""
     log_info("Criando diretórios necessários...")
     os.makedirs("docker/nginx/conf.d", exist_ok=True)
+    os.makedirs("docker/nginx/logs", exist_ok=True)
+
+    # A configuração é gerada: reescrever quando o conteúdo esperado mudar
+    if write_if_changed("docker/nginx/conf.d/app.conf",
+                        NGINX_LOG_FORMAT + "\n" + NGINX_SERVER_BLOCK):
+        log_success("Configuração do Nginx criada com sucesso.")
+
+
+def write_if_changed(path, content):
+    """
+    Grava um arquivo gerado apenas se o conteúdo mudou.
+
+    Args:
+        path: Caminho do arquivo
+        content: Conteúdo esperado
+
+    Returns:
+        bool: True se o arquivo foi (re)escrito
+    """
+    current = None
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            current = f.read()
+    if current == content:
+        return False
+
+    log_info(f"Gerando {path}...")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return True
 
-    # Criar ou atualizar a configuração do Nginx
-    nginx_config = "docker/nginx/conf.d/app.conf"
-    if not os.path.exists(nginx_config):
-        log_info("Criando configuração do Nginx...")
-        with open(nginx_config, "w") as f:
-            f.write("""server {
+
+PRODUCTION_COMPOSE_FILE = "docker-compose.production.yml"
+FPM_POOL_FILE = "docker/php/fpm/zz-pool.conf"
+NGINX_PRODUCTION_CONFIG = "docker/nginx/production/app.conf"
+
+MYSQL_CONFIG_FILE = "docker/mysql/conf.d/zz-host.cnf"
+MYSQL_LOG_DIR = "docker/mysql/logs"
+
+# Consultas acima deste tempo (s) vão para o slow log lido pelo slow_query_analyzer.py
+MYSQL_LONG_QUERY_TIME = 0.5
+
+# Memória mínima deixada para MySQL, Redis, nginx e sistema operacional
+RESERVED_MEMORY_MB = 1024
+
+
+def reserved_memory_mb(memory_mb):
+    """Memória fora do pool do PHP-FPM: RESERVED_MEMORY_MB ou 40% do total."""
+    return max(RESERVED_MEMORY_MB, memory_mb * 0.4)
+
+
+@dataclass
+class FpmPoolSettings:
+    """Dimensionamento do pool do PHP-FPM e do upstream do nginx."""
+    cpus: int
+    memory_mb: int
+    child_memory_mb: int
+    pm: str
+    max_children: int
+    start_servers: int
+    min_spare_servers: int
+    max_spare_servers: int
+    max_requests: int
+    upstream_keepalive: int
+
+
+def detect_host_resources():
+    """
+    Detecta CPUs e memória disponíveis para os contêineres.
+
+    Consulta o `docker info`, que no Docker Desktop reflete a VM onde os
+    contêineres rodam; sem ele, usa os recursos da máquina local.
+
+    Returns:
+        tuple: (CPUs, memória total em MB)
+    """
+    result = subprocess.run(
+        "docker info --format '{{.NCPU}} {{.MemTotal}}'",
+        shell=True,
+        capture_output=True,
+        text=True,
+        check=False  # Definido explicitamente
+    )
+    parts = result.stdout.split()
+    if result.returncode == 0 and len(parts) == 2 and all(p.isdigit() for p in parts):
+        return int(parts[0]), int(parts[1]) // (1024 * 1024)
+
+    cpus = os.cpu_count() or 1
+    try:
+        memory_mb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        memory_mb = 2048
+    return cpus, memory_mb
+
+
+def size_fpm_pool(cpus, memory_mb, child_memory_mb=64, max_requests=500):
+    """
+    Dimensiona o pool do PHP-FPM a partir das CPUs e da memória.
+
+    O limite de memória deixa reserved_memory_mb() para os demais serviços. O limite por CPU é de 8 processos por
+    núcleo: as compras passam a maior parte do tempo esperando os gateways,
+    então mais processos que núcleos mantêm as CPUs ocupadas. Pools pequenos
+    usam pm = static (sem custo de fork durante picos); pools grandes usam
+    pm = dynamic para não manter centenas de processos ociosos.
+
+    O nginx mantém conexões FastCGI ociosas por worker, e cada conexão
+    persistente ocupa um processo do FPM; o keepalive do upstream fica em
+    metade do pool dividida pelos workers do nginx (um por CPU).
+
+    Args:
+        cpus: Quantidade de CPUs
+        memory_mb: Memória total em MB
+        child_memory_mb: Memória estimada por processo PHP em MB
+        max_requests: Requisições por processo antes de reciclá-lo
+
+    Returns:
+        FpmPoolSettings: Configuração calculada
+    """
+    cpus = max(1, cpus)
+    budget_mb = max(memory_mb - reserved_memory_mb(memory_mb), child_memory_mb * 2)
+    max_children = max(2, min(int(budget_mb // child_memory_mb), cpus * 8))
+
+    pm = "static" if max_children <= 32 else "dynamic"
+    min_spare = max(1, max_children // 8)
+    max_spare = max(min_spare + 1, max_children // 2)
+    start = min(max(max_children // 4, min_spare), max_spare)
+
+    return FpmPoolSettings(
+        cpus=cpus,
+        memory_mb=memory_mb,
+        child_memory_mb=child_memory_mb,
+        pm=pm,
+        max_children=max_children,
+        start_servers=start,
+        min_spare_servers=min_spare,
+        max_spare_servers=max_spare,
+        max_requests=max_requests,
+        upstream_keepalive=max(1, max_children // (2 * cpus)),
+    )
+
+
+def render_fpm_pool(settings):
+    """Gera o arquivo do pool [www] que sobrescreve o padrão da imagem."""
+    lines = [
+        f"; Gerado pelo setup.py --profile production ({settings.cpus} CPUs, "
+        f"{settings.memory_mb} MB, ~{settings.child_memory_mb} MB por processo).",
+        "; Não editar: o arquivo é reescrito a cada execução.",
+        "[www]",
+        f"pm = {settings.pm}",
+        f"pm.max_children = {settings.max_children}",
+    ]
+    if settings.pm == "dynamic":
+        lines += [
+            f"pm.start_servers = {settings.start_servers}",
+            f"pm.min_spare_servers = {settings.min_spare_servers}",
+            f"pm.max_spare_servers = {settings.max_spare_servers}",
+        ]
+    lines += [
+        f"pm.max_requests = {settings.max_requests}",
+        "listen.backlog = 511",
+        "request_terminate_timeout = 65s",
+        "pm.status_path = /fpm-status",
+        "ping.path = /fpm-ping",
+        "clear_env = no",
+        "catch_workers_output = yes",
+        "decorate_workers_output = no",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+NGINX_PRODUCTION_SERVER_BLOCK = r"""server {
     listen 80;
     index index.php index.html;
     error_log  /var/log/nginx/error.log;
-    access_log /var/log/nginx/access.log;
+    access_log /var/log/nginx/access.log upstream_timing;
     root /var/www/html/public;
+    client_max_body_size 20m;
+
+    gzip on;
+    gzip_vary on;
+    gzip_proxied any;
+    gzip_comp_level 5;
+    gzip_min_length 1024;
+    gzip_types application/json application/javascript text/css text/plain text/xml;
+
     location ~ \.php$ {
         try_files $uri =404;
         fastcgi_split_path_info ^(.+\.php)(/.+)$;
-        fastcgi_pass app:9000;
+        fastcgi_pass php_fpm;
+        fastcgi_keep_conn on;
         fastcgi_index index.php;
         include fastcgi_params;
         fastcgi_param SCRIPT_FILENAME $document_root$fastcgi_script_name;
         fastcgi_param PATH_INFO $fastcgi_path_info;
+        fastcgi_param HTTP_X_REQUEST_ID $req_id;
+
+        fastcgi_buffering on;
+        fastcgi_buffer_size 32k;
+        fastcgi_buffers 16 16k;
+        fastcgi_busy_buffers_size 64k;
+        fastcgi_read_timeout 65s;
     }
     location / {
         try_files $uri $uri/ /index.php?$query_string;
         gzip_static on;
     }
 }
-""")
-        log_success("Configuração do Nginx criada com sucesso.")
+"""
+
+
+def render_nginx_production_config(settings):
+    """Gera a configuração do nginx com o upstream persistente para o FPM."""
+    upstream = (
+        "upstream php_fpm {\n"
+        "    server app:9000;\n"
+        f"    keepalive {settings.upstream_keepalive};\n"
+        "    keepalive_requests 1000;\n"
+        "    keepalive_timeout 60s;\n"
+        "}\n"
+    )
+    return NGINX_LOG_FORMAT + "\n" + upstream + "\n" + NGINX_PRODUCTION_SERVER_BLOCK
+
+
+def create_production_config(cpus, memory_mb, child_memory_mb):
+    """
+    Gera o pool do PHP-FPM e a configuração do nginx do perfil de produção.
+
+    Args:
+        cpus: CPUs do host Docker
+        memory_mb: Memória do host Docker em MB
+        child_memory_mb: Memória estimada por processo PHP em MB
+
+    Returns:
+        FpmPoolSettings: Configuração calculada
+    """
+    settings = size_fpm_pool(cpus, memory_mb, child_memory_mb)
+    log_info(f"Pool PHP-FPM: pm = {settings.pm}, max_children = {settings.max_children}, "
+             f"max_requests = {settings.max_requests}; "
+             f"keepalive do upstream = {settings.upstream_keepalive}")
+
+    write_if_changed(FPM_POOL_FILE, render_fpm_pool(settings))
+    os.makedirs("docker/nginx/logs", exist_ok=True)
+    write_if_changed(NGINX_PRODUCTION_CONFIG, render_nginx_production_config(settings))
+    return settings
+
+
+@dataclass
+class MysqlSettings:
+    """Dimensionamento do MySQL do serviço db."""
+    buffer_pool_mb: int
+    buffer_pool_instances: int
+    redo_log_mb: int
+    max_connections: int
+    table_open_cache: int
+    table_open_cache_instances: int
+    thread_cache_size: int
+    io_threads: int
+
+
+def size_mysql(cpus, memory_mb, workers):
+    """
+    Dimensiona o MySQL a partir das CPUs, da memória e dos workers do PHP.
+
+    O buffer pool fica com metade da memória reservada fora do pool do
+    PHP-FPM (o restante atende Redis, nginx, buffers por conexão e o
+    sistema), em múltiplos de 128 MB por instância. O redo log comporta um
+    quarto do buffer pool, para que checkpoints não travem as escritas em
+    picos de compras. Cada worker do PHP abre no máximo uma conexão; a folga
+    atende filas, migrações, testes e acesso administrativo.
+
+    Args:
+        cpus: Quantidade de CPUs
+        memory_mb: Memória total em MB
+        workers: Processos PHP que atendem requisições simultaneamente
+
+    Returns:
+        MysqlSettings: Configuração calculada
+    """
+    cpus = max(1, cpus)
+    buffer_pool_mb = max(128, int(reserved_memory_mb(memory_mb) * 0.5))
+    instances = 1 if buffer_pool_mb < 1024 else max(1, min(8, cpus, buffer_pool_mb // 1024))
+    chunk_mb = 128 * instances
+    buffer_pool_mb = max(chunk_mb, buffer_pool_mb // chunk_mb * chunk_mb)
+
+    max_connections = max(151, workers + 50)
+    return MysqlSettings(
+        buffer_pool_mb=buffer_pool_mb,
+        buffer_pool_instances=instances,
+        redo_log_mb=min(4096, max(256, buffer_pool_mb // 4)),
+        max_connections=max_connections,
+        table_open_cache=max(2000, max_connections * 8),
+        table_open_cache_instances=max(1, min(16, cpus)),
+        thread_cache_size=min(100, max(16, workers)),
+        io_threads=max(4, min(16, cpus)),
+    )
+
+
+def render_mysql_config(settings, cpus, memory_mb, workers):
+    """Gera o arquivo de configuração do MySQL para o serviço db."""
+    return (
+        f"# Gerado pelo setup.py ({cpus} CPUs, {memory_mb} MB, {workers} workers PHP).\n"
+        "# Não editar: o arquivo é reescrito a cada execução.\n"
+        "[mysqld]\n"
+        "# Memória\n"
+        f"innodb_buffer_pool_size = {settings.buffer_pool_mb}M\n"
+        f"innodb_buffer_pool_instances = {settings.buffer_pool_instances}\n"
+        f"innodb_redo_log_capacity = {settings.redo_log_mb}M\n"
+        "\n"
+        "# Conexões e caches de tabelas\n"
+        f"max_connections = {settings.max_connections}\n"
+        f"thread_cache_size = {settings.thread_cache_size}\n"
+        f"table_open_cache = {settings.table_open_cache}\n"
+        f"table_open_cache_instances = {settings.table_open_cache_instances}\n"
+        "table_definition_cache = 2000\n"
+        "skip-name-resolve\n"
+        "\n"
+        "# Gravação: transações de pagamento mantêm flush a cada commit\n"
+        "innodb_flush_log_at_trx_commit = 1\n"
+        "sync_binlog = 1\n"
+        "innodb_flush_method = O_DIRECT\n"
+        "innodb_flush_neighbors = 0\n"
+        "innodb_io_capacity = 1000\n"
+        "innodb_io_capacity_max = 2000\n"
+        f"innodb_read_io_threads = {settings.io_threads}\n"
+        f"innodb_write_io_threads = {settings.io_threads}\n"
+        "\n"
+        "# Slow query log (lido pelo slow_query_analyzer.py)\n"
+        "slow_query_log = 1\n"
+        "slow_query_log_file = /var/log/mysql/mysql-slow.log\n"
+        f"long_query_time = {MYSQL_LONG_QUERY_TIME}\n"
+        "log_slow_extra = 1\n"
+        "\n"
+        "character-set-server = utf8mb4\n"
+        "collation-server = utf8mb4_unicode_ci\n"
+    )
+
+
+def create_mysql_config(cpus, memory_mb, workers):
+    """
+    Gera a configuração do MySQL do serviço db, montada em /etc/mysql/conf.d.
+
+    Args:
+        cpus: CPUs do host Docker
+        memory_mb: Memória do host Docker em MB
+        workers: Processos PHP que atendem requisições simultaneamente
+
+    Returns:
+        MysqlSettings: Configuração calculada
+    """
+    settings = size_mysql(cpus, memory_mb, workers)
+    log_info(f"MySQL: buffer pool = {settings.buffer_pool_mb} MB "
+             f"({settings.buffer_pool_instances} instância(s)), "
+             f"redo log = {settings.redo_log_mb} MB, "
+             f"max_connections = {settings.max_connections}")
+    write_if_changed(MYSQL_CONFIG_FILE, render_mysql_config(settings, cpus, memory_mb, workers))
+
+    # O mysqld roda com outro usuário no contêiner e precisa gravar o slow log
+    os.makedirs(MYSQL_LOG_DIR, exist_ok=True)
+    os.chmod(MYSQL_LOG_DIR, 0o777)
+    return settings
+
+
+def compose_with_production(docker_compose):
+    """
+    Monta o comando do Docker Compose com o override do perfil de produção.
+
+    Args:
+        docker_compose: Comando do Docker Compose
+
+    Returns:
+        str: Comando do Docker Compose com os arquivos -f adequados
+    """
+    if " -f " not in docker_compose:
+        docker_compose = f"{docker_compose} -f docker-compose.yml"
+    return f"{docker_compose} -f {PRODUCTION_COMPOSE_FILE}"
 
 
 def check_existing_containers(docker_compose):
@@ -459,60 +1103,65 @@ def get_clean_option():
     return clean_option, fresh_migrate
 
 
-def build_and_start_containers(docker_compose):
+def build_and_start_containers(docker_compose, profile="development"):
     """
-    Constrói e inicia os contêineres Docker.
+    Constrói os contêineres e os inicia conforme as dependências ficam prontas.
 
     Args:
         docker_compose: Comando do Docker Compose
+        profile: Perfil do ambiente (development ou production)
+
+    Returns:
+        dict: Nome do serviço -> ServiceStatus
     """
     # Iniciar build dos containers
     log_info("Iniciando build e download dos containers Docker...")
     run_command(f"{docker_compose} build")
 
-    # Iniciar o banco de dados primeiro
-    log_info("Iniciando o banco de dados...")
-    run_command(f"{docker_compose} up -d db")
-    log_info("Aguardando banco de dados inicializar...")
-    time.sleep(10)  # Esperar o banco inicializar
+    # Criar contêineres e rede sem iniciá-los, para que cada serviço possa
+    # ser iniciado individualmente sem disputar a criação da rede
+    log_info("Criando contêineres...")
+    run_command(f"{docker_compose} up --no-start")
 
-    # Iniciar os gateways
-    log_info("Iniciando gateways de pagamento...")
-    run_command(f"{docker_compose} up -d gateway1 gateway2")
-    log_info("Aguardando gateways inicializarem...")
-    time.sleep(5)  # Esperar os gateways inicializarem
+    log_info("Iniciando serviços e aguardando prontidão...")
+    statuses = asyncio.run(
+        bring_up_services(docker_compose, default_service_specs(docker_compose, profile)))
+    print_readiness_report(statuses)
+    return statuses
 
-    # Iniciar o restante da aplicação
-    log_info("Iniciando o restante da aplicação...")
-    run_command(f"{docker_compose} up -d")
 
+def install_composer_dependencies(app_session):
+    """
+    Instala as dependências do Composer.
 
-def check_app_key(docker_compose):
+    Args:
+        app_session: Sessão de execução persistente no contêiner da aplicação
+    """
+    log_info("Instalando dependências do Composer...")
+    result = app_session.run("composer install --no-interaction")
+    if not result.ok:
+        log_warning(f"composer install terminou com código {result.returncode}.")
+
+
+def check_app_key(app_session):
     """
     Verifica a chave da aplicação Laravel.
 
     Args:
-        docker_compose: Comando do Docker Compose
+        app_session: Sessão de execução persistente no contêiner da aplicação
 
     Returns:
         bool: True se a chave já existe, False caso contrário
     """
     log_info("Verificando chave da aplicação...")
 
-    app_key_cmd = subprocess.run(
-        f"{docker_compose} exec app php -r \"echo env('APP_KEY');\"",
-        shell=True,
-        capture_output=True,
-        text=True,
-        check=False  # Definido explicitamente
-    )
-
-    app_key = app_key_cmd.stdout.strip()
+    # Só a presença da chave é consultada, e sem echo: o valor não vai para o console nem para logs de CI
+    app_key_cmd = app_session.run("php -r \"echo env('APP_KEY') ? 'present' : '';\"", echo=False)
+    has_app_key = app_key_cmd.ok and app_key_cmd.stdout.strip() == "present"
 
-    if not app_key:
+    if not has_app_key:
         log_info("Gerando nova chave da aplicação...")
-        run_command(
-            f"{docker_compose} exec app php artisan key:generate --force")
+        app_session.run("php artisan key:generate --force")
         log_success("Nova chave gerada com sucesso.")
         return False
     else:
@@ -520,42 +1169,39 @@ def check_app_key(docker_compose):
         return True
 
 
-def run_migrations(docker_compose, fresh_migrate):
+def run_migrations(app_session, fresh_migrate):
     """
     Executa migrações no banco de dados.
 
     Args:
-        docker_compose: Comando do Docker Compose
+        app_session: Sessão de execução persistente no contêiner da aplicação
         fresh_migrate: Se deve executar migrações com --fresh
     """
     if fresh_migrate == "yes":
         log_info("Resetando banco de dados e executando migrações...")
-        run_command(
-            f"{docker_compose} exec app php artisan migrate:fresh --seed --force")
+        app_session.run("php artisan migrate:fresh --seed --force")
     else:
         log_info("Executando migrações sem resetar banco de dados...")
-        try:
-            migrate_cmd = subprocess.run(
-                f"{docker_compose} exec app php artisan migrate --seed --force",
-                shell=True,
-                capture_output=True,
-                text=True,
-                check=False  # Definido explicitamente
-            )
-        except Exception:
-            # Ignorar erros (tabelas já podem existir)
-            pass
+        # Erros são ignorados (tabelas já podem existir)
+        app_session.run("php artisan migrate --seed --force")
 
 
-def optimize_laravel(docker_compose):
+def optimize_laravel(app_session, keep_caches=False):
     """
     Otimiza a aplicação Laravel.
 
     Args:
-        docker_compose: Comando do Docker Compose
+        app_session: Sessão de execução persistente no contêiner da aplicação
+        keep_caches: Mantém os caches de config, rotas, eventos e views
+            (modo warm boot); sem ele, os caches são limpos para que mudanças
+            no código e no .env valham sem rebuild
     """
     log_info("Otimizando a aplicação...")
 
+    if keep_caches:
+        app_session.run("php artisan optimize")
+        return
+
     commands = [
         "php artisan optimize",
         "php artisan view:clear",
@@ -563,47 +1209,76 @@ def optimize_laravel(docker_compose):
         "php artisan config:clear"
     ]
 
-    for cmd in commands:
-        run_command(f"{docker_compose} exec app {cmd}")
+    app_session.run_batch(commands)
 
 
-def check_laravel_accessibility():
+def start_queue_workers(docker_compose, timeout=60.0):
     """
-    Verifica se o Laravel está acessível via HTTP.
+    Inicia o worker da fila de pagamentos (serviço queue).
+
+    O `up --no-start` só cria o contêiner, e o queue:work depende do vendor/
+    do bind mount: o worker é iniciado depois do composer e das migrações.
+    Sem ele as compras assíncronas ficam PENDING.
+
+    Args:
+        docker_compose: Comando do Docker Compose
+        timeout: Tempo máximo de espera em segundos
+
+    Returns:
+        bool: True se o worker está em execução, False caso contrário
+    """
+    log_info("Iniciando o worker da fila de pagamentos...")
+    if not run_command(f"{docker_compose} start queue"):
+        log_warning("Falha ao iniciar o serviço queue. "
+                    "Use 'python queue_workers.py start 1' para tentar novamente.")
+        return False
+
+    ready, _, detail = asyncio.run(wait_until_ready(
+        [compose_health_probe(docker_compose, "queue")], timeout))
+    if ready:
+        log_success("Worker da fila de pagamentos em execução.")
+    else:
+        log_warning(f"O worker da fila não ficou em execução ({detail}). "
+                    f"Verifique com: {docker_compose} logs queue")
+    return ready
+
+
+def check_laravel_accessibility(port=8000, timeout=60.0):
+    """
+    Verifica se o Laravel está acessível via HTTP, com backoff adaptativo.
+
+    Args:
+        port: Porta local (8000 no artisan serve, 80 pelo nginx em produção)
+        timeout: Tempo máximo de espera em segundos
 
     Returns:
         bool: True se o Laravel está acessível, False caso contrário
     """
     log_info("Verificando se o Laravel está acessível...")
 
-    try:
-        curl_cmd = subprocess.run(
-            "curl -s -o /dev/null -w \"%{http_code}\" \"http://localhost:8000\"",
-            shell=True,
-            capture_output=True,
-            text=True,
-            check=False  # Definido explicitamente
-        )
+    started_at = time.monotonic()
+    ready, _, detail = asyncio.run(wait_until_ready(
+        [http_probe("localhost", port, "/api/health", accept_any_status=False)],
+        timeout
+    ))
 
-        if curl_cmd.stdout.strip() == "200":
-            log_success("Laravel está acessível via http://localhost:8000")
-            return True
-        else:
-            log_warning("Não foi possível confirmar se o Laravel está acessível. "
-                        "Tente acessar manualmente http://localhost:8000")
-            return False
-    except Exception:
-        log_warning("Não foi possível verificar se o Laravel está acessível. "
-                    "Tente acessar manualmente http://localhost:8000")
-        return False
+    if ready:
+        log_success(f"Laravel está acessível via http://localhost:{port} "
+                    f"({time.monotonic() - started_at:.1f}s)")
+        return True
+
+    log_warning(f"Não foi possível confirmar se o Laravel está acessível ({detail}). "
+                f"Tente acessar manualmente http://localhost:{port}/api/health")
+    return False
 
 
-def show_summary(docker_compose):
+def show_summary(docker_compose, base_url="http://localhost:8000"):
     """
     Exibe um resumo do setup.
 
     Args:
         docker_compose: Comando do Docker Compose
+        base_url: Endereço da aplicação
     """
     print(f"\n{Colors.GREEN}SETUP CONCLUÍDO COM SUCESSO!{Colors.RESET}\n")
 
@@ -611,8 +1286,8 @@ def show_summary(docker_compose):
     print("      INFORMAÇÕES DO SISTEMA")
     print(f"====================================={Colors.RESET}")
     print("Sua aplicação Laravel está rodando em:")
-    print("- Aplicação Web: http://localhost:8000")
-    print("- API: http://localhost:8000/api")
+    print(f"- Aplicação Web: {base_url}")
+    print(f"- API: {base_url}/api")
     print("- Acesso ao Banco: localhost:3306 (via cliente de banco de dados)")
     print("- Gateway 1: http://localhost:3001")
     print("- Gateway 2: http://localhost:3002")
@@ -645,8 +1320,47 @@ def show_summary(docker_compose):
     print(f"{Colors.CYAN}====================================={Colors.RESET}\n")
 
 
+def parse_arguments(argv):
+    """
+    Interpreta os argumentos da linha de comando.
+
+    Args:
+        argv: Argumentos da linha de comando
+
+    Returns:
+        argparse.Namespace: Opções do script
+    """
+    parser = argparse.ArgumentParser(
+        description="Configura e inicia o ambiente Docker do Multi-Gateway.")
+    parser.add_argument(
+        "--gateway-mock", nargs="?", const="default", default=None, metavar="CENARIO",
+        help="Substitui gateway1/gateway2 pelo gateway_mock.py local, com o cenário "
+             "de docker/gateway-mock/CENARIO.json (padrão: default)")
+    parser.add_argument(
+        "--profile", choices=["development", "production"], default="development",
+        help="development: php artisan serve na porta 8000; production: PHP-FPM "
+             "atrás do nginx na porta 80, dimensionado pelas CPUs e memória do host")
+    parser.add_argument(
+        "--warm-boot", action="store_true",
+        help="Mantém os caches do Laravel e ativa OPcache dimensionado, sem "
+             "revalidação e com preload (gerados pelo warm_boot.py)")
+    parser.add_argument(
+        "--measure-boot", type=int, default=0, metavar="N",
+        help="Com --warm-boot, compara as primeiras N requisições a frio e a quente")
+    parser.add_argument(
+        "--db-probe", action="store_true",
+        help="Ao final, confere a configuração gerada do MySQL e mede inserções e "
+             "consultas sobre uma cópia da tabela transactions (mysql_probe.py)")
+    parser.add_argument(
+        "--fpm-child-memory", type=int, default=64, metavar="MB",
+        help="Memória estimada por processo PHP-FPM no perfil production (padrão: 64)")
+    return parser.parse_args(argv)
+
+
 def main():
     """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+
     # Banner de boas-vindas
     print(f"{Colors.CYAN}")
     print("=============================================")
@@ -670,6 +1384,16 @@ def main():
 
     # Determinar comando do Docker Compose
     docker_compose = find_docker_compose()
+    if options.profile == "production":
+        docker_compose = compose_with_production(docker_compose)
+        log_info("Perfil de produção: PHP-FPM atrás do nginx")
+    if options.gateway_mock:
+        docker_compose = compose_with_gateway_mock(docker_compose, options.gateway_mock)
+        log_info(f"Gateways simulados localmente (cenário: {options.gateway_mock})")
+    cold_compose = docker_compose
+    if options.warm_boot:
+        docker_compose = warm_boot.compose_with_warm_boot(docker_compose)
+        log_info("Warm boot: caches do Laravel mantidos, OPcache com preload")
     log_success(f"Usando comando: {docker_compose}")
 
     # Verificar diretório da aplicação Laravel
@@ -684,6 +1408,16 @@ def main():
     # Criar configuração do Nginx
     create_nginx_config()
 
+    # Dimensionar PHP-FPM (produção) e MySQL pelos recursos do host Docker
+    cpus, memory_mb = detect_host_resources()
+    log_info(f"Host Docker: {cpus} CPUs, {memory_mb} MB de memória")
+    workers = 1  # php artisan serve atende uma requisição por vez
+    if options.profile == "production":
+        workers = create_production_config(cpus, memory_mb, options.fpm_child_memory).max_children
+    create_mysql_config(cpus, memory_mb, workers)
+    if options.warm_boot:
+        warm_boot.generate()
+
     # Verificar contêineres existentes
     check_existing_containers(docker_compose)
 
@@ -691,35 +1425,68 @@ def main():
     _, fresh_migrate = get_clean_option()
 
     # Construir e iniciar contêineres
-    build_and_start_containers(docker_compose)
+    statuses = build_and_start_containers(docker_compose, options.profile)
 
     # Verificar contêineres
     log_info("Verificando status dos contêineres...")
     run_command(f"{docker_compose} ps")
 
     # Verificar se a aplicação está pronta
-    app_ready = check_app_readiness(docker_compose)
+    app_ready = statuses["app"].ready
 
     if app_ready:
-        # Instalar dependências do composer
-        log_info("Instalando dependências do Composer...")
-        run_command(
-            f"{docker_compose} exec app composer install --no-interaction")
-
-        # Verificar a chave da aplicação
-        check_app_key(docker_compose)
-
-        # Executar migrações
-        run_migrations(docker_compose, fresh_migrate)
-
-        # Otimizar o Laravel
-        optimize_laravel(docker_compose)
+        # Um único canal de execução para todas as etapas no contêiner da aplicação
+        with ExecSession(docker_compose, "app") as app_session:
+            # Instalar dependências do composer
+            install_composer_dependencies(app_session)
+
+            # Verificar a chave da aplicação
+            check_app_key(app_session)
+
+            # Executar migrações
+            run_migrations(app_session, fresh_migrate)
+
+            # Otimizar o Laravel
+            optimize_laravel(app_session, keep_caches=options.warm_boot)
+
+        log_info("Tempo por etapa no contêiner da aplicação:")
+        print(format_results(app_session.history))
+
+        # O preload só é lido na inicialização do PHP: com o vendor/ instalado
+        # a lista de classes muda e o app precisa ser reiniciado
+        if options.warm_boot and warm_boot.generate():
+            log_info("Reiniciando a aplicação para carregar o novo preload...")
+            run_command(f"{docker_compose} restart app")
+
+        # Worker das compras assíncronas, agora que o vendor/ e as tabelas existem
+        start_queue_workers(docker_compose)
+
+        # Segunda verificação: o /api/health precisa responder 2xx (em produção, pelo nginx)
+        port = 80 if options.profile == "production" else 8000
+        if not check_laravel_accessibility(port):
+            log_error("A aplicação não respondeu ao /api/health após o composer e as migrações.")
+            log_error("Verifique os logs com o comando:")
+            print(f"  {docker_compose} logs app")
+            sys.exit(1)
 
-        # Verificar se o Laravel está acessível
-        check_laravel_accessibility()
+        if options.db_probe:
+            try:
+                mysql_probe.print_probe(mysql_probe.run_probe(docker_compose))
+            except RuntimeError as e:
+                log_warning(f"Sonda do MySQL falhou: {e}")
+
+        if options.warm_boot and options.measure_boot > 0:
+            base_url = "http://localhost" if port == 80 else f"http://localhost:{port}"
+            try:
+                phases = warm_boot.measure_cold_warm(
+                    cold_compose, base_url, options.measure_boot,
+                    9000 if options.profile == "production" else 8000)
+                warm_boot.print_comparison(phases)
+            except RuntimeError as e:
+                log_warning(f"Medição a frio x a quente interrompida: {e}")
 
         # Exibir resumo
-        show_summary(docker_compose)
+        show_summary(docker_compose, "http://localhost" if port == 80 else f"http://localhost:{port}")
     else:
         log_error(
             "Não foi possível verificar se a aplicação está funcionando corretamente.")
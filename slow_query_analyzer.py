@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Slow Query Analyzer
+-------------------
+Lê o slow query log do MySQL em uma passada (mmap, sem carregar o arquivo
+em memória), agrupa as consultas por fingerprint (literais, listas IN e
+VALUES normalizados) e relata, por fingerprint, quantidade, tempo total,
+p95 e linhas examinadas.
+
+Em seguida cruza as consultas mais custosas com o esquema declarado em
+multigateway-app/database/migrations e sugere índices ausentes: colunas de
+igualdade do WHERE seguidas da coluna de intervalo ou do ORDER BY, quando
+nenhum índice existente começa por essas colunas.
+
+Uso:
+  python slow_query_analyzer.py
+  python slow_query_analyzer.py docker/mysql/logs/mysql-slow.log --top 20 --json
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+
+from latency_histogram import LatencyHistogram, format_percentiles
+from log_analyzer import iter_lines
+
+SLOW_LOG = os.path.join("docker", "mysql", "logs", "mysql-slow.log")
+MIGRATIONS_DIR = os.path.join("multigateway-app", "database", "migrations")
+
+# Normalização de literais
+COMMENT_RE = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+NUMBER_RE = re.compile(r"(?<![\w.?])(?:0x[0-9a-f]+|-?\d+(?:\.\d+)?(?:e[+-]?\d+)?)(?![\w])", re.I)
+IN_LIST_RE = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+VALUES_RE = re.compile(r"\bvalues\s*\([^()]*\)(?:\s*,\s*\([^()]*\))*", re.I)
+SPACE_RE = re.compile(r"\s+")
+
+# Cabeçalhos do slow log
+QUERY_TIME_RE = re.compile(
+    rb"# Query_time: ([\d.]+)\s+Lock_time: ([\d.]+)\s+Rows_sent: (\d+)\s+Rows_examined: (\d+)")
+
+# Partes da consulta usadas pelo sugestor de índices
+FROM_RE = re.compile(r"\bfrom (\w+)")
+WHERE_RE = re.compile(r"\bwhere (.*?)(?= group by | order by | limit | for update|$)")
+ORDER_RE = re.compile(r"\border by (.*?)(?= limit | for update|$)")
+EQUALITY_RE = re.compile(r"^(?:(\w+)\.)?(\w+) (?:= \?|in \(\?\+\))$")
+RANGE_RE = re.compile(r"^(?:(\w+)\.)?(\w+) (?:[<>]=? \?|between \? and \?|like \?)$")
+
+# Migrações: tabelas, colunas e índices
+SCHEMA_CALL_RE = re.compile(r"(?:Schema::|\$schema->)(create|table)\(\s*'(\w+)'")
+TABLE_CALL_RE = re.compile(r"\$table->(\w+)\(([^;]*?)\)((?:\s*->\w+\([^;]*?\))*)\s*;", re.S)
+CHAINED_RE = re.compile(r"->(\w+)\(")
+QUOTED_RE = re.compile(r"'(\w+)'")
+INDEX_METHODS = {"index", "unique", "primary", "foreign"}
+
+
+# Cores para formatação no terminal
+class Colors:
+    """Define cores para saídas no terminal."""
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[0;33m'
+    BLUE = '\033[0;34m'
+    RESET = '\033[0m'  # No Color
+
+
+def log_info(message):
+    """Exibe mensagem informativa."""
+    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}", file=sys.stderr)
+
+
+def log_error(message):
+    """Exibe mensagem de erro."""
+    print(f"{Colors.RED}[ERROR]{Colors.RESET} {message}", file=sys.stderr)
+
+
+def fingerprint(statement):
+    """
+    Normaliza uma consulta para agrupar execuções equivalentes.
+
+    Ex.: "SELECT * FROM `t` WHERE `t`.`id` IN (1, 2, 3) AND name = 'x'"
+         -> "select * from t where t.id in (?+) and name = ?"
+    """
+    text = COMMENT_RE.sub(" ", statement)
+    text = STRING_RE.sub("?", text)
+    text = NUMBER_RE.sub("?", text)
+    text = text.replace("`", "").lower()
+    text = IN_LIST_RE.sub("in (?+)", text)
+    text = VALUES_RE.sub("values (?+)", text)
+    return SPACE_RE.sub(" ", text).strip().rstrip(";").strip()
+
+
+class SlowQueryEntry:
+    """Uma execução registrada no slow log."""
+
+    __slots__ = ("query_time", "lock_time", "rows_sent", "rows_examined", "statement")
+
+    def __init__(self, query_time, lock_time, rows_sent, rows_examined, statement):
+        self.query_time = query_time
+        self.lock_time = lock_time
+        self.rows_sent = rows_sent
+        self.rows_examined = rows_examined
+        self.statement = statement
+
+
+def iter_slow_log(path):
+    """
+    Percorre as execuções de um slow log do MySQL.
+
+    Linhas "# Time", "# User@Host", "use ..." e "SET timestamp=..." são
+    cabeçalhos; o texto após "# Query_time" até o próximo cabeçalho é a
+    consulta (que pode ocupar várias linhas).
+
+    Yields:
+        SlowQueryEntry
+    """
+    metrics = None
+    statement = []
+    for _, _, line in iter_lines(path):
+        if line.startswith(b"#"):
+            if line.startswith(b"# Time:") and metrics and statement:
+                yield SlowQueryEntry(*metrics, b" ".join(statement).decode(errors="replace"))
+                metrics, statement = None, []
+            match = QUERY_TIME_RE.match(line)
+            if match:
+                if metrics and statement:
+                    yield SlowQueryEntry(*metrics, b" ".join(statement).decode(errors="replace"))
+                statement = []
+                metrics = (float(match.group(1)), float(match.group(2)),
+                           int(match.group(3)), int(match.group(4)))
+            continue
+        if metrics is None:
+            continue  # Cabeçalho do arquivo (versão do servidor, portas)
+        lowered = line[:16].lower()
+        if not statement and (lowered.startswith(b"use ") or lowered.startswith(b"set timestamp=")):
+            continue
+        statement.append(line.strip())
+    if metrics and statement:
+        yield SlowQueryEntry(*metrics, b" ".join(statement).decode(errors="replace"))
+
+
+class FingerprintStats:
+    """Métricas agregadas de um fingerprint."""
+
+    def __init__(self, text):
+        self.fingerprint = text
+        self.count = 0
+        self.total_time = 0.0
+        self.lock_time = 0.0
+        self.rows_examined = 0
+        self.rows_sent = 0
+        self.max_rows_examined = 0
+        self.latency = LatencyHistogram()
+        self.sample = None
+        self.sample_time = -1.0
+
+    def add(self, entry):
+        """Acrescenta uma execução."""
+        self.count += 1
+        self.total_time += entry.query_time
+        self.lock_time += entry.lock_time
+        self.rows_examined += entry.rows_examined
+        self.rows_sent += entry.rows_sent
+        self.max_rows_examined = max(self.max_rows_examined, entry.rows_examined)
+        self.latency.record_seconds(entry.query_time)
+        if entry.query_time > self.sample_time:
+            self.sample, self.sample_time = entry.statement, entry.query_time
+
+    def to_dict(self):
+        """Resumo serializável."""
+        return {
+            "fingerprint": self.fingerprint,
+            "count": self.count,
+            "total_s": round(self.total_time, 6),
+            "lock_s": round(self.lock_time, 6),
+            "p95_ms": self.latency.percentile(95) / 1000.0,
+            "rows_examined_avg": round(self.rows_examined / self.count, 1),
+            "rows_examined_max": self.max_rows_examined,
+            "rows_sent_avg": round(self.rows_sent / self.count, 1),
+            "slowest_sample": self.sample,
+        }
+
+
+def analyze(paths):
+    """
+    Agrupa as execuções dos slow logs por fingerprint.
+
+    Returns:
+        dict: fingerprint -> FingerprintStats
+    """
+    stats = {}
+    for path in paths:
+        for entry in iter_slow_log(path):
+            text = fingerprint(entry.statement)
+            if not text or text.startswith(("set ", "commit", "rollback", "start transaction")):
+                continue
+            current = stats.get(text)
+            if current is None:
+                current = stats[text] = FingerprintStats(text)
+            current.add(entry)
+    return stats
+
+
+def _columns_for(method, args):
+    """Colunas criadas por uma chamada $table->metodo(args)."""
+    names = QUOTED_RE.findall(args)
+    if method == "id":
+        return names or ["id"]
+    if method == "timestamps":
+        return ["created_at", "updated_at"]
+    if method == "softDeletes":
+        return names or ["deleted_at"]
+    if method == "rememberToken":
+        return ["remember_token"]
+    if method in ("morphs", "nullableMorphs", "uuidMorphs"):
+        return [f"{names[0]}_type", f"{names[0]}_id"] if names else []
+    if method in INDEX_METHODS or method.startswith("drop"):
+        return []
+    return names[:1]
+
+
+def load_schema(migrations_dir=MIGRATIONS_DIR):
+    """
+    Extrai tabelas, colunas e índices do método up() das migrações.
+
+    Cobre os padrões usados no projeto: id(), foreignId()->constrained(),
+    foreign(), index()/unique()/primary() isolados ou encadeados e morphs().
+
+    Returns:
+        dict: tabela -> {"columns": set, "indexes": list de tuplas de colunas}
+    """
+    schema = {}
+    for path in sorted(glob.glob(os.path.join(migrations_dir, "*.php"))):
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        up = source.split("function down(", 1)[0]
+        calls = list(SCHEMA_CALL_RE.finditer(up))
+        for position, call in enumerate(calls):
+            end = calls[position + 1].start() if position + 1 < len(calls) else len(up)
+            table = schema.setdefault(call.group(2), {"columns": set(), "indexes": []})
+            for match in TABLE_CALL_RE.finditer(up, call.end(), end):
+                method, args, chain = match.group(1), match.group(2), match.group(3) or ""
+                chained = CHAINED_RE.findall(chain)
+                columns = _columns_for(method, args)
+                table["columns"].update(columns)
+
+                if method in INDEX_METHODS:
+                    if args.lstrip().startswith("["):
+                        listed = QUOTED_RE.findall(args.split("]", 1)[0])
+                    else:
+                        listed = QUOTED_RE.findall(args)[:1]
+                    if listed:
+                        table["indexes"].append(tuple(listed))
+                elif method in ("id", "bigIncrements", "increments"):
+                    table["indexes"].append(tuple(columns))
+                elif method in ("morphs", "nullableMorphs", "uuidMorphs"):
+                    table["indexes"].append(tuple(columns))
+                elif columns and ("index" in chained or "unique" in chained
+                                  or "primary" in chained or "constrained" in chained):
+                    table["indexes"].append((columns[0],))
+    return schema
+
+
+def candidate_index(text):
+    """
+    Monta o índice candidato de uma consulta (apenas colunas da tabela do FROM).
+
+    Igualdades e listas IN vêm primeiro, na ordem do WHERE; depois a
+    primeira coluna de intervalo ou, sem intervalo, as colunas do ORDER BY.
+    Consultas com OR ou subconsultas não recebem sugestão.
+
+    Returns:
+        tuple: (tabela, tupla de colunas) ou (None, ())
+    """
+    if not text.startswith(("select ", "update ", "delete ")) or text.count("select ") > 1:
+        return None, ()
+    table_match = FROM_RE.search(text) or re.match(r"update (\w+)", text)
+    if not table_match:
+        return None, ()
+    table = table_match.group(1)
+
+    equality, ranges = [], []
+    where = WHERE_RE.search(text)
+    if where:
+        clause = where.group(1)
+        if " or " in clause:
+            return table, ()
+        for predicate in clause.split(" and "):
+            predicate = predicate.strip().strip("()")
+            for pattern, target in ((EQUALITY_RE, equality), (RANGE_RE, ranges)):
+                match = pattern.match(predicate)
+                if match and match.group(1) in (None, table) and match.group(2) not in target:
+                    target.append(match.group(2))
+                    break
+    columns = list(equality)
+    if ranges:
+        columns.append(ranges[0])
+    else:
+        order = ORDER_RE.search(text)
+        if order:
+            for part in order.group(1).split(","):
+                column = part.strip().split(" ")[0]
+                owner, _, name = column.rpartition(".")
+                if owner in ("", table) and name.isidentifier() and name not in columns:
+                    columns.append(name)
+    return table, tuple(columns)
+
+
+def advise(stats, schema, top=10):
+    """
+    Sugere índices para os fingerprints de maior tempo total.
+
+    Returns:
+        list: dicts com fingerprint, tabela, colunas, índices existentes e motivo
+    """
+    advice = []
+    seen = set()
+    ranked = sorted(stats.values(), key=lambda s: s.total_time, reverse=True)[:top]
+    for item in ranked:
+        table, columns = candidate_index(item.fingerprint)
+        if not table or not columns or columns == ("id",):
+            continue
+        definition = schema.get(table)
+        if definition is None or not set(columns) <= definition["columns"]:
+            continue
+        existing = definition["indexes"]
+        if any(index[:len(columns)] == columns for index in existing):
+            continue
+        if (table, columns) in seen:
+            continue
+        seen.add((table, columns))
+
+        extends = [index for index in existing if columns[:len(index)] == index]
+        reason = (f"estende o índice ({', '.join(extends[0])}), que pode ser removido"
+                  if extends else "nenhum índice existente começa por essas colunas")
+        advice.append({
+            "fingerprint": item.fingerprint,
+            "table": table,
+            "columns": list(columns),
+            "existing_indexes": [list(index) for index in existing],
+            "reason": reason,
+            "total_s": round(item.total_time, 6),
+            "rows_examined_avg": round(item.rows_examined / item.count, 1),
+            "migration": f"$table->index([{', '.join(repr(c) for c in columns)}]);",
+        })
+    return advice
+
+
+def print_report(stats, advice, top):
+    """Exibe os fingerprints mais custosos e as sugestões de índice."""
+    ranked = sorted(stats.values(), key=lambda s: s.total_time, reverse=True)[:top]
+    print(f"{Colors.BLUE}=== CONSULTAS LENTAS POR FINGERPRINT ==={Colors.RESET}")
+    for position, item in enumerate(ranked, 1):
+        print(f"\n{position}. {item.fingerprint[:160]}")
+        print(f"   {item.count} execuções, total {item.total_time:.3f}s, "
+              f"{format_percentiles(item.latency, (50.0, 95.0))}, "
+              f"linhas examinadas {item.rows_examined / item.count:.0f} em média "
+              f"(máx. {item.max_rows_examined}), enviadas {item.rows_sent / item.count:.0f}")
+
+    print(f"\n{Colors.BLUE}=== ÍNDICES SUGERIDOS ==={Colors.RESET}")
+    if not advice:
+        print("Nenhum índice ausente encontrado para as consultas analisadas.")
+    for item in advice:
+        print(f"\n{Colors.YELLOW}{item['table']}({', '.join(item['columns'])}){Colors.RESET}"
+              f" - {item['reason']}")
+        print(f"   consulta: {item['fingerprint'][:160]}")
+        print(f"   Schema::table('{item['table']}', fn (Blueprint $table) => "
+              f"{item['migration'].rstrip(';')});")
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Fingerprints do slow query log do MySQL e sugestão de índices")
+    parser.add_argument("files", nargs="*", default=[SLOW_LOG],
+                        help=f"Slow logs a analisar (padrão: {SLOW_LOG})")
+    parser.add_argument("--migrations", default=MIGRATIONS_DIR,
+                        help=f"Diretório das migrações (padrão: {MIGRATIONS_DIR})")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Fingerprints exibidos e analisados (padrão: 10)")
+    parser.add_argument("--json", action="store_true",
+                        help="Imprime o resultado em JSON")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+    paths = [path for path in options.files if os.path.isfile(path)]
+    if not paths:
+        log_error(f"Slow log não encontrado: {', '.join(options.files)}")
+        sys.exit(1)
+
+    stats = analyze(paths)
+    schema = load_schema(options.migrations)
+    log_info(f"{sum(s.count for s in stats.values())} execuções, {len(stats)} fingerprints; "
+             f"{len(schema)} tabelas nas migrações")
+    advice = advise(stats, schema, options.top)
+
+    if options.json:
+        ranked = sorted(stats.values(), key=lambda s: s.total_time, reverse=True)
+        json.dump({"fingerprints": [item.to_dict() for item in ranked[:options.top]],
+                   "advice": advice}, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print_report(stats, advice, options.top)
+
+
+if __name__ == "__main__":
+    main()
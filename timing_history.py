@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test Timing History
+-------------------
+Histórico de duração por teste entre execuções, armazenado em SQLite.
+Alimenta o balanceamento dos shards do run_tests.py e o relatório de
+testes mais lentos e de regressões de tempo.
+Seguindo as diretrizes do PEP 8.
+"""
+
+import sqlite3
+import statistics
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    label TEXT
+);
+CREATE TABLE IF NOT EXISTS test_durations (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    class_name TEXT NOT NULL,
+    test_name TEXT NOT NULL,
+    duration REAL NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_test_durations_test
+    ON test_durations (class_name, test_name, run_id);
+"""
+
+
+class TimingHistory:
+    """Acesso ao histórico de duração por teste."""
+
+    def __init__(self, path, window=10):
+        """
+        Args:
+            path: Caminho do arquivo SQLite
+            window: Quantidade de execuções usadas na mediana móvel
+        """
+        self.window = window
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """Fecha a conexão com o banco."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _recent_durations(self):
+        """Retorna (classe, teste) -> durações das últimas execuções, da mais nova à mais antiga."""
+        rows = self.connection.execute(
+            """
+            SELECT class_name, test_name, duration FROM (
+                SELECT class_name, test_name, duration,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY class_name, test_name ORDER BY run_id DESC
+                       ) AS position
+                FROM test_durations
+                WHERE status != 'skipped'
+            ) WHERE position <= ?
+            """,
+            (self.window,)
+        )
+        recent = {}
+        for class_name, test_name, duration in rows:
+            recent.setdefault((class_name, test_name), []).append(duration)
+        return recent
+
+    def rolling_medians(self):
+        """
+        Calcula a mediana móvel de duração de cada teste.
+
+        Returns:
+            dict: (classe, teste) -> mediana em segundos
+        """
+        return {key: statistics.median(values)
+                for key, values in self._recent_durations().items()}
+
+    def class_durations(self):
+        """
+        Estima a duração de cada classe somando as medianas de seus testes.
+
+        Returns:
+            dict: Classe -> duração estimada em segundos
+        """
+        totals = {}
+        for (class_name, _), median in self.rolling_medians().items():
+            totals[class_name] = totals.get(class_name, 0.0) + median
+        return totals
+
+    def record_run(self, cases, label=None):
+        """
+        Grava as durações de uma execução.
+
+        Args:
+            cases: Lista de dicts com class_name, test_name, duration e status
+            label: Identificação opcional da execução (ex.: shard)
+
+        Returns:
+            int: ID da execução gravada
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (started_at, label) VALUES (?, ?)",
+                (time.strftime("%Y-%m-%dT%H:%M:%S"), label)
+            )
+            run_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO test_durations (run_id, class_name, test_name, duration, status) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(run_id, c["class_name"], c["test_name"], c["duration"], c["status"])
+                 for c in cases]
+            )
+        return run_id
+
+    def find_regressions(self, cases, threshold=1.5, min_delta=0.05):
+        """
+        Compara as durações atuais com a mediana móvel anterior.
+
+        Deve ser chamada antes de record_run, para que a execução atual não
+        entre na própria referência.
+
+        Args:
+            cases: Lista de dicts com class_name, test_name, duration e status
+            threshold: Razão mínima entre duração atual e mediana
+            min_delta: Diferença mínima em segundos para ignorar ruído
+
+        Returns:
+            list: Tuplas (caso, mediana, razão), da maior razão para a menor
+        """
+        medians = self.rolling_medians()
+        regressions = []
+        for case in cases:
+            median = medians.get((case["class_name"], case["test_name"]))
+            if not median or case["status"] == "skipped":
+                continue
+            ratio = case["duration"] / median
+            if ratio >= threshold and case["duration"] - median >= min_delta:
+                regressions.append((case, median, ratio))
+        return sorted(regressions, key=lambda item: item[2], reverse=True)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Request Trace Tool
+------------------
+Reconstrói o caminho de uma requisição a partir do request_id que o
+CustomJsonFormatter grava em todos os registros dos canais `system`,
+`gateways` e `transactions` (o middleware RequestMonitoring gera um
+X-Request-ID quando o cliente não envia).
+
+Mantém em disco um índice request_id -> (arquivo, offset), atualizado de
+forma incremental com os mesmos checkpoints do log_indexer.py. Exibir uma
+requisição é uma consulta pela chave primária seguida de um seek por
+registro; nenhum arquivo é relido por inteiro.
+
+Uso:
+  python trace_requests.py show <request_id>   # waterfall da requisição
+  python trace_requests.py slowest --limit 20  # requisições mais lentas por etapa
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from log_analyzer import LOG_DIR, iter_lines, parse_record
+from log_indexer import CHANNELS, CheckpointedIndex
+
+TRACE_FILE = ".trace-index.sqlite"
+
+# Largura da barra do waterfall em caracteres
+BAR_WIDTH = 40
+
+
+# Cores para formatação no terminal
+class Colors:
+    """Define cores para saídas no terminal."""
+    RED = '\033[0;31m'
+    BLUE = '\033[0;34m'
+    RESET = '\033[0m'  # No Color
+
+
+def log_info(message):
+    """Exibe mensagem informativa."""
+    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}")
+
+
+def log_error(message):
+    """Exibe mensagem de erro."""
+    print(f"{Colors.RED}[ERROR]{Colors.RESET} {message}")
+
+
+TRACE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trace_entries (
+    request_id TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (request_id, file_id, offset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_trace_entries_file ON trace_entries (file_id);
+CREATE TABLE IF NOT EXISTS trace_requests (
+    request_id TEXT PRIMARY KEY,
+    first_ts REAL NOT NULL,
+    last_ts REAL NOT NULL,
+    response_ms REAL,
+    route TEXT,
+    total_ms REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_trace_requests_total ON trace_requests (total_ms);
+"""
+
+
+def record_timestamp(record):
+    """Converte o datetime do registro em epoch (com microssegundos)."""
+    try:
+        return datetime.fromisoformat(record.get("datetime", "")).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class TraceIndex(CheckpointedIndex):
+    """Índice request_id -> (arquivo, offset) e resumo por requisição."""
+
+    SCHEMA = TRACE_SCHEMA
+
+    def __init__(self, path=TRACE_FILE):
+        """
+        Args:
+            path: Caminho do arquivo SQLite
+        """
+        super().__init__(path)
+
+    def _index_file(self, channel, path, start, file_id):
+        """Grava a posição de cada registro com request_id e atualiza o resumo."""
+        entries = []
+        requests = {}
+        offset = start
+        for line_offset, next_offset, line in iter_lines(path, start):
+            offset = next_offset
+            if b'"request_id":"' not in line:
+                continue
+            record = parse_record(line)
+            if record is None or not record.get("request_id"):
+                continue
+            ts = record_timestamp(record)
+            if ts is None:
+                continue
+            request_id = record["request_id"]
+            entries.append((request_id, file_id, line_offset, ts))
+
+            summary = requests.setdefault(request_id, [ts, ts, None, None])
+            summary[0] = min(summary[0], ts)
+            summary[1] = max(summary[1], ts)
+            context = record.get("context") or {}
+            if record.get("message") == "API Response":
+                summary[2] = context.get("response_time_ms")
+            if record.get("message") in ("API Request", "API Response"):
+                summary[3] = f"{context.get('method', '?')} {context.get('path', '?')}"
+
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO trace_entries (request_id, file_id, offset, ts) "
+            "VALUES (?, ?, ?, ?)", entries)
+        for request_id, (first_ts, last_ts, response_ms, route) in requests.items():
+            self._merge_request(request_id, first_ts, last_ts, response_ms, route)
+        return len(entries), offset
+
+    def _merge_request(self, request_id, first_ts, last_ts, response_ms, route):
+        row = self.connection.execute(
+            "SELECT first_ts, last_ts, response_ms, route FROM trace_requests "
+            "WHERE request_id = ?", (request_id,)).fetchone()
+        if row:
+            first_ts = min(first_ts, row[0])
+            last_ts = max(last_ts, row[1])
+            response_ms = response_ms if response_ms is not None else row[2]
+            route = route or row[3]
+        total_ms = response_ms if response_ms is not None else (last_ts - first_ts) * 1000
+        self.connection.execute(
+            "INSERT OR REPLACE INTO trace_requests "
+            "(request_id, first_ts, last_ts, response_ms, route, total_ms) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (request_id, first_ts, last_ts, response_ms, route, total_ms))
+
+    def _forget(self, file_id):
+        """Remove as entradas do arquivo e recalcula as requisições afetadas."""
+        affected = [row[0] for row in self.connection.execute(
+            "SELECT DISTINCT request_id FROM trace_entries WHERE file_id = ?", (file_id,))]
+        self.connection.execute("DELETE FROM trace_entries WHERE file_id = ?", (file_id,))
+        for request_id in affected:
+            self.connection.execute("DELETE FROM trace_requests WHERE request_id = ?",
+                                    (request_id,))
+            records = self.load(request_id)
+            if records:
+                first_ts = min(r["_ts"] for r in records)
+                last_ts = max(r["_ts"] for r in records)
+                responses = [r for r in records if r.get("message") == "API Response"]
+                response_ms = (responses[-1].get("context") or {}).get("response_time_ms") \
+                    if responses else None
+                self._merge_request(request_id, first_ts, last_ts, response_ms, None)
+
+    def load(self, request_id):
+        """
+        Lê os registros de uma requisição diretamente dos offsets indexados.
+
+        Args:
+            request_id: ID da requisição
+
+        Returns:
+            list: Registros decodificados, em ordem de horário, com _channel e _ts
+        """
+        rows = self.connection.execute(
+            "SELECT c.path, c.channel, e.offset, e.ts FROM trace_entries e "
+            "JOIN checkpoints c ON c.id = e.file_id "
+            "WHERE e.request_id = ? ORDER BY e.ts, e.offset", (request_id,)).fetchall()
+        records = []
+        handles = {}
+        try:
+            for path, channel, offset, ts in rows:
+                handle = handles.get(path)
+                if handle is None:
+                    try:
+                        handle = handles[path] = open(path, "rb")
+                    except OSError:
+                        continue
+                handle.seek(offset)
+                record = parse_record(handle.readline())
+                if record is not None and record.get("request_id") == request_id:
+                    record["_channel"] = channel
+                    record["_ts"] = ts
+                    records.append(record)
+        finally:
+            for handle in handles.values():
+                handle.close()
+        return records
+
+    def slowest(self, limit, since=None):
+        """Retorna as requisições com maior tempo total."""
+        query = "SELECT request_id, first_ts, total_ms, route FROM trace_requests"
+        params = []
+        if since is not None:
+            query += " WHERE first_ts >= ?"
+            params.append(since)
+        query += " ORDER BY total_ms DESC LIMIT ?"
+        params.append(limit)
+        return self.connection.execute(query, params).fetchall()
+
+
+def describe(record):
+    """Texto curto e duração (ms) de um registro para o waterfall."""
+    message = record.get("message", "")
+    context = record.get("context") or {}
+    metadata = context.get("metadata") or {}
+    gateway = (context.get("gateway") or {}).get("name", "")
+
+    if message == "API Request":
+        return f"API Request {context.get('method', '')} {context.get('path', '')}", None
+    if message == "API Response":
+        return (f"API Response {context.get('status_code', '')}",
+                context.get("response_time_ms"))
+    if message == "Gateway request":
+        return f"Gateway request {gateway} {context.get('operation', '')}", None
+    if message == "Gateway response":
+        return (f"Gateway response {gateway} {context.get('operation', '')} "
+                f"{context.get('status', '')}", metadata.get("processing_time_ms"))
+    if message.startswith("Transaction"):
+        return (f"{message} #{context.get('transaction_id', '')} {gateway}",
+                metadata.get("processing_time_ms"))
+    return message, metadata.get("processing_time_ms", context.get("processing_time_ms"))
+
+
+def stage_breakdown(records, total_ms=None):
+    """
+    Divide o tempo de uma requisição em etapas.
+
+    Returns:
+        dict: total, antes dos gateways, gateways com sucesso, tentativas com
+              falha (custo do fallback) e depois dos gateways, em ms
+    """
+    if not records:
+        return {}
+    start = records[0]["_ts"]
+    end = records[-1]["_ts"]
+    if total_ms is None:
+        total_ms = (end - start) * 1000
+
+    gateway_ok = gateway_failed = 0.0
+    first_gateway = last_gateway = None
+    for record in records:
+        message = record.get("message")
+        if message == "Gateway request" and first_gateway is None:
+            first_gateway = record["_ts"]
+        if message == "Gateway response":
+            context = record.get("context") or {}
+            elapsed = (context.get("metadata") or {}).get("processing_time_ms") or 0.0
+            if context.get("status") == "success":
+                gateway_ok += elapsed
+            else:
+                gateway_failed += elapsed
+            last_gateway = record["_ts"]
+
+    before = ((first_gateway - start) * 1000) if first_gateway else total_ms
+    after = max(0.0, total_ms - ((last_gateway - start) * 1000)) if last_gateway else 0.0
+    return {"total": total_ms, "before_gateways": before, "gateways": gateway_ok,
+            "failed_attempts": gateway_failed, "after_gateways": after}
+
+
+def print_waterfall(request_id, records):
+    """Exibe a linha do tempo de uma requisição."""
+    start = records[0]["_ts"]
+    rows = []
+    end_ms = 0.0
+    for record in records:
+        label, duration = describe(record)
+        at_ms = (record["_ts"] - start) * 1000
+        duration = duration if isinstance(duration, (int, float)) else None
+        begin_ms = max(0.0, at_ms - duration) if duration is not None else at_ms
+        rows.append((record["_channel"], label, begin_ms, at_ms, duration))
+        end_ms = max(end_ms, at_ms)
+
+    scale = BAR_WIDTH / end_ms if end_ms else 0
+    print(f"{Colors.BLUE}=== TRACE {request_id} ==={Colors.RESET}")
+    print(f"Início: {datetime.fromtimestamp(start).isoformat()}\n")
+    for channel, label, begin_ms, at_ms, duration in rows:
+        left = int(begin_ms * scale)
+        width = max(1, int(at_ms * scale) - left) if duration is not None else 1
+        bar = " " * left + ("█" * width if duration is not None else "│")
+        took = f"{duration:>8.1f}ms" if duration is not None else " " * 10
+        print(f"+{at_ms:>9.1f}ms {channel:<12} {label[:48]:<48} {took} {bar}")
+
+    response = [r for r in records if r.get("message") == "API Response"]
+    total_ms = (response[-1].get("context") or {}).get("response_time_ms") if response else None
+    print_breakdown_header()
+    print_breakdown_row(request_id, stage_breakdown(records, total_ms))
+
+
+def print_breakdown_header():
+    print(f"\n{'request_id':<28} {'total':>9} {'antes':>9} {'gateways':>9} "
+          f"{'falhas':>9} {'depois':>9}")
+
+
+def print_breakdown_row(request_id, stages, route=""):
+    if not stages:
+        return
+    print(f"{request_id[:28]:<28} {stages['total']:>7.1f}ms {stages['before_gateways']:>7.1f}ms "
+          f"{stages['gateways']:>7.1f}ms {stages['failed_attempts']:>7.1f}ms "
+          f"{stages['after_gateways']:>7.1f}ms  {route}")
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Trace de requisições pelos logs system, gateways e transactions")
+    parser.add_argument("--log-dir", default=LOG_DIR,
+                        help=f"Diretório dos logs (padrão: {LOG_DIR})")
+    parser.add_argument("--index", default=TRACE_FILE,
+                        help=f"Arquivo SQLite do índice (padrão: {TRACE_FILE})")
+    parser.add_argument("--no-update", action="store_true",
+                        help="Não atualiza o índice antes da consulta")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    show = subparsers.add_parser("show", help="Waterfall de uma requisição")
+    show.add_argument("request_id")
+
+    slowest = subparsers.add_parser("slowest", help="Requisições mais lentas, por etapa")
+    slowest.add_argument("--limit", type=int, default=20,
+                         help="Quantidade de requisições (padrão: 20)")
+    slowest.add_argument("--hours", type=float, default=None,
+                         help="Considera apenas as últimas N horas")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+
+    with TraceIndex(options.index) as index:
+        if not options.no_update:
+            started_at = time.monotonic()
+            totals = index.update(options.log_dir, CHANNELS)
+            if totals["records"] or totals["pruned"]:
+                log_info(f"Índice atualizado: {totals['records']} registros novos, "
+                         f"{totals['pruned']} arquivos removidos, "
+                         f"em {(time.monotonic() - started_at) * 1000:.0f}ms")
+
+        if options.command == "show":
+            records = index.load(options.request_id)
+            if not records:
+                log_error(f"Nenhum registro com request_id {options.request_id}")
+                sys.exit(1)
+            print_waterfall(options.request_id, records)
+            return
+
+        since = time.time() - options.hours * 3600 if options.hours else None
+        rows = index.slowest(options.limit, since)
+        print(f"{Colors.BLUE}=== REQUISIÇÕES MAIS LENTAS ==={Colors.RESET}")
+        print_breakdown_header()
+        for request_id, _, total_ms, route in rows:
+            stages = stage_breakdown(index.load(request_id), total_ms)
+            print_breakdown_row(request_id, stages, route or "")
+
+
+if __name__ == "__main__":
+    main()
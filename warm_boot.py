@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Warm Boot
+---------
+Modo de inicialização "quente" da aplicação Laravel:
+
+  - caches de config, rotas, eventos e views construídos e mantidos
+    (`php artisan optimize`, sem os `*:clear` do setup padrão);
+  - OPcache dimensionado pela quantidade real de arquivos PHP, sem revalidar
+    timestamps, em docker/php/opcache-warm.ini;
+  - script de preload com as classes do framework e de app/, compilado
+    uma vez na inicialização do PHP-FPM.
+
+O subcomando `measure` compara a latência das primeiras N requisições após
+reiniciar a aplicação a frio (sem caches e com o OPcache vazio) e a quente.
+
+Uso:
+  python warm_boot.py generate
+  python warm_boot.py measure --requests 50
+  python warm_boot.py measure --compose "docker compose -f docker-compose.yml \\
+      -f docker-compose.production.yml" --url http://localhost
+Seguindo as diretrizes do PEP 8.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from async_http import HttpClient, HttpError
+from latency_histogram import LatencyHistogram, format_percentiles
+
+APP_DIR = "multigateway-app"
+CONTAINER_APP_DIR = "/var/www/html"
+OPCACHE_INI = os.path.join("docker", "php", "opcache-warm.ini")
+PRELOAD_SCRIPT = os.path.join("bootstrap", "cache", "preload.php")
+COMPOSE_OVERRIDE_FILE = "docker-compose.warm-boot.yml"
+
+# Diretórios (relativos à aplicação) cujas classes são pré-carregadas
+PRELOAD_DIRS = [
+    "app",
+    "vendor/laravel/framework/src/Illuminate",
+    "vendor/laravel/sanctum/src",
+    "vendor/symfony/http-foundation",
+    "vendor/symfony/http-kernel",
+    "vendor/symfony/routing",
+    "vendor/monolog/monolog/src",
+    "vendor/nesbot/carbon/src",
+    "vendor/guzzlehttp/guzzle/src",
+    "vendor/guzzlehttp/psr7/src",
+    "vendor/guzzlehttp/promises/src",
+    "vendor/psr",
+]
+
+# Partes usadas apenas no console ou nos testes ficam fora do preload
+PRELOAD_EXCLUDED_DIRS = {"Console", "Testing", "Tests", "tests", "stubs", "resources"}
+
+# Diretórios ignorados na contagem de arquivos para o OPcache
+COUNT_EXCLUDED_DIRS = {"node_modules", "tests", "storage", ".git"}
+
+# Tamanhos de tabela de hash usados internamente pelo OPcache
+OPCACHE_PRIMES = [223, 463, 983, 1979, 3907, 7963, 16229, 32531, 65407,
+                  130987, 262237, 524521, 1048793]
+
+# Sequência medida: login (primeira requisição real) e leituras alternadas
+LOGIN = {"email": "admin@example.com", "password": "password"}
+READ_PATHS = ["/api/health", "/api/products"]
+
+
+# Cores para formatação no terminal
+class Colors:
+    """Define cores para saídas no terminal."""
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[0;33m'
+    BLUE = '\033[0;34m'
+    RESET = '\033[0m'  # No Color
+
+
+def log_info(message):
+    """Exibe mensagem informativa."""
+    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}")
+
+
+def log_success(message):
+    """Exibe mensagem de sucesso."""
+    print(f"{Colors.GREEN}[SUCCESS]{Colors.RESET} {message}")
+
+
+def log_warning(message):
+    """Exibe mensagem de aviso."""
+    print(f"{Colors.YELLOW}[WARNING]{Colors.RESET} {message}")
+
+
+def log_error(message):
+    """Exibe mensagem de erro."""
+    print(f"{Colors.RED}[ERROR]{Colors.RESET} {message}")
+
+
+def count_php_files(app_dir=APP_DIR):
+    """
+    Conta os arquivos PHP que o OPcache pode precisar manter em memória.
+
+    Args:
+        app_dir: Diretório da aplicação
+
+    Returns:
+        tuple: (quantidade de arquivos, soma dos tamanhos em bytes)
+    """
+    count = 0
+    total_bytes = 0
+    for root, dirs, files in os.walk(app_dir):
+        dirs[:] = [d for d in dirs if d not in COUNT_EXCLUDED_DIRS]
+        for name in files:
+            if name.endswith(".php"):
+                count += 1
+                total_bytes += os.path.getsize(os.path.join(root, name))
+    # Cada view Blade (já contada acima) gera ainda uma view compilada em
+    # storage/framework/views
+    views_dir = os.path.join(app_dir, "resources", "views")
+    if os.path.isdir(views_dir):
+        for _, _, files in os.walk(views_dir):
+            count += sum(1 for name in files if name.endswith(".php"))
+    return count, total_bytes
+
+
+def size_opcache(file_count, total_bytes):
+    """
+    Dimensiona o OPcache a partir dos arquivos da aplicação.
+
+    max_accelerated_files recebe o primeiro tamanho interno do OPcache com
+    20% de folga sobre a contagem real. A memória estima o código compilado
+    em 1,5x o tamanho dos fontes, mais 32 MB para o preload e imprevistos.
+
+    Args:
+        file_count: Quantidade de arquivos PHP
+        total_bytes: Soma dos tamanhos dos arquivos
+
+    Returns:
+        dict: Diretivas opcache.* calculadas
+    """
+    wanted = math.ceil(file_count * 1.2)
+    max_files = next((prime for prime in OPCACHE_PRIMES if prime >= wanted), OPCACHE_PRIMES[-1])
+    memory_mb = math.ceil((total_bytes * 1.5 / (1024 * 1024) + 32) / 32) * 32
+    memory_mb = max(128, memory_mb)
+    return {
+        "memory_consumption": memory_mb,
+        "interned_strings_buffer": 16 if memory_mb <= 256 else 32,
+        "max_accelerated_files": max_files,
+    }
+
+
+def render_opcache_ini(sizing, file_count):
+    """Gera o ini do OPcache para o modo warm boot."""
+    preload = f"{CONTAINER_APP_DIR}/{PRELOAD_SCRIPT}"
+    return (
+        f"; Gerado pelo warm_boot.py a partir de {file_count} arquivos PHP.\n"
+        "; Não editar: o arquivo é reescrito a cada execução.\n"
+        "; Com validate_timestamps = 0, mudanças no código exigem reiniciar o app.\n"
+        "[opcache]\n"
+        "opcache.enable = 1\n"
+        f"opcache.memory_consumption = {sizing['memory_consumption']}\n"
+        f"opcache.interned_strings_buffer = {sizing['interned_strings_buffer']}\n"
+        f"opcache.max_accelerated_files = {sizing['max_accelerated_files']}\n"
+        "opcache.validate_timestamps = 0\n"
+        "opcache.save_comments = 1\n"
+        f"opcache.preload = {preload}\n"
+        "opcache.preload_user = www-data\n"
+    )
+
+
+def preload_files(app_dir=APP_DIR):
+    """
+    Lista os arquivos de classe a pré-carregar, relativos à aplicação.
+
+    Apenas arquivos com nome iniciado em maiúscula (uma classe, interface
+    ou trait por arquivo, PSR-4) entram: arquivos de funções como helpers.php
+    continuam carregados pelo autoload do Composer.
+    """
+    selected = []
+    for directory in PRELOAD_DIRS:
+        base = os.path.join(app_dir, directory)
+        for root, dirs, files in os.walk(base):
+            dirs[:] = sorted(d for d in dirs if d not in PRELOAD_EXCLUDED_DIRS)
+            for name in sorted(files):
+                if name.endswith(".php") and name[:1].isupper():
+                    selected.append(os.path.relpath(os.path.join(root, name), app_dir))
+    return selected
+
+
+def render_preload_script(files):
+    """
+    Gera o script de preload.
+
+    Os arquivos são compilados com opcache_compile_file, sem executá-los; o
+    PHP liga ao final as classes cujas dependências também foram
+    pré-carregadas e as demais continuam vindo do autoload.
+    """
+    listing = "\n".join(f"    '{path.replace(os.sep, '/')}'," for path in files)
+    return (
+        "<?php\n\n"
+        "// Gerado pelo warm_boot.py. Não editar: o arquivo é reescrito a cada execução.\n\n"
+        "$base = dirname(__DIR__, 2);\n"
+        "$files = [\n"
+        f"{listing}\n"
+        "];\n\n"
+        "foreach ($files as $file) {\n"
+        "    if (is_file($base.'/'.$file)) {\n"
+        "        opcache_compile_file($base.'/'.$file);\n"
+        "    }\n"
+        "}\n"
+    )
+
+
+def write_if_changed(path, content):
+    """Grava o arquivo gerado apenas se o conteúdo mudou; retorna True se gravou."""
+    current = None
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            current = f.read()
+    if current == content:
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return True
+
+
+def generate(app_dir=APP_DIR):
+    """
+    Gera o ini do OPcache e o script de preload.
+
+    Args:
+        app_dir: Diretório da aplicação
+
+    Returns:
+        bool: True se algum dos arquivos mudou (o app precisa ser reiniciado)
+    """
+    file_count, total_bytes = count_php_files(app_dir)
+    sizing = size_opcache(file_count, total_bytes)
+    files = preload_files(app_dir)
+    if not os.path.isdir(os.path.join(app_dir, "vendor")):
+        log_warning("vendor/ ainda não existe: o preload terá apenas as classes de app/")
+
+    log_info(f"OPcache: {file_count} arquivos PHP ({total_bytes / 1024 / 1024:.1f} MB) -> "
+             f"max_accelerated_files = {sizing['max_accelerated_files']}, "
+             f"memory_consumption = {sizing['memory_consumption']} MB; "
+             f"{len(files)} classes no preload")
+    changed = write_if_changed(OPCACHE_INI, render_opcache_ini(sizing, file_count))
+    changed |= write_if_changed(os.path.join(app_dir, PRELOAD_SCRIPT),
+                                render_preload_script(files))
+    return changed
+
+
+def compose_with_warm_boot(docker_compose):
+    """
+    Monta o comando do Docker Compose com o override do warm boot.
+
+    Args:
+        docker_compose: Comando do Docker Compose, possivelmente já com outros arquivos -f
+
+    Returns:
+        str: Comando do Docker Compose com os arquivos -f adequados
+    """
+    if " -f " not in docker_compose:
+        docker_compose = f"{docker_compose} -f docker-compose.yml"
+    return f"{docker_compose} -f {COMPOSE_OVERRIDE_FILE}"
+
+
+def run(command):
+    """Executa um comando do shell e retorna o código de saída."""
+    return subprocess.run(command, shell=True, check=False).returncode
+
+
+def wait_for_app(docker_compose, port, timeout=120.0):
+    """
+    Aguarda o processo PHP aceitar conexões dentro do contêiner.
+
+    A verificação não passa pela aplicação, para que a primeira requisição
+    medida seja de fato a primeira atendida pelo PHP.
+    """
+    check = (f"{docker_compose} exec -T app php -r "
+             f"\"exit(@fsockopen('127.0.0.1', {port}) ? 0 : 1);\"")
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = subprocess.run(check, shell=True, capture_output=True, check=False)
+        if result.returncode == 0:
+            return True
+        time.sleep(0.5)
+    return False
+
+
+async def first_requests(base_url, count):
+    """
+    Mede as primeiras requisições após a inicialização, em sequência.
+
+    A primeira é o login; as seguintes alternam entre READ_PATHS com o token.
+
+    Returns:
+        list: Latências em segundos (None para falhas)
+    """
+    client = HttpClient(base_url, max_connections=1)
+    latencies = []
+    token = None
+    try:
+        for index in range(count):
+            started_at = time.perf_counter()
+            try:
+                if index == 0:
+                    response = await client.request("POST", "/api/login", json_body=LOGIN)
+                    if response.status == 200:
+                        token = response.json().get("token")
+                else:
+                    headers = {"Authorization": f"Bearer {token}"} if token else None
+                    response = await client.request(
+                        "GET", READ_PATHS[(index - 1) % len(READ_PATHS)], headers=headers)
+                ok = response.status < 500
+            except HttpError:
+                ok = False
+            latencies.append(time.perf_counter() - started_at if ok else None)
+    finally:
+        client.close()
+    return latencies
+
+
+def summarize(latencies):
+    """Resumo de uma fase: primeira requisição e distribuição das demais."""
+    histogram = LatencyHistogram()
+    for value in latencies[1:]:
+        if value is not None:
+            histogram.record_seconds(value)
+    total = [value for value in latencies if value is not None]
+    return {
+        "requests": len(latencies),
+        "failures": sum(1 for value in latencies if value is None),
+        "first_ms": round(latencies[0] * 1000, 2) if latencies and latencies[0] else None,
+        "total_ms": round(sum(total) * 1000, 2),
+        "rest": histogram,
+    }
+
+
+def measure_cold_warm(docker_compose, base_url, count, port):
+    """
+    Compara as primeiras requisições a frio e a quente.
+
+    Frio: caches do Laravel removidos e contêiner do app recriado sem o
+    override do warm boot (OPcache vazio, sem preload, revalidando arquivos).
+    Quente: caches reconstruídos e app recriado com o override.
+
+    Args:
+        docker_compose: Comando do Docker Compose sem o override do warm boot
+        base_url: URL da aplicação vista do host
+        count: Requisições medidas em cada fase
+        port: Porta do PHP dentro do contêiner (9000 no FPM, 8000 no artisan serve)
+
+    Returns:
+        dict: fase -> resumo
+    """
+    warm_compose = compose_with_warm_boot(docker_compose)
+    phases = {}
+    for phase, compose, commands in [
+        ("frio", docker_compose, ["php artisan optimize:clear"]),
+        ("quente", warm_compose, ["php artisan optimize"]),
+    ]:
+        log_info(f"Fase {phase}: preparando a aplicação...")
+        for command in commands:
+            run(f"{docker_compose} exec -T app {command}")
+        run(f"{compose} up -d --no-deps --force-recreate app")
+        if not wait_for_app(compose, port):
+            raise RuntimeError(f"a aplicação não iniciou na fase {phase}")
+        log_info(f"Fase {phase}: medindo as primeiras {count} requisições...")
+        phases[phase] = summarize(asyncio.run(first_requests(base_url, count)))
+    return phases
+
+
+def print_comparison(phases):
+    """Exibe a comparação entre as fases."""
+    print(f"\n{Colors.BLUE}=== INICIALIZAÇÃO A FRIO x A QUENTE ==={Colors.RESET}")
+    for phase, summary in phases.items():
+        print(f"{phase:<7} 1ª requisição {summary['first_ms'] or 0:>8.1f}ms  "
+              f"total {summary['total_ms']:>9.1f}ms  falhas {summary['failures']}")
+        print(f"        demais: {format_percentiles(summary['rest'])}")
+
+    cold, warm = phases.get("frio"), phases.get("quente")
+    if cold and warm and warm["total_ms"]:
+        print(f"\nGanho no total: {cold['total_ms'] / warm['total_ms']:.2f}x; "
+              f"p50 das demais: {cold['rest'].percentile(50) / 1000:.1f}ms -> "
+              f"{warm['rest'].percentile(50) / 1000:.1f}ms")
+
+
+def parse_arguments(argv):
+    """Interpreta os argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Caches do Laravel, OPcache e preload para inicialização a quente")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("generate", help="Gera o ini do OPcache e o script de preload")
+
+    measure = subparsers.add_parser(
+        "measure", help="Compara as primeiras requisições a frio e a quente")
+    measure.add_argument("--compose", default="docker compose",
+                         help="Comando do Docker Compose sem o override do warm boot "
+                              "(padrão: docker compose)")
+    measure.add_argument("--url", default="http://localhost:8000",
+                         help="URL da aplicação (padrão: http://localhost:8000)")
+    measure.add_argument("--php-port", type=int, default=None,
+                         help="Porta do PHP no contêiner (padrão: 9000 se a URL usa a "
+                              "porta 80, senão 8000)")
+    measure.add_argument("--requests", type=int, default=50,
+                         help="Requisições medidas em cada fase (padrão: 50)")
+    measure.add_argument("--json", action="store_true",
+                         help="Imprime o resultado em JSON")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Função principal do script."""
+    options = parse_arguments(sys.argv[1:])
+    if not os.path.isdir(APP_DIR):
+        log_error(f"Diretório da aplicação não encontrado: {APP_DIR}")
+        sys.exit(1)
+
+    if generate():
+        log_success(f"Arquivos gerados: {OPCACHE_INI}, {APP_DIR}/{PRELOAD_SCRIPT}")
+    if options.command == "generate":
+        return
+
+    port = options.php_port
+    if port is None:
+        port = 9000 if (urlsplit(options.url).port or 80) == 80 else 8000
+    try:
+        phases = measure_cold_warm(options.compose, options.url, options.requests, port)
+    except RuntimeError as e:
+        log_error(str(e))
+        sys.exit(1)
+
+    if options.json:
+        json.dump({phase: {**{k: v for k, v in summary.items() if k != "rest"},
+                           "rest": summary["rest"].to_dict()}
+                   for phase, summary in phases.items()}, sys.stdout, indent=2)
+        print()
+    else:
+        print_comparison(phases)
+
+
+if __name__ == "__main__":
+    main()